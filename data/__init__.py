@@ -146,6 +146,12 @@ def process_corpus(corpus_data: dict, save_processed: bool = True) -> tuple:
     return processor.process_corpus(corpus_data, save_processed)
 
 
+def process_corpus_stream(documents, workers: int = None, **kwargs):
+    """Procesa documentos en streaming con un pool de procesos"""
+    processor = get_corpus_processor_instance()
+    return processor.process_corpus_stream(documents, workers=workers, **kwargs)
+
+
 def clean_text(text: str, language: str = "es") -> str:
     """Limpia un texto"""
     processor = get_corpus_processor_instance()
@@ -400,8 +406,9 @@ def initialize_data_module():
         if not data_dir.exists():
             print("⚠️  Advertencia: Directorio de datos no encontrado")
 
-        # Inicializar sistema
-        initialize_data_system()
+        # Los gestores se crean en su primer uso (get_*_instance) o al llamar
+        # explícitamente a initialize_data_system(); instanciarlos aquí
+        # cargaba spaCy, transformers y FAISS en cada importación del paquete
 
     except Exception as e:
         print(f"❌ Error inicializando módulo de datos: {e}")
@@ -431,6 +438,7 @@ __all__ = [
     "get_rag_memory_data",
     "process_document",
     "process_corpus",
+    "process_corpus_stream",
     "clean_text",
     "tokenize_text",
     "extract_keywords",
@@ -10,19 +10,31 @@ import logging
 import asyncio
 import threading
 from pathlib import Path
-from typing import Dict, Any, List, Optional, Union, Tuple, Set
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Union, Tuple, Set
 from dataclasses import dataclass, asdict
 from datetime import datetime
 import hashlib
+import math
+import os
 import unicodedata
-from collections import Counter, defaultdict
-import nltk
-from nltk.tokenize import word_tokenize, sent_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import SnowballStemmer
-import spacy
-from transformers import AutoTokenizer
-import numpy as np
+from collections import Counter, defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from modules.utils.lazy_imports import lazy_import
+
+try:
+    from .sparse_tfidf import SparseTermMatrixBuilder, iter_ngrams
+except ImportError:
+    from sparse_tfidf import SparseTermMatrixBuilder, iter_ngrams
+
+# Librerías pesadas: se importan en el primer uso, no al importar este módulo
+nltk = lazy_import("nltk")
+nltk_tokenize = lazy_import("nltk.tokenize")
+nltk_corpus = lazy_import("nltk.corpus")
+nltk_stem = lazy_import("nltk.stem")
+spacy = lazy_import("spacy")
+transformers = lazy_import("transformers")
+np = lazy_import("numpy")
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -62,29 +74,177 @@ class CorpusStats:
     processing_time: float
 
 
+class HyperLogLog:
+    """
+    Estimador de cardinalidad con memoria fija (2^precision registros de un
+    byte). Con la precisión por defecto el error típico es ~0.8%.
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+        self._alpha = 0.7213 / (1 + 1.079 / self.num_registers)
+
+    def add(self, item: str):
+        value = int.from_bytes(
+            hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        index = value >> (64 - self.precision)
+        remaining_bits = 64 - self.precision
+        rank = remaining_bits - (value & ((1 << remaining_bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items: Iterable[str]):
+        for item in items:
+            self.add(item)
+
+    def __len__(self) -> int:
+        m = self.num_registers
+        estimate = self._alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        # Corrección para cardinalidades pequeñas (linear counting)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+class CorpusStatsAccumulator:
+    """
+    Estadísticas del corpus mantenidas de forma incremental, documento a
+    documento, sin conservar los documentos ni sus tokens. El vocabulario
+    es un conjunto exacto o, con `exact_vocabulary=False`, un HyperLogLog
+    de memoria constante.
+    """
+
+    def __init__(self, exact_vocabulary: bool = True):
+        self.started_at = datetime.now()
+        self.total_documents = 0
+        self.total_words = 0
+        self.total_sentences = 0
+        self.language_distribution: Counter = Counter()
+        self.category_distribution: Counter = Counter()
+        self.vocabulary: Union[Set[str], HyperLogLog] = (
+            set() if exact_vocabulary else HyperLogLog()
+        )
+
+    def add(self, doc: ProcessedDocument):
+        self.total_documents += 1
+        self.total_words += doc.word_count
+        self.total_sentences += doc.sentence_count
+        self.language_distribution[doc.language] += 1
+        self.category_distribution[doc.category] += 1
+        self.vocabulary.update(set(doc.tokens))
+
+    def to_stats(self, start_time: Optional[datetime] = None) -> CorpusStats:
+        unique_words = len(self.vocabulary)
+        processing_time = (
+            datetime.now() - (start_time or self.started_at)
+        ).total_seconds()
+
+        return CorpusStats(
+            total_documents=self.total_documents,
+            total_words=self.total_words,
+            total_sentences=self.total_sentences,
+            unique_words=unique_words,
+            vocabulary_size=unique_words,
+            language_distribution=dict(self.language_distribution),
+            category_distribution=dict(self.category_distribution),
+            average_document_length=(
+                self.total_words / self.total_documents
+                if self.total_documents > 0
+                else 0
+            ),
+            average_sentence_length=(
+                self.total_words / self.total_sentences
+                if self.total_sentences > 0
+                else 0
+            ),
+            processing_time=processing_time,
+        )
+
+
+# Procesador de cada proceso del pool: los modelos NLP se cargan una vez
+# por proceso y se reutilizan para todos sus lotes
+_worker_processor: Optional["CorpusProcessor"] = None
+
+
+def _init_worker(data_dir: str):
+    global _worker_processor
+    _worker_processor = CorpusProcessor(data_dir)
+
+
+def _process_chunk(
+    documents: List[Dict[str, Any]],
+) -> List[Optional[ProcessedDocument]]:
+    return [_worker_processor._process_document_safe(doc) for doc in documents]
+
+
+def _document_to_dict(doc: ProcessedDocument) -> Dict[str, Any]:
+    doc_dict = asdict(doc)
+    doc_dict["processed_at"] = doc_dict["processed_at"].isoformat()
+    return doc_dict
+
+
 class CorpusProcessor:
     """Procesador principal de corpus del sistema NeuroFusion"""
 
     def __init__(self, data_dir: str = "data"):
         self.data_dir = Path(data_dir)
-        self.nlp_models = {}
-        self.tokenizers = {}
-        self.stemmers = {}
-        self.stop_words = {}
         self.cache = {}
         self.locks = {}
 
-        # Inicializar modelos de procesamiento
-        self._initialize_nlp_models()
-        self._initialize_tokenizers()
-        self._initialize_stemmers()
-        self._initialize_stop_words()
-
-    def _initialize_nlp_models(self):
+        # Los modelos de procesamiento se cargan en su primer uso; cada
+        # diccionario se publica completo, nunca a medio llenar
+        self._nlp_models = None
+        self._tokenizers = None
+        self._stemmers = None
+        self._stop_words = None
+        self._init_lock = threading.RLock()
+
+    @property
+    def nlp_models(self) -> Dict[str, Any]:
+        """Modelos spaCy por idioma (carga diferida)"""
+        if self._nlp_models is None:
+            with self._init_lock:
+                if self._nlp_models is None:
+                    self._nlp_models = self._initialize_nlp_models()
+        return self._nlp_models
+
+    @property
+    def tokenizers(self) -> Dict[str, Any]:
+        """Tokenizers de transformers (carga diferida)"""
+        if self._tokenizers is None:
+            with self._init_lock:
+                if self._tokenizers is None:
+                    self._tokenizers = self._initialize_tokenizers()
+        return self._tokenizers
+
+    @property
+    def stemmers(self) -> Dict[str, Any]:
+        """Stemmers por idioma (carga diferida)"""
+        if self._stemmers is None:
+            with self._init_lock:
+                if self._stemmers is None:
+                    self._stemmers = self._initialize_stemmers()
+        return self._stemmers
+
+    @property
+    def stop_words(self) -> Dict[str, Set[str]]:
+        """Palabras vacías por idioma (carga diferida)"""
+        if self._stop_words is None:
+            with self._init_lock:
+                if self._stop_words is None:
+                    self._stop_words = self._initialize_stop_words()
+        return self._stop_words
+
+    def _initialize_nlp_models(self) -> Dict[str, Any]:
         """Inicializa modelos de procesamiento de lenguaje natural"""
+        nlp_models = {}
         try:
             # Cargar modelo spaCy para español
-            self.nlp_models["es"] = spacy.load("es_core_news_sm")
+            nlp_models["es"] = spacy.load("es_core_news_sm")
             logger.info("Modelo spaCy español cargado")
         except OSError:
             logger.warning("Modelo spaCy español no encontrado. Instalando...")
@@ -92,23 +252,26 @@ class CorpusProcessor:
                 import subprocess
 
                 subprocess.run(["python", "-m", "spacy", "download", "es_core_news_sm"])
-                self.nlp_models["es"] = spacy.load("es_core_news_sm")
+                nlp_models["es"] = spacy.load("es_core_news_sm")
                 logger.info("Modelo spaCy español instalado y cargado")
             except Exception as e:
                 logger.error(f"Error instalando modelo spaCy: {e}")
 
         try:
             # Cargar modelo spaCy para inglés
-            self.nlp_models["en"] = spacy.load("en_core_web_sm")
+            nlp_models["en"] = spacy.load("en_core_web_sm")
             logger.info("Modelo spaCy inglés cargado")
         except OSError:
             logger.warning("Modelo spaCy inglés no encontrado")
 
-    def _initialize_tokenizers(self):
+        return nlp_models
+
+    def _initialize_tokenizers(self) -> Dict[str, Any]:
         """Inicializa tokenizers de transformers"""
+        tokenizers = {}
         try:
             # Tokenizer para modelos de embeddings
-            self.tokenizers["embedding"] = AutoTokenizer.from_pretrained(
+            tokenizers["embedding"] = transformers.AutoTokenizer.from_pretrained(
                 "sentence-transformers/all-MiniLM-L6-v2"
             )
             logger.info("Tokenizer de embeddings cargado")
@@ -117,34 +280,42 @@ class CorpusProcessor:
 
         try:
             # Tokenizer para modelos de generación
-            self.tokenizers["generation"] = AutoTokenizer.from_pretrained(
+            tokenizers["generation"] = transformers.AutoTokenizer.from_pretrained(
                 "microsoft/Phi-3-mini-4k-instruct"
             )
             logger.info("Tokenizer de generación cargado")
         except Exception as e:
             logger.warning(f"Error cargando tokenizer de generación: {e}")
 
-    def _initialize_stemmers(self):
+        return tokenizers
+
+    def _initialize_stemmers(self) -> Dict[str, Any]:
         """Inicializa stemmers para diferentes idiomas"""
+        stemmers = {}
         try:
-            self.stemmers["es"] = SnowballStemmer("spanish")
-            self.stemmers["en"] = SnowballStemmer("english")
+            stemmers["es"] = nltk_stem.SnowballStemmer("spanish")
+            stemmers["en"] = nltk_stem.SnowballStemmer("english")
             logger.info("Stemmers inicializados")
         except Exception as e:
             logger.warning(f"Error inicializando stemmers: {e}")
 
-    def _initialize_stop_words(self):
+        return stemmers
+
+    def _initialize_stop_words(self) -> Dict[str, Set[str]]:
         """Inicializa listas de palabras vacías"""
+        stop_words = {}
         try:
             # Descargar stop words de NLTK si no están disponibles
             nltk.download("stopwords", quiet=True)
 
-            self.stop_words["es"] = set(stopwords.words("spanish"))
-            self.stop_words["en"] = set(stopwords.words("english"))
+            stop_words["es"] = set(nltk_corpus.stopwords.words("spanish"))
+            stop_words["en"] = set(nltk_corpus.stopwords.words("english"))
             logger.info("Stop words inicializadas")
         except Exception as e:
             logger.warning(f"Error inicializando stop words: {e}")
 
+        return stop_words
+
     def detect_language(self, text: str) -> str:
         """Detecta el idioma del texto"""
         try:
@@ -212,7 +383,7 @@ class CorpusProcessor:
 
         try:
             # Usar NLTK para tokenización básica
-            tokens = word_tokenize(text.lower(), language=language)
+            tokens = nltk_tokenize.word_tokenize(text.lower(), language=language)
 
             # Filtrar tokens
             filtered_tokens = []
@@ -244,7 +415,7 @@ class CorpusProcessor:
 
         try:
             # Usar NLTK para segmentación de oraciones
-            sentences = sent_tokenize(text, language=language)
+            sentences = nltk_tokenize.sent_tokenize(text, language=language)
 
             # Limpiar oraciones
             cleaned_sentences = []
@@ -378,32 +549,39 @@ class CorpusProcessor:
             logger.error(f"Error procesando documento: {e}")
             raise
 
+    def _process_document_safe(
+        self, document: Dict[str, Any]
+    ) -> Optional[ProcessedDocument]:
+        """Procesa un documento; devuelve None (y lo registra) si falla"""
+        try:
+            return self.process_document(document)
+        except Exception as e:
+            logger.error(f"Error procesando documento {document.get('id', '')}: {e}")
+            return None
+
     def process_corpus(
-        self, corpus_data: Dict[str, Any], save_processed: bool = True
+        self,
+        corpus_data: Dict[str, Any],
+        save_processed: bool = True,
+        workers: int = 1,
     ) -> Tuple[List[ProcessedDocument], CorpusStats]:
-        """Procesa un corpus completo"""
+        """
+        Procesa un corpus completo. Con `workers > 1` los documentos se
+        reparten en un pool de procesos (ver process_corpus_stream)
+        """
         start_time = datetime.now()
 
         try:
             documents = corpus_data.get("documents", [])
-            processed_docs = []
-
             logger.info(f"Procesando corpus con {len(documents)} documentos...")
 
-            for i, document in enumerate(documents):
-                try:
-                    processed_doc = self.process_document(document)
-                    processed_docs.append(processed_doc)
-
-                    if (i + 1) % 100 == 0:
-                        logger.info(f"Procesados {i + 1}/{len(documents)} documentos")
-
-                except Exception as e:
-                    logger.error(f"Error procesando documento {i}: {e}")
-                    continue
-
-            # Calcular estadísticas
-            stats = self._calculate_corpus_stats(processed_docs, start_time)
+            accumulator = CorpusStatsAccumulator()
+            processed_docs = list(
+                self.process_corpus_stream(
+                    documents, workers=workers, stats=accumulator
+                )
+            )
+            stats = accumulator.to_stats(start_time)
 
             # Guardar corpus procesado si se solicita
             if save_processed:
@@ -418,48 +596,133 @@ class CorpusProcessor:
             logger.error(f"Error procesando corpus: {e}")
             raise
 
+    def process_corpus_stream(
+        self,
+        documents: Iterable[Dict[str, Any]],
+        workers: Optional[int] = None,
+        chunk_size: int = 64,
+        stats: Optional[CorpusStatsAccumulator] = None,
+        output_path: Optional[Union[str, Path]] = None,
+    ) -> Iterator[ProcessedDocument]:
+        """
+        Procesa documentos de forma perezosa y devuelve los resultados en
+        el mismo orden de entrada, con memoria acotada.
+
+        Los documentos se leen del iterable a medida que hace falta (p. ej.
+        iter_documents sobre un JSONL de varios GB), se agrupan en lotes de
+        `chunk_size` y se reparten en un pool de `workers` procesos (por
+        defecto uno por CPU; con 1 se procesa en este proceso). Solo hay
+        `2 * workers` lotes en vuelo a la vez. Las estadísticas se
+        acumulan en `stats` y, si se indica `output_path`, cada documento
+        se escribe como una línea JSONL en cuanto está listo.
+        """
+        workers = workers or os.cpu_count() or 1
+        output_file = None
+        if output_path is not None:
+            Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+            output_file = open(output_path, "w", encoding="utf-8")
+
+        try:
+            if workers <= 1:
+                results: Iterator[Optional[ProcessedDocument]] = (
+                    self._process_document_safe(doc) for doc in documents
+                )
+                yield from self._emit_processed(results, stats, output_file)
+            else:
+                with ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(str(self.data_dir),),
+                ) as executor:
+                    results = self._iter_pool_results(
+                        executor, documents, chunk_size, max_pending=2 * workers
+                    )
+                    yield from self._emit_processed(results, stats, output_file)
+        finally:
+            if output_file is not None:
+                output_file.close()
+
+    @staticmethod
+    def _iter_pool_results(
+        executor: ProcessPoolExecutor,
+        documents: Iterable[Dict[str, Any]],
+        chunk_size: int,
+        max_pending: int,
+    ) -> Iterator[Optional[ProcessedDocument]]:
+        """Envía lotes al pool con una ventana acotada y los devuelve en orden"""
+        pending: deque = deque()
+        chunk: List[Dict[str, Any]] = []
+
+        try:
+            for document in documents:
+                chunk.append(document)
+                if len(chunk) >= chunk_size:
+                    pending.append(executor.submit(_process_chunk, chunk))
+                    chunk = []
+                    if len(pending) >= max_pending:
+                        yield from pending.popleft().result()
+
+            if chunk:
+                pending.append(executor.submit(_process_chunk, chunk))
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Si el consumidor deja de iterar, no procesar lo que falta
+            for future in pending:
+                future.cancel()
+
+    @staticmethod
+    def _emit_processed(
+        results: Iterable[Optional[ProcessedDocument]],
+        stats: Optional[CorpusStatsAccumulator],
+        output_file,
+    ) -> Iterator[ProcessedDocument]:
+        processed = 0
+        for doc in results:
+            if doc is None:
+                continue
+
+            if stats is not None:
+                stats.add(doc)
+            if output_file is not None:
+                output_file.write(
+                    json.dumps(_document_to_dict(doc), ensure_ascii=False) + "\n"
+                )
+
+            processed += 1
+            if processed % 100 == 0:
+                logger.info(f"Procesados {processed} documentos")
+            yield doc
+
+    @staticmethod
+    def iter_documents(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+        """
+        Lee documentos de forma perezosa: un documento por línea en JSONL,
+        o la lista "documents" de un JSON de corpus (este se carga entero)
+        """
+        path = Path(path)
+        with open(path, "r", encoding="utf-8") as f:
+            if path.suffix == ".jsonl":
+                for line_number, line in enumerate(f, 1):
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Línea {line_number} inválida en {path}: {e}")
+            else:
+                yield from json.load(f).get("documents", [])
+
     def _calculate_corpus_stats(
         self, processed_docs: List[ProcessedDocument], start_time: datetime
     ) -> CorpusStats:
         """Calcula estadísticas del corpus procesado"""
         try:
-            total_documents = len(processed_docs)
-            total_words = sum(doc.word_count for doc in processed_docs)
-            total_sentences = sum(doc.sentence_count for doc in processed_docs)
-
-            # Vocabulario único
-            all_tokens = []
+            accumulator = CorpusStatsAccumulator()
             for doc in processed_docs:
-                all_tokens.extend(doc.tokens)
-            unique_words = len(set(all_tokens))
-
-            # Distribución de idiomas
-            language_dist = Counter(doc.language for doc in processed_docs)
-
-            # Distribución de categorías
-            category_dist = Counter(doc.category for doc in processed_docs)
-
-            # Promedios
-            avg_doc_length = total_words / total_documents if total_documents > 0 else 0
-            avg_sentence_length = (
-                total_words / total_sentences if total_sentences > 0 else 0
-            )
-
-            # Tiempo de procesamiento
-            processing_time = (datetime.now() - start_time).total_seconds()
-
-            return CorpusStats(
-                total_documents=total_documents,
-                total_words=total_words,
-                total_sentences=total_sentences,
-                unique_words=unique_words,
-                vocabulary_size=unique_words,
-                language_distribution=dict(language_dist),
-                category_distribution=dict(category_dist),
-                average_document_length=avg_doc_length,
-                average_sentence_length=avg_sentence_length,
-                processing_time=processing_time,
-            )
+                accumulator.add(doc)
+            return accumulator.to_stats(start_time)
 
         except Exception as e:
             logger.error(f"Error calculando estadísticas: {e}")
@@ -471,11 +734,7 @@ class CorpusProcessor:
         """Guarda el corpus procesado"""
         try:
             # Convertir documentos procesados a diccionarios
-            docs_data = []
-            for doc in processed_docs:
-                doc_dict = asdict(doc)
-                doc_dict["processed_at"] = doc_dict["processed_at"].isoformat()
-                docs_data.append(doc_dict)
+            docs_data = [_document_to_dict(doc) for doc in processed_docs]
 
             # Crear estructura del corpus procesado
             processed_corpus = {
@@ -498,24 +757,19 @@ class CorpusProcessor:
             logger.error(f"Error guardando corpus procesado: {e}")
 
     def create_vocabulary(
-        self, processed_docs: List[ProcessedDocument], min_freq: int = 2
+        self, processed_docs: Iterable[ProcessedDocument], min_freq: int = 2
     ) -> Dict[str, int]:
         """Crea un vocabulario a partir de documentos procesados"""
         try:
-            # Contar frecuencias de palabras
-            word_freq = Counter()
-            for doc in processed_docs:
-                word_freq.update(doc.tokens)
-
-            # Filtrar por frecuencia mínima
-            vocabulary = {
-                word: freq for word, freq in word_freq.items() if freq >= min_freq
-            }
+            builder = self.build_term_matrix(processed_docs)
+            frequencies = np.asarray(builder.count_matrix().sum(axis=0)).ravel()
 
-            # Ordenar por frecuencia
-            sorted_vocab = dict(
-                sorted(vocabulary.items(), key=lambda x: x[1], reverse=True)
-            )
+            # Filtrar por frecuencia mínima y ordenar por frecuencia (estable:
+            # a igual frecuencia, orden de primera aparición)
+            term_ids = np.flatnonzero(frequencies >= min_freq)
+            term_ids = term_ids[np.argsort(-frequencies[term_ids], kind="stable")]
+            terms = builder.vocabulary.id_to_term
+            sorted_vocab = {terms[i]: int(frequencies[i]) for i in term_ids}
 
             logger.info(f"Vocabulario creado: {len(sorted_vocab)} palabras")
             return sorted_vocab
@@ -530,47 +784,62 @@ class CorpusProcessor:
             return []
 
         try:
-            ngrams = []
-            for i in range(len(tokens) - n + 1):
-                ngram = tuple(tokens[i : i + n])
-                ngrams.append(ngram)
-
-            return ngrams
+            return list(iter_ngrams(tokens, n))
 
         except Exception as e:
             logger.error(f"Error creando n-gramas: {e}")
             return []
 
+    def build_term_matrix(
+        self,
+        processed_docs: Iterable[ProcessedDocument],
+        ngram_range: Tuple[int, int] = (1, 1),
+        spill_dir: Optional[Union[str, Path]] = None,
+    ) -> SparseTermMatrixBuilder:
+        """
+        Construye la matriz documento-término dispersa en una sola pasada.
+        Acepta cualquier iterable (p. ej. process_corpus_stream); con
+        `spill_dir` los bloques se vuelcan a disco (out-of-core)
+        """
+        builder = SparseTermMatrixBuilder(ngram_range=ngram_range, spill_dir=spill_dir)
+        builder.add_documents((doc.id, doc.tokens) for doc in processed_docs)
+        return builder
+
+    def save_tf_idf(
+        self,
+        processed_docs: Iterable[ProcessedDocument],
+        output_path: Optional[Union[str, Path]] = None,
+        ngram_range: Tuple[int, int] = (1, 1),
+        spill_dir: Optional[Union[str, Path]] = None,
+    ) -> Path:
+        """
+        Calcula TF-IDF disperso y lo guarda con su vocabulario en un .npz
+        que se puede abrir por mmap con sparse_tfidf.load_term_matrix
+        """
+        output_path = output_path or self.data_dir / "corpus" / "tf_idf.npz"
+        builder = self.build_term_matrix(processed_docs, ngram_range, spill_dir)
+        return builder.save_npz(output_path)
+
     def calculate_tf_idf(
         self, processed_docs: List[ProcessedDocument]
     ) -> Dict[str, Dict[str, float]]:
         """Calcula TF-IDF para los documentos procesados"""
         try:
-            # Calcular frecuencia de términos por documento
-            doc_freqs = {}
-            for doc in processed_docs:
-                doc_freqs[doc.id] = Counter(doc.tokens)
-
-            # Calcular frecuencia de documentos que contienen cada término
-            term_doc_freq = Counter()
-            for doc_freq in doc_freqs.values():
-                for term in doc_freq:
-                    term_doc_freq[term] += 1
+            builder = self.build_term_matrix(processed_docs)
+            matrix = builder.tf_idf_matrix()
+            terms = builder.vocabulary.id_to_term
 
-            # Calcular TF-IDF
+            # Misma forma de resultado que antes: {doc_id: {término: tf-idf}}
             tf_idf = {}
-            total_docs = len(processed_docs)
-
-            for doc_id, doc_freq in doc_freqs.items():
-                tf_idf[doc_id] = {}
-                doc_total_words = sum(doc_freq.values())
-
-                for term, freq in doc_freq.items():
-                    tf = freq / doc_total_words
-                    idf = np.log(total_docs / term_doc_freq[term])
-                    tf_idf[doc_id][term] = tf * idf
-
-            logger.info(f"TF-IDF calculado para {len(processed_docs)} documentos")
+            indptr, indices, data = matrix.indptr, matrix.indices, matrix.data.tolist()
+            for row, doc_id in enumerate(builder.doc_ids):
+                start, end = indptr[row], indptr[row + 1]
+                tf_idf[doc_id] = {
+                    terms[term_id]: value
+                    for term_id, value in zip(indices[start:end].tolist(), data[start:end])
+                }
+
+            logger.info(f"TF-IDF calculado para {len(builder.doc_ids)} documentos")
             return tf_idf
 
         except Exception as e:
@@ -595,13 +864,26 @@ class CorpusProcessor:
         logger.info("Caché del procesador limpiado")
 
 
-# Instancia global del procesador de corpus
-corpus_processor = CorpusProcessor()
+# Instancia global del procesador de corpus (se crea en el primer uso)
+_corpus_processor: Optional[CorpusProcessor] = None
+_corpus_processor_lock = threading.Lock()
 
 
 def get_corpus_processor() -> CorpusProcessor:
     """Obtiene la instancia global del procesador de corpus"""
-    return corpus_processor
+    global _corpus_processor
+    if _corpus_processor is None:
+        with _corpus_processor_lock:
+            if _corpus_processor is None:
+                _corpus_processor = CorpusProcessor()
+    return _corpus_processor
+
+
+def __getattr__(name: str) -> Any:
+    # Compatibilidad con `from data.corpus_processor import corpus_processor`
+    if name == "corpus_processor":
+        return get_corpus_processor()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
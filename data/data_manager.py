@@ -12,15 +12,19 @@ import threading
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Union, Tuple
 from dataclasses import dataclass, asdict
-import duckdb
-import faiss
-import numpy as np
 from datetime import datetime, timedelta
 import hashlib
 import pickle
 import gzip
 import shutil
 
+from modules.utils.lazy_imports import lazy_import
+
+# Librerías pesadas: se importan en el primer uso, no al importar este módulo
+duckdb = lazy_import("duckdb")
+faiss = lazy_import("faiss")
+np = lazy_import("numpy")
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -346,7 +350,7 @@ class DataManager:
 
     def load_faiss_index(
         self, index_name: str = "faiss_index"
-    ) -> Optional[faiss.Index]:
+    ) -> Optional["faiss.Index"]:
         """Carga un índice FAISS"""
         index_path = self.data_dir / f"{index_name}.index"
 
@@ -363,7 +367,7 @@ class DataManager:
             return None
 
     def save_faiss_index(
-        self, index: faiss.Index, index_name: str = "faiss_index"
+        self, index: "faiss.Index", index_name: str = "faiss_index"
     ) -> bool:
         """Guarda un índice FAISS"""
         index_path = self.data_dir / f"{index_name}.index"
@@ -629,13 +633,26 @@ class DataManager:
         self.locks.clear()
 
 
-# Instancia global del gestor de datos
-data_manager = DataManager()
+# Instancia global del gestor de datos (se crea en el primer uso)
+_data_manager: Optional[DataManager] = None
+_data_manager_lock = threading.Lock()
 
 
 def get_data_manager() -> DataManager:
     """Obtiene la instancia global del gestor de datos"""
-    return data_manager
+    global _data_manager
+    if _data_manager is None:
+        with _data_manager_lock:
+            if _data_manager is None:
+                _data_manager = DataManager()
+    return _data_manager
+
+
+def __getattr__(name: str) -> Any:
+    # Compatibilidad con `from data.data_manager import data_manager`
+    if name == "data_manager":
+        return get_data_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
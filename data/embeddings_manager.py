@@ -11,18 +11,21 @@ import threading
 from pathlib import Path
 from typing import Dict, Any, List, Optional, Union, Tuple
 from dataclasses import dataclass, asdict
-import numpy as np
-import faiss
 from datetime import datetime, timedelta
 import hashlib
 import pickle
 import gzip
-from sentence_transformers import SentenceTransformer
-from transformers import AutoTokenizer, AutoModel
-import torch
-from sklearn.metrics.pairwise import cosine_similarity
 import sqlite3
 
+from modules.utils.lazy_imports import lazy_import
+
+# Librerías pesadas: se importan en el primer uso, no al importar este módulo
+np = lazy_import("numpy")
+faiss = lazy_import("faiss")
+torch = lazy_import("torch")
+sentence_transformers = lazy_import("sentence_transformers")
+transformers = lazy_import("transformers")
+
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -166,12 +169,12 @@ class EmbeddingsManager:
         for model_name, config in models_config.items():
             try:
                 if config["type"] == "sentence_transformer":
-                    model = SentenceTransformer(model_name)
+                    model = sentence_transformers.SentenceTransformer(model_name)
                     self.models[model_name] = model
                     logger.info(f"Modelo cargado: {model_name}")
                 elif config["type"] == "transformer":
-                    tokenizer = AutoTokenizer.from_pretrained(model_name)
-                    model = AutoModel.from_pretrained(model_name)
+                    tokenizer = transformers.AutoTokenizer.from_pretrained(model_name)
+                    model = transformers.AutoModel.from_pretrained(model_name)
                     self.tokenizers[model_name] = tokenizer
                     self.models[model_name] = model
                     logger.info(f"Modelo cargado: {model_name}")
@@ -199,7 +202,7 @@ class EmbeddingsManager:
                 return None
 
             # Generar embedding
-            if isinstance(model, SentenceTransformer):
+            if isinstance(model, sentence_transformers.SentenceTransformer):
                 embedding = model.encode(text, convert_to_tensor=False)
                 embedding_list = (
                     embedding.tolist() if hasattr(embedding, "tolist") else embedding
@@ -255,7 +258,7 @@ class EmbeddingsManager:
                 return [None] * len(texts)
 
             # Generar embeddings en lote
-            if isinstance(model, SentenceTransformer):
+            if isinstance(model, sentence_transformers.SentenceTransformer):
                 embeddings = model.encode(valid_text_list, convert_to_tensor=False)
                 embeddings_list = (
                     embeddings.tolist() if hasattr(embeddings, "tolist") else embeddings
@@ -505,7 +508,7 @@ class EmbeddingsManager:
 
     def load_faiss_index(
         self, model_name: str = "all-MiniLM-L6-v2"
-    ) -> Optional[Tuple[faiss.Index, List[str]]]:
+    ) -> Optional[Tuple["faiss.Index", List[str]]]:
         """Carga un índice FAISS"""
         try:
             index_path = (
@@ -720,13 +723,26 @@ class EmbeddingsManager:
                 logger.error(f"Error cerrando conexión: {e}")
 
 
-# Instancia global del gestor de embeddings
-embeddings_manager = EmbeddingsManager()
+# Instancia global del gestor de embeddings (se crea en el primer uso)
+_embeddings_manager: Optional[EmbeddingsManager] = None
+_embeddings_manager_lock = threading.Lock()
 
 
 def get_embeddings_manager() -> EmbeddingsManager:
     """Obtiene la instancia global del gestor de embeddings"""
-    return embeddings_manager
+    global _embeddings_manager
+    if _embeddings_manager is None:
+        with _embeddings_manager_lock:
+            if _embeddings_manager is None:
+                _embeddings_manager = EmbeddingsManager()
+    return _embeddings_manager
+
+
+def __getattr__(name: str) -> Any:
+    # Compatibilidad con `from data.embeddings_manager import embeddings_manager`
+    if name == "embeddings_manager":
+        return get_embeddings_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
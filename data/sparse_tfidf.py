@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Motor TF-IDF Disperso del Sistema NeuroFusion
+Matriz documento-término en formato CSR construida en una sola pasada
+"""
+
+import logging
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from modules.utils.lazy_imports import lazy_import
+
+# Librerías pesadas: se importan en el primer uso, no al importar este módulo
+np = lazy_import("numpy")
+sp = lazy_import("scipy.sparse")
+npy_format = lazy_import("numpy.lib.format")
+
+logger = logging.getLogger(__name__)
+
+
+class TokenVocabulary:
+    """Internado de términos: cada término distinto recibe un id entero"""
+
+    def __init__(self, terms: Optional[Iterable[str]] = None):
+        self.term_to_id: Dict[str, int] = {}
+        self.id_to_term: List[str] = []
+        for term in terms or ():
+            self.intern(term)
+
+    def intern(self, term: str) -> int:
+        term_id = self.term_to_id.get(term)
+        if term_id is None:
+            term_id = len(self.id_to_term)
+            self.term_to_id[term] = term_id
+            self.id_to_term.append(term)
+        return term_id
+
+    def __len__(self) -> int:
+        return len(self.id_to_term)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.term_to_id
+
+
+def iter_ngrams(tokens: Sequence[str], n: int) -> Iterator[Tuple[str, ...]]:
+    """N-gramas de una secuencia de tokens (sin copiar sublistas)"""
+    return zip(*(tokens[i:] for i in range(n)))
+
+
+class SparseTermMatrixBuilder:
+    """
+    Construye la matriz documento-término (documentos x términos) en una
+    sola pasada.
+
+    Cada documento se convierte a ids con `np.unique` en cuanto se añade,
+    sin guardar sus tokens. Los documentos se acumulan por bloques de
+    `chunk_nnz` entradas no nulas; con `spill_dir` cada bloque se vuelca a
+    archivos binarios en disco y la matriz final se lee por mmap, de modo
+    que corpus mayores que la memoria se pueden indexar (out-of-core).
+    """
+
+    def __init__(
+        self,
+        vocabulary: Optional[TokenVocabulary] = None,
+        ngram_range: Tuple[int, int] = (1, 1),
+        chunk_nnz: int = 1_000_000,
+        spill_dir: Optional[Union[str, Path]] = None,
+    ):
+        self.vocabulary = vocabulary or TokenVocabulary()
+        self.ngram_range = ngram_range
+        self.chunk_nnz = chunk_nnz
+        self.spill_dir = Path(spill_dir) if spill_dir else None
+
+        self.doc_ids: List[str] = []
+        self.row_nnz: List[int] = []
+        self.document_frequency = np.zeros(0, dtype=np.int64)
+
+        self._chunk_indices: List[Any] = []
+        self._chunk_counts: List[Any] = []
+        self._chunk_size = 0
+        self._blocks: List[Tuple[Any, Any]] = []
+        self._spilled_nnz = 0
+
+        if self.spill_dir is not None:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            # Archivos de volcado nuevos para esta construcción
+            for name in ("indices.bin", "counts.bin"):
+                (self.spill_dir / name).write_bytes(b"")
+
+    def _terms(self, tokens: Sequence[str]) -> Iterator[str]:
+        low, high = self.ngram_range
+        for n in range(low, high + 1):
+            if n == 1:
+                yield from tokens
+            else:
+                yield from (" ".join(ngram) for ngram in iter_ngrams(tokens, n))
+
+    def add_document(self, tokens: Sequence[str], doc_id: Optional[str] = None):
+        intern = self.vocabulary.intern
+        ids = np.fromiter((intern(term) for term in self._terms(tokens)), dtype=np.int64)
+        unique_ids, counts = np.unique(ids, return_counts=True)
+
+        self.doc_ids.append(doc_id if doc_id is not None else str(len(self.doc_ids)))
+        self.row_nnz.append(len(unique_ids))
+        self._chunk_indices.append(unique_ids)
+        self._chunk_counts.append(counts)
+        self._chunk_size += len(unique_ids)
+
+        if self._chunk_size >= self.chunk_nnz:
+            self._flush_chunk()
+
+    def add_documents(self, documents: Iterable[Tuple[Optional[str], Sequence[str]]]):
+        """Añade pares (doc_id, tokens); acepta cualquier iterable perezoso"""
+        for doc_id, tokens in documents:
+            self.add_document(tokens, doc_id)
+
+    def _flush_chunk(self):
+        if not self._chunk_indices:
+            return
+
+        indices = np.concatenate(self._chunk_indices)
+        counts = np.concatenate(self._chunk_counts).astype(np.float32)
+        self._chunk_indices, self._chunk_counts, self._chunk_size = [], [], 0
+
+        # Frecuencia de documento: cada id aparece una vez por documento
+        chunk_df = np.bincount(indices, minlength=len(self.vocabulary))
+        if len(self.document_frequency) < len(chunk_df):
+            self.document_frequency = np.pad(
+                self.document_frequency,
+                (0, len(chunk_df) - len(self.document_frequency)),
+            )
+        self.document_frequency[: len(chunk_df)] += chunk_df
+
+        if self.spill_dir is None:
+            self._blocks.append((indices.astype(np.int32), counts))
+        else:
+            with open(self.spill_dir / "indices.bin", "ab") as f:
+                indices.astype(np.int32).tofile(f)
+            with open(self.spill_dir / "counts.bin", "ab") as f:
+                counts.tofile(f)
+            self._spilled_nnz += len(indices)
+
+    def count_matrix(self):
+        """Matriz CSR de frecuencias (documentos x términos)"""
+        self._flush_chunk()
+
+        if self.spill_dir is not None:
+            if self._spilled_nnz:
+                indices = np.memmap(
+                    self.spill_dir / "indices.bin", dtype=np.int32, mode="r"
+                )
+                counts = np.memmap(
+                    self.spill_dir / "counts.bin", dtype=np.float32, mode="r"
+                )
+            else:
+                indices = np.zeros(0, dtype=np.int32)
+                counts = np.zeros(0, dtype=np.float32)
+        elif self._blocks:
+            indices = np.concatenate([block[0] for block in self._blocks])
+            counts = np.concatenate([block[1] for block in self._blocks])
+            self._blocks = [(indices, counts)]
+        else:
+            indices = np.zeros(0, dtype=np.int32)
+            counts = np.zeros(0, dtype=np.float32)
+
+        indptr = np.zeros(len(self.row_nnz) + 1, dtype=np.int64)
+        np.cumsum(self.row_nnz, out=indptr[1:])
+
+        return sp.csr_matrix(
+            (counts, indices, indptr),
+            shape=(len(self.row_nnz), len(self.vocabulary)),
+            copy=False,
+        )
+
+    def idf(self):
+        """log(N / df) por término (0 para términos sin documentos)"""
+        self._flush_chunk()
+        df = np.zeros(len(self.vocabulary), dtype=np.float64)
+        df[: len(self.document_frequency)] = self.document_frequency
+        idf = np.zeros(len(df), dtype=np.float32)
+        seen = df > 0
+        idf[seen] = np.log(len(self.row_nnz) / df[seen])
+        return idf
+
+    def tf_idf_matrix(self):
+        """
+        TF-IDF = (frecuencia / palabras del documento) * idf, todo disperso.
+        Conserva la estructura de la matriz de frecuencias: los términos
+        presentes en todos los documentos (idf = 0) quedan como ceros
+        explícitos, igual que en el resultado de `calculate_tf_idf`
+        """
+        counts = self.count_matrix()
+        row_totals = np.asarray(counts.sum(axis=1)).ravel()
+        with np.errstate(divide="ignore"):
+            inverse_totals = np.where(row_totals > 0, 1.0 / row_totals, 0.0)
+
+        # Escalado de los valores sin productos de matrices, que descartan
+        # los ceros resultantes
+        rows = np.repeat(np.arange(counts.shape[0]), np.diff(counts.indptr))
+        data = (
+            counts.data
+            * inverse_totals[rows].astype(np.float32)
+            * self.idf()[counts.indices]
+        ).astype(np.float32)
+        return sp.csr_matrix(
+            (data, counts.indices, counts.indptr), shape=counts.shape, copy=False
+        )
+
+    def save_npz(self, path: Union[str, Path], tf_idf: bool = True) -> Path:
+        """Guarda matriz, vocabulario, ids e idf (ver load_term_matrix)"""
+        matrix = self.tf_idf_matrix() if tf_idf else self.count_matrix()
+        return save_term_matrix(
+            path, matrix, self.vocabulary.id_to_term, self.doc_ids, self.idf()
+        )
+
+
+def save_term_matrix(
+    path: Union[str, Path],
+    matrix,
+    vocabulary: Sequence[str],
+    doc_ids: Sequence[str],
+    idf=None,
+) -> Path:
+    """
+    Guarda una matriz CSR en un .npz sin compresión: cada array se almacena
+    tal cual dentro del zip, lo que permite leerlo después por mmap
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    matrix = sp.csr_matrix(matrix)
+
+    arrays = {
+        "data": matrix.data,
+        "indices": matrix.indices,
+        "indptr": matrix.indptr,
+        "shape": np.asarray(matrix.shape, dtype=np.int64),
+        "vocabulary": np.asarray(list(vocabulary), dtype=str),
+        "doc_ids": np.asarray(list(doc_ids), dtype=str),
+    }
+    if idf is not None:
+        arrays["idf"] = np.asarray(idf)
+
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+    logger.info(
+        f"Matriz {matrix.shape[0]}x{matrix.shape[1]} ({matrix.nnz} no nulos) "
+        f"guardada: {path}"
+    )
+    return path
+
+
+def load_term_matrix(path: Union[str, Path], mmap: bool = True) -> Dict[str, Any]:
+    """
+    Carga un .npz de save_term_matrix. Con `mmap=True` los arrays de la
+    matriz y del idf se mapean en memoria directamente desde el zip (np.load
+    ignora mmap_mode en los .npz), así que abrir una matriz grande no la
+    copia a RAM.
+
+    Devuelve {"matrix", "vocabulary", "doc_ids", "idf"}.
+    """
+    path = Path(path)
+    arrays = _mmap_npz(path) if mmap else dict(np.load(path, allow_pickle=False))
+
+    shape = tuple(int(x) for x in arrays["shape"])
+    matrix = sp.csr_matrix(
+        (arrays["data"], arrays["indices"], arrays["indptr"]), shape=shape, copy=False
+    )
+
+    return {
+        "matrix": matrix,
+        "vocabulary": arrays["vocabulary"].tolist(),
+        "doc_ids": arrays["doc_ids"].tolist(),
+        "idf": arrays.get("idf"),
+    }
+
+
+def _mmap_npz(path: Path) -> Dict[str, Any]:
+    """Mapea en memoria los miembros sin comprimir de un .npz"""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, "rb") as f:
+        for info in archive.infolist():
+            name = info.filename[:-4] if info.filename.endswith(".npy") else info.filename
+            if info.compress_type != zipfile.ZIP_STORED:
+                arrays[name] = np.load(archive.open(info), allow_pickle=False)
+                continue
+
+            # Cabecera local del zip: 30 bytes fijos + nombre + campo extra
+            f.seek(info.header_offset + 26)
+            name_length = int.from_bytes(f.read(2), "little")
+            extra_length = int.from_bytes(f.read(2), "little")
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+
+            version = npy_format.read_magic(f)
+            if version == (1, 0):
+                header = npy_format.read_array_header_1_0(f)
+            else:
+                header = npy_format.read_array_header_2_0(f)
+            shape, fortran_order, dtype = header
+            if dtype.hasobject or 0 in shape:
+                f.seek(info.header_offset + 30 + name_length + extra_length)
+                arrays[name] = npy_format.read_array(f, allow_pickle=False)
+                continue
+
+            arrays[name] = np.memmap(
+                path,
+                dtype=dtype,
+                mode="r",
+                offset=f.tell(),
+                shape=shape,
+                order="F" if fortran_order else "C",
+            )
+    return arrays
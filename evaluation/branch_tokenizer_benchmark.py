@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Benchmark del Detector de Ramas de UnifiedBranchTokenizer
+=========================================================
+Compara, sobre unos miles de consultas reales, la detección/sugerencia de
+ramas término a término (una búsqueda por término de cada rama, como hacía
+el tokenizador) con el autómata único `BranchPatternMatcher`, y la
+tokenización uno a uno con `tokenize_batch`. También verifica que ambos
+caminos devuelven los mismos resultados.
+
+Consultas: `datasets/conversations/real_interactions.jsonl` si existe; si
+no, las instrucciones y respuestas de `data/branches/*.jsonl`. El
+vocabulario de ramas se entrena con los datasets de `data/branches/`.
+
+Uso:
+    python evaluation/branch_tokenizer_benchmark.py
+    python evaluation/branch_tokenizer_benchmark.py --queries 5000 --repeat 5
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from modules.unified_systems.unified_branch_tokenizer import UnifiedBranchTokenizer
+
+REAL_INTERACTIONS = REPO_ROOT / "datasets" / "conversations" / "real_interactions.jsonl"
+BRANCH_DATASETS = str(REPO_ROOT / "data" / "branches" / "branch_*_dataset.jsonl")
+
+
+def load_queries(limit: int) -> List[str]:
+    """Cargar consultas reales (repitiendo el conjunto si hay menos)"""
+    queries: List[str] = []
+
+    if REAL_INTERACTIONS.exists():
+        with open(REAL_INTERACTIONS, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if data.get("query"):
+                    queries.append(data["query"])
+
+    if not queries:
+        for path in sorted(glob.glob(BRANCH_DATASETS)):
+            with open(path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        data = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue
+                    for field in ("instruction", "output"):
+                        if data.get(field):
+                            queries.append(data[field])
+
+    if not queries:
+        raise RuntimeError("No hay consultas disponibles para el benchmark")
+
+    return [queries[i % len(queries)] for i in range(limit)]
+
+
+def build_tokenizer() -> UnifiedBranchTokenizer:
+    """Tokenizador con vocabulario aprendido de los datasets de ramas"""
+    tokenizer = UnifiedBranchTokenizer()
+    branches = list(tokenizer.vocab_builder.branch_vocabs)
+    for index, path in enumerate(sorted(glob.glob(BRANCH_DATASETS))):
+        branch = branches[index % len(branches)]
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    data = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                text = " ".join(
+                    data.get(field, "") for field in ("instruction", "output")
+                )
+                tokenizer.vocab_builder.update_branch_vocab(branch, text)
+    return tokenizer
+
+
+class PerTermBaseline:
+    """Referencia: cada término de cada rama se busca por separado"""
+
+    def __init__(self, tokenizer: UnifiedBranchTokenizer):
+        self.tokenizer = tokenizer
+        self.branch_patterns: Dict[str, List[tuple]] = {}
+        for term, branch, kind, whole_word in tokenizer.matcher.patterns:
+            self.branch_patterns.setdefault(branch, []).append(
+                (term, kind, whole_word)
+            )
+
+    def detect_active_branches(self, text: str) -> List[str]:
+        text_lower = text.lower()
+        return [
+            branch
+            for branch, patterns in self.branch_patterns.items()
+            if any(kind == "name" and term in text_lower for term, kind, _ in patterns)
+        ]
+
+    def suggest_branches(self, text: str) -> List[tuple]:
+        total_words = len(text.split())
+        if total_words == 0:
+            return []
+        text_lower = text.lower()
+        words = set(self.tokenizer.vocab_builder._tokenize_text(text))
+        order = list(self.tokenizer.BRANCH_KEYWORDS) + list(
+            self.tokenizer.vocab_builder.branch_vocabs
+        )
+        scores = Counter()
+        for branch in dict.fromkeys(order):
+            matched = {
+                term
+                for term, kind, whole_word in self.branch_patterns.get(branch, [])
+                if kind != "name"
+                and ((term in words) if whole_word else (term in text_lower))
+            }
+            if matched:
+                scores[branch] = len(matched)
+        return [(branch, count / total_words) for branch, count in scores.most_common()]
+
+
+class BranchTokenizerBenchmark:
+    """Benchmark de detección de ramas y tokenización en lote"""
+
+    def __init__(self, log_dir: str = "logs/performance"):
+        os.makedirs(log_dir, exist_ok=True)
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s: %(message)s",
+        )
+        self.logger = logging.getLogger(__name__)
+        self.log_dir = log_dir
+
+    @staticmethod
+    def _time(fn: Callable[[], Any], repeat: int) -> float:
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    def run(self, num_queries: int, repeat: int) -> Dict[str, Any]:
+        queries = load_queries(num_queries)
+        tokenizer = build_tokenizer()
+        baseline = PerTermBaseline(tokenizer)
+        matcher = tokenizer.matcher
+
+        # Verificar equivalencia antes de medir
+        mismatches = sum(
+            1
+            for q in queries
+            if sorted(tokenizer.detect_active_branches(q))
+            != sorted(baseline.detect_active_branches(q))
+            or tokenizer.suggest_branches(q) != baseline.suggest_branches(q)
+        )
+
+        def per_term():
+            for q in queries:
+                baseline.detect_active_branches(q)
+                baseline.suggest_branches(q)
+
+        def automaton():
+            for q in queries:
+                tokenizer.detect_active_branches(q)
+                tokenizer.suggest_branches(q)
+
+        def tokenize_loop():
+            for q in queries:
+                tokenizer.tokenize(q, "tech")
+
+        per_term_s = self._time(per_term, repeat)
+        automaton_s = self._time(automaton, repeat)
+        tokenize_s = self._time(tokenize_loop, repeat)
+        batch_s = self._time(lambda: tokenizer.tokenize_batch(queries, "tech"), repeat)
+
+        result = {
+            "queries": len(queries),
+            "patterns": len(matcher.patterns),
+            "branches": len(baseline.branch_patterns),
+            "mismatches": mismatches,
+            "per_term_ms": per_term_s * 1000,
+            "automaton_ms": automaton_s * 1000,
+            "detection_speedup": per_term_s / automaton_s if automaton_s else None,
+            "tokenize_loop_ms": tokenize_s * 1000,
+            "tokenize_batch_ms": batch_s * 1000,
+            "tokenize_speedup": tokenize_s / batch_s if batch_s else None,
+        }
+        self.logger.info(
+            f"{result['queries']} consultas, {result['patterns']} términos: "
+            f"detección x{result['detection_speedup']:.2f}, "
+            f"tokenización x{result['tokenize_speedup']:.2f}"
+        )
+        return result
+
+    def save_results(self, result: Dict[str, Any]) -> str:
+        output_path = os.path.join(self.log_dir, "branch_tokenizer_benchmark.json")
+        with open(output_path, "w") as f:
+            json.dump({"timestamp": time.time(), "result": result}, f, indent=2)
+        return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del detector de ramas")
+    parser.add_argument("--queries", type=int, default=3000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    benchmark = BranchTokenizerBenchmark()
+    result = benchmark.run(args.queries, args.repeat)
+
+    print(f"\nConsultas: {result['queries']}  términos: {result['patterns']}")
+    print(
+        f"  detección término a término: {result['per_term_ms']:8.1f} ms\n"
+        f"  detección con autómata:      {result['automaton_ms']:8.1f} ms"
+        f"  (x{result['detection_speedup']:.2f})\n"
+        f"  tokenize() en bucle:         {result['tokenize_loop_ms']:8.1f} ms\n"
+        f"  tokenize_batch():            {result['tokenize_batch_ms']:8.1f} ms"
+        f"  (x{result['tokenize_speedup']:.2f})"
+    )
+    if result["mismatches"]:
+        print(f"\n❌ {result['mismatches']} consultas con resultados distintos")
+    print(f"\nResultados guardados en {benchmark.save_results(result)}")
+    return 1 if result["mismatches"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Precisión Contextual: fp32 vs int8
+===============================================
+Mide `ContextualAccuracyEvaluator` con el encoder en fp32 y con
+cuantización dinámica int8 en CPU:
+
+- latencia por par (p50/p95) codificando consulta y respuesta por separado
+  (como antes) y en un único lote
+- pares/segundo con `evaluate_batch`
+- precisión de int8 frente a fp32: error absoluto de la similitud,
+  correlación y proporción de puntuaciones finales idénticas
+
+Pares: instrucción + respuesta de los datasets de `data/branches/`, más
+los mismos con respuestas barajadas para cubrir similitudes bajas. Las
+cachés del encoder y de consultas se desactivan para medir inferencia.
+
+Uso:
+    python evaluation/contextual_accuracy_benchmark.py
+    python evaluation/contextual_accuracy_benchmark.py --pairs 500 --batch-size 64
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import random
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from modules.embeddings.encoder_service import DEFAULT_ENCODER_MODEL, EncoderService
+from modules.rewards.contextual_accuracy import ContextualAccuracyEvaluator
+
+BRANCH_DATASETS = str(REPO_ROOT / "data" / "branches" / "branch_*_dataset.jsonl")
+
+
+def load_pairs(num_pairs: int, seed: int = 0) -> List[Tuple[str, str]]:
+    """Mitad pares reales (instrucción, respuesta), mitad barajados"""
+    pairs: List[Tuple[str, str]] = []
+    for dataset in sorted(glob.glob(BRANCH_DATASETS)):
+        with open(dataset, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                query = f"{record.get('instruction', '')} {record.get('input', '')}"
+                pairs.append((query.strip(), record.get("output", "")))
+    if not pairs:
+        raise RuntimeError("No hay datos disponibles para el benchmark")
+
+    rng = random.Random(seed)
+    rng.shuffle(pairs)
+    real = pairs[: num_pairs // 2]
+    responses = [response for _, response in pairs[: num_pairs - len(real)]]
+    rng.shuffle(responses)
+    shuffled = [(query, response) for (query, _), response in zip(pairs, responses)]
+    return real + shuffled
+
+
+class ContextualAccuracyBenchmark:
+    """Benchmark de latencia y precisión del evaluador contextual"""
+
+    def __init__(self, log_dir: str = "logs/performance"):
+        os.makedirs(log_dir, exist_ok=True)
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s: %(message)s",
+        )
+        self.logger = logging.getLogger(__name__)
+        self.log_dir = log_dir
+
+    def _evaluator(self, model_path: str, quantize: bool) -> ContextualAccuracyEvaluator:
+        """Evaluador con un encoder propio y sin cachés"""
+        encoder = EncoderService(
+            model_path, cache_size=0, max_wait_ms=0, quantize=quantize
+        )
+        return ContextualAccuracyEvaluator(
+            embedding_model=model_path, query_cache_size=0, encoder=encoder
+        )
+
+    @staticmethod
+    def _latency(samples: List[float]) -> Dict[str, float]:
+        ms = np.asarray(samples) * 1000
+        return {
+            "mean_ms": float(ms.mean()),
+            "p50_ms": float(np.percentile(ms, 50)),
+            "p95_ms": float(np.percentile(ms, 95)),
+        }
+
+    def measure(
+        self, evaluator: ContextualAccuracyEvaluator, pairs, batch_size: int
+    ) -> Dict[str, Any]:
+        encoder = evaluator.embedding_model
+        latency_pairs = pairs[: min(len(pairs), 200)]
+
+        # Antes: un forward para la consulta y otro para la respuesta
+        separate = []
+        for query, response in latency_pairs:
+            start = time.perf_counter()
+            encoder.encode(query)
+            encoder.encode(response)
+            separate.append(time.perf_counter() - start)
+
+        # Ahora: consulta y respuesta en un único lote
+        single = []
+        similarities = []
+        for query, response in latency_pairs:
+            start = time.perf_counter()
+            similarities.append(evaluator.semantic_similarity(query, response))
+            single.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        scores = evaluator.evaluate_batch(pairs, batch_size=batch_size)
+        batch_s = time.perf_counter() - start
+
+        return {
+            "separate_forwards": self._latency(separate),
+            "single_batch": self._latency(single),
+            "evaluate_batch_seconds": batch_s,
+            "evaluate_batch_pairs_per_second": len(pairs) / batch_s,
+            "similarities": similarities,
+            "scores": scores,
+        }
+
+    def run(self, model_path: str, pairs, batch_size: int) -> Dict[str, Any]:
+        results = {}
+        for name, quantize in (("fp32", False), ("int8", True)):
+            start = time.perf_counter()
+            evaluator = self._evaluator(model_path, quantize)
+            load_s = time.perf_counter() - start
+            results[name] = self.measure(evaluator, pairs, batch_size)
+            results[name]["load_seconds"] = load_s
+            self.logger.info(
+                f"{name}: {results[name]['single_batch']['p50_ms']:.1f} ms/par, "
+                f"{results[name]['evaluate_batch_pairs_per_second']:.1f} pares/s en lote"
+            )
+
+        fp32_sim = np.asarray(results["fp32"].pop("similarities"))
+        int8_sim = np.asarray(results["int8"].pop("similarities"))
+        fp32_scores = np.asarray(results["fp32"].pop("scores"))
+        int8_scores = np.asarray(results["int8"].pop("scores"))
+        error = np.abs(fp32_sim - int8_sim)
+
+        return {
+            "model": model_path,
+            "pairs": len(pairs),
+            "batch_size": batch_size,
+            "fp32": results["fp32"],
+            "int8": results["int8"],
+            "accuracy": {
+                "similarity_mean_abs_error": float(error.mean()),
+                "similarity_max_abs_error": float(error.max()),
+                "similarity_correlation": float(np.corrcoef(fp32_sim, int8_sim)[0, 1]),
+                "score_agreement": float(np.mean(fp32_scores == int8_scores)),
+                "score_mean_abs_error": float(np.abs(fp32_scores - int8_scores).mean()),
+            },
+        }
+
+    def save_results(self, result: Dict[str, Any]) -> str:
+        output_path = os.path.join(self.log_dir, "contextual_accuracy_benchmark.json")
+        with open(output_path, "w") as f:
+            json.dump({"timestamp": time.time(), "result": result}, f, indent=2)
+        return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Benchmark de precisión contextual fp32 vs int8"
+    )
+    parser.add_argument("--model", default=DEFAULT_ENCODER_MODEL)
+    parser.add_argument("--pairs", type=int, default=400)
+    parser.add_argument("--batch-size", type=int, default=64)
+    args = parser.parse_args()
+
+    benchmark = ContextualAccuracyBenchmark()
+    pairs = load_pairs(args.pairs)
+    result = benchmark.run(args.model, pairs, args.batch_size)
+
+    print(f"\nPares: {result['pairs']}  modelo: {result['model']}")
+    for name in ("fp32", "int8"):
+        r = result[name]
+        print(
+            f"  {name}: separado {r['separate_forwards']['p50_ms']:7.1f} ms"
+            f"  un lote {r['single_batch']['p50_ms']:7.1f} ms"
+            f" (p95 {r['single_batch']['p95_ms']:.1f})"
+            f"  evaluate_batch {r['evaluate_batch_pairs_per_second']:8.1f} pares/s"
+        )
+    accuracy = result["accuracy"]
+    print(
+        f"  int8 vs fp32: error medio {accuracy['similarity_mean_abs_error']:.4f}"
+        f"  máx {accuracy['similarity_max_abs_error']:.4f}"
+        f"  correlación {accuracy['similarity_correlation']:.4f}"
+        f"  puntuaciones idénticas {accuracy['score_agreement']:.1%}"
+    )
+    print(f"\nResultados guardados en {benchmark.save_results(result)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
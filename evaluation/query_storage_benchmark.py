@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""
+Benchmark de /query bajo Carga Concurrente
+==========================================
+Compara el throughput (peticiones/segundo) de un manejador de `/query`
+cuando los sistemas unificados guardan sus datos:
+
+- antes: con sqlite3 síncrono dentro de la corrutina (un commit por
+  escritura, bloqueando el event loop), como hacían
+  `_save_generation_to_db`, `_save_learning_experience`, ...
+- después: con la capa `unified_async_storage` (escritor dedicado con
+  commits por lotes, pool de lectura y WAL).
+
+Cada petición simulada reproduce la parte de base de datos de /query:
+lectura de sesión, espera del modelo (`asyncio.sleep`) y las escrituras de
+generación, evaluación de calidad y métricas. También se mide el retraso
+del event loop (p95), que es lo que perciben las demás peticiones.
+
+Con `--url` se mide en su lugar un servidor real (`unified_api_server.py`)
+arrancado aparte; ejecutarlo contra la revisión anterior y la actual para
+comparar.
+
+Uso:
+    python evaluation/query_storage_benchmark.py
+    python evaluation/query_storage_benchmark.py --requests 2000 --concurrency 64
+    python evaluation/query_storage_benchmark.py --url http://localhost:8000
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+
+from modules.unified_systems.unified_async_storage import AsyncStorage, get_sqlite_storage
+
+_SCHEMA = [
+    """
+    CREATE TABLE IF NOT EXISTS generations (
+        id TEXT PRIMARY KEY,
+        prompt TEXT NOT NULL,
+        content TEXT NOT NULL,
+        quality_score REAL NOT NULL,
+        created_at TEXT NOT NULL,
+        metadata TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS quality_evaluations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        query TEXT NOT NULL,
+        response TEXT NOT NULL,
+        overall_score REAL NOT NULL,
+        timestamp TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS performance_metrics (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        metric_type TEXT NOT NULL,
+        metric_value REAL NOT NULL,
+        timestamp TEXT NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS user_sessions (
+        session_id TEXT PRIMARY KEY,
+        user_id TEXT NOT NULL,
+        last_activity TEXT NOT NULL
+    )
+    """,
+]
+
+_INSERT_GENERATION = (
+    "INSERT INTO generations (id, prompt, content, quality_score, created_at, metadata) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+_INSERT_EVALUATION = (
+    "INSERT INTO quality_evaluations (query, response, overall_score, timestamp) "
+    "VALUES (?, ?, ?, ?)"
+)
+_INSERT_METRIC = (
+    "INSERT INTO performance_metrics (metric_type, metric_value, timestamp) "
+    "VALUES (?, ?, ?)"
+)
+_SELECT_SESSION = "SELECT user_id, last_activity FROM user_sessions WHERE session_id = ?"
+_UPDATE_SESSION = "UPDATE user_sessions SET last_activity = ? WHERE session_id = ?"
+
+
+def _request_rows(index: int):
+    now = datetime.now().isoformat()
+    query = f"consulta de prueba {index}"
+    response = "respuesta generada " * 20
+    return now, query, response
+
+
+class SyncSQLiteBackend:
+    """Comportamiento anterior: sqlite3 síncrono dentro de la corrutina"""
+
+    name = "antes (sqlite3 síncrono)"
+
+    def __init__(self, db_path: str):
+        self.conn = sqlite3.connect(db_path)
+
+    async def handle(self, index: int, session_id: str, model_latency: float):
+        now, query, response = _request_rows(index)
+
+        cursor = self.conn.cursor()
+        cursor.execute(_SELECT_SESSION, (session_id,))
+        cursor.fetchone()
+        cursor.close()
+
+        await asyncio.sleep(model_latency)
+
+        for sql, params in (
+            (
+                _INSERT_GENERATION,
+                (uuid.uuid4().hex, query, response, 0.8, now, json.dumps({})),
+            ),
+            (_INSERT_EVALUATION, (query, response, 0.8, now)),
+            (_INSERT_METRIC, ("processing_time", model_latency, now)),
+            (_INSERT_METRIC, ("quality_score", 0.8, now)),
+            (_UPDATE_SESSION, (now, session_id)),
+        ):
+            cursor = self.conn.cursor()
+            cursor.execute(sql, params)
+            self.conn.commit()
+            cursor.close()
+
+    def close(self):
+        self.conn.close()
+
+
+class AsyncStorageBackend:
+    """Comportamiento actual: unified_async_storage"""
+
+    name = "después (unified_async_storage)"
+
+    def __init__(self, db_path: str):
+        self.storage: AsyncStorage = get_sqlite_storage(db_path)
+
+    async def handle(self, index: int, session_id: str, model_latency: float):
+        now, query, response = _request_rows(index)
+
+        await self.storage.fetchone(_SELECT_SESSION, (session_id,))
+
+        await asyncio.sleep(model_latency)
+
+        # Igual que los sistemas: la generación se espera, el resto se encola
+        await self.storage.execute(
+            _INSERT_GENERATION,
+            (uuid.uuid4().hex, query, response, 0.8, now, json.dumps({})),
+        )
+        self.storage.submit(_INSERT_EVALUATION, (query, response, 0.8, now))
+        self.storage.submit(_INSERT_METRIC, ("processing_time", model_latency, now))
+        self.storage.submit(_INSERT_METRIC, ("quality_score", 0.8, now))
+        self.storage.submit(_UPDATE_SESSION, (now, session_id))
+
+    def close(self):
+        self.storage.close()
+
+
+class QueryStorageBenchmark:
+    """Benchmark de throughput de /query antes y después"""
+
+    def __init__(self, log_dir: str = "logs/performance"):
+        os.makedirs(log_dir, exist_ok=True)
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s: %(message)s",
+        )
+        self.logger = logging.getLogger(__name__)
+        self.log_dir = log_dir
+
+    def run_backend(
+        self,
+        backend_cls,
+        requests: int,
+        concurrency: int,
+        model_latency: float,
+        sessions: int = 100,
+    ) -> Dict[str, Any]:
+        """Medir un backend sobre una base de datos nueva"""
+        work_dir = tempfile.mkdtemp(prefix="query_bench_")
+        db_path = os.path.join(work_dir, "bench.db")
+        try:
+            conn = sqlite3.connect(db_path)
+            for statement in _SCHEMA:
+                conn.execute(statement)
+            session_ids = [f"session_{i}" for i in range(sessions)]
+            conn.executemany(
+                "INSERT INTO user_sessions VALUES (?, ?, ?)",
+                [(sid, "user", datetime.now().isoformat()) for sid in session_ids],
+            )
+            conn.commit()
+            conn.close()
+
+            backend = backend_cls(db_path)
+            try:
+                result = asyncio.run(
+                    self._drive(backend, session_ids, requests, concurrency, model_latency)
+                )
+            finally:
+                backend.close()
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        result["backend"] = backend_cls.name
+        self.logger.info(
+            f"{backend_cls.name}: {result['requests_per_second']:.1f} req/s, "
+            f"p95 latencia {result['latency_p95_ms']:.1f} ms, "
+            f"p95 retraso del loop {result['loop_lag_p95_ms']:.1f} ms"
+        )
+        return result
+
+    async def _drive(
+        self,
+        backend,
+        session_ids: List[str],
+        requests: int,
+        concurrency: int,
+        model_latency: float,
+    ) -> Dict[str, Any]:
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: List[float] = []
+        lags: List[float] = []
+        done = asyncio.Event()
+
+        async def probe():
+            # Retraso del event loop: cuánto tarda en despertar un sleep corto
+            interval = 0.005
+            while not done.is_set():
+                start = time.perf_counter()
+                await asyncio.sleep(interval)
+                lags.append(time.perf_counter() - start - interval)
+
+        async def one(index: int):
+            async with semaphore:
+                start = time.perf_counter()
+                await backend.handle(
+                    index, session_ids[index % len(session_ids)], model_latency
+                )
+                latencies.append(time.perf_counter() - start)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+        return {
+            "requests": requests,
+            "concurrency": concurrency,
+            "model_latency_ms": model_latency * 1000,
+            "elapsed_seconds": elapsed,
+            "requests_per_second": requests / elapsed,
+            "latency_p50_ms": _percentile(latencies, 50) * 1000,
+            "latency_p95_ms": _percentile(latencies, 95) * 1000,
+            "loop_lag_p95_ms": _percentile(lags, 95) * 1000,
+        }
+
+    def run_http(self, url: str, requests: int, concurrency: int) -> Dict[str, Any]:
+        """Medir un servidor /query real con peticiones concurrentes"""
+        import httpx
+
+        async def drive():
+            semaphore = asyncio.Semaphore(concurrency)
+            latencies, errors = [], 0
+
+            async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+
+                async def one(index: int):
+                    nonlocal errors
+                    async with semaphore:
+                        start = time.perf_counter()
+                        response = await client.post(
+                            "/query", json={"query": f"consulta de prueba {index}"}
+                        )
+                        latencies.append(time.perf_counter() - start)
+                        if response.status_code != 200:
+                            errors += 1
+
+                start = time.perf_counter()
+                await asyncio.gather(*(one(i) for i in range(requests)))
+                elapsed = time.perf_counter() - start
+
+            return {
+                "backend": url,
+                "requests": requests,
+                "concurrency": concurrency,
+                "errors": errors,
+                "elapsed_seconds": elapsed,
+                "requests_per_second": requests / elapsed,
+                "latency_p50_ms": _percentile(latencies, 50) * 1000,
+                "latency_p95_ms": _percentile(latencies, 95) * 1000,
+            }
+
+        return asyncio.run(drive())
+
+    def save_results(self, results: List[Dict[str, Any]]) -> str:
+        output_path = os.path.join(self.log_dir, "query_storage_benchmark.json")
+        with open(output_path, "w") as f:
+            json.dump({"timestamp": time.time(), "results": results}, f, indent=2)
+        return output_path
+
+
+def _percentile(values: List[float], percentile: int) -> float:
+    if not values:
+        return 0.0
+    if len(values) == 1:
+        return values[0]
+    return statistics.quantiles(values, n=100)[percentile - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de /query")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument(
+        "--model-latency-ms",
+        type=float,
+        default=20.0,
+        help="Latencia simulada del modelo por petición",
+    )
+    parser.add_argument("--url", help="Medir un servidor real en esta URL")
+    args = parser.parse_args()
+
+    benchmark = QueryStorageBenchmark()
+
+    if args.url:
+        results = [benchmark.run_http(args.url, args.requests, args.concurrency)]
+    else:
+        results = [
+            benchmark.run_backend(
+                backend_cls,
+                args.requests,
+                args.concurrency,
+                args.model_latency_ms / 1000,
+            )
+            for backend_cls in (SyncSQLiteBackend, AsyncStorageBackend)
+        ]
+
+    print()
+    for result in results:
+        print(f"{result['backend']}")
+        print(
+            f"  {result['requests_per_second']:8.1f} req/s   "
+            f"p50 {result['latency_p50_ms']:7.1f} ms   "
+            f"p95 {result['latency_p95_ms']:7.1f} ms"
+            + (
+                f"   retraso loop p95 {result['loop_lag_p95_ms']:6.1f} ms"
+                if "loop_lag_p95_ms" in result
+                else ""
+            )
+        )
+
+    if len(results) == 2:
+        speedup = results[1]["requests_per_second"] / results[0]["requests_per_second"]
+        print(f"\nMejora de throughput: x{speedup:.2f}")
+
+    print(f"\nResultados guardados en {benchmark.save_results(results)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
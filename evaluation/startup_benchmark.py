@@ -0,0 +1,283 @@
+#!/usr/bin/env python3
+"""
+Benchmark de Arranque de los Puntos de Entrada
+==============================================
+Mide, para cada punto de entrada, el tiempo de reloj y la memoria (RSS
+máxima) hasta quedar "listo" (módulo cargado y app construida, sin entrar
+en el bloque `__main__`), y desglosa el coste de importación con
+`python -X importtime`. Compara cada medición con el presupuesto de
+`evaluation/startup_budgets.json` y devuelve código de salida 1 si alguno
+lo supera.
+
+Uso:
+    python evaluation/startup_benchmark.py               # medir y comparar
+    python evaluation/startup_benchmark.py --runs 5      # mediana de 5 runs
+    python evaluation/startup_benchmark.py --only blockchain_server
+    python evaluation/startup_benchmark.py --update-budgets
+"""
+
+import argparse
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+BUDGETS_PATH = REPO_ROOT / "evaluation" / "startup_budgets.json"
+
+# Puntos de entrada: nombre -> script (relativo a la raíz del repositorio)
+ENTRY_POINTS = {
+    "chatbot_completo": "chatbot_completo.py",
+    "llm_server": "backend/llm_server.py",
+    "unified_api_server": "modules/unified_systems/unified_api_server.py",
+    "blockchain_server": "blockchain_server.py",
+    "corpus_processor": "data/corpus_processor.py",
+}
+
+# Margen sobre la medición actual al regenerar presupuestos
+BUDGET_HEADROOM = 1.25
+
+_RESULT_MARKER = "__STARTUP_BENCHMARK__"
+
+# Programa que ejecuta el proceso hijo: carga el script como lo haría
+# `python script.py` pero con otro __name__, para no arrancar el servidor
+_CHILD_PROGRAM = """
+import json, resource, runpy, sys, time
+start = time.perf_counter()
+script = sys.argv[1]
+sys.argv = [script]
+sys.path.insert(0, {script_dir!r})
+error = None
+try:
+    runpy.run_path(script, run_name="__startup_benchmark__")
+except BaseException as e:
+    error = "%s: %s" % (type(e).__name__, e)
+ready = time.perf_counter() - start
+rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print({marker!r} + json.dumps({{"ready_seconds": ready, "max_rss_kb": rss_kb, "error": error}}))
+"""
+
+
+class StartupBenchmark:
+    """Benchmark de arranque con desglose de -X importtime"""
+
+    def __init__(self, log_dir: str = "logs/performance", top_imports: int = 10):
+        os.makedirs(log_dir, exist_ok=True)
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s: %(message)s",
+        )
+        self.logger = logging.getLogger(__name__)
+        self.log_dir = log_dir
+        self.top_imports = top_imports
+
+    def measure_entry_point(self, name: str, script: str) -> Dict[str, Any]:
+        """Ejecutar un punto de entrada en un proceso limpio y medirlo"""
+        script_path = REPO_ROOT / script
+        program = _CHILD_PROGRAM.format(
+            script_dir=str(script_path.parent), marker=_RESULT_MARKER
+        )
+
+        start = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", program, str(script_path)],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            timeout=600,
+        )
+        wall_seconds = time.perf_counter() - start
+
+        result = {
+            "name": name,
+            "script": script,
+            "wall_seconds": wall_seconds,
+            "ready_seconds": None,
+            "max_rss_mb": None,
+            "error": None,
+            "returncode": completed.returncode,
+        }
+
+        for line in completed.stdout.splitlines():
+            if line.startswith(_RESULT_MARKER):
+                child = json.loads(line[len(_RESULT_MARKER) :])
+                result["ready_seconds"] = child["ready_seconds"]
+                # ru_maxrss está en KB en Linux
+                result["max_rss_mb"] = child["max_rss_kb"] / 1024
+                result["error"] = child["error"]
+                break
+        else:
+            result["error"] = f"el proceso terminó con código {completed.returncode}"
+        if completed.returncode != 0 and not result["error"]:
+            result["error"] = f"el proceso terminó con código {completed.returncode}"
+
+        imports = self.parse_importtime(completed.stderr)
+        result["import_seconds"] = sum(imports.values())
+        result["top_imports"] = sorted(
+            ({"package": pkg, "seconds": secs} for pkg, secs in imports.items()),
+            key=lambda entry: entry["seconds"],
+            reverse=True,
+        )[: self.top_imports]
+        return result
+
+    @staticmethod
+    def parse_importtime(stderr: str) -> Dict[str, float]:
+        """
+        Agregar la salida de -X importtime por paquete raíz: suma del tiempo
+        propio (self) de cada módulo importado, en segundos
+        """
+        totals: Dict[str, float] = defaultdict(float)
+        for line in stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            # "import time:   <self> | <cumulative> |   <paquete>"
+            try:
+                self_us, _, package = line.split(":", 1)[1].split("|")
+                self_us = int(self_us)
+            except ValueError:
+                continue
+            package = package.strip()
+            totals[package.split(".")[0]] += self_us / 1_000_000
+        return dict(totals)
+
+    def run(self, names: Optional[List[str]] = None, runs: int = 1) -> List[Dict]:
+        """Medir los puntos de entrada (mediana de `runs` ejecuciones)"""
+        results = []
+        for name, script in ENTRY_POINTS.items():
+            if names and name not in names:
+                continue
+
+            samples = [self.measure_entry_point(name, script) for _ in range(runs)]
+            median = _median(samples)
+            result = min(samples, key=lambda r: abs(r["wall_seconds"] - median))
+            result["runs"] = runs
+            results.append(result)
+
+            self.logger.info(
+                f"{name}: {result['wall_seconds']:.2f}s hasta listo, "
+                f"{result['max_rss_mb'] or 0:.0f} MB RSS"
+                + (f" (error: {result['error']})" if result["error"] else "")
+            )
+        return results
+
+    def check_budgets(
+        self, results: List[Dict[str, Any]], budgets: Dict[str, Dict[str, float]]
+    ) -> List[str]:
+        """
+        Devolver las regresiones respecto al presupuesto de cada entrada.
+        Un punto de entrada que no arranca (error o código de salida no
+        nulo) es siempre una regresión, tenga presupuesto o no
+        """
+        regressions = []
+        for result in results:
+            if result["error"]:
+                regressions.append(f"{result['name']}: no arranca ({result['error']})")
+                continue
+
+            budget = budgets.get(result["name"])
+            if not budget:
+                continue
+
+            if result["wall_seconds"] > budget["max_seconds"]:
+                regressions.append(
+                    f"{result['name']}: {result['wall_seconds']:.2f}s > "
+                    f"{budget['max_seconds']:.2f}s"
+                )
+            if (
+                result["max_rss_mb"] is not None
+                and result["max_rss_mb"] > budget["max_rss_mb"]
+            ):
+                regressions.append(
+                    f"{result['name']}: {result['max_rss_mb']:.0f} MB > "
+                    f"{budget['max_rss_mb']:.0f} MB"
+                )
+        return regressions
+
+    def save_results(self, results: List[Dict[str, Any]]) -> str:
+        output_path = os.path.join(self.log_dir, "startup_benchmark.json")
+        with open(output_path, "w") as f:
+            json.dump(
+                {"timestamp": time.time(), "results": results}, f, indent=2
+            )
+        return output_path
+
+
+def _median(samples: List[Dict[str, Any]]) -> float:
+    return statistics.median(sample["wall_seconds"] for sample in samples)
+
+
+def load_budgets() -> Dict[str, Dict[str, float]]:
+    if BUDGETS_PATH.exists():
+        with open(BUDGETS_PATH, "r") as f:
+            return json.load(f)
+    return {}
+
+
+def update_budgets(results: List[Dict[str, Any]]):
+    """Regenerar presupuestos a partir de la medición actual más un margen"""
+    budgets = load_budgets()
+    for result in results:
+        if result["error"]:
+            continue
+        budgets[result["name"]] = {
+            "max_seconds": round(result["wall_seconds"] * BUDGET_HEADROOM, 2),
+            "max_rss_mb": round(result["max_rss_mb"] * BUDGET_HEADROOM),
+        }
+    with open(BUDGETS_PATH, "w") as f:
+        json.dump(budgets, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque")
+    parser.add_argument("--only", nargs="*", help="Puntos de entrada a medir")
+    parser.add_argument("--runs", type=int, default=1)
+    parser.add_argument(
+        "--update-budgets",
+        action="store_true",
+        help="Guardar la medición actual (+25%%) como nuevo presupuesto",
+    )
+    args = parser.parse_args()
+
+    benchmark = StartupBenchmark()
+    results = benchmark.run(args.only, args.runs)
+    output_path = benchmark.save_results(results)
+
+    for result in results:
+        print(f"\n{result['name']} ({result['script']})")
+        print(
+            f"  listo: {result['wall_seconds']:.2f}s  "
+            f"RSS: {result['max_rss_mb'] or 0:.0f} MB  "
+            f"imports: {result['import_seconds']:.2f}s"
+        )
+        if result["error"]:
+            print(f"  error: {result['error']}")
+        for entry in result["top_imports"]:
+            print(f"    {entry['package']:<30} {entry['seconds'] * 1000:8.1f} ms")
+
+    print(f"\nResultados guardados en {output_path}")
+
+    if args.update_budgets:
+        update_budgets(results)
+        print(f"Presupuestos actualizados en {BUDGETS_PATH}")
+        return 0
+
+    regressions = benchmark.check_budgets(results, load_budgets())
+    if regressions:
+        print("\n❌ Regresiones de arranque:")
+        for regression in regressions:
+            print(f"  - {regression}")
+        return 1
+
+    print("\n✅ Todos los puntos de entrada dentro de presupuesto")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Benchmark de la Caché de Tokenización LoRA
+==========================================
+Compara la preparación del dataset de entrenamiento:
+
+- antes: re-tokenizar todo el dataset en cada entrenamiento (como hacía
+  `LoRATrainer.prepare_dataset`), con relleno por lote
+- después: `TokenizationCache` en frío (tokenizar y escribir los tokens
+  empaquetados) y en caliente (abrir por mmap y recorrer el dataset)
+
+Informa tokens/segundo de cada camino y la proporción de relleno
+(tokens de padding / tokens procesados) con y sin empaquetado.
+
+Datos: `--dataset` (JSONL o directorio con manifest.json); por defecto los
+datasets de `data/branches/`, repetidos hasta `--examples` ejemplos.
+
+Uso:
+    python evaluation/tokenization_cache_benchmark.py
+    python evaluation/tokenization_cache_benchmark.py --tokenizer gpt2 --examples 20000
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO_ROOT))
+sys.path.insert(0, str(REPO_ROOT / "modules" / "core" / "training"))
+
+from tokenization_cache import DEFAULT_TEMPLATE, TokenizationCache, _Example
+
+BRANCH_DATASETS = str(REPO_ROOT / "data" / "branches" / "branch_*_dataset.jsonl")
+
+
+def build_dataset(path: str, examples: int) -> str:
+    """JSONL de benchmark con `examples` ejemplos de los datasets de ramas"""
+    records: List[Dict[str, Any]] = []
+    for dataset in sorted(glob.glob(BRANCH_DATASETS)):
+        with open(dataset, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    continue
+    if not records:
+        raise RuntimeError("No hay datos disponibles para el benchmark")
+
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(examples):
+            f.write(json.dumps(records[i % len(records)], ensure_ascii=False) + "\n")
+    return path
+
+
+class TokenizationCacheBenchmark:
+    """Benchmark de tokenización con y sin caché"""
+
+    def __init__(self, log_dir: str = "logs/performance"):
+        os.makedirs(log_dir, exist_ok=True)
+        logging.basicConfig(
+            level=logging.INFO,
+            format="%(asctime)s - %(levelname)s: %(message)s",
+        )
+        self.logger = logging.getLogger(__name__)
+        self.log_dir = log_dir
+
+    def retokenize(
+        self, dataset_path: str, tokenizer, max_length: int, batch_size: int
+    ) -> Dict[str, Any]:
+        """Referencia: tokenizar todo con truncado y relleno por lote"""
+        with open(dataset_path, "r", encoding="utf-8") as f:
+            texts = [
+                DEFAULT_TEMPLATE.format_map(_Example(json.loads(line)))
+                for line in f
+                if line.strip()
+            ]
+
+        start = time.perf_counter()
+        encoded = []
+        for i in range(0, len(texts), 1000):
+            encoded.extend(
+                tokenizer(
+                    texts[i : i + 1000], truncation=True, max_length=max_length
+                )["input_ids"]
+            )
+        elapsed = time.perf_counter() - start
+
+        num_tokens = sum(len(ids) for ids in encoded)
+        # Relleno dinámico: cada lote se rellena hasta su secuencia más larga
+        padded = sum(
+            max(len(ids) for ids in encoded[i : i + batch_size])
+            * len(encoded[i : i + batch_size])
+            for i in range(0, len(encoded), batch_size)
+        )
+        return {
+            "seconds": elapsed,
+            "num_tokens": num_tokens,
+            "tokens_per_second": num_tokens / elapsed if elapsed else None,
+            "padding_ratio": 1 - num_tokens / padded if padded else 0.0,
+        }
+
+    def run(
+        self, tokenizer_name: str, dataset_path: str, max_length: int, batch_size: int
+    ) -> Dict[str, Any]:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(tokenizer_name)
+        baseline = self.retokenize(dataset_path, tokenizer, max_length, batch_size)
+
+        cache_dir = tempfile.mkdtemp(prefix="token_cache_bench_")
+        try:
+            cache = TokenizationCache(cache_dir=cache_dir, max_length=max_length)
+
+            start = time.perf_counter()
+            dataset = cache.load(dataset_path, tokenizer)
+            cold_s = time.perf_counter() - start
+            stats = dataset.stats
+
+            # En caliente: abrir la caché y leer todas las secuencias
+            start = time.perf_counter()
+            warm = cache.load(dataset_path, tokenizer)
+            for i in range(len(warm)):
+                warm[i]
+            warm_s = time.perf_counter() - start
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+        result = {
+            "tokenizer": tokenizer_name,
+            "examples": stats["num_examples"],
+            "max_length": max_length,
+            "batch_size": batch_size,
+            "retokenize": baseline,
+            "cache_cold_seconds": cold_s,
+            "cache_cold_tokens_per_second": stats["num_tokens"] / cold_s,
+            "cache_warm_seconds": warm_s,
+            "cache_warm_tokens_per_second": stats["num_tokens"] / warm_s,
+            "packed_sequences": stats["num_sequences"],
+            "packed_padding_ratio": stats["padding_ratio"],
+        }
+        self.logger.info(
+            f"{result['examples']} ejemplos: re-tokenizar "
+            f"{baseline['tokens_per_second']:.0f} tok/s, caché en caliente "
+            f"{result['cache_warm_tokens_per_second']:.0f} tok/s; relleno "
+            f"{baseline['padding_ratio']:.1%} -> {result['packed_padding_ratio']:.1%}"
+        )
+        return result
+
+    def save_results(self, result: Dict[str, Any]) -> str:
+        output_path = os.path.join(self.log_dir, "tokenization_cache_benchmark.json")
+        with open(output_path, "w") as f:
+            json.dump({"timestamp": time.time(), "result": result}, f, indent=2)
+        return output_path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de la caché de tokenización")
+    parser.add_argument(
+        "--tokenizer",
+        default="models/custom/shaili-personal-model",
+        help="Nombre o ruta del tokenizador (AutoTokenizer)",
+    )
+    parser.add_argument("--dataset", help="JSONL o directorio con manifest.json")
+    parser.add_argument("--examples", type=int, default=5000)
+    parser.add_argument("--max-length", type=int, default=512)
+    parser.add_argument("--batch-size", type=int, default=4)
+    args = parser.parse_args()
+
+    benchmark = TokenizationCacheBenchmark()
+
+    work_dir = tempfile.mkdtemp(prefix="token_cache_data_")
+    try:
+        dataset_path = args.dataset or build_dataset(
+            os.path.join(work_dir, "dataset.jsonl"), args.examples
+        )
+        result = benchmark.run(
+            args.tokenizer, dataset_path, args.max_length, args.batch_size
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    baseline = result["retokenize"]
+    print(f"\nEjemplos: {result['examples']}  max_length: {result['max_length']}")
+    print(
+        f"  re-tokenizar cada entrenamiento: {baseline['seconds']:8.2f} s"
+        f"  {baseline['tokens_per_second']:12.0f} tok/s\n"
+        f"  caché en frío (tokenizar+escribir): {result['cache_cold_seconds']:5.2f} s"
+        f"  {result['cache_cold_tokens_per_second']:12.0f} tok/s\n"
+        f"  caché en caliente (mmap):        {result['cache_warm_seconds']:8.2f} s"
+        f"  {result['cache_warm_tokens_per_second']:12.0f} tok/s"
+    )
+    print(
+        f"  relleno por lote de {result['batch_size']}: {baseline['padding_ratio']:.1%}"
+        f"   empaquetado: {result['packed_padding_ratio']:.1%}"
+    )
+    print(f"\nResultados guardados en {benchmark.save_results(result)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
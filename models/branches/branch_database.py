@@ -4,14 +4,21 @@ Branch Database System
 ======================
 
 Sistema de base de datos para gestionar información de ramas de conocimiento.
+
+El uso de ramas se agrega en memoria y un hilo lo vuelca por lotes a filas
+por rama y hora (`branch_usage_hourly`); `record_usage` no escribe en disco.
+Las filas crudas de `branch_usage` solo se conservan durante una retención
+corta.
 """
 
+import atexit
 import sqlite3
 import json
 import logging
-from typing import Dict, List, Any, Optional
+import threading
+from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, asdict
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -31,16 +38,88 @@ class BranchRecord:
     is_active: bool = True
 
 
+def _hour_bucket(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:00:00")
+
+
+class UsageAggregator:
+    """
+    Acumula eventos de uso en memoria: contadores por (rama, hora) y los
+    eventos crudos pendientes. `drain` entrega lo acumulado y lo reinicia
+    """
+
+    def __init__(self, keep_raw: bool = True):
+        self.keep_raw = keep_raw
+        self.lock = threading.Lock()
+        self.rollups: Dict[Tuple[str, str], List[float]] = {}
+        self.raw_events: List[Tuple[str, str, float, str]] = []
+        self.pending = 0
+
+    def add(self, branch_id: str, query: str, response_quality: float) -> int:
+        now = datetime.now()
+        quality = float(response_quality or 0.0)
+        with self.lock:
+            bucket = self.rollups.setdefault((branch_id, _hour_bucket(now)), [0, 0.0])
+            bucket[0] += 1
+            bucket[1] += quality
+            if self.keep_raw:
+                self.raw_events.append((branch_id, query, quality, now.isoformat()))
+            self.pending += 1
+            return self.pending
+
+    def drain(self):
+        with self.lock:
+            rollups, raw_events = self.rollups, self.raw_events
+            self.rollups, self.raw_events, self.pending = {}, [], 0
+        return rollups, raw_events
+
+    def restore(self, rollups, raw_events):
+        """Devolver lo drenado (volcado fallido) para el siguiente intento"""
+        with self.lock:
+            for key, (count, quality_sum) in rollups.items():
+                bucket = self.rollups.setdefault(key, [0, 0.0])
+                bucket[0] += count
+                bucket[1] += quality_sum
+                self.pending += count
+            self.raw_events[:0] = raw_events
+
+    def totals(self, branch_id: str, since: str) -> Tuple[int, float]:
+        """Usos y suma de calidad aún no volcados desde la hora `since`"""
+        with self.lock:
+            uses, quality = 0, 0.0
+            for (branch, hour), (count, quality_sum) in self.rollups.items():
+                if branch == branch_id and hour >= since:
+                    uses += count
+                    quality += quality_sum
+            return uses, quality
+
+
 class BranchDatabase:
     """Gestor de base de datos para ramas de conocimiento"""
 
-    def __init__(self, db_path: str = "branches/branches.db"):
+    def __init__(
+        self,
+        db_path: str = "branches/branches.db",
+        raw_retention_hours: float = 24.0,
+        flush_interval: float = 5.0,
+        flush_batch: int = 500,
+    ):
         self.logger = logging.getLogger(__name__)
         self.db_path = Path(db_path)
         self.db_path.parent.mkdir(exist_ok=True, parents=True)
 
         self.initialized = False
 
+        # Uso agregado en memoria; volcado por un hilo en segundo plano
+        self.raw_retention_hours = raw_retention_hours
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._usage = UsageAggregator(keep_raw=raw_retention_hours > 0)
+        self._flush_lock = threading.Lock()
+        self._flush_event = threading.Event()
+        self._flush_thread: Optional[threading.Thread] = None
+        self._last_prune: Optional[datetime] = None
+
         try:
             self._initialize_database()
             self._create_default_branches()
@@ -92,6 +171,39 @@ class BranchDatabase:
             """
             )
 
+            rollups_exist = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' "
+                "AND name = 'branch_usage_hourly'"
+            ).fetchone()
+
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS branch_usage_hourly (
+                    branch_id TEXT NOT NULL,
+                    hour TEXT NOT NULL,
+                    uses INTEGER NOT NULL DEFAULT 0,
+                    quality_sum REAL NOT NULL DEFAULT 0,
+                    PRIMARY KEY (branch_id, hour)
+                )
+            """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_branch_usage_used_at ON branch_usage (used_at)"
+            )
+
+            if not rollups_exist:
+                # Una sola vez: agregar el historial crudo existente
+                conn.execute(
+                    """
+                    INSERT INTO branch_usage_hourly (branch_id, hour, uses, quality_sum)
+                    SELECT branch_id, substr(used_at, 1, 13) || ':00:00',
+                           COUNT(*), COALESCE(SUM(response_quality), 0)
+                    FROM branch_usage
+                    WHERE used_at IS NOT NULL
+                    GROUP BY branch_id, substr(used_at, 1, 13)
+                """
+                )
+
             conn.commit()
 
     def _create_default_branches(self):
@@ -321,49 +433,116 @@ class BranchDatabase:
             return False
 
     def record_usage(self, branch_id: str, query: str, response_quality: float):
-        """Registrar uso de una rama"""
+        """Registrar uso de una rama (en memoria; se vuelca en segundo plano)"""
         try:
-            with sqlite3.connect(self.db_path) as conn:
-                conn.execute(
-                    """
-                    INSERT INTO branch_usage (branch_id, query, response_quality, used_at)
-                    VALUES (?, ?, ?, ?)
-                """,
-                    (branch_id, query, response_quality, datetime.now().isoformat()),
-                )
-                conn.commit()
+            pending = self._usage.add(branch_id, query, response_quality)
+            self._ensure_flush_thread()
+            if pending >= self.flush_batch:
+                self._flush_event.set()
 
         except Exception as e:
             self.logger.error(f"❌ Error registrando uso de rama {branch_id}: {e}")
 
+    def _ensure_flush_thread(self):
+        if self._flush_thread is not None and self._flush_thread.is_alive():
+            return
+        with self._flush_lock:
+            if self._flush_thread is not None and self._flush_thread.is_alive():
+                return
+            self._flush_thread = threading.Thread(
+                target=self._flush_loop, name="branch-usage-flush", daemon=True
+            )
+            self._flush_thread.start()
+            atexit.register(self.flush_usage)
+
+    def _flush_loop(self):
+        while True:
+            self._flush_event.wait(self.flush_interval)
+            self._flush_event.clear()
+            self.flush_usage()
+
+    def flush_usage(self) -> int:
+        """
+        Volcar el uso acumulado en una transacción: suma a las filas
+        horarias, inserta los eventos crudos y poda los que superan la
+        retención. Devuelve el número de eventos volcados
+        """
+        with self._flush_lock:
+            rollups, raw_events = self._usage.drain()
+            if not rollups:
+                return 0
+
+            try:
+                with sqlite3.connect(self.db_path) as conn:
+                    conn.executemany(
+                        """
+                        INSERT INTO branch_usage_hourly (branch_id, hour, uses, quality_sum)
+                        VALUES (?, ?, ?, ?)
+                        ON CONFLICT(branch_id, hour) DO UPDATE SET
+                            uses = uses + excluded.uses,
+                            quality_sum = quality_sum + excluded.quality_sum
+                    """,
+                        [
+                            (branch, hour, count, quality_sum)
+                            for (branch, hour), (count, quality_sum) in rollups.items()
+                        ],
+                    )
+                    if raw_events:
+                        conn.executemany(
+                            """
+                            INSERT INTO branch_usage (branch_id, query, response_quality, used_at)
+                            VALUES (?, ?, ?, ?)
+                        """,
+                            raw_events,
+                        )
+                    self._prune_raw_usage(conn)
+                    conn.commit()
+
+                return sum(count for count, _ in rollups.values())
+
+            except Exception as e:
+                self.logger.error(f"❌ Error volcando uso de ramas: {e}")
+                self._usage.restore(rollups, raw_events)
+                return 0
+
+    def _prune_raw_usage(self, conn: sqlite3.Connection):
+        """Eliminar filas crudas fuera de la retención (como mucho cada hora)"""
+        now = datetime.now()
+        if self._last_prune and now - self._last_prune < timedelta(hours=1):
+            return
+        self._last_prune = now
+        cutoff = now - timedelta(hours=self.raw_retention_hours)
+        conn.execute("DELETE FROM branch_usage WHERE used_at < ?", (cutoff.isoformat(),))
+
     def get_usage_stats(self, branch_id: str, days: int = 7) -> Dict[str, Any]:
-        """Obtener estadísticas de uso de una rama"""
+        """Obtener estadísticas de uso de una rama (desde las filas horarias)"""
         try:
             cutoff_date = datetime.now().replace(
                 hour=0, minute=0, second=0, microsecond=0
-            )
-            cutoff_date = cutoff_date.replace(day=cutoff_date.day - days)
+            ) - timedelta(days=days)
+            cutoff_hour = _hour_bucket(cutoff_date)
 
-            with sqlite3.connect(self.db_path) as conn:
+            # Bajo el lock de volcado: cada evento está o en memoria o en disco
+            with self._flush_lock, sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
-                # Total de usos
-                total_uses = cursor.execute(
+                # Usos y calidad acumulada
+                total_uses, quality_sum = cursor.execute(
                     """
-                    SELECT COUNT(*) FROM branch_usage 
-                    WHERE branch_id = ? AND used_at >= ?
+                    SELECT COALESCE(SUM(uses), 0), COALESCE(SUM(quality_sum), 0)
+                    FROM branch_usage_hourly
+                    WHERE branch_id = ? AND hour >= ?
                 """,
-                    (branch_id, cutoff_date.isoformat()),
-                ).fetchone()[0]
+                    (branch_id, cutoff_hour),
+                ).fetchone()
 
-                # Calidad promedio
-                avg_quality = cursor.execute(
-                    """
-                    SELECT AVG(response_quality) FROM branch_usage 
-                    WHERE branch_id = ? AND used_at >= ?
-                """,
-                    (branch_id, cutoff_date.isoformat()),
-                ).fetchone()[0]
+                # Eventos aún no volcados
+                pending_uses, pending_quality = self._usage.totals(
+                    branch_id, cutoff_hour
+                )
+                total_uses += pending_uses
+                quality_sum += pending_quality
+                avg_quality = quality_sum / total_uses if total_uses else 0.0
 
                 return {
                     "branch_id": branch_id,
@@ -391,7 +570,13 @@ class BranchDatabase:
                 active_branches = cursor.execute(
                     "SELECT COUNT(*) FROM branches WHERE is_active = 1"
                 ).fetchone()[0]
-                total_usage_records = cursor.execute(
+                total_usage_records = (
+                    cursor.execute(
+                        "SELECT COALESCE(SUM(uses), 0) FROM branch_usage_hourly"
+                    ).fetchone()[0]
+                    + self._usage.pending
+                )
+                raw_usage_records = cursor.execute(
                     "SELECT COUNT(*) FROM branch_usage"
                 ).fetchone()[0]
 
@@ -401,6 +586,7 @@ class BranchDatabase:
                     "total_branches": total_branches,
                     "active_branches": active_branches,
                     "total_usage_records": total_usage_records,
+                    "raw_usage_records": raw_usage_records,
                     "timestamp": datetime.now().isoformat(),
                 }
 
@@ -4,11 +4,17 @@ Branch Embeddings System
 ========================
 
 Sistema de embeddings para las ramas de conocimiento especializadas.
+
+Los embeddings se mantienen apilados en una matriz normalizada junto con la
+matriz de similitud coseno de todos los pares, que se actualiza por fila y
+columna cuando cambia una rama: `compute_similarity` es una lectura y
+`find_similar_branches` un único `argpartition`.
 """
 
 import numpy as np
 import logging
-from typing import Dict, List, Any, Optional
+from datetime import datetime
+from typing import Dict, List, Any, Optional, Sequence
 from dataclasses import dataclass
 
 logger = logging.getLogger(__name__)
@@ -32,8 +38,16 @@ class BranchEmbeddings:
         self.embeddings_cache = {}
         self.initialized = False
 
+        # Índice vectorizado: fila i de la matriz = branch_ids[i]. Las
+        # matrices tienen capacidad sobrante para añadir ramas sin copiar
+        self.branch_ids: List[str] = []
+        self._branch_index: Dict[str, int] = {}
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+        self._similarity = np.zeros((0, 0), dtype=np.float32)
+
         try:
             self._initialize_embeddings()
+            self._rebuild_index()
             self.initialized = True
             self.logger.info("✅ BranchEmbeddings inicializado")
         except Exception as e:
@@ -70,6 +84,111 @@ class BranchEmbeddings:
                 created_at="2025-09-17T22:52:00Z",
             )
 
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        """Normalizar filas (las de norma cero quedan a cero)"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+    def _rebuild_index(self):
+        """Reconstruir matriz y similitudes desde embeddings_cache"""
+        self.branch_ids = list(self.embeddings_cache)
+        self._branch_index = {branch: i for i, branch in enumerate(self.branch_ids)}
+
+        if not self.branch_ids:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._similarity = np.zeros((0, 0), dtype=np.float32)
+            return
+
+        self._matrix = self._normalize(
+            np.stack(
+                [self.embeddings_cache[b].embedding_vector for b in self.branch_ids]
+            )
+        )
+        self._similarity = self._matrix @ self._matrix.T
+
+    def _ensure_index(self):
+        # embeddings_cache modificado directamente (sin set_embedding)
+        if len(self.branch_ids) != len(self.embeddings_cache):
+            self._rebuild_index()
+
+    def _grow(self, dimensions: int):
+        """Duplicar la capacidad de las matrices (coste amortizado O(1))"""
+        size = len(self.branch_ids)
+        capacity = max(8, 2 * len(self._matrix))
+
+        matrix = np.zeros((capacity, dimensions), dtype=np.float32)
+        matrix[:size] = self._matrix[:size]
+        similarity = np.zeros((capacity, capacity), dtype=np.float32)
+        similarity[:size, :size] = self._similarity[:size, :size]
+        self._matrix, self._similarity = matrix, similarity
+
+    def set_embedding(
+        self,
+        branch_id: str,
+        embedding_vector: np.ndarray,
+        metadata: Optional[Dict[str, Any]] = None,
+        created_at: Optional[str] = None,
+    ) -> BranchEmbedding:
+        """
+        Añadir o actualizar el embedding de una rama. Solo se recalculan la
+        fila y la columna de la rama en la matriz de similitud (O(n·d))
+        """
+        self._ensure_index()
+        embedding_vector = np.asarray(embedding_vector)
+        dimensions = self._matrix.shape[1] if self.branch_ids else len(embedding_vector)
+        if embedding_vector.shape != (dimensions,):
+            raise ValueError(
+                f"Embedding de {branch_id} con forma {embedding_vector.shape}, "
+                f"se esperaba ({dimensions},)"
+            )
+
+        embedding = BranchEmbedding(
+            branch_id=branch_id,
+            embedding_vector=embedding_vector,
+            metadata=metadata or {"domain": branch_id, "vector_size": dimensions},
+            created_at=created_at or datetime.now().isoformat(),
+        )
+        self.embeddings_cache[branch_id] = embedding
+
+        index = self._branch_index.get(branch_id)
+        if index is None:
+            index = len(self.branch_ids)
+            if index >= len(self._matrix) or self._matrix.shape[1] != dimensions:
+                self._grow(dimensions)
+            self.branch_ids.append(branch_id)
+            self._branch_index[branch_id] = index
+
+        size = len(self.branch_ids)
+        self._matrix[index] = self._normalize(embedding_vector)
+        row = self._matrix[:size] @ self._matrix[index]
+        self._similarity[index, :size] = row
+        self._similarity[:size, index] = row
+
+        self.initialized = True
+        return embedding
+
+    def remove_embedding(self, branch_id: str) -> bool:
+        """Eliminar una rama (la última fila ocupa su lugar)"""
+        self._ensure_index()
+        index = self._branch_index.pop(branch_id, None)
+        if index is None:
+            return False
+        del self.embeddings_cache[branch_id]
+
+        last = len(self.branch_ids) - 1
+        if index != last:
+            moved = self.branch_ids[last]
+            self.branch_ids[index] = moved
+            self._branch_index[moved] = index
+            self._matrix[index] = self._matrix[last]
+            self._similarity[index, : last + 1] = self._similarity[last, : last + 1]
+            self._similarity[: last + 1, index] = self._similarity[: last + 1, last]
+            self._similarity[index, index] = self._similarity[last, last]
+        self.branch_ids.pop()
+        return True
+
     def get_embedding(self, branch_id: str) -> Optional[BranchEmbedding]:
         """Obtener embedding de una rama específica"""
         return self.embeddings_cache.get(branch_id)
@@ -78,42 +197,91 @@ class BranchEmbeddings:
         """Obtener lista de ramas con embeddings disponibles"""
         return list(self.embeddings_cache.keys())
 
+    def similarity_matrix(self) -> np.ndarray:
+        """Similitud coseno de todos los pares (filas/columnas = branch_ids)"""
+        self._ensure_index()
+        size = len(self.branch_ids)
+        return self._similarity[:size, :size]
+
     def compute_similarity(self, branch_a: str, branch_b: str) -> float:
         """Calcular similitud entre dos ramas"""
         if not self.initialized:
             return 0.0
 
-        embedding_a = self.get_embedding(branch_a)
-        embedding_b = self.get_embedding(branch_b)
+        self._ensure_index()
+        index_a = self._branch_index.get(branch_a)
+        index_b = self._branch_index.get(branch_b)
 
-        if not embedding_a or not embedding_b:
+        if index_a is None or index_b is None:
             return 0.0
 
-        # Calcular similitud coseno
-        dot_product = np.dot(embedding_a.embedding_vector, embedding_b.embedding_vector)
-        norm_a = np.linalg.norm(embedding_a.embedding_vector)
-        norm_b = np.linalg.norm(embedding_b.embedding_vector)
-
-        if norm_a == 0 or norm_b == 0:
-            return 0.0
+        # Similitud coseno precalculada
+        return float(self._similarity[index_a, index_b])
 
-        similarity = dot_product / (norm_a * norm_b)
-        return float(similarity)
+    def _top_k(self, scores: np.ndarray, top_k: int) -> np.ndarray:
+        """Índices de las k mayores puntuaciones, de mayor a menor"""
+        top_k = min(top_k, len(scores))
+        if top_k <= 0:
+            return np.zeros(0, dtype=np.int64)
+        if top_k < len(scores):
+            candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidates = np.arange(len(scores))
+        # Empates en el orden de las ramas, como la ordenación estable anterior
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
 
     def find_similar_branches(self, target_branch: str, top_k: int = 5) -> List[tuple]:
         """Encontrar ramas similares a la target"""
         if not self.initialized or target_branch not in self.embeddings_cache:
             return []
 
-        similarities = []
-        for branch_id in self.embeddings_cache:
-            if branch_id != target_branch:
-                similarity = self.compute_similarity(target_branch, branch_id)
-                similarities.append((branch_id, similarity))
+        self._ensure_index()
+        index = self._branch_index[target_branch]
+        scores = self._similarity[index, : len(self.branch_ids)].copy()
+        scores[index] = -np.inf
+
+        return [
+            (self.branch_ids[i], float(scores[i]))
+            for i in self._top_k(scores, min(top_k, len(scores) - 1))
+        ]
+
+    def score_queries(self, query_embeddings: np.ndarray) -> np.ndarray:
+        """
+        Similitud coseno de cada embedding de consulta (fila) contra cada
+        rama: matriz (consultas x ramas) con columnas en el orden de
+        `branch_ids`
+        """
+        self._ensure_index()
+        queries = self._normalize(np.atleast_2d(query_embeddings))
+        return queries @ self._matrix[: len(self.branch_ids)].T
+
+    def score_query(
+        self,
+        query_embedding: np.ndarray,
+        top_k: Optional[int] = 5,
+        branches: Optional[Sequence[str]] = None,
+    ) -> List[tuple]:
+        """
+        Ramas más cercanas a un embedding de texto arbitrario, para el
+        enrutado: [(rama, similitud)] de mayor a menor. `branches` limita
+        las candidatas; `top_k=None` devuelve todas
+        """
+        if not self.initialized or not self.embeddings_cache:
+            return []
+
+        scores = self.score_queries(query_embedding)[0]
+        if branches is not None:
+            allowed = np.zeros(len(scores), dtype=bool)
+            allowed[
+                [self._branch_index[b] for b in branches if b in self._branch_index]
+            ] = True
+            scores = np.where(allowed, scores, -np.inf)
+            limit = int(allowed.sum())
+        else:
+            limit = len(scores)
 
-        # Ordenar por similitud descendente
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:top_k]
+        top_k = limit if top_k is None else min(top_k, limit)
+        return [(self.branch_ids[i], float(scores[i])) for i in self._top_k(scores, top_k)]
 
     def get_branch_info(self, branch_id: str) -> Dict[str, Any]:
         """Obtener información detallada de una rama"""
@@ -4,7 +4,7 @@ import logging
 from typing import Dict, List, Any, Optional
 from datetime import datetime
 import torch
-from transformers import AutoModel, AutoTokenizer
+from transformers import AutoModel
 from peft import PeftModel, get_peft_model, LoraConfig
 
 
@@ -66,7 +66,7 @@ class BranchManager:
         # Micro-ramas por dominio
         self.micro_branches = self._load_micro_branches()
 
-        # Caché de adapters cargados
+        # Caché de adapters cargados (ruta del adapter -> modelo)
         self.loaded_adapters = {}
 
         self.logger.info(
@@ -139,8 +139,13 @@ class BranchManager:
                 self.logger.warning(f"Adapter no encontrado en: {adapter_path}")
                 return None
 
-            # Cargar modelo base
-            tokenizer = AutoTokenizer.from_pretrained(self.base_model_path)
+            # Reutilizar el adapter si ya está cargado en este gestor
+            if adapter_path in self.loaded_adapters:
+                return self.loaded_adapters[adapter_path]
+
+            # Cargar modelo base. Cada adapter necesita su propia copia: PEFT
+            # inyecta las capas LoRA en el modelo, así que no se pueden usar
+            # los pesos del encoder compartido (modules.embeddings)
             base_model = AutoModel.from_pretrained(self.base_model_path)
 
             # Cargar adapter
@@ -148,6 +153,7 @@ class BranchManager:
 
             # Configurar para inferencia
             adapter_model.eval()
+            self.loaded_adapters[adapter_path] = adapter_model
 
             self.logger.info(f"✅ Adapter cargado para dominio: {domain}")
             return adapter_model
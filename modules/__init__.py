@@ -14,6 +14,8 @@ from dataclasses import dataclass, field
 from datetime import datetime
 import importlib
 import inspect
+import threading
+import time
 
 # Configuración de logging
 logging.basicConfig(level=logging.INFO)
@@ -33,6 +35,12 @@ class ModuleInfo:
     is_async: bool = False
     status: str = "active"
     last_used: Optional[datetime] = None
+    # Carga diferida: ruta del módulo Python, atributo y argumentos del constructor
+    module_path: Optional[str] = None
+    factory_args: tuple = ()
+    import_time: Optional[float] = None
+    init_time: Optional[float] = None
+    error: Optional[str] = None
 
 
 class ModuleRegistry:
@@ -42,6 +50,11 @@ class ModuleRegistry:
         self.modules: Dict[str, ModuleInfo] = {}
         self.categories: Dict[str, List[str]] = {}
         self.initialized = False
+        # Un lock por módulo para poder cargar módulos independientes en
+        # paralelo; la pila por hilo detecta dependencias circulares
+        self._locks_guard = threading.Lock()
+        self._module_locks: Dict[str, threading.Lock] = {}
+        self._loading = threading.local()
 
     def register_module(
         self,
@@ -63,6 +76,40 @@ class ModuleRegistry:
             is_async=is_async,
         )
 
+        self._add_module(module_info)
+
+    def register_lazy(
+        self,
+        name: str,
+        category: str,
+        description: str,
+        module_path: str,
+        class_name: str,
+        args: tuple = (),
+        dependencies: List[str] = None,
+        is_async: bool = False,
+    ):
+        """
+        Registrar un módulo sin importarlo: la clase se importa e instancia
+        en el primer get_module_instance
+        """
+        module_info = ModuleInfo(
+            name=name,
+            category=category,
+            description=description,
+            class_name=class_name,
+            instance=None,
+            dependencies=dependencies or [],
+            is_async=is_async,
+            status="registered",
+            module_path=module_path,
+            factory_args=args,
+        )
+
+        self._add_module(module_info)
+
+    def _add_module(self, module_info: ModuleInfo):
+        name, category = module_info.name, module_info.category
         self.modules[name] = module_info
 
         if category not in self.categories:
@@ -85,12 +132,122 @@ class ModuleRegistry:
         return self.categories.copy()
 
     def get_module_instance(self, name: str) -> Any:
-        """Obtener la instancia de un módulo"""
+        """Obtener la instancia de un módulo, instanciándolo si hace falta"""
         module_info = self.get_module(name)
-        if module_info:
-            module_info.last_used = datetime.now()
-            return module_info.instance
-        return None
+        if not module_info:
+            return None
+
+        module_info.last_used = datetime.now()
+        if module_info.instance is None and module_info.status == "registered":
+            self._load_module(module_info)
+        return module_info.instance
+
+    def _load_module(self, module_info: ModuleInfo):
+        """Importar e instanciar un módulo diferido y sus dependencias"""
+        loading = getattr(self._loading, "stack", None)
+        if loading is None:
+            loading = self._loading.stack = []
+
+        if module_info.name in loading:
+            cycle = " -> ".join(loading + [module_info.name])
+            raise RuntimeError(f"Dependencia circular entre módulos: {cycle}")
+
+        with self._locks_guard:
+            lock = self._module_locks.setdefault(module_info.name, threading.Lock())
+
+        with lock:
+            if module_info.status != "registered":
+                return
+
+            loading.append(module_info.name)
+            start = None
+            try:
+                # Las dependencias se instancian primero (orden topológico)
+                for dependency in module_info.dependencies:
+                    if dependency in self.modules:
+                        self.get_module_instance(dependency)
+
+                start = time.perf_counter()
+                python_module = importlib.import_module(module_info.module_path, __name__)
+                cls = getattr(python_module, module_info.class_name)
+                module_info.import_time = time.perf_counter() - start
+
+                start = time.perf_counter()
+                module_info.instance = cls(*module_info.factory_args)
+                module_info.init_time = time.perf_counter() - start
+                module_info.status = "active"
+
+                logger.info(
+                    f"✅ Módulo cargado: {module_info.name} "
+                    f"(import {module_info.import_time * 1000:.1f} ms, "
+                    f"init {module_info.init_time * 1000:.1f} ms)"
+                )
+
+            except Exception as e:
+                if start is not None and module_info.import_time is None:
+                    module_info.import_time = time.perf_counter() - start
+                module_info.status = "error"
+                module_info.error = str(e)
+                logger.error(f"❌ Error cargando módulo {module_info.name}: {e}")
+
+            finally:
+                loading.remove(module_info.name)
+
+    def dependency_layers(self, names: List[str] = None) -> List[List[str]]:
+        """
+        Agrupar módulos en capas según sus dependencias declaradas: los de
+        una capa solo dependen de capas anteriores
+        """
+        pending = set(names or self.modules)
+        # Incluir dependencias transitivas registradas
+        stack = list(pending)
+        while stack:
+            for dependency in self.modules[stack.pop()].dependencies:
+                if dependency in self.modules and dependency not in pending:
+                    pending.add(dependency)
+                    stack.append(dependency)
+
+        layers, done = [], set()
+        while pending:
+            layer = sorted(
+                name
+                for name in pending
+                if all(
+                    dep in done or dep not in self.modules
+                    for dep in self.modules[name].dependencies
+                )
+            )
+            if not layer:
+                raise RuntimeError(
+                    f"Dependencia circular entre módulos: {sorted(pending)}"
+                )
+            layers.append(layer)
+            done.update(layer)
+            pending.difference_update(layer)
+        return layers
+
+    def get_load_report(self) -> List[Dict[str, Any]]:
+        """Tiempos de import/inicialización por módulo, de mayor a menor"""
+        report = []
+        for module_info in self.modules.values():
+            if module_info.import_time is None:
+                continue
+            report.append(
+                {
+                    "name": module_info.name,
+                    "category": module_info.category,
+                    "status": module_info.status,
+                    "import_ms": round(module_info.import_time * 1000, 2),
+                    "init_ms": round((module_info.init_time or 0) * 1000, 2),
+                    "total_ms": round(
+                        (module_info.import_time + (module_info.init_time or 0))
+                        * 1000,
+                        2,
+                    ),
+                }
+            )
+        report.sort(key=lambda entry: entry["total_ms"], reverse=True)
+        return report
 
 
 class UnifiedModuleSystem:
@@ -100,121 +257,112 @@ class UnifiedModuleSystem:
         self.registry = ModuleRegistry()
         self.initialized = False
 
-    async def initialize(self):
-        """Inicializar todos los módulos del sistema"""
+    async def initialize(self, preload: Optional[List[str]] = None):
+        """
+        Inicializar el sistema de módulos.
+
+        El registro solo guarda cómo construir cada módulo; las clases se
+        importan e instancian en el primer get_module. `preload` permite
+        instanciar por adelantado una lista de módulos (o todos con ["*"]).
+        """
         if self.initialized:
             return
 
         logger.info("🚀 Inicializando sistema de módulos unificado...")
 
-        # Importar y registrar módulos de IA
-        await self._register_ai_modules()
-
-        # Importar y registrar módulos de memoria
-        await self._register_memory_modules()
-
-        # Importar y registrar módulos de entrenamiento
-        await self._register_training_modules()
-
-        # Importar y registrar módulos de blockchain
-        await self._register_blockchain_modules()
-
-        # Importar y registrar módulos de seguridad
-        await self._register_security_modules()
-
-        # Importar y registrar módulos de evaluación
-        await self._register_evaluation_modules()
-
-        # Importar y registrar módulos de tokens
-        await self._register_token_modules()
-
-        # Importar y registrar módulos de recomendaciones
-        await self._register_recommendation_modules()
-
-        # Importar y registrar módulos de embeddings
-        await self._register_embedding_modules()
-
-        # Importar y registrar módulos de core
-        await self._register_core_modules()
-
-        # Importar y registrar módulos de orquestación
-        await self._register_orchestrator_modules()
-
-        # Importar y registrar módulos de refuerzo
-        await self._register_reinforcement_modules()
-
-        # Importar y registrar módulos de recompensas
-        await self._register_rewards_modules()
-
-        # Importar y registrar módulos de adaptadores
-        await self._register_adapter_modules()
-
-        # Importar y registrar módulos de plugins
-        await self._register_plugin_modules()
-
-        # Importar y registrar módulos de scripts
-        await self._register_script_modules()
-
-        # Importar y registrar módulos de utilidades
-        await self._register_utils_modules()
-
-        # Importar y registrar módulos de visualización
-        await self._register_visualization_modules()
-
-        # Importar y registrar módulos de aprendizaje
-        await self._register_learning_modules()
+        # Los registros son independientes entre sí: se lanzan juntos
+        await asyncio.gather(
+            self._register_ai_modules(),
+            self._register_memory_modules(),
+            self._register_training_modules(),
+            self._register_blockchain_modules(),
+            self._register_security_modules(),
+            self._register_evaluation_modules(),
+            self._register_token_modules(),
+            self._register_recommendation_modules(),
+            self._register_embedding_modules(),
+            self._register_core_modules(),
+            self._register_orchestrator_modules(),
+            self._register_reinforcement_modules(),
+            self._register_rewards_modules(),
+            self._register_adapter_modules(),
+            self._register_plugin_modules(),
+            self._register_script_modules(),
+            self._register_utils_modules(),
+            self._register_visualization_modules(),
+            self._register_learning_modules(),
+            self._register_ai_components_modules(),
+            self._register_clustering_modules(),
+            self._register_unified_modules(),
+        )
 
-        # Importar y registrar módulos de componentes de IA
-        await self._register_ai_components_modules()
+        self.initialized = True
+        logger.info(f"✅ Sistema inicializado con {len(self.registry.modules)} módulos")
 
-        # Importar y registrar módulos de clustering y expansión de dominio
-        await self._register_clustering_modules()
+        if preload:
+            await self.preload(None if preload == ["*"] else preload)
 
-        # Importar y registrar módulos unificados
-        await self._register_unified_modules()
+    async def preload(self, names: List[str] = None):
+        """
+        Instanciar módulos por adelantado respetando sus dependencias: cada
+        capa del grafo se carga en paralelo en el executor por defecto
+        """
+        loop = asyncio.get_running_loop()
+        for layer in self.registry.dependency_layers(names):
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(None, self.registry.get_module_instance, name)
+                    for name in layer
+                )
+            )
 
-        self.initialized = True
-        logger.info(f"✅ Sistema inicializado con {len(self.registry.modules)} módulos")
+    def get_load_report(self) -> List[Dict[str, Any]]:
+        """Informe de tiempos de import/inicialización por módulo"""
+        return self.registry.get_load_report()
 
     async def _register_ai_modules(self):
         """Registrar módulos de IA"""
         try:
-            from .ai.llm_models import LLMModelManager
-            from .ai.ml_components import MLModelManager
-            from .ai.response_generator import ResponseGenerator
-            from .ai.semantic_analyzer import SemanticAnalyzer
-            from .ai.text_processor import TextProcessor
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "llm_manager",
                 "ai",
                 "Gestor de modelos de lenguaje",
-                LLMModelManager(),
-                ["text_processor"],
+                ".ai.llm_models",
+                "LLMModelManager",
+                dependencies=["text_processor"],
             )
 
-            self.registry.register_module(
-                "ml_manager", "ai", "Gestor de modelos de ML", MLModelManager(), []
+            self.registry.register_lazy(
+                "ml_manager",
+                "ai",
+                "Gestor de modelos de ML",
+                ".ai.ml_components",
+                "MLModelManager",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "response_generator",
                 "ai",
                 "Generador de respuestas",
-                ResponseGenerator(),
-                ["semantic_analyzer"],
+                ".ai.response_generator",
+                "ResponseGenerator",
+                dependencies=["semantic_analyzer"],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "semantic_analyzer",
                 "ai",
                 "Analizador semántico",
-                SemanticAnalyzer(),
-                [],
+                ".ai.semantic_analyzer",
+                "SemanticAnalyzer",
             )
 
-            self.registry.register_module(
-                "text_processor", "ai", "Procesador de texto", TextProcessor(), []
+            self.registry.register_lazy(
+                "text_processor",
+                "ai",
+                "Procesador de texto",
+                ".ai.text_processor",
+                "TextProcessor",
             )
 
         except Exception as e:
@@ -223,41 +371,37 @@ class UnifiedModuleSystem:
     async def _register_memory_modules(self):
         """Registrar módulos de memoria"""
         try:
-            from .memory.data_management import DataManagementService
-            from .memory.intelligent_backup_system import IntelligentBackupSystem
-            from .memory.rag import RAGRetriever
-            from .memory.short_term import ShortTermMemory
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "data_management",
                 "memory",
                 "Servicio de gestión de datos",
-                DataManagementService(),
-                [],
+                ".memory.data_management",
+                "DataManagementService",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "backup_system",
                 "memory",
                 "Sistema de respaldo inteligente",
-                IntelligentBackupSystem(),
-                ["rag_retriever"],
+                ".memory.intelligent_backup_system",
+                "IntelligentBackupSystem",
+                dependencies=["rag_retriever"],
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "rag_retriever",
                 "memory",
                 "Sistema RAG para recuperación",
-                RAGRetriever(),
-                [],
+                ".memory.rag",
+                "RAGRetriever",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "short_term_memory",
                 "memory",
                 "Memoria a corto plazo",
-                ShortTermMemory(),
-                [],
+                ".memory.short_term",
+                "ShortTermMemory",
             )
 
         except Exception as e:
@@ -266,23 +410,20 @@ class UnifiedModuleSystem:
     async def _register_training_modules(self):
         """Registrar módulos de entrenamiento"""
         try:
-            from .training.advanced_training_system import AdvancedTrainingSystem
-            from .training.automatic_lora_trainer import AutomaticLoRATrainer
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "advanced_training",
                 "training",
                 "Sistema de entrenamiento avanzado",
-                AdvancedTrainingSystem(),
-                [],
+                ".training.advanced_training_system",
+                "AdvancedTrainingSystem",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "lora_trainer",
                 "training",
                 "Entrenador automático LoRA",
-                AutomaticLoRATrainer(),
-                [],
+                ".training.automatic_lora_trainer",
+                "AutomaticLoRATrainer",
             )
 
         except Exception as e:
@@ -291,65 +432,68 @@ class UnifiedModuleSystem:
     async def _register_blockchain_modules(self):
         """Registrar módulos de blockchain"""
         try:
-            from .blockchain.rate_limiter import RateLimiter
-            from .blockchain.secure_key_management import SecureKeyManagement
-            from .blockchain.sheily_spl_manager import SheilySPLManager
-            from .blockchain.sheily_spl_real import SheilySPLReal
-            from .blockchain.sheily_token_manager import SheilyTokenManager
-            from .blockchain.solana_blockchain_real import SolanaBlockchainReal
-            from .blockchain.spl_data_persistence import SPLDataPersistence
-            from .blockchain.transaction_monitor import TransactionMonitor
-
-            self.registry.register_module(
-                "rate_limiter", "blockchain", "Limitador de tasa", RateLimiter(), []
+            self.registry.register_lazy(
+                "rate_limiter",
+                "blockchain",
+                "Limitador de tasa",
+                ".blockchain.rate_limiter",
+                "RateLimiter",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "key_management",
                 "blockchain",
                 "Gestión segura de claves",
-                SecureKeyManagement(),
-                [],
+                ".blockchain.secure_key_management",
+                "SecureKeyManagement",
             )
 
-            self.registry.register_module(
-                "spl_manager", "blockchain", "Gestor SPL", SheilySPLManager(), []
+            self.registry.register_lazy(
+                "spl_manager",
+                "blockchain",
+                "Gestor SPL",
+                ".blockchain.sheily_spl_manager",
+                "SheilySPLManager",
             )
 
-            self.registry.register_module(
-                "spl_real", "blockchain", "SPL real", SheilySPLReal(), []
+            self.registry.register_lazy(
+                "spl_real",
+                "blockchain",
+                "SPL real",
+                ".blockchain.sheily_spl_real",
+                "SheilySPLReal",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "token_manager",
                 "blockchain",
                 "Gestor de tokens",
-                SheilyTokenManager(),
-                [],
+                ".blockchain.sheily_token_manager",
+                "SheilyTokenManager",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "solana_blockchain",
                 "blockchain",
                 "Blockchain Solana",
-                SolanaBlockchainReal(),
-                [],
+                ".blockchain.solana_blockchain_real",
+                "SolanaBlockchainReal",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "spl_persistence",
                 "blockchain",
                 "Persistencia SPL",
-                SPLDataPersistence(),
-                [],
+                ".blockchain.spl_data_persistence",
+                "SPLDataPersistence",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "transaction_monitor",
                 "blockchain",
                 "Monitor de transacciones",
-                TransactionMonitor(),
-                [],
+                ".blockchain.transaction_monitor",
+                "TransactionMonitor",
             )
 
         except Exception as e:
@@ -358,23 +502,20 @@ class UnifiedModuleSystem:
     async def _register_security_modules(self):
         """Registrar módulos de seguridad"""
         try:
-            from .security.neurofusion_unified_core import NeuroFusionUnifiedCore
-            from .security.neurofusion_unified_launcher import NeuroFusionLauncher
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "unified_core",
                 "security",
                 "Núcleo unificado de seguridad",
-                NeuroFusionUnifiedCore(),
-                [],
+                ".security.neurofusion_unified_core",
+                "NeuroFusionUnifiedCore",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "unified_launcher",
                 "security",
                 "Lanzador unificado",
-                NeuroFusionLauncher(),
-                [],
+                ".security.neurofusion_unified_launcher",
+                "NeuroFusionLauncher",
             )
 
         except Exception as e:
@@ -383,63 +524,52 @@ class UnifiedModuleSystem:
     async def _register_evaluation_modules(self):
         """Registrar módulos de evaluación"""
         try:
-            from .evaluation.model_validator import ModelValidator
-            from .evaluation.performance_metrics import (
-                PerformanceMonitor,
-                MetricsCalculator,
-            )
-            from .evaluation.quality_evaluator import (
-                DataQualityEvaluator,
-                ModelQualityEvaluator,
-            )
-            from .evaluation.result_analyzer import ResultAnalyzer
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "model_validator",
                 "evaluation",
                 "Validador de modelos",
-                ModelValidator(),
-                [],
+                ".evaluation.model_validator",
+                "ModelValidator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "performance_monitor",
                 "evaluation",
                 "Monitor de rendimiento",
-                PerformanceMonitor(),
-                [],
+                ".evaluation.performance_metrics",
+                "PerformanceMonitor",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "metrics_calculator",
                 "evaluation",
                 "Calculador de métricas",
-                MetricsCalculator(),
-                [],
+                ".evaluation.performance_metrics",
+                "MetricsCalculator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "data_quality_evaluator",
                 "evaluation",
                 "Evaluador de calidad de datos",
-                DataQualityEvaluator(),
-                [],
+                ".evaluation.quality_evaluator",
+                "DataQualityEvaluator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "model_quality_evaluator",
                 "evaluation",
                 "Evaluador de calidad de modelos",
-                ModelQualityEvaluator(),
-                [],
+                ".evaluation.quality_evaluator",
+                "ModelQualityEvaluator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "result_analyzer",
                 "evaluation",
                 "Analizador de resultados",
-                ResultAnalyzer(),
-                [],
+                ".evaluation.result_analyzer",
+                "ResultAnalyzer",
             )
 
         except Exception as e:
@@ -448,37 +578,37 @@ class UnifiedModuleSystem:
     async def _register_token_modules(self):
         """Registrar módulos de tokens"""
         try:
-            from .tokens.advanced_sheily_token_system import AdvancedSheilyTokenSystem
-            from .tokens.sheily_token_manager import SheilyTokenManager
-            from .tokens.sheily_tokens_system import SheilyTokensSystem
-            from .tokens.unified_sheily_token_system import UnifiedSheilyTokenSystem
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "advanced_token_system",
                 "tokens",
                 "Sistema avanzado de tokens",
-                AdvancedSheilyTokenSystem(),
-                [],
+                ".tokens.advanced_sheily_token_system",
+                "AdvancedSheilyTokenSystem",
             )
 
-            self.registry.register_module(
-                "token_manager", "tokens", "Gestor de tokens", SheilyTokenManager(), []
+            self.registry.register_lazy(
+                "token_manager",
+                "tokens",
+                "Gestor de tokens",
+                ".tokens.sheily_token_manager",
+                "SheilyTokenManager",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "tokens_system",
                 "tokens",
                 "Sistema de tokens",
-                SheilyTokensSystem({}),
-                [],
+                ".tokens.sheily_tokens_system",
+                "SheilyTokensSystem",
+                args=({},),
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "unified_token_system",
                 "tokens",
                 "Sistema unificado de tokens",
-                UnifiedSheilyTokenSystem(),
-                [],
+                ".tokens.unified_sheily_token_system",
+                "UnifiedSheilyTokenSystem",
             )
 
         except Exception as e:
@@ -487,16 +617,12 @@ class UnifiedModuleSystem:
     async def _register_recommendation_modules(self):
         """Registrar módulos de recomendaciones"""
         try:
-            from .recommendations.personalized_recommendations import (
-                PersonalizedRecommendations,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "personalized_recommendations",
                 "recommendations",
                 "Recomendaciones personalizadas",
-                PersonalizedRecommendations(),
-                [],
+                ".recommendations.personalized_recommendations",
+                "PersonalizedRecommendations",
             )
 
         except Exception as e:
@@ -505,25 +631,21 @@ class UnifiedModuleSystem:
     async def _register_embedding_modules(self):
         """Registrar módulos de embeddings"""
         try:
-            from .embeddings.embedding_performance_monitor import (
-                EmbeddingPerformanceMonitor,
-            )
-            from .embeddings.semantic_search_engine import SemanticSearchEngine
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "embedding_monitor",
                 "embeddings",
                 "Monitor de rendimiento de embeddings",
-                EmbeddingPerformanceMonitor("default"),
-                [],
+                ".embeddings.embedding_performance_monitor",
+                "EmbeddingPerformanceMonitor",
+                args=("default",),
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "semantic_search",
                 "embeddings",
                 "Motor de búsqueda semántica",
-                SemanticSearchEngine(),
-                [],
+                ".embeddings.semantic_search_engine",
+                "SemanticSearchEngine",
             )
 
         except Exception as e:
@@ -532,121 +654,100 @@ class UnifiedModuleSystem:
     async def _register_core_modules(self):
         """Registrar módulos del núcleo"""
         try:
-            from .core.advanced_system_integrator import AdvancedSystemIntegrator
-            from .core.cognitive_understanding_module import (
-                CognitiveUnderstandingModule,
-            )
-            from .core.continuous_improvement import ContinuousImprovement
-            from .core.daily_exercise_generator import DailyExerciseGenerator
-            from .core.daily_exercise_integrator import DailyExerciseIntegrator
-            from .core.dynamic_knowledge_generator import DynamicKnowledgeGenerator
-            from .core.enhanced_daily_exercise_generator import (
-                EnhancedDailyExerciseGenerator,
-            )
-            from .core.enhanced_daily_exercise_integrator import (
-                EnhancedDailyExerciseIntegrator,
-            )
-            from .core.integration_manager import IntegrationManager
-            from .core.neurofusion_compatibility_validator import (
-                NeuroFusionCompatibilitySystem,
-            )
-            from .core.neurofusion_core import NeuroFusionCore
-            from .core.semantic_adaptation_manager import SemanticAdaptationManager
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "system_integrator",
                 "core",
                 "Integrador de sistema avanzado",
-                AdvancedSystemIntegrator(),
-                [],
+                ".core.advanced_system_integrator",
+                "AdvancedSystemIntegrator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "cognitive_understanding",
                 "core",
                 "Módulo de comprensión cognitiva",
-                CognitiveUnderstandingModule(),
-                [],
+                ".core.cognitive_understanding_module",
+                "CognitiveUnderstandingModule",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "continuous_improvement",
                 "core",
                 "Mejora continua",
-                ContinuousImprovement(),
-                [],
+                ".core.continuous_improvement",
+                "ContinuousImprovement",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "daily_exercise_generator",
                 "core",
                 "Generador de ejercicios diarios",
-                DailyExerciseGenerator(),
-                [],
+                ".core.daily_exercise_generator",
+                "DailyExerciseGenerator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "daily_exercise_integrator",
                 "core",
                 "Integrador de ejercicios diarios",
-                DailyExerciseIntegrator(),
-                [],
+                ".core.daily_exercise_integrator",
+                "DailyExerciseIntegrator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "knowledge_generator",
                 "core",
                 "Generador de conocimiento dinámico",
-                DynamicKnowledgeGenerator(),
-                [],
+                ".core.dynamic_knowledge_generator",
+                "DynamicKnowledgeGenerator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "enhanced_exercise_generator",
                 "core",
                 "Generador mejorado de ejercicios",
-                EnhancedDailyExerciseGenerator(),
-                [],
+                ".core.enhanced_daily_exercise_generator",
+                "EnhancedDailyExerciseGenerator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "enhanced_exercise_integrator",
                 "core",
                 "Integrador mejorado de ejercicios",
-                EnhancedDailyExerciseIntegrator(),
-                [],
+                ".core.enhanced_daily_exercise_integrator",
+                "EnhancedDailyExerciseIntegrator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "integration_manager",
                 "core",
                 "Gestor de integración",
-                IntegrationManager(),
-                [],
+                ".core.integration_manager",
+                "IntegrationManager",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "compatibility_validator",
                 "core",
                 "Validador de compatibilidad",
-                NeuroFusionCompatibilitySystem(),
-                [],
+                ".core.neurofusion_compatibility_validator",
+                "NeuroFusionCompatibilitySystem",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "neurofusion_core",
                 "core",
                 "Núcleo de NeuroFusion",
-                NeuroFusionCore(),
-                [],
+                ".core.neurofusion_core",
+                "NeuroFusionCore",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "semantic_adaptation",
                 "core",
                 "Gestor de adaptación semántica",
-                SemanticAdaptationManager(),
-                [],
+                ".core.semantic_adaptation_manager",
+                "SemanticAdaptationManager",
             )
 
         except Exception as e:
@@ -655,18 +756,14 @@ class UnifiedModuleSystem:
     async def _register_orchestrator_modules(self):
         """Registrar módulos de orquestación"""
         try:
-            from .orchestrator.domain_classifier import DomainClassifier
-            from .orchestrator.router import SemanticRouter
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "domain_classifier",
                 "orchestrator",
                 "Clasificador de dominios",
-                DomainClassifier(),
-                [],
+                ".orchestrator.domain_classifier",
+                "DomainClassifier",
             )
 
-            # Router necesita dependencias específicas
             self.registry.register_module(
                 "semantic_router",
                 "orchestrator",
@@ -681,14 +778,13 @@ class UnifiedModuleSystem:
     async def _register_reinforcement_modules(self):
         """Registrar módulos de refuerzo"""
         try:
-            from .reinforcement.adaptive_learning_agent import AdaptiveLearningAgent
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "adaptive_learning_agent",
                 "reinforcement",
                 "Agente de aprendizaje adaptativo",
-                AdaptiveLearningAgent(None, None),
-                [],
+                ".reinforcement.adaptive_learning_agent",
+                "AdaptiveLearningAgent",
+                args=(None, None),
             )
 
         except Exception as e:
@@ -697,59 +793,52 @@ class UnifiedModuleSystem:
     async def _register_rewards_modules(self):
         """Registrar módulos de recompensas"""
         try:
-            from .rewards.adaptive_rewards import AdaptiveRewardsOptimizer
-            from .rewards.advanced_optimization import AdvancedRewardsOptimizer
-            from .rewards.contextual_accuracy import ContextualAccuracyEvaluator
-            from .rewards.integration_example import ShailiRewardsIntegration
-            from .rewards.reward_system import ShailiRewardSystem
-            from .rewards.tracker import SessionTracker
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "adaptive_rewards",
                 "rewards",
                 "Optimizador de recompensas adaptativo",
-                AdaptiveRewardsOptimizer(),
-                [],
+                ".rewards.adaptive_rewards",
+                "AdaptiveRewardsOptimizer",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "advanced_optimization",
                 "rewards",
                 "Optimización avanzada",
-                AdvancedRewardsOptimizer(),
-                [],
+                ".rewards.advanced_optimization",
+                "AdvancedRewardsOptimizer",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "contextual_accuracy",
                 "rewards",
                 "Evaluador de precisión contextual",
-                ContextualAccuracyEvaluator(),
-                [],
+                ".rewards.contextual_accuracy",
+                "ContextualAccuracyEvaluator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "rewards_integration",
                 "rewards",
                 "Integración de recompensas",
-                ShailiRewardsIntegration(),
-                [],
+                ".rewards.integration_example",
+                "ShailiRewardsIntegration",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "reward_system",
                 "rewards",
                 "Sistema de recompensas",
-                ShailiRewardSystem(),
-                [],
+                ".rewards.reward_system",
+                "ShailiRewardSystem",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "session_tracker",
                 "rewards",
                 "Rastreador de sesiones",
-                SessionTracker(),
-                [],
+                ".rewards.tracker",
+                "SessionTracker",
             )
 
         except Exception as e:
@@ -758,34 +847,28 @@ class UnifiedModuleSystem:
     async def _register_adapter_modules(self):
         """Registrar módulos de adaptadores"""
         try:
-            from .adapters.compatibility_adapter import CompatibilityAdapter
-            from .adapters.neurofusion_migration_toolkit import (
-                ComponentMigrationRegistry,
-                ComponentTransformer,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "compatibility_adapter",
                 "adapters",
                 "Adaptador de compatibilidad",
-                CompatibilityAdapter(),
-                [],
+                ".adapters.compatibility_adapter",
+                "CompatibilityAdapter",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "migration_registry",
                 "adapters",
                 "Registro de migración",
-                ComponentMigrationRegistry(),
-                [],
+                ".adapters.neurofusion_migration_toolkit",
+                "ComponentMigrationRegistry",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "component_transformer",
                 "adapters",
                 "Transformador de componentes",
-                ComponentTransformer(),
-                [],
+                ".adapters.neurofusion_migration_toolkit",
+                "ComponentTransformer",
             )
 
         except Exception as e:
@@ -794,10 +877,12 @@ class UnifiedModuleSystem:
     async def _register_plugin_modules(self):
         """Registrar módulos de plugins"""
         try:
-            from .plugins.logging_plugin import LoggingPlugin
-
-            self.registry.register_module(
-                "logging_plugin", "plugins", "Plugin de logging", LoggingPlugin(), []
+            self.registry.register_lazy(
+                "logging_plugin",
+                "plugins",
+                "Plugin de logging",
+                ".plugins.logging_plugin",
+                "LoggingPlugin",
             )
 
         except Exception as e:
@@ -806,121 +891,117 @@ class UnifiedModuleSystem:
     async def _register_script_modules(self):
         """Registrar módulos de scripts"""
         try:
-            from .scripts.audit import ShailiAudit
-            from .scripts.data_curation import DataCurator
-            from .scripts.dependency_manager import DependencyManager
-            from .scripts.download_branch_datasets import BranchDatasetDownloader
-            from .scripts.download_datasets import DatasetDownloader
-            from .scripts.download_models import download_sentence_transformers
-            from .scripts.env_manager import EnvManager
-            from .scripts.integrate_llm_with_server import LLMIntegrationManager
-            from .scripts.layer_manager import LayerManager
-            from .scripts.load_local_llm import LocalLLMLoader
-            from .scripts.prepare_training_datasets import TrainingDatasetPreparation
-            from .scripts.restore_branch_structure import BranchStructureRestorer
-            from .scripts.security_audit import SecurityAuditor
-            from .scripts.select_micro_branches import select_representative_branches
-            from .scripts.slack_notification import (
-                generate_slack_message,
-                send_slack_message,
-            )
-            from .scripts.train_branch_adapters import BranchAdapterTrainer
-            from .scripts.version_manager import VersionManager
-
-            self.registry.register_module(
-                "audit", "scripts", "Auditoría del sistema", ShailiAudit(), []
+            self.registry.register_lazy(
+                "audit",
+                "scripts",
+                "Auditoría del sistema",
+                ".scripts.audit",
+                "ShailiAudit",
             )
 
-            self.registry.register_module(
-                "data_curator", "scripts", "Curador de datos", DataCurator(), []
+            self.registry.register_lazy(
+                "data_curator",
+                "scripts",
+                "Curador de datos",
+                ".scripts.data_curation",
+                "DataCurator",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "dependency_manager",
                 "scripts",
                 "Gestor de dependencias",
-                DependencyManager(),
-                [],
+                ".scripts.dependency_manager",
+                "DependencyManager",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "branch_dataset_downloader",
                 "scripts",
                 "Descargador de datasets de ramas",
-                BranchDatasetDownloader(),
-                [],
+                ".scripts.download_branch_datasets",
+                "BranchDatasetDownloader",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "dataset_downloader",
                 "scripts",
                 "Descargador de datasets",
-                DatasetDownloader(),
-                [],
+                ".scripts.download_datasets",
+                "DatasetDownloader",
             )
 
-            self.registry.register_module(
-                "env_manager", "scripts", "Gestor de entorno", EnvManager(), []
+            self.registry.register_lazy(
+                "env_manager",
+                "scripts",
+                "Gestor de entorno",
+                ".scripts.env_manager",
+                "EnvManager",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "llm_integration_manager",
                 "scripts",
                 "Gestor de integración LLM",
-                LLMIntegrationManager(),
-                [],
+                ".scripts.integrate_llm_with_server",
+                "LLMIntegrationManager",
             )
 
-            self.registry.register_module(
-                "layer_manager", "scripts", "Gestor de capas", LayerManager(), []
+            self.registry.register_lazy(
+                "layer_manager",
+                "scripts",
+                "Gestor de capas",
+                ".scripts.layer_manager",
+                "LayerManager",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "local_llm_loader",
                 "scripts",
                 "Cargador de LLM local",
-                LocalLLMLoader(),
-                [],
+                ".scripts.load_local_llm",
+                "LocalLLMLoader",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "training_dataset_preparation",
                 "scripts",
                 "Preparación de datasets de entrenamiento",
-                TrainingDatasetPreparation(),
-                [],
+                ".scripts.prepare_training_datasets",
+                "TrainingDatasetPreparation",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "branch_structure_restorer",
                 "scripts",
                 "Restaurador de estructura de ramas",
-                BranchStructureRestorer(),
-                [],
+                ".scripts.restore_branch_structure",
+                "BranchStructureRestorer",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "security_auditor",
                 "scripts",
                 "Auditor de seguridad",
-                SecurityAuditor("http://localhost"),
-                [],
+                ".scripts.security_audit",
+                "SecurityAuditor",
+                args=("http://localhost",),
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "branch_adapter_trainer",
                 "scripts",
                 "Entrenador de adaptadores de ramas",
-                BranchAdapterTrainer(),
-                [],
+                ".scripts.train_branch_adapters",
+                "BranchAdapterTrainer",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "version_manager",
                 "scripts",
                 "Gestor de versiones",
-                VersionManager(),
-                [],
+                ".scripts.version_manager",
+                "VersionManager",
             )
 
         except Exception as e:
@@ -939,10 +1020,12 @@ class UnifiedModuleSystem:
     async def _register_visualization_modules(self):
         """Registrar módulos de visualización"""
         try:
-            from .visualization.insights_dashboard import main as insights_dashboard
-
             self.registry.register_module(
-                "insights_dashboard", "visualization", "Dashboard de insights", None, []
+                "insights_dashboard",
+                "visualization",
+                "Dashboard de insights",
+                None,
+                [],
             )
 
         except Exception as e:
@@ -951,14 +1034,12 @@ class UnifiedModuleSystem:
     async def _register_learning_modules(self):
         """Registrar módulos de aprendizaje"""
         try:
-            from .learning.neural_plasticity_manager import NeuralPlasticityManager
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "neural_plasticity",
                 "learning",
                 "Gestor de plasticidad neural",
-                NeuralPlasticityManager(),
-                [],
+                ".learning.neural_plasticity_manager",
+                "NeuralPlasticityManager",
             )
 
         except Exception as e:
@@ -967,83 +1048,68 @@ class UnifiedModuleSystem:
     async def _register_ai_components_modules(self):
         """Registrar módulos de componentes de IA"""
         try:
-            from .ai_components.advanced_ai_system import AdvancedAISystem
-            from .ai_components.advanced_algorithm_refinement import (
-                AlgorithmRefinementEngine,
-            )
-            from .ai_components.advanced_contextual_reasoning import (
-                ContextualReasoningEngine,
-            )
-            from .ai_components.advanced_module_enhancer import AdvancedModuleEnhancer
-            from .ai_components.module_enhancer import ModuleEnhancer
-            from .ai_components.neurofusion_component_adapters import (
-                MLModelAdapter,
-                NLPComponentAdapter,
-                EmbeddingAdapter,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "advanced_ai_system",
                 "ai_components",
                 "Sistema de IA avanzado",
-                AdvancedAISystem(),
-                [],
+                ".ai_components.advanced_ai_system",
+                "AdvancedAISystem",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "algorithm_refinement",
                 "ai_components",
                 "Motor de refinamiento de algoritmos",
-                AlgorithmRefinementEngine(),
-                [],
+                ".ai_components.advanced_algorithm_refinement",
+                "AlgorithmRefinementEngine",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "contextual_reasoning",
                 "ai_components",
                 "Motor de razonamiento contextual",
-                ContextualReasoningEngine(),
-                [],
+                ".ai_components.advanced_contextual_reasoning",
+                "ContextualReasoningEngine",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "advanced_module_enhancer",
                 "ai_components",
                 "Mejorador avanzado de módulos",
-                AdvancedModuleEnhancer(),
-                [],
+                ".ai_components.advanced_module_enhancer",
+                "AdvancedModuleEnhancer",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "module_enhancer",
                 "ai_components",
                 "Mejorador de módulos",
-                ModuleEnhancer(),
-                [],
+                ".ai_components.module_enhancer",
+                "ModuleEnhancer",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "ml_model_adapter",
                 "ai_components",
                 "Adaptador de modelos ML",
-                MLModelAdapter(),
-                [],
+                ".ai_components.neurofusion_component_adapters",
+                "MLModelAdapter",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "nlp_component_adapter",
                 "ai_components",
                 "Adaptador de componentes NLP",
-                NLPComponentAdapter(),
-                [],
+                ".ai_components.neurofusion_component_adapters",
+                "NLPComponentAdapter",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "embedding_adapter",
                 "ai_components",
                 "Adaptador de embeddings",
-                EmbeddingAdapter(),
-                [],
+                ".ai_components.neurofusion_component_adapters",
+                "EmbeddingAdapter",
             )
 
         except Exception as e:
@@ -1052,36 +1118,28 @@ class UnifiedModuleSystem:
     async def _register_clustering_modules(self):
         """Registrar módulos de clustering y expansión de dominio"""
         try:
-            from .src.advanced_clustering.domain_adapter_optimizer import (
-                DomainAdapterOptimizer,
-            )
-            from .src.advanced_clustering.domain_expansion import DomainExpansionEngine
-            from .src.advanced_clustering.semantic_clustering import (
-                AdvancedSemanticClustering,
-            )
-
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "domain_adapter_optimizer",
                 "clustering",
                 "Optimizador de adaptadores de dominio",
-                DomainAdapterOptimizer(),
-                [],
+                ".src.advanced_clustering.domain_adapter_optimizer",
+                "DomainAdapterOptimizer",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "domain_expansion",
                 "clustering",
                 "Motor de expansión de dominio",
-                DomainExpansionEngine(),
-                [],
+                ".src.advanced_clustering.domain_expansion",
+                "DomainExpansionEngine",
             )
 
-            self.registry.register_module(
+            self.registry.register_lazy(
                 "semantic_clustering",
                 "clustering",
                 "Clustering semántico avanzado",
-                AdvancedSemanticClustering(),
-                [],
+                ".src.advanced_clustering.semantic_clustering",
+                "AdvancedSemanticClustering",
             )
 
         except Exception as e:
@@ -1130,6 +1188,9 @@ class UnifiedModuleSystem:
                 "is_async": module_info.is_async,
                 "status": module_info.status,
                 "last_used": module_info.last_used,
+                "import_time": module_info.import_time,
+                "init_time": module_info.init_time,
+                "error": module_info.error,
             }
         return None
 
@@ -1159,9 +1220,9 @@ unified_system = UnifiedModuleSystem()
 
 
 # Funciones de conveniencia para acceso directo
-async def initialize_modules():
+async def initialize_modules(preload: Optional[List[str]] = None):
     """Inicializar todos los módulos"""
-    await unified_system.initialize()
+    await unified_system.initialize(preload)
 
 
 def get_module(name: str) -> Any:
@@ -1179,6 +1240,11 @@ def get_module_info(name: str) -> Optional[Dict[str, Any]]:
     return unified_system.get_module_info(name)
 
 
+def get_load_report() -> List[Dict[str, Any]]:
+    """Obtener el informe de tiempos de carga de los módulos"""
+    return unified_system.get_load_report()
+
+
 async def execute_module_function(
     module_name: str, function_name: str, *args, **kwargs
 ):
@@ -1198,5 +1264,6 @@ __all__ = [
     "get_module",
     "list_modules",
     "get_module_info",
+    "get_load_report",
     "execute_module_function",
 ]
@@ -3,17 +3,34 @@ Análisis Semántico - Semantic Analyzer
 ======================================
 
 Componentes para análisis semántico y comprensión de significado.
+
+- Caché LRU de embeddings por hash del contenido (sha256): un texto se
+  codifica una sola vez por analizador
+- `build_index(texts)` devuelve un índice (`SemanticIndex`) que codifica el
+  corpus una vez y admite consultas repetidas, consultas por lotes y
+  adiciones incrementales
+- Sin modelo o si falla la codificación se lanza `SemanticModelError`; nunca
+  se devuelven embeddings aleatorios
 """
 
+import hashlib
 import logging
-from typing import List, Dict, Any, Optional, Tuple
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Sequence, Tuple, Union
 from dataclasses import dataclass
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
-import torch
+from sentence_transformers import SentenceTransformer
 
 logger = logging.getLogger(__name__)
 
+# Consultas puntuadas por operación matricial en las búsquedas por lotes
+QUERY_BATCH_SIZE = 256
+
+
+class SemanticModelError(RuntimeError):
+    """El modelo semántico no está disponible o no pudo codificar"""
+
 
 @dataclass
 class SemanticSimilarity:
@@ -35,12 +52,142 @@ class SemanticAnalysis:
     semantic_similarity: Dict[str, float]
 
 
+def _normalize(embeddings: np.ndarray) -> np.ndarray:
+    """Filas con norma unitaria (las filas nulas quedan a cero)"""
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def _top_k(
+    scores: np.ndarray, k: Optional[int], threshold: Optional[float] = None
+) -> np.ndarray:
+    """
+    Índices de las k mayores puntuaciones (> threshold), de mayor a menor;
+    los empates, en el orden del corpus. `k=None` devuelve todas
+    """
+    candidates = (
+        np.flatnonzero(scores > threshold)
+        if threshold is not None
+        else np.arange(len(scores))
+    )
+    k = len(candidates) if k is None else min(k, len(candidates))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+
+    candidate_scores = scores[candidates]
+    if k < len(candidates):
+        kth = candidate_scores[np.argpartition(-candidate_scores, k - 1)[k - 1]]
+        above = candidates[candidate_scores > kth]
+        ties = candidates[candidate_scores == kth][: k - len(above)]
+        candidates = np.concatenate([above, ties])
+
+    return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+
+class SemanticIndex:
+    """
+    Corpus codificado una vez: matriz de embeddings normalizados sobre la
+    que se resuelven consultas sueltas o por lotes
+    """
+
+    def __init__(self, analyzer: "SemanticAnalyzer", texts: Sequence[str] = ()):
+        self.analyzer = analyzer
+        self.texts: List[str] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._size = 0
+        self._lock = threading.Lock()
+        if texts:
+            self.add(texts)
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Embeddings normalizados del corpus (textos x dimensión)"""
+        if self._matrix is None:
+            return np.zeros((0, 0), dtype=np.float32)
+        return self._matrix[: self._size]
+
+    def add(self, texts: Sequence[str]) -> range:
+        """
+        Añadir textos al corpus; devuelve el rango de sus índices. Si la
+        codificación falla el índice no cambia
+        """
+        texts = list(texts)
+        if not texts:
+            return range(self._size, self._size)
+
+        vectors = _normalize(self.analyzer.get_embeddings(texts))
+        with self._lock:
+            start = self._size
+            end = start + len(vectors)
+            if self._matrix is None:
+                self._matrix = np.empty((len(vectors), vectors.shape[1]), dtype=np.float32)
+            elif end > len(self._matrix):
+                # Capacidad duplicada: adiciones incrementales en O(n) amortizado
+                grown = np.empty(
+                    (max(end, 2 * len(self._matrix)), self._matrix.shape[1]),
+                    dtype=np.float32,
+                )
+                grown[:start] = self._matrix[:start]
+                self._matrix = grown
+            self._matrix[start:end] = vectors
+            self.texts.extend(texts)
+            self._size = end
+        return range(start, end)
+
+    def similarities(self, queries: Sequence[str]) -> np.ndarray:
+        """Matriz de similitud coseno (consultas x corpus)"""
+        if not queries or not self._size:
+            return np.zeros((len(queries), self._size), dtype=np.float32)
+        query_vectors = _normalize(self.analyzer.get_embeddings(list(queries)))
+        return query_vectors @ self.embeddings.T
+
+    def search_batch(
+        self,
+        queries: Sequence[str],
+        top_k: Optional[int] = 5,
+        threshold: Optional[float] = None,
+    ) -> List[List[Tuple[int, float]]]:
+        """
+        Para cada consulta, lista de (índice, similitud) de los `top_k`
+        textos más similares (> threshold), de mayor a menor
+        """
+        results = []
+        # Por bloques de consultas para acotar la matriz consultas x corpus
+        for start in range(0, len(queries), QUERY_BATCH_SIZE):
+            scores = self.similarities(queries[start : start + QUERY_BATCH_SIZE])
+            for row in scores:
+                results.append(
+                    [(int(i), float(row[i])) for i in _top_k(row, top_k, threshold)]
+                )
+        return results
+
+    def search(
+        self, query: str, top_k: Optional[int] = 5, threshold: Optional[float] = None
+    ) -> List[Tuple[int, float]]:
+        """(índice, similitud) de los `top_k` textos más similares a la consulta"""
+        return self.search_batch([query], top_k, threshold)[0]
+
+
 class SemanticAnalyzer:
     """Analizador semántico principal"""
 
-    def __init__(self, model_name: str = "paraphrase-multilingual-MiniLM-L12-v2"):
+    def __init__(
+        self,
+        model_name: str = "paraphrase-multilingual-MiniLM-L12-v2",
+        cache_size: int = 10000,
+        batch_size: int = 32,
+    ):
         self.model_name = model_name
         self.model = None
+        self.cache_size = cache_size
+        self.batch_size = batch_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self._cache_hits = 0
+        self._cache_misses = 0
         self._load_model()
 
     def _load_model(self):
@@ -53,18 +200,91 @@ class SemanticAnalyzer:
             logger.error(f"❌ Error cargando modelo semántico: {e}")
             self.model = None
 
+    @staticmethod
+    def _content_key(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
     def get_embeddings(self, texts: List[str]) -> np.ndarray:
-        """Obtiene embeddings para una lista de textos"""
+        """
+        Obtiene embeddings para una lista de textos. Solo se codifican los
+        textos que no están en la caché, una vez cada uno y en un lote.
+        Lanza `SemanticModelError` si el modelo no está disponible o falla
+        """
         if not self.model:
-            logger.warning("⚠️ Modelo no disponible, usando embeddings aleatorios")
-            return np.random.rand(len(texts), 384)  # Dimensión típica
+            raise SemanticModelError(
+                f"Modelo semántico {self.model_name} no disponible"
+            )
 
-        try:
-            embeddings = self.model.encode(texts, convert_to_tensor=True)
-            return embeddings.cpu().numpy()
-        except Exception as e:
-            logger.error(f"❌ Error generando embeddings: {e}")
-            return np.random.rand(len(texts), 384)
+        keys = [self._content_key(text) for text in texts]
+        found: Dict[str, np.ndarray] = {}
+        missing: Dict[str, str] = {}
+        with self._cache_lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in missing:
+                    continue
+                cached = self._cache.get(key)
+                if cached is not None:
+                    self._cache.move_to_end(key)
+                    found[key] = cached
+                else:
+                    missing[key] = text
+            self._cache_hits += len(found)
+            self._cache_misses += len(missing)
+
+        if missing:
+            try:
+                encoded = self.model.encode(
+                    list(missing.values()),
+                    batch_size=self.batch_size,
+                    convert_to_numpy=True,
+                )
+            except Exception as e:
+                logger.error(f"❌ Error generando embeddings: {e}")
+                raise SemanticModelError(f"Error generando embeddings: {e}") from e
+
+            encoded = np.asarray(encoded, dtype=np.float32)
+            with self._cache_lock:
+                for key, vector in zip(missing, encoded):
+                    found[key] = vector
+                    if self.cache_size > 0:
+                        self._cache[key] = vector
+                        self._cache.move_to_end(key)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if not keys:
+            dimension = next(iter(self._cache.values())).shape[0] if self._cache else 0
+            return np.zeros((0, dimension), dtype=np.float32)
+        return np.stack([found[key] for key in keys])
+
+    def get_cache_stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            lookups = self._cache_hits + self._cache_misses
+            return {
+                "cache_entries": len(self._cache),
+                "cache_hits": self._cache_hits,
+                "cache_misses": self._cache_misses,
+                "cache_hit_rate": self._cache_hits / lookups if lookups else 0.0,
+            }
+
+    def clear_cache(self):
+        with self._cache_lock:
+            self._cache.clear()
+
+    def _similarity_matrix(self, texts: List[str]) -> np.ndarray:
+        """Similitud coseno de todos contra todos"""
+        vectors = _normalize(self.get_embeddings(texts))
+        return vectors @ vectors.T
+
+    def build_index(self, texts: Sequence[str] = ()) -> SemanticIndex:
+        """
+        Codifica el corpus una vez y devuelve un índice para consultas
+        repetidas (`search`/`search_batch`) y adiciones (`add`)
+        """
+        return SemanticIndex(self, texts)
+
+    def _as_index(self, texts: Union[Sequence[str], SemanticIndex]) -> SemanticIndex:
+        return texts if isinstance(texts, SemanticIndex) else self.build_index(texts)
 
     def calculate_similarity(self, text1: str, text2: str) -> float:
         """Calcula similitud semántica entre dos textos"""
@@ -72,34 +292,27 @@ class SemanticAnalyzer:
             return 0.0
 
         try:
-            embeddings = self.model.encode([text1, text2], convert_to_tensor=True)
-            similarity = util.pytorch_cos_sim(embeddings[0], embeddings[1])
-            return float(similarity[0][0])
+            return float(self._similarity_matrix([text1, text2])[0, 1])
         except Exception as e:
             logger.error(f"❌ Error calculando similitud: {e}")
             return 0.0
 
     def find_similar_texts(
-        self, query: str, texts: List[str], threshold: float = 0.5
+        self,
+        query: str,
+        texts: Union[List[str], SemanticIndex],
+        threshold: float = 0.5,
     ) -> List[Tuple[int, float]]:
-        """Encuentra textos similares a una consulta"""
-        if not self.model or not texts:
+        """
+        Encuentra textos similares a una consulta. `texts` puede ser un
+        índice de `build_index` para no recodificar el corpus
+        """
+        if not self.model or not len(texts):
             return []
 
         try:
-            query_embedding = self.model.encode(query, convert_to_tensor=True)
-            text_embeddings = self.model.encode(texts, convert_to_tensor=True)
-
-            similarities = util.pytorch_cos_sim(query_embedding, text_embeddings)[0]
-
-            similar_texts = []
-            for i, similarity in enumerate(similarities):
-                if similarity > threshold:
-                    similar_texts.append((i, float(similarity)))
-
-            # Ordenar por similitud descendente
-            similar_texts.sort(key=lambda x: x[1], reverse=True)
-            return similar_texts
+            # Ordenados por similitud descendente
+            return self._as_index(texts).search(query, top_k=None, threshold=threshold)
 
         except Exception as e:
             logger.error(f"❌ Error buscando textos similares: {e}")
@@ -111,10 +324,8 @@ class SemanticAnalyzer:
             return []
 
         try:
-            embeddings = self.model.encode(texts, convert_to_tensor=True)
-
             # Calcular matriz de similitud
-            similarity_matrix = util.pytorch_cos_sim(embeddings, embeddings)
+            similarity_matrix = self._similarity_matrix(texts)
 
             # Clustering simple basado en similitud
             clusters = []
@@ -169,16 +380,13 @@ class SemanticAnalyzer:
             return []
 
         try:
-            # Obtener embeddings de oraciones
-            embeddings = self.model.encode(sentences, convert_to_tensor=True)
-
             # Calcular similitud entre oraciones
-            similarity_matrix = util.pytorch_cos_sim(embeddings, embeddings)
+            similarity_matrix = self._similarity_matrix(sentences)
 
             # Encontrar oraciones más representativas
             sentence_scores = []
             for i in range(len(sentences)):
-                score = torch.mean(similarity_matrix[i]).item()
+                score = float(np.mean(similarity_matrix[i]))
                 sentence_scores.append((i, score))
 
             # Ordenar por score y tomar las mejores
@@ -221,28 +429,16 @@ class SemanticAnalyzer:
                 # Usar la primera oración como tema principal
                 analysis["main_theme"] = sentences[0].strip()
 
-            # Calcular coherencia semántica
+            # Calcular coherencia semántica entre oraciones consecutivas
             if len(sentences) > 1:
-                embeddings = self.model.encode(sentences, convert_to_tensor=True)
-                similarities = []
-                for i in range(len(sentences) - 1):
-                    sim = util.pytorch_cos_sim(embeddings[i], embeddings[i + 1])
-                    similarities.append(float(sim[0][0]))
-
-                if similarities:
-                    analysis["semantic_coherence"] = np.mean(similarities)
+                vectors = _normalize(self.get_embeddings(sentences))
+                similarities = np.sum(vectors[:-1] * vectors[1:], axis=1)
+                analysis["semantic_coherence"] = float(np.mean(similarities))
 
             # Análisis de relevancia con contexto
             if context_texts:
-                text_embedding = self.model.encode(text, convert_to_tensor=True)
-                context_embeddings = self.model.encode(
-                    context_texts, convert_to_tensor=True
-                )
-
-                similarities = util.pytorch_cos_sim(text_embedding, context_embeddings)[
-                    0
-                ]
-                analysis["context_relevance"] = float(torch.mean(similarities))
+                similarities = self.build_index(context_texts).similarities([text])[0]
+                analysis["context_relevance"] = float(np.mean(similarities))
 
             return analysis
 
@@ -277,12 +473,19 @@ class SemanticAnalyzer:
             # Análisis de contexto
             context_understanding = self.understand_context(text, context_texts)
 
-            # Similitud semántica con conceptos clave
+            # Similitud semántica con conceptos clave (el texto se codifica una vez)
             semantic_similarity = {}
-            if key_concepts:
-                for concept in key_concepts[:5]:
-                    similarity = self.calculate_similarity(text, concept)
-                    semantic_similarity[concept] = similarity
+            if key_concepts and self.model:
+                concepts = key_concepts[:5]
+                try:
+                    similarities = self.build_index(concepts).similarities([text])[0]
+                    semantic_similarity = {
+                        concept: float(similarity)
+                        for concept, similarity in zip(concepts, similarities)
+                    }
+                except SemanticModelError as e:
+                    logger.error(f"❌ Error calculando similitud: {e}")
+                    semantic_similarity = {concept: 0.0 for concept in concepts}
 
             return SemanticAnalysis(
                 main_topics=main_topics,
@@ -297,26 +500,38 @@ class SemanticAnalyzer:
             return SemanticAnalysis([], [], [], {}, {})
 
     def semantic_search(
-        self, query: str, documents: List[str], top_k: int = 5
+        self,
+        query: str,
+        documents: Union[List[str], SemanticIndex],
+        top_k: int = 5,
     ) -> List[Tuple[int, float]]:
-        """Búsqueda semántica en documentos"""
-        if not self.model or not documents:
+        """
+        Búsqueda semántica en documentos. `documents` puede ser un índice de
+        `build_index` para no recodificar el corpus en cada consulta
+        """
+        if not self.model or not len(documents):
             return []
 
         try:
-            query_embedding = self.model.encode(query, convert_to_tensor=True)
-            doc_embeddings = self.model.encode(documents, convert_to_tensor=True)
+            return self._as_index(documents).search(query, top_k=top_k)
 
-            similarities = util.pytorch_cos_sim(query_embedding, doc_embeddings)[0]
+        except Exception as e:
+            logger.error(f"❌ Error en búsqueda semántica: {e}")
+            return []
 
-            # Obtener top-k resultados
-            top_results = []
-            for i, similarity in enumerate(similarities):
-                top_results.append((i, float(similarity)))
+    def semantic_search_batch(
+        self,
+        queries: List[str],
+        documents: Union[List[str], SemanticIndex],
+        top_k: int = 5,
+    ) -> List[List[Tuple[int, float]]]:
+        """Búsqueda semántica de varias consultas sobre el mismo corpus"""
+        if not self.model or not len(documents):
+            return [[] for _ in queries]
 
-            top_results.sort(key=lambda x: x[1], reverse=True)
-            return top_results[:top_k]
+        try:
+            return self._as_index(documents).search_batch(queries, top_k=top_k)
 
         except Exception as e:
             logger.error(f"❌ Error en búsqueda semántica: {e}")
-            return []
+            return [[] for _ in queries]
@@ -11,7 +11,7 @@ sys.path.append(
 
 from modules.rewards.reward_system import ShailiRewardSystem
 from modules.rewards.tracker import SessionTracker
-from modules.rewards.contextual_accuracy import ContextualAccuracyEvaluator
+from modules.rewards.contextual_accuracy import get_contextual_evaluator
 from datetime import datetime, UTC
 
 
@@ -56,7 +56,7 @@ class ShailiModelRewardsIntegrator:
             retention_days=self.rewards_config.get("retention_days", 90),
         )
 
-        self.contextual_evaluator = ContextualAccuracyEvaluator()
+        self.contextual_evaluator = get_contextual_evaluator()
 
         # Métricas de rendimiento
         self.performance_metrics = {
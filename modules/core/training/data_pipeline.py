@@ -4,6 +4,7 @@ import re
 import json
 import logging
 import hashlib
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any, Optional
 import numpy as np
 import pandas as pd
@@ -16,6 +17,11 @@ from urllib.parse import urlparse
 from bs4 import BeautifulSoup
 import chardet
 
+try:
+    from .minhash_index import MinHashIndex
+except ImportError:
+    from minhash_index import MinHashIndex
+
 
 class DataCurationPipeline:
     def __init__(
@@ -49,7 +55,12 @@ class DataCurationPipeline:
             "max_text_length": 10000,
             "deduplication_threshold": 0.85,
             "pii_risk_threshold": 0.5,
+            "minhash_num_perm": 128,
+            "minhash_batch_size": 256,
+            "dedup_index_path": os.path.join(output_dir, "dedup_index.sqlite"),
+            "ingest_workers": 8,
         }
+        self._dedup_index: Optional[MinHashIndex] = None
 
     def _detect_language(self, text: str) -> str:
         """
@@ -147,12 +158,47 @@ class DataCurationPipeline:
         """
         return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
+    def _read_source(self, source: Dict[str, Any]) -> Optional[str]:
+        """
+        Leer el texto crudo de una fuente (E/S: descarga o lectura de archivo)
+
+        Args:
+            source (dict): Fuente de datos
+
+        Returns:
+            Texto limpio, o None si el tipo de fuente no está soportado
+        """
+        if source["type"] == "url":
+            response = requests.get(source["url"], timeout=10)
+            return self._clean_text(response.text)
+        elif source["type"] == "file":
+            with open(source["path"], "rb") as f:
+                raw_data = f.read()
+            encoding = chardet.detect(raw_data)["encoding"]
+            return self._clean_text(raw_data.decode(encoding))
+        elif source["type"] == "text":
+            return self._clean_text(source["content"])
+
+        self.logger.warning(f"Tipo de fuente no soportado: {source['type']}")
+        return None
+
+    def _read_source_safe(self, source: Dict[str, Any]) -> Optional[str]:
+        try:
+            return self._read_source(source)
+        except Exception as e:
+            self.logger.error(f"Error procesando fuente {source}: {e}")
+            return None
+
     def ingest_data(
         self, sources: List[Dict[str, Any]], domain: str
     ) -> List[Dict[str, str]]:
         """
         Ingestar datos de múltiples fuentes
 
+        Las descargas y lecturas de archivo se hacen en paralelo con un pool
+        de hilos acotado (config["ingest_workers"]); los filtros de calidad,
+        que usan los modelos, se aplican después en orden.
+
         Args:
             sources (list): Lista de fuentes de datos
             domain (str): Dominio de los datos
@@ -162,25 +208,17 @@ class DataCurationPipeline:
         """
         processed_docs = []
 
-        for source in sources:
-            try:
-                # Manejar diferentes tipos de fuentes
-                if source["type"] == "url":
-                    response = requests.get(source["url"], timeout=10)
-                    text = self._clean_text(response.text)
-                elif source["type"] == "file":
-                    with open(source["path"], "rb") as f:
-                        raw_data = f.read()
-                        encoding = chardet.detect(raw_data)["encoding"]
-                        text = self._clean_text(raw_data.decode(encoding))
-                elif source["type"] == "text":
-                    text = self._clean_text(source["content"])
-                else:
-                    self.logger.warning(
-                        f"Tipo de fuente no soportado: {source['type']}"
-                    )
-                    continue
+        workers = max(1, min(self.config["ingest_workers"], len(sources)))
+        with ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="ingest"
+        ) as executor:
+            texts = list(executor.map(self._read_source_safe, sources))
+
+        for source, text in zip(sources, texts):
+            if text is None:
+                continue
 
+            try:
                 # Filtros de calidad
                 if (
                     len(text) < self.config["min_text_length"]
@@ -215,9 +253,22 @@ class DataCurationPipeline:
 
         return processed_docs
 
+    @property
+    def dedup_index(self) -> MinHashIndex:
+        """Índice persistente de casi-duplicados (se abre en el primer uso)"""
+        if self._dedup_index is None:
+            self._dedup_index = MinHashIndex(
+                self.config["dedup_index_path"],
+                threshold=self.config["deduplication_threshold"],
+                num_perm=self.config["minhash_num_perm"],
+            )
+        return self._dedup_index
+
     def deduplicate(self, documents: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
-        Eliminar documentos duplicados usando MinHash
+        Eliminar documentos duplicados: primero por hash exacto y después
+        por similitud MinHash, comparando también con el corpus ya indexado
+        en ejecuciones anteriores
 
         Args:
             documents (list): Lista de documentos
@@ -225,20 +276,22 @@ class DataCurationPipeline:
         Returns:
             Lista de documentos únicos
         """
-        from datasketch import MinHash, MinHashLSH
-
-        lsh = MinHashLSH(threshold=self.config["deduplication_threshold"])
         unique_docs = []
+        batch_size = self.config["minhash_batch_size"]
+
+        for start in range(0, len(documents), batch_size):
+            batch = documents[start : start + batch_size]
+            keep = self.dedup_index.deduplicate_batch(
+                [doc["hash"] for doc in batch],
+                [doc["text"] for doc in batch],
+                [doc["hash"] for doc in batch],
+            )
+            unique_docs.extend(doc for doc, kept in zip(batch, keep) if kept)
 
-        for doc in documents:
-            minhash = MinHash(num_perm=128)
-            for word in doc["text"].split():
-                minhash.update(word.encode("utf-8"))
-
-            if not lsh.query(minhash):
-                lsh.insert(doc["hash"], minhash)
-                unique_docs.append(doc)
-
+        self.logger.info(
+            f"Deduplicación: {len(unique_docs)}/{len(documents)} documentos únicos "
+            f"({len(self.dedup_index)} en el índice)"
+        )
         return unique_docs
 
     def prepare_training_dataset(
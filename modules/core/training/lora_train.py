@@ -1,10 +1,18 @@
 import os
+from dataclasses import replace
+from datetime import datetime
+
 import torch
-from transformers import TrainingArguments
+from transformers import DataCollatorForLanguageModeling, Trainer, TrainingArguments
 from peft import LoraConfig, get_peft_model, prepare_model_for_kbit_training
 from datasets import load_dataset
 import wandb
 
+try:
+    from .tokenization_cache import TokenizationCache
+except ImportError:
+    from tokenization_cache import TokenizationCache
+
 
 class LoRATrainer:
     def __init__(self, base_model, domain, config_path="utils/config.yaml"):
@@ -50,16 +58,40 @@ class LoRATrainer:
             report_to="wandb",
         )
 
-    def prepare_dataset(self, dataset_path):
+        # Caché de tokenización compartida entre entrenamientos
+        self.tokenization_cache = TokenizationCache(max_length=512, pack=True)
+
+        # Fracción de los bloques de la caché reservada para validación
+        self.validation_fraction = 0.05
+
+    def prepare_dataset(self, dataset_path, use_cache=True):
         """
         Preparar dataset para entrenamiento de rama
 
         Args:
             dataset_path: Ruta al dataset del dominio
+            use_cache: Leer los tokens de la caché de tokenización (solo se
+                tokeniza si cambian el dataset o el tokenizador), con los
+                ejemplos empaquetados en bloques de 512 tokens
 
         Returns:
-            Dataset procesado
+            Dataset procesado; con la caché, un `validation_fraction` de los
+            bloques (elegidos con semilla fija) forma el split "validation"
         """
+        if use_cache:
+            cached = self.tokenization_cache.load(dataset_path, self.base_model.tokenizer)
+            num_eval = int(len(cached) * self.validation_fraction)
+            if num_eval == 0:
+                return {"train": cached}
+
+            order = torch.randperm(
+                len(cached), generator=torch.Generator().manual_seed(42)
+            ).tolist()
+            return {
+                "train": torch.utils.data.Subset(cached, order[num_eval:]),
+                "validation": torch.utils.data.Subset(cached, order[:num_eval]),
+            }
+
         dataset = load_dataset("json", data_files=dataset_path)
 
         # Preprocesar dataset
@@ -106,14 +138,25 @@ class LoRATrainer:
 
         # Dividir dataset
         train_dataset = processed_dataset["train"]
-        eval_dataset = processed_dataset["validation"]
+        eval_dataset = processed_dataset.get("validation")
+
+        # Sin split de validación (dataset pequeño) no se evalúa: Trainer
+        # no acepta una estrategia de evaluación sin eval_dataset
+        training_args = self.training_args
+        if eval_dataset is None:
+            training_args = replace(training_args, evaluation_strategy="no")
+
+        tokenizer = self.base_model.tokenizer
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
 
         # Inicializar Trainer
         trainer = Trainer(
             model=self.model,
-            args=self.training_args,
+            args=training_args,
             train_dataset=train_dataset,
             eval_dataset=eval_dataset,
+            data_collator=DataCollatorForLanguageModeling(tokenizer, mlm=False),
         )
 
         # Entrenar
@@ -122,9 +165,43 @@ class LoRATrainer:
         # Guardar adapter
         self.model.save_pretrained(f"branches/{self.domain}/adapter")
 
+        # Resumen de métricas para el colector de monitoreo
+        self._write_metrics_summary(trainer, len(train_dataset))
+
         # Finalizar wandb
         wandb.finish()
 
+    def _write_metrics_summary(self, trainer, num_samples):
+        """
+        Escribir branches/<dominio>/metrics_summary.json con el estado final
+        del entrenamiento, que el MetricsCollector lee en una sola apertura
+        """
+        from monitoring.branch_summary import write_branch_summary
+
+        state = trainer.state
+        log_history = state.log_history or []
+        losses = [entry["loss"] for entry in log_history if "loss" in entry]
+        accuracies = [
+            entry["eval_accuracy"] for entry in log_history if "eval_accuracy" in entry
+        ]
+
+        write_branch_summary(
+            f"branches/{self.domain}",
+            {
+                "active_adapters": 1,
+                "training_progress": (
+                    100.0 * state.global_step / state.max_steps
+                    if state.max_steps
+                    else 100.0
+                ),
+                "accuracy_score": accuracies[-1] * 100 if accuracies else None,
+                "loss_value": losses[-1] if losses else None,
+                "samples_processed": num_samples
+                * int(self.training_args.num_train_epochs),
+                "last_training_time": datetime.now().isoformat(),
+            },
+        )
+
     def evaluate(self):
         """
         Evaluar rendimiento del adapter entrenado
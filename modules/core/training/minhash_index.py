@@ -0,0 +1,370 @@
+#!/usr/bin/env python3
+"""
+Índice persistente de casi-duplicados (MinHash + LSH)
+
+Las firmas MinHash se calculan por lotes con NumPy: cada shingle distinto
+se hashea una vez y las permutaciones se aplican sobre la matriz completa
+del lote. Las firmas y los buckets LSH se guardan en SQLite, de modo que
+cada ingesta nueva se compara también con el corpus de ejecuciones
+anteriores. Antes de MinHash se descartan los duplicados exactos por hash.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+from typing import Dict, List, Sequence, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Primo de Mersenne 2^61 - 1 y máscara de 32 bits (mismo esquema que datasketch)
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+def _integrate(y: np.ndarray, x: np.ndarray) -> float:
+    """Regla del trapecio"""
+    return float(np.sum((y[1:] + y[:-1]) / 2 * np.diff(x)))
+
+
+def optimal_lsh_params(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Bandas y filas por banda que minimizan falsos positivos + falsos
+    negativos para el umbral de Jaccard dado
+    """
+    grid = np.linspace(0.0, 1.0, 201)
+    below, above = grid <= threshold, grid >= threshold
+    best, best_error = (1, num_perm), float("inf")
+
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        probability = 1 - (1 - grid**rows) ** bands
+        false_positive = _integrate(probability[below], grid[below])
+        false_negative = _integrate(1 - probability[above], grid[above])
+        error = false_positive + false_negative
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+class MinHashIndex:
+    """Índice LSH de firmas MinHash persistido en SQLite"""
+
+    def __init__(
+        self,
+        db_path: str,
+        threshold: float = 0.85,
+        num_perm: int = 128,
+        shingle_size: int = 1,
+        seed: int = 1,
+    ):
+        """
+        Args:
+            db_path: archivo SQLite del índice (se crea si no existe)
+            threshold: Jaccard estimado a partir del cual un documento es duplicado
+            num_perm: número de permutaciones de la firma
+            shingle_size: palabras por shingle (1 = conjunto de palabras)
+            seed: semilla de las permutaciones; fija para que las firmas
+                guardadas sean comparables entre ejecuciones
+        """
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = optimal_lsh_params(threshold, num_perm)
+
+        generator = np.random.RandomState(seed)
+        self._a = generator.randint(1, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._b = generator.randint(0, 1 << 32, size=(num_perm, 1), dtype=np.uint64)
+        self._band_multipliers = (
+            generator.randint(0, 1 << 63, size=self.rows, dtype=np.uint64) << np.uint64(1)
+        ) | np.uint64(1)
+
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.conn = sqlite3.connect(db_path)
+        self._create_tables(seed)
+
+    def _create_tables(self, seed: int):
+        cursor = self.conn.cursor()
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS index_config (key TEXT PRIMARY KEY, value TEXT)"
+        )
+        cursor.execute(
+            "CREATE TABLE IF NOT EXISTS exact_hashes (hash TEXT PRIMARY KEY)"
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS signatures (
+                key TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            """
+            CREATE TABLE IF NOT EXISTS lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                key TEXT NOT NULL
+            )
+        """
+        )
+        cursor.execute(
+            "CREATE INDEX IF NOT EXISTS idx_lsh_bucket ON lsh_buckets(band, bucket)"
+        )
+
+        # Un índice solo es reutilizable con los mismos parámetros de firma
+        config = {
+            "num_perm": str(self.num_perm),
+            "bands": str(self.bands),
+            "shingle_size": str(self.shingle_size),
+            "seed": str(seed),
+        }
+        stored = dict(cursor.execute("SELECT key, value FROM index_config"))
+        if stored and stored != config:
+            raise ValueError(
+                f"El índice existente usa otros parámetros: {stored} != {config}"
+            )
+        cursor.executemany(
+            "INSERT OR IGNORE INTO index_config (key, value) VALUES (?, ?)",
+            config.items(),
+        )
+        self.conn.commit()
+        cursor.close()
+
+    # ==================== FIRMAS ====================
+
+    def _shingles(self, text: str) -> Set[str]:
+        words = text.split()
+        if self.shingle_size <= 1 or len(words) < self.shingle_size:
+            return set(words)
+        return {
+            " ".join(words[i : i + self.shingle_size])
+            for i in range(len(words) - self.shingle_size + 1)
+        }
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """Firmas MinHash de un lote de textos: matriz (textos x num_perm)"""
+        shingle_ids: Dict[str, int] = {}
+        doc_shingles: List[List[int]] = []
+        for text in texts:
+            doc_shingles.append(
+                [
+                    shingle_ids.setdefault(shingle, len(shingle_ids))
+                    for shingle in self._shingles(text)
+                ]
+            )
+
+        signatures = np.full((len(texts), self.num_perm), _MAX_HASH, dtype=np.uint64)
+        if not shingle_ids:
+            return signatures
+
+        # Cada shingle distinto del lote se hashea una sola vez
+        hashes = np.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.sha1(shingle.encode("utf-8")).digest()[:4], "little"
+                )
+                for shingle in shingle_ids
+            ),
+            dtype=np.uint64,
+            count=len(shingle_ids),
+        )
+        # Permutaciones sobre todos los shingles a la vez: (num_perm x shingles)
+        permuted = ((self._a * hashes + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+
+        non_empty = [i for i, ids in enumerate(doc_shingles) if ids]
+        columns = np.fromiter(
+            (shingle for i in non_empty for shingle in doc_shingles[i]), dtype=np.int64
+        )
+        offsets = np.cumsum([0] + [len(doc_shingles[i]) for i in non_empty[:-1]])
+        signatures[non_empty] = np.minimum.reduceat(
+            permuted[:, columns], offsets, axis=1
+        ).T
+        return signatures
+
+    def _band_buckets(self, signatures: np.ndarray) -> np.ndarray:
+        """Hash de 63 bits de cada banda: matriz (textos x bandas)"""
+        rows = signatures[:, : self.bands * self.rows].reshape(
+            len(signatures), self.bands, self.rows
+        )
+        # Hash polinómico con aritmética modular 2^64 (desbordamiento de uint64)
+        with np.errstate(over="ignore"):
+            mixed = (rows * self._band_multipliers).sum(axis=2, dtype=np.uint64)
+        return (mixed >> np.uint64(1)).astype(np.int64)
+
+    def jaccard(self, first: np.ndarray, second: np.ndarray) -> float:
+        return float(np.mean(first == second))
+
+    # ==================== CONSULTA E INSERCIÓN ====================
+
+    def filter_exact(self, hashes: Sequence[str]) -> List[bool]:
+        """True para cada hash no visto antes (ni en el índice ni en el lote)"""
+        seen: Set[str] = set()
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("CREATE TEMP TABLE IF NOT EXISTS batch_hashes (hash TEXT)")
+            cursor.execute("DELETE FROM batch_hashes")
+            cursor.executemany(
+                "INSERT INTO batch_hashes (hash) VALUES (?)", [(h,) for h in hashes]
+            )
+            known = {
+                row[0]
+                for row in cursor.execute(
+                    "SELECT DISTINCT b.hash FROM batch_hashes b "
+                    "JOIN exact_hashes e ON e.hash = b.hash"
+                )
+            }
+        finally:
+            cursor.close()
+
+        keep = []
+        for text_hash in hashes:
+            keep.append(text_hash not in known and text_hash not in seen)
+            seen.add(text_hash)
+        return keep
+
+    def _indexed_candidates(self, buckets: np.ndarray) -> Dict[int, Set[str]]:
+        """Claves del índice que comparten algún bucket con cada texto del lote"""
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS batch_buckets "
+                "(position INTEGER, band INTEGER, bucket INTEGER)"
+            )
+            cursor.execute("DELETE FROM batch_buckets")
+            cursor.executemany(
+                "INSERT INTO batch_buckets VALUES (?, ?, ?)",
+                (
+                    (position, band, int(bucket))
+                    for position, row in enumerate(buckets)
+                    for band, bucket in enumerate(row)
+                ),
+            )
+            candidates: Dict[int, Set[str]] = {}
+            for position, key in cursor.execute(
+                "SELECT DISTINCT b.position, l.key FROM batch_buckets b "
+                "JOIN lsh_buckets l ON l.band = b.band AND l.bucket = b.bucket"
+            ):
+                candidates.setdefault(position, set()).add(key)
+            return candidates
+        finally:
+            cursor.close()
+
+    def _load_signatures(self, keys: Set[str]) -> Dict[str, np.ndarray]:
+        if not keys:
+            return {}
+        cursor = self.conn.cursor()
+        try:
+            result = {}
+            keys = list(keys)
+            for start in range(0, len(keys), 500):
+                chunk = keys[start : start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                for key, blob in cursor.execute(
+                    f"SELECT key, signature FROM signatures WHERE key IN ({placeholders})",
+                    chunk,
+                ):
+                    result[key] = np.frombuffer(blob, dtype=np.uint64)
+            return result
+        finally:
+            cursor.close()
+
+    def deduplicate_batch(
+        self, keys: Sequence[str], texts: Sequence[str], exact_hashes: Sequence[str]
+    ) -> List[bool]:
+        """
+        Decidir qué textos del lote son nuevos y añadirlos al índice.
+
+        Un texto es duplicado si su hash exacto ya existe o si su Jaccard
+        estimado con un texto indexado (de ejecuciones anteriores o anterior
+        en el mismo lote) alcanza el umbral. Devuelve una máscara de textos
+        conservados, en el orden de entrada.
+        """
+        keep = self.filter_exact(exact_hashes)
+        positions = [i for i, kept in enumerate(keep) if kept]
+        if not positions:
+            return keep
+
+        signatures = self.signatures([texts[i] for i in positions])
+        buckets = self._band_buckets(signatures)
+
+        indexed = self._indexed_candidates(buckets)
+        indexed_signatures = self._load_signatures(
+            set().union(*indexed.values()) if indexed else set()
+        )
+
+        # Buckets de los textos aceptados en este mismo lote
+        batch_buckets: Dict[Tuple[int, int], List[int]] = {}
+        accepted: List[int] = []
+
+        for local, position in enumerate(positions):
+            signature = signatures[local]
+            candidates = [
+                indexed_signatures[key]
+                for key in indexed.get(local, ())
+                if key in indexed_signatures
+            ]
+            batch_matches = {
+                other
+                for band, bucket in enumerate(buckets[local])
+                for other in batch_buckets.get((band, int(bucket)), ())
+            }
+            candidates.extend(signatures[other] for other in batch_matches)
+
+            if any(self.jaccard(signature, other) >= self.threshold for other in candidates):
+                keep[position] = False
+                continue
+
+            accepted.append(local)
+            for band, bucket in enumerate(buckets[local]):
+                batch_buckets.setdefault((band, int(bucket)), []).append(local)
+
+        self._insert(
+            [keys[positions[local]] for local in accepted],
+            [exact_hashes[positions[local]] for local in accepted],
+            signatures[accepted],
+            buckets[accepted],
+        )
+        return keep
+
+    def _insert(
+        self,
+        keys: List[str],
+        exact_hashes: List[str],
+        signatures: np.ndarray,
+        buckets: np.ndarray,
+    ):
+        if not keys:
+            return
+        cursor = self.conn.cursor()
+        try:
+            cursor.executemany(
+                "INSERT OR IGNORE INTO exact_hashes (hash) VALUES (?)",
+                [(h,) for h in exact_hashes],
+            )
+            cursor.executemany(
+                "INSERT OR REPLACE INTO signatures (key, signature) VALUES (?, ?)",
+                [(key, signature.tobytes()) for key, signature in zip(keys, signatures)],
+            )
+            cursor.executemany(
+                "INSERT INTO lsh_buckets (band, bucket, key) VALUES (?, ?, ?)",
+                [
+                    (band, int(bucket), key)
+                    for key, row in zip(keys, buckets)
+                    for band, bucket in enumerate(row)
+                ],
+            )
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+        finally:
+            cursor.close()
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM signatures").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Caché de Tokenización para Entrenamiento LoRA
+=============================================
+Guarda los datasets ya tokenizados en archivos mapeados en memoria para no
+re-tokenizar en cada entrenamiento.
+
+- Clave: (checksum del archivo de datos, huella del tokenizador,
+  max_length, empaquetado y plantilla de texto)
+- Tokens en un único `tokens.bin` plano (uint16/int32) más `offsets.npy`
+  con el inicio de cada secuencia; ambos se leen por mmap
+- Empaquetado opcional: los ejemplos se concatenan separados por EOS y se
+  cortan en bloques de max_length, sin tokens de relleno salvo en el
+  último bloque
+- Los datasets incrementales (manifest.json por shards) se cachean shard a
+  shard, de modo que los trabajos de una misma rama solo tokenizan los
+  shards nuevos
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from bisect import bisect_right
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Cambiar si cambia el formato en disco
+CACHE_FORMAT_VERSION = 1
+
+DEFAULT_TEMPLATE = "{instruction} {input}\n{output}"
+
+
+class _Example(dict):
+    """Ejemplo para str.format_map: los campos ausentes quedan vacíos"""
+
+    def __missing__(self, key):
+        return ""
+
+
+def file_checksum(path: Union[str, Path]) -> str:
+    """sha256 de un archivo, leído por bloques"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def tokenizer_fingerprint(tokenizer) -> str:
+    """Huella del tokenizador: clase, vocabulario y tokens especiales"""
+    digest = hashlib.sha256()
+    digest.update(type(tokenizer).__name__.encode("utf-8"))
+    digest.update(
+        json.dumps(tokenizer.get_vocab(), sort_keys=True, ensure_ascii=False).encode(
+            "utf-8"
+        )
+    )
+    special = getattr(tokenizer, "special_tokens_map", {}) or {}
+    digest.update(json.dumps(special, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _iter_jsonl(path: Union[str, Path]) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+
+def _batched(items: Iterator[Any], size: int) -> Iterator[List[Any]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class TokenizedShard:
+    """Un archivo de datos tokenizado, leído por mmap"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        with open(self.path / "meta.json", "r", encoding="utf-8") as f:
+            self.meta: Dict[str, Any] = json.load(f)
+
+        dtype = np.dtype(self.meta["dtype"])
+        if self.meta["num_tokens"]:
+            self.tokens = np.memmap(
+                self.path / "tokens.bin",
+                dtype=dtype,
+                mode="r",
+                shape=(self.meta["num_tokens"],),
+            )
+        else:
+            self.tokens = np.zeros(0, dtype=dtype)
+        self.offsets = np.load(self.path / "offsets.npy", mmap_mode="r")
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int):
+        return self.tokens[self.offsets[index] : self.offsets[index + 1]]
+
+
+class CachedTokenDataset:
+    """
+    Dataset indexable (compatible con torch/Trainer) sobre uno o varios
+    shards tokenizados. Cada elemento es {"input_ids": [...]}; el collator
+    de lenguaje causal añade labels y relleno
+    """
+
+    def __init__(self, shards: Sequence[TokenizedShard]):
+        self.shards = list(shards)
+        self._starts = [0]
+        for shard in self.shards:
+            self._starts.append(self._starts[-1] + len(shard))
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __getitem__(self, index: int) -> Dict[str, List[int]]:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        shard = bisect_right(self._starts, index) - 1
+        ids = self.shards[shard][index - self._starts[shard]]
+        return {"input_ids": ids.astype(np.int64).tolist()}
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Ejemplos, tokens, secuencias y proporción de relleno a max_length"""
+        num_tokens = sum(s.meta["num_tokens"] for s in self.shards)
+        num_sequences = sum(s.meta["num_sequences"] for s in self.shards)
+        max_length = self.shards[0].meta["max_length"] if self.shards else 0
+        slots = num_sequences * max_length
+        return {
+            "shards": len(self.shards),
+            "num_examples": sum(s.meta["num_examples"] for s in self.shards),
+            "num_tokens": num_tokens,
+            "num_sequences": num_sequences,
+            "padding_ratio": 1 - num_tokens / slots if slots else 0.0,
+        }
+
+
+class TokenizationCache:
+    """Caché en disco de datasets tokenizados"""
+
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = "shaili_ai/cache/tokenized",
+        max_length: int = 512,
+        pack: bool = True,
+        template: str = DEFAULT_TEMPLATE,
+        batch_size: int = 1000,
+    ):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_length = max_length
+        self.pack = pack
+        self.template = template
+        self.batch_size = batch_size
+        self._fingerprints: Dict[int, tuple] = {}
+
+    def _fingerprint(self, tokenizer) -> str:
+        # Se guarda también el tokenizador para que su id no se reutilice;
+        # add_tokens() cambia len(tokenizer) y fuerza a recalcular
+        cached = self._fingerprints.get(id(tokenizer))
+        if cached is None or cached[0] is not tokenizer or cached[1] != len(tokenizer):
+            cached = (tokenizer, len(tokenizer), tokenizer_fingerprint(tokenizer))
+            self._fingerprints[id(tokenizer)] = cached
+        return cached[2]
+
+    def cache_key(self, checksum: str, tokenizer) -> str:
+        key = "|".join(
+            (
+                checksum,
+                self._fingerprint(tokenizer),
+                str(self.max_length),
+                "packed" if self.pack else "padded",
+                self.template,
+                f"v{CACHE_FORMAT_VERSION}",
+            )
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+
+    def get_or_build(
+        self,
+        data_file: Union[str, Path],
+        tokenizer,
+        checksum: Optional[str] = None,
+    ) -> TokenizedShard:
+        """Shard tokenizado de `data_file` (JSONL), construyéndolo si falta"""
+        checksum = checksum or file_checksum(data_file)
+        target = self.cache_dir / self.cache_key(checksum, tokenizer)
+
+        if (target / "meta.json").exists():
+            return TokenizedShard(target)
+
+        self._build(data_file, tokenizer, target, checksum)
+        return TokenizedShard(target)
+
+    def load(self, dataset_path: Union[str, Path], tokenizer) -> CachedTokenDataset:
+        """
+        Dataset tokenizado para un JSONL, un directorio con manifest.json o
+        un manifiesto de shards (se reutiliza el sha256 de cada shard)
+        """
+        dataset_path = Path(dataset_path)
+        manifest_path = (
+            dataset_path / "manifest.json" if dataset_path.is_dir() else dataset_path
+        )
+
+        if manifest_path.suffix == ".json":
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            shards = [
+                self.get_or_build(
+                    manifest_path.parent / shard["file"], tokenizer, shard["sha256"]
+                )
+                for shard in manifest["shards"]
+            ]
+        else:
+            shards = [self.get_or_build(dataset_path, tokenizer)]
+
+        return CachedTokenDataset(shards)
+
+    def _build(self, data_file, tokenizer, target: Path, checksum: str):
+        """Tokenizar `data_file` por lotes escribiendo directamente a disco"""
+        start_time = time.perf_counter()
+        max_length = self.max_length
+        dtype = np.uint16 if len(tokenizer) <= np.iinfo(np.uint16).max else np.int32
+        eos_id = tokenizer.eos_token_id
+
+        # Se construye en un directorio temporal y se renombra al final: un
+        # proceso que lea la caché nunca ve un shard a medias
+        work_dir = Path(tempfile.mkdtemp(prefix=f".{target.name}.", dir=self.cache_dir))
+        lengths: List[int] = []
+        num_examples = 0
+        num_tokens = 0
+        carry: List[int] = []
+
+        try:
+            with open(work_dir / "tokens.bin", "wb") as out:
+                for batch in _batched(_iter_jsonl(data_file), self.batch_size):
+                    texts = [self.template.format_map(_Example(ex)) for ex in batch]
+                    if self.pack:
+                        encoded = tokenizer(texts, add_special_tokens=True)["input_ids"]
+                    else:
+                        encoded = tokenizer(
+                            texts,
+                            add_special_tokens=True,
+                            truncation=True,
+                            max_length=max_length,
+                        )["input_ids"]
+                    num_examples += len(encoded)
+
+                    if self.pack:
+                        for ids in encoded:
+                            carry.extend(ids)
+                            if eos_id is not None and (not ids or ids[-1] != eos_id):
+                                carry.append(eos_id)
+                        full = len(carry) // max_length * max_length
+                        if not full:
+                            continue
+                        chunk = np.asarray(carry[:full], dtype=dtype)
+                        del carry[:full]
+                        lengths.extend([max_length] * (full // max_length))
+                    else:
+                        chunk = np.fromiter(
+                            (token for ids in encoded for token in ids), dtype=dtype
+                        )
+                        lengths.extend(len(ids) for ids in encoded)
+
+                    chunk.tofile(out)
+                    num_tokens += len(chunk)
+
+                if carry:
+                    np.asarray(carry, dtype=dtype).tofile(out)
+                    lengths.append(len(carry))
+                    num_tokens += len(carry)
+
+            offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+            np.cumsum(lengths, out=offsets[1:])
+            np.save(work_dir / "offsets.npy", offsets)
+
+            elapsed = time.perf_counter() - start_time
+            slots = len(lengths) * max_length
+            meta = {
+                "version": CACHE_FORMAT_VERSION,
+                "source": str(data_file),
+                "checksum": checksum,
+                "max_length": max_length,
+                "pack": self.pack,
+                "dtype": np.dtype(dtype).name,
+                "num_examples": num_examples,
+                "num_tokens": num_tokens,
+                "num_sequences": len(lengths),
+                "padding_ratio": 1 - num_tokens / slots if slots else 0.0,
+                "build_seconds": elapsed,
+                "tokens_per_second": num_tokens / elapsed if elapsed else None,
+            }
+            with open(work_dir / "meta.json", "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+
+            try:
+                os.replace(work_dir, target)
+            except OSError:
+                # Otro proceso construyó el mismo shard a la vez
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+
+        logger.info(
+            f"🧩 Tokenizado {data_file}: {num_examples} ejemplos, {num_tokens} tokens "
+            f"en {len(lengths)} secuencias ({elapsed:.1f}s)"
+        )
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+"""
+Servicio de Encoder Compartido
+==============================
+Un único encoder (por defecto `models/custom/shaili-personal-model`) por
+proceso para RAG, clasificación de dominio y evaluación de precisión, en
+lugar de una copia de los pesos por componente.
+
+- `get_encoder_service()` devuelve el servicio del proceso (uno por modelo)
+- `encode(texts, pooling=...)` agrupa en micro-lotes las peticiones de
+  todos los hilos: un hilo de inferencia espera como mucho `max_wait_ms`
+  para llenar un lote de hasta `max_batch_size` textos
+- LRU de embeddings por (pooling, texto)
+- Despliegues con varios workers: `python -m modules.embeddings.encoder_service
+  --socket /ruta.sock` sirve el encoder por un socket Unix; con la variable
+  SHEILY_ENCODER_SOCKET apuntando a él, `get_encoder_service()` devuelve un
+  cliente remoto con la misma interfaz
+"""
+
+import argparse
+import json
+import logging
+import os
+import queue
+import socket
+import socketserver
+import struct
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+try:
+    from modules.utils.lazy_imports import lazy_import
+except ImportError:
+    from utils.lazy_imports import lazy_import
+
+torch = lazy_import("torch")
+transformers = lazy_import("transformers")
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENCODER_MODEL = "models/custom/shaili-personal-model"
+SOCKET_ENV_VAR = "SHEILY_ENCODER_SOCKET"
+POOLING_MODES = ("mean", "cls", "max")
+
+
+class _EncodeRequest:
+    __slots__ = ("texts", "pooling", "done", "result", "error")
+
+    def __init__(self, texts: List[str], pooling: str):
+        self.texts = texts
+        self.pooling = pooling
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class EncoderService:
+    """Encoder compartido con micro-batching entre hilos y LRU de embeddings"""
+
+    def __init__(
+        self,
+        model_path: str = DEFAULT_ENCODER_MODEL,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        cache_size: int = 10000,
+        max_length: int = 512,
+        device: Optional[str] = None,
+        quantize: bool = False,
+    ):
+        self.model_path = model_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.cache_size = cache_size
+        self.max_length = max_length
+        self.device = device
+        self.quantize = quantize
+
+        self._tokenizer = None
+        self._model = None
+        self._load_lock = threading.Lock()
+
+        self._cache: "OrderedDict[tuple, np.ndarray]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+        self._queue: "queue.Queue[Optional[_EncodeRequest]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+        self._worker_lock = threading.Lock()
+
+        self.stats = {
+            "requests": 0,
+            "texts": 0,
+            "cache_hits": 0,
+            "batches": 0,
+            "batched_texts": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Modelo
+    # ------------------------------------------------------------------
+
+    def load(self):
+        """Cargar tokenizador y modelo (una vez por proceso)"""
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is not None:
+                return
+            start = time.perf_counter()
+            tokenizer = transformers.AutoTokenizer.from_pretrained(self.model_path)
+            model = transformers.AutoModel.from_pretrained(self.model_path)
+            model.eval()
+            if self.quantize:
+                # Cuantización dinámica int8 de las capas lineales (solo CPU)
+                model = torch.quantization.quantize_dynamic(
+                    model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+            elif self.device:
+                model.to(self.device)
+            self._tokenizer = tokenizer
+            self._model = model
+            logger.info(
+                f"✅ Encoder compartido cargado: {self.model_path}"
+                f"{' (int8)' if self.quantize else ''} "
+                f"({time.perf_counter() - start:.1f}s)"
+            )
+
+    @property
+    def tokenizer(self):
+        self.load()
+        return self._tokenizer
+
+    @property
+    def model(self):
+        self.load()
+        return self._model
+
+    @property
+    def embedding_dimension(self) -> int:
+        return int(self.model.config.hidden_size)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def encode(
+        self,
+        texts: Union[str, Sequence[str]],
+        pooling: str = "mean",
+        normalize: bool = False,
+    ) -> np.ndarray:
+        """
+        Embeddings float32 de `texts`: (n, d) para una lista, (d,) para un
+        texto. `pooling`: "mean" (media con máscara de atención), "cls" o
+        "max"
+        """
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"Pooling no soportado: {pooling}")
+        single = isinstance(texts, str)
+        texts = [texts] if single else list(texts)
+
+        vectors: List[Optional[np.ndarray]] = [None] * len(texts)
+        missing: Dict[str, List[int]] = {}
+        with self._cache_lock:
+            self.stats["requests"] += 1
+            self.stats["texts"] += len(texts)
+            for i, text in enumerate(texts):
+                cached = self._cache.get((pooling, text))
+                if cached is not None:
+                    self._cache.move_to_end((pooling, text))
+                    vectors[i] = cached
+                else:
+                    missing.setdefault(text, []).append(i)
+            self.stats["cache_hits"] += len(texts) - sum(len(v) for v in missing.values())
+
+        if missing:
+            request = _EncodeRequest(list(missing), pooling)
+            self._ensure_worker()
+            self._queue.put(request)
+            request.done.wait()
+            if request.error is not None:
+                raise request.error
+
+            with self._cache_lock:
+                for text, vector in zip(request.texts, request.result):
+                    vector.setflags(write=False)
+                    for i in missing[text]:
+                        vectors[i] = vector
+                    self._cache[(pooling, text)] = vector
+                    self._cache.move_to_end((pooling, text))
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        if not vectors:
+            return np.zeros((0, self.embedding_dimension), dtype=np.float32)
+
+        result = np.stack(vectors)
+        if normalize:
+            norms = np.linalg.norm(result, axis=1, keepdims=True)
+            result = np.divide(result, norms, out=np.zeros_like(result), where=norms > 0)
+        return result[0] if single else result
+
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats["cache_entries"] = len(self._cache)
+        stats["avg_batch_size"] = (
+            stats["batched_texts"] / stats["batches"] if stats["batches"] else 0.0
+        )
+        return stats
+
+    def close(self):
+        """Detener el hilo de inferencia"""
+        with self._worker_lock:
+            if self._worker is not None and self._worker.is_alive():
+                self._queue.put(None)
+                self._worker.join(timeout=5)
+            self._worker = None
+
+    # ------------------------------------------------------------------
+    # Micro-batching
+    # ------------------------------------------------------------------
+
+    def _ensure_worker(self):
+        if self._worker is not None and self._worker.is_alive():
+            return
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._worker_loop, name="encoder-service", daemon=True
+                )
+                self._worker.start()
+
+    def _collect_batch(self, first: _EncodeRequest) -> List[_EncodeRequest]:
+        """
+        Añadir peticiones en espera hasta que el último trozo de
+        max_batch_size esté lleno o se agote max_wait
+        """
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.monotonic() + self.max_wait
+        while size % self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                request = (
+                    self._queue.get(timeout=remaining)
+                    if remaining > 0
+                    else self._queue.get_nowait()
+                )
+            except queue.Empty:
+                break
+            if request is None:
+                self._queue.put(None)
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _worker_loop(self):
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch = self._collect_batch(first)
+
+            # Un forward por modo de pooling presente en el lote
+            by_pooling: Dict[str, List[_EncodeRequest]] = {}
+            for request in batch:
+                by_pooling.setdefault(request.pooling, []).append(request)
+
+            for pooling, requests in by_pooling.items():
+                try:
+                    texts = [text for request in requests for text in request.texts]
+                    vectors = self._forward(texts, pooling)
+                    offset = 0
+                    for request in requests:
+                        request.result = vectors[offset : offset + len(request.texts)]
+                        offset += len(request.texts)
+                except Exception as e:
+                    for request in requests:
+                        request.error = e
+                finally:
+                    for request in requests:
+                        request.done.set()
+
+    def _forward(self, texts: List[str], pooling: str) -> List[np.ndarray]:
+        """Inferencia por trozos de max_batch_size (solo en el hilo del worker)"""
+        self.load()
+        vectors: List[np.ndarray] = []
+        for start in range(0, len(texts), self.max_batch_size):
+            chunk = texts[start : start + self.max_batch_size]
+            inputs = self._tokenizer(
+                chunk,
+                return_tensors="pt",
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+            )
+            if self.device and not self.quantize:
+                inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+            with torch.inference_mode():
+                hidden = self._model(**inputs).last_hidden_state
+                mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+                if pooling == "cls":
+                    pooled = hidden[:, 0]
+                elif pooling == "max":
+                    pooled = hidden.masked_fill(mask == 0, float("-inf")).max(dim=1).values
+                else:
+                    pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+
+            pooled = pooled.float().cpu().numpy()
+            vectors.extend(pooled[i] for i in range(len(chunk)))
+            self.stats["batches"] += 1
+            self.stats["batched_texts"] += len(chunk)
+        return vectors
+
+
+# ----------------------------------------------------------------------
+# Servidor y cliente por socket Unix
+# ----------------------------------------------------------------------
+# Marco: 4 bytes big-endian con la longitud de una cabecera JSON; la
+# respuesta lleva detrás `nbytes` bytes con la matriz float32.
+
+
+def _send_message(sock: socket.socket, header: Dict[str, Any], payload: bytes = b""):
+    data = json.dumps(header).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(data)) + data + payload)
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("Conexión cerrada por el otro extremo")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def _recv_message(sock: socket.socket) -> Dict[str, Any]:
+    (length,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, length))
+
+
+class _EncoderRequestHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        service: EncoderService = self.server.service
+        while True:
+            try:
+                message = _recv_message(self.request)
+            except (ConnectionError, struct.error):
+                return
+            try:
+                if message.get("op") == "info":
+                    _send_message(
+                        self.request,
+                        {
+                            "model_path": service.model_path,
+                            "quantize": service.quantize,
+                            "embedding_dimension": service.embedding_dimension,
+                            "stats": service.get_stats(),
+                        },
+                    )
+                    continue
+
+                vectors = service.encode(
+                    message["texts"],
+                    pooling=message.get("pooling", "mean"),
+                    normalize=message.get("normalize", False),
+                ).astype(np.float32, copy=False)
+                payload = vectors.tobytes()
+                _send_message(
+                    self.request,
+                    {"shape": list(vectors.shape), "nbytes": len(payload)},
+                    payload,
+                )
+            except Exception as e:
+                _send_message(self.request, {"error": str(e)})
+
+
+class EncoderServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Sirve un EncoderService por socket Unix (un hilo por conexión)"""
+
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, service: EncoderService):
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        self.service = service
+        super().__init__(socket_path, _EncoderRequestHandler)
+
+
+class RemoteEncoder:
+    """Cliente de EncoderServer con la interfaz de EncoderService"""
+
+    def __init__(
+        self,
+        socket_path: str,
+        model_path: str = DEFAULT_ENCODER_MODEL,
+        quantize: bool = False,
+    ):
+        self.socket_path = socket_path
+        self.model_path = model_path
+        self.quantize = quantize
+        self._local = threading.local()
+        self._dimension: Optional[int] = None
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _call(self, header: Dict[str, Any]):
+        sock = self._socket()
+        try:
+            _send_message(sock, header)
+            response = _recv_message(sock)
+            payload = _recv_exact(sock, response["nbytes"]) if "nbytes" in response else b""
+        except (OSError, ConnectionError):
+            # Conexión rota (p. ej. servidor reiniciado): se reabre en la siguiente
+            self._local.sock = None
+            sock.close()
+            raise
+        if "error" in response:
+            raise RuntimeError(f"Encoder remoto: {response['error']}")
+        return response, payload
+
+    def load(self):
+        self._call({"op": "info"})
+
+    def check_server(self):
+        """Comprobar que el servidor sirve el modelo y la precisión pedidos"""
+        response, _ = self._call({"op": "info"})
+        served = (
+            os.path.normpath(response["model_path"]),
+            bool(response.get("quantize", False)),
+        )
+        if served != (os.path.normpath(self.model_path), self.quantize):
+            raise ValueError(
+                f"el servidor sirve {served[0]} (int8={served[1]}), "
+                f"se pidió {self.model_path} (int8={self.quantize})"
+            )
+        self._dimension = int(response["embedding_dimension"])
+
+    @property
+    def embedding_dimension(self) -> int:
+        if self._dimension is None:
+            response, _ = self._call({"op": "info"})
+            self._dimension = int(response["embedding_dimension"])
+        return self._dimension
+
+    def encode(
+        self,
+        texts: Union[str, Sequence[str]],
+        pooling: str = "mean",
+        normalize: bool = False,
+    ) -> np.ndarray:
+        single = isinstance(texts, str)
+        response, payload = self._call(
+            {
+                "op": "encode",
+                "texts": [texts] if single else list(texts),
+                "pooling": pooling,
+                "normalize": normalize,
+            }
+        )
+        vectors = np.frombuffer(payload, dtype=np.float32).reshape(response["shape"])
+        return vectors[0] if single else vectors
+
+    def get_stats(self) -> Dict[str, Any]:
+        response, _ = self._call({"op": "info"})
+        return response["stats"]
+
+
+# ----------------------------------------------------------------------
+# Instancia por proceso
+# ----------------------------------------------------------------------
+
+_services: Dict[tuple, Union[EncoderService, RemoteEncoder]] = {}
+_services_lock = threading.Lock()
+
+
+def get_encoder_service(
+    model_path: str = DEFAULT_ENCODER_MODEL, quantize: bool = False, **kwargs
+) -> Union[EncoderService, RemoteEncoder]:
+    """
+    Encoder compartido del proceso para `model_path` (una instancia por
+    modelo y precisión). Si SHEILY_ENCODER_SOCKET apunta a un socket
+    existente se usa el servidor externo, siempre que sirva ese mismo
+    modelo y precisión; si no, se carga el encoder en el proceso
+    """
+    key = (model_path, quantize)
+    service = _services.get(key)
+    if service is not None:
+        return service
+
+    with _services_lock:
+        service = _services.get(key)
+        if service is None:
+            socket_path = os.environ.get(SOCKET_ENV_VAR)
+            if socket_path and os.path.exists(socket_path):
+                remote = RemoteEncoder(socket_path, model_path, quantize=quantize)
+                try:
+                    remote.check_server()
+                    service = remote
+                    logger.info(f"🔌 Encoder remoto en {socket_path}")
+                except (OSError, ConnectionError, RuntimeError, ValueError) as e:
+                    logger.warning(
+                        f"⚠️ Encoder remoto en {socket_path} no utilizable ({e}); "
+                        "se usa un encoder local"
+                    )
+            if service is None:
+                service = EncoderService(model_path, quantize=quantize, **kwargs)
+            _services[key] = service
+        return service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de encoder compartido")
+    parser.add_argument("--socket", required=True, help="Ruta del socket Unix")
+    parser.add_argument("--model", default=DEFAULT_ENCODER_MODEL)
+    parser.add_argument("--max-batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--device", default=None)
+    parser.add_argument(
+        "--quantize", action="store_true", help="Cuantización dinámica int8 (CPU)"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="%(asctime)s - %(levelname)s: %(message)s"
+    )
+    service = EncoderService(
+        args.model,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+        cache_size=args.cache_size,
+        device=args.device,
+        quantize=args.quantize,
+    )
+    service.load()
+
+    server = EncoderServer(args.socket, service)
+    logger.info(f"🚀 Encoder sirviendo {args.model} en {args.socket}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if os.path.exists(args.socket):
+            os.unlink(args.socket)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
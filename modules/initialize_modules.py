@@ -57,8 +57,9 @@ class ModuleInitializer:
         start_time = datetime.now()
 
         try:
-            # Inicializar el sistema principal
-            await self.system.initialize()
+            # Inicializar el sistema principal, instanciando todos los módulos
+            # por capas de dependencias
+            await self.system.initialize(preload=["*"])
 
             # Inicializar la interfaz del LLM
             await self.llm_interface.initialize()
@@ -103,6 +104,7 @@ class ModuleInitializer:
 
         self.initialization_report["total_modules"] = len(all_modules)
         self.initialization_report["categories"] = categories
+        self.initialization_report["load_report"] = self.system.get_load_report()
 
         for module_name, module_info in all_modules.items():
             try:
@@ -4,11 +4,12 @@ import logging
 from typing import List, Dict, Any, Optional
 import faiss
 import numpy as np
-import torch
 import sqlalchemy as sa
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.types import LargeBinary, JSON
 
+from modules.embeddings.encoder_service import get_encoder_service
+
 Base = declarative_base()
 
 
@@ -44,12 +45,9 @@ class RAGRetriever:
         )
         self.logger = logging.getLogger(__name__)
 
-        # Cargar modelo de embeddings
-        # Usar el modelo principal para embeddings
-        from transformers import AutoModel, AutoTokenizer
-
-        self.tokenizer = AutoTokenizer.from_pretrained(embed_model)
-        self.embed_model = AutoModel.from_pretrained(embed_model)
+        # Encoder compartido del proceso (mismos pesos que el clasificador
+        # de dominio y el evaluador de precisión)
+        self.encoder = get_encoder_service(embed_model)
 
         # Conexión a base de datos
         self.engine = sa.create_engine(db_url)
@@ -71,7 +69,7 @@ class RAGRetriever:
             return faiss.read_index(self.index_path)
 
         # Crear índice nuevo
-        dimension = self.embed_model.get_sentence_embedding_dimension()
+        dimension = self.encoder.embedding_dimension
         index = faiss.IndexFlatL2(dimension)
         faiss.write_index(index, self.index_path)
 
@@ -90,13 +88,7 @@ class RAGRetriever:
             metadata (dict, opcional): Metadatos adicionales
         """
         # Generar embedding
-        # Generar embeddings usando el modelo principal
-        inputs = self.tokenizer(
-            content, return_tensors="pt", padding=True, truncation=True
-        )
-        with torch.no_grad():
-            outputs = self.embed_model(**inputs)
-            embedding = outputs.last_hidden_state.mean(dim=1).cpu().numpy()
+        embedding = self.encoder.encode(content)
 
         # Insertar en base de datos
         session = self.Session()
@@ -112,7 +104,7 @@ class RAGRetriever:
             session.commit()
 
             # Añadir al índice FAISS
-            self.index.add(np.array([embedding]))
+            self.index.add(embedding.reshape(1, -1))
             faiss.write_index(self.index, self.index_path)
 
             self.logger.info(f"Documento añadido: {source}")
@@ -132,12 +124,7 @@ class RAGRetriever:
         Returns:
             Embedding de la consulta
         """
-        inputs = self.tokenizer(
-            query, return_tensors="pt", padding=True, truncation=True
-        )
-        with torch.no_grad():
-            outputs = self.embed_model(**inputs)
-            return outputs.last_hidden_state.mean(dim=1).cpu().numpy()
+        return self.encoder.encode(query)
 
     def _get_document_by_id(
         self, session, idx: int, domain: Optional[str] = None
@@ -3,11 +3,12 @@ import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import LogisticRegression
 from sklearn.preprocessing import LabelEncoder
-from sentence_transformers import SentenceTransformer
 import joblib
 import os
 import logging
 
+from modules.embeddings.encoder_service import get_encoder_service
+
 
 class DomainClassifier:
     def __init__(self, domains=None, tfidf_params=None, lr_params=None):
@@ -74,13 +75,8 @@ class DomainClassifier:
         self.label_encoder = LabelEncoder()
         self.tfidf = TfidfVectorizer(**self.tfidf_params)
         self.lr = LogisticRegression(**self.lr_params)
-        # Usar el modelo principal para clasificación de dominio
-        from transformers import AutoModel, AutoTokenizer
-
-        self.tokenizer = AutoTokenizer.from_pretrained(
-            "models/custom/shaili-personal-model"
-        )
-        self.semantic_model = AutoModel.from_pretrained(
+        # Encoder compartido del proceso (modelo principal)
+        self.semantic_model = get_encoder_service(
             "models/custom/shaili-personal-model"
         )
 
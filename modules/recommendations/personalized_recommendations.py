@@ -13,10 +13,18 @@ from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 import math
-from collections import defaultdict, Counter
+from collections import defaultdict
+
+try:
+    from .vectorized_recommender import MIN_CONFIDENCE, VectorizedRecommender
+except ImportError:
+    from vectorized_recommender import MIN_CONFIDENCE, VectorizedRecommender
 
 logger = logging.getLogger(__name__)
 
+# Usuarios por consulta en los recálculos por lotes (límite de parámetros SQLite)
+PROFILE_BATCH_SIZE = 500
+
 
 @dataclass
 class UserProfile:
@@ -73,9 +81,14 @@ class PersonalizedRecommendations:
 
     def __init__(self, db_path: str = "shaili_ai/data/lora_training.db"):
         self.db_path = Path(db_path)
+        # Caché de perfiles; se invalida cuando cambia la versión de los
+        # agregados del usuario en user_activity_stats
         self.user_profiles: Dict[str, UserProfile] = {}
+        self._profile_versions: Dict[str, int] = {}
+        self._aggregates_ready = False
         self.recommendation_cache: Dict[str, List[ExerciseRecommendation]] = {}
         self.learning_paths: Dict[str, LearningPath] = {}
+        self._recommender: Optional[VectorizedRecommender] = None
 
         # Pesos para diferentes factores de recomendación
         self.weights = {
@@ -88,6 +101,10 @@ class PersonalizedRecommendations:
 
         # Inicializar base de datos
         self._init_database()
+        try:
+            self._ensure_profile_aggregates()
+        except Exception as e:
+            logger.error(f"❌ Error instalando agregados de perfiles: {e}")
 
         logger.info("🎯 Sistema de recomendaciones personalizadas inicializado")
 
@@ -172,96 +189,361 @@ class PersonalizedRecommendations:
         except Exception as e:
             logger.error(f"❌ Error inicializando base de datos: {e}")
 
-    def generate_user_profile(self, user_id: str) -> UserProfile:
-        """Generar perfil de usuario basado en historial de entrenamiento"""
+    def _ensure_profile_aggregates(self) -> bool:
+        """
+        Instalar las tablas de agregados por usuario y los triggers que las
+        mantienen al insertar en lora_training_data.
+
+        La tabla lora_training_data la crea el generador LoRA; si aún no
+        existe se vuelve a intentar en la siguiente consulta de perfil. Al
+        instalarlos se calculan los agregados de todos los usuarios.
+        """
+        if self._aggregates_ready:
+            return True
+
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') "
+                "AND name IN ('lora_training_data', 'trg_user_stats_insert')"
+            )
+            names = {row[0] for row in cursor.fetchall()}
+            if "lora_training_data" not in names:
+                return False
+
+            if "trg_user_stats_insert" not in names:
+                cursor.executescript(
+                    """
+                    BEGIN;
+                    CREATE TABLE IF NOT EXISTS user_category_stats (
+                        user_id TEXT NOT NULL,
+                        category TEXT NOT NULL,
+                        difficulty TEXT NOT NULL,
+                        attempts INTEGER NOT NULL,
+                        correct INTEGER NOT NULL,
+                        correct_points INTEGER NOT NULL,
+                        last_at TIMESTAMP NOT NULL,
+                        PRIMARY KEY (user_id, category, difficulty)
+                    );
+
+                    CREATE TABLE IF NOT EXISTS user_exercise_stats (
+                        user_id TEXT NOT NULL,
+                        exercise_id TEXT NOT NULL,
+                        attempts INTEGER NOT NULL,
+                        PRIMARY KEY (user_id, exercise_id)
+                    );
+
+                    CREATE TABLE IF NOT EXISTS user_activity_stats (
+                        user_id TEXT PRIMARY KEY,
+                        attempts INTEGER NOT NULL,
+                        first_activity TIMESTAMP NOT NULL,
+                        last_activity TIMESTAMP NOT NULL,
+                        version INTEGER NOT NULL DEFAULT 1,
+                        dirty INTEGER NOT NULL DEFAULT 0
+                    );
+
+                    -- Upserts: un OR IGNORE heredaría el OR REPLACE de la sentencia
+                    CREATE TRIGGER IF NOT EXISTS trg_user_stats_insert
+                    AFTER INSERT ON lora_training_data
+                    BEGIN
+                        INSERT INTO user_category_stats
+                            (user_id, category, difficulty, attempts, correct,
+                             correct_points, last_at)
+                        VALUES (
+                            NEW.user_id, NEW.category, NEW.difficulty, 1,
+                            CASE WHEN NEW.is_correct THEN 1 ELSE 0 END,
+                            CASE WHEN NEW.is_correct THEN NEW.points ELSE 0 END,
+                            NEW.created_at
+                        )
+                        ON CONFLICT(user_id, category, difficulty) DO UPDATE SET
+                            attempts = attempts + 1,
+                            correct = correct + excluded.correct,
+                            correct_points = correct_points + excluded.correct_points,
+                            last_at = MAX(last_at, excluded.last_at);
+
+                        INSERT INTO user_exercise_stats (user_id, exercise_id, attempts)
+                        VALUES (NEW.user_id, NEW.exercise_id, 1)
+                        ON CONFLICT(user_id, exercise_id) DO UPDATE SET
+                            attempts = attempts + 1;
+
+                        INSERT INTO user_activity_stats
+                            (user_id, attempts, first_activity, last_activity)
+                        VALUES (NEW.user_id, 1, NEW.created_at, NEW.created_at)
+                        ON CONFLICT(user_id) DO UPDATE SET
+                            attempts = attempts + 1,
+                            first_activity = MIN(first_activity, excluded.first_activity),
+                            last_activity = MAX(last_activity, excluded.last_activity),
+                            version = version + 1;
+                    END;
+
+                    -- Borrados y reemplazos (INSERT OR REPLACE no dispara el
+                    -- trigger de borrado): el usuario se recalcula entero
+                    CREATE TRIGGER IF NOT EXISTS trg_user_stats_replace
+                    BEFORE INSERT ON lora_training_data
+                    WHEN EXISTS (SELECT 1 FROM lora_training_data WHERE id = NEW.id)
+                    BEGIN
+                        UPDATE user_activity_stats SET dirty = 1, version = version + 1
+                        WHERE user_id =
+                            (SELECT user_id FROM lora_training_data WHERE id = NEW.id);
+                    END;
+
+                    CREATE TRIGGER IF NOT EXISTS trg_user_stats_delete
+                    AFTER DELETE ON lora_training_data
+                    BEGIN
+                        UPDATE user_activity_stats SET dirty = 1, version = version + 1
+                        WHERE user_id = OLD.user_id;
+                    END;
+                    COMMIT;
+                """
+                )
+                self._aggregates_ready = True
+                self.refresh_profiles()
+                logger.info("✅ Agregados de perfiles de usuario instalados")
+
+        self._aggregates_ready = True
+        return True
+
+    def refresh_profiles(
+        self, user_ids: Optional[List[str]] = None
+    ) -> Dict[str, UserProfile]:
+        """
+        Recalcular con GROUP BY los agregados de varios usuarios a la vez
+        (todos si `user_ids` es None) y regenerar sus perfiles
+        """
+        profiles: Dict[str, UserProfile] = {}
         try:
+            if not self._ensure_profile_aggregates():
+                return profiles
+
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
+                if user_ids is None:
+                    cursor.execute("SELECT DISTINCT user_id FROM lora_training_data")
+                    user_ids = [row[0] for row in cursor.fetchall()]
+                    cursor.execute("SELECT user_id FROM user_activity_stats")
+                    user_ids = list(set(user_ids) | {row[0] for row in cursor.fetchall()})
 
-                # Obtener historial de entrenamiento
+                for start in range(0, len(user_ids), PROFILE_BATCH_SIZE):
+                    chunk = list(user_ids[start : start + PROFILE_BATCH_SIZE])
+                    placeholders = ",".join("?" * len(chunk))
+
+                    cursor.execute(
+                        f"DELETE FROM user_category_stats WHERE user_id IN ({placeholders})",
+                        chunk,
+                    )
+                    cursor.execute(
+                        f"DELETE FROM user_exercise_stats WHERE user_id IN ({placeholders})",
+                        chunk,
+                    )
+                    cursor.execute(
+                        f"""
+                        INSERT INTO user_category_stats
+                            (user_id, category, difficulty, attempts, correct,
+                             correct_points, last_at)
+                        SELECT user_id, category, difficulty, COUNT(*),
+                               SUM(CASE WHEN is_correct THEN 1 ELSE 0 END),
+                               SUM(CASE WHEN is_correct THEN points ELSE 0 END),
+                               MAX(created_at)
+                        FROM lora_training_data
+                        WHERE user_id IN ({placeholders})
+                        GROUP BY user_id, category, difficulty
+                    """,
+                        chunk,
+                    )
+                    cursor.execute(
+                        f"""
+                        INSERT INTO user_exercise_stats (user_id, exercise_id, attempts)
+                        SELECT user_id, exercise_id, COUNT(*)
+                        FROM lora_training_data
+                        WHERE user_id IN ({placeholders})
+                        GROUP BY user_id, exercise_id
+                    """,
+                        chunk,
+                    )
+                    cursor.execute(
+                        f"""
+                        INSERT INTO user_activity_stats
+                            (user_id, attempts, first_activity, last_activity)
+                        SELECT user_id, COUNT(*), MIN(created_at), MAX(created_at)
+                        FROM lora_training_data
+                        WHERE user_id IN ({placeholders})
+                        GROUP BY user_id
+                        ON CONFLICT(user_id) DO UPDATE SET
+                            attempts = excluded.attempts,
+                            first_activity = excluded.first_activity,
+                            last_activity = excluded.last_activity,
+                            version = version + 1,
+                            dirty = 0
+                    """,
+                        chunk,
+                    )
+                    # Usuarios que ya no tienen datos
+                    cursor.execute(
+                        f"""
+                        DELETE FROM user_activity_stats
+                        WHERE user_id IN ({placeholders}) AND NOT EXISTS (
+                            SELECT 1 FROM lora_training_data
+                            WHERE lora_training_data.user_id = user_activity_stats.user_id
+                        )
+                    """,
+                        chunk,
+                    )
+                    conn.commit()
+
+                    profiles.update(self._profiles_from_aggregates(cursor, chunk))
+
+            for user_id in user_ids:
+                if user_id not in profiles:
+                    self.invalidate_profile(user_id)
+
+            self._save_user_profiles(list(profiles.values()))
+            logger.info(f"🔄 {len(profiles)} perfiles de usuario recalculados")
+
+        except Exception as e:
+            logger.error(f"❌ Error recalculando perfiles: {e}")
+
+        return profiles
+
+    def invalidate_profile(self, user_id: Optional[str] = None):
+        """Olvidar el perfil en caché de un usuario (o de todos)"""
+        if user_id is None:
+            self.user_profiles.clear()
+            self._profile_versions.clear()
+        else:
+            self.user_profiles.pop(user_id, None)
+            self._profile_versions.pop(user_id, None)
+
+    @staticmethod
+    def _most_common(groups: Dict[str, List], n: int) -> List[str]:
+        """Claves más frecuentes; a igual frecuencia, la más reciente primero"""
+        ranked = sorted(groups.items(), key=lambda item: item[1][2], reverse=True)
+        ranked.sort(key=lambda item: item[1][0], reverse=True)
+        return [key for key, _ in ranked[:n]]
+
+    def _profiles_from_aggregates(
+        self, cursor, user_ids: List[str]
+    ) -> Dict[str, UserProfile]:
+        """Construir perfiles desde las tablas de agregados y cachearlos"""
+        placeholders = ",".join("?" * len(user_ids))
+
+        cursor.execute(
+            f"""
+            SELECT user_id, attempts, first_activity, last_activity, version
+            FROM user_activity_stats WHERE user_id IN ({placeholders})
+        """,
+            user_ids,
+        )
+        activity = {row[0]: row[1:] for row in cursor.fetchall()}
+
+        cursor.execute(
+            f"""
+            SELECT user_id, category, difficulty, attempts, correct, correct_points, last_at
+            FROM user_category_stats WHERE user_id IN ({placeholders})
+        """,
+            user_ids,
+        )
+        category_rows = defaultdict(list)
+        for row in cursor.fetchall():
+            category_rows[row[0]].append(row[1:])
+
+        cursor.execute(
+            f"""
+            SELECT user_id, COUNT(*) FROM user_exercise_stats
+            WHERE user_id IN ({placeholders}) GROUP BY user_id
+        """,
+            user_ids,
+        )
+        exercise_counts = dict(cursor.fetchall())
+
+        profiles = {}
+        for user_id, (attempts, first_activity, last_activity, version) in activity.items():
+            rows = category_rows.get(user_id, [])
+
+            categories: Dict[str, List] = {}
+            difficulties: Dict[str, List] = {}
+            total_score = 0
+            for category, difficulty, count, correct, points, last_at in rows:
+                total_score += points
+                # [intentos, aciertos, última actividad]
+                for key, groups in ((category, categories), (difficulty, difficulties)):
+                    group = groups.setdefault(key, [0, 0, ""])
+                    group[0] += count
+                    group[1] += correct
+                    group[2] = max(group[2], last_at)
+
+            # Como en el historial: la categoría más reciente primero
+            weak_areas = []
+            strong_areas = []
+            for category, (count, correct, _) in sorted(
+                categories.items(), key=lambda item: item[1][2], reverse=True
+            ):
+                success_rate = correct / count
+                if success_rate < 0.6:
+                    weak_areas.append(category)
+                elif success_rate > 0.8:
+                    strong_areas.append(category)
+
+            profile = UserProfile(
+                user_id=user_id,
+                total_sessions=exercise_counts.get(user_id, 0),
+                total_score=total_score,
+                average_score=total_score / attempts if attempts else 0,
+                preferred_categories=self._most_common(categories, 3),
+                preferred_difficulties=self._most_common(difficulties, 2),
+                weak_areas=weak_areas,
+                strong_areas=strong_areas,
+                learning_style=self._determine_learning_style(
+                    {category: group[0] for category, group in categories.items()},
+                    attempts,
+                ),
+                study_pattern=self._determine_study_pattern(
+                    first_activity, last_activity, attempts
+                ),
+                last_activity=datetime.fromisoformat(last_activity),
+                created_at=datetime.now(),
+            )
+            profiles[user_id] = profile
+            self.user_profiles[user_id] = profile
+            self._profile_versions[user_id] = version
+
+        return profiles
+
+    def generate_user_profile(self, user_id: str) -> UserProfile:
+        """
+        Perfil de usuario desde los agregados incrementales. Se reutiliza el
+        perfil en caché mientras no cambie la versión de sus agregados
+        """
+        try:
+            if not self._ensure_profile_aggregates():
+                return self._create_default_profile(user_id)
+
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
                 cursor.execute(
-                    """
-                    SELECT exercise_id, category, difficulty, points, is_correct, created_at
-                    FROM lora_training_data
-                    WHERE user_id = ?
-                    ORDER BY created_at DESC
-                """,
+                    "SELECT version, dirty FROM user_activity_stats WHERE user_id = ?",
                     (user_id,),
                 )
+                row = cursor.fetchone()
 
-                training_history = cursor.fetchall()
-
-                if not training_history:
+                if row is None:
                     # Usuario nuevo - perfil por defecto
+                    self.invalidate_profile(user_id)
                     return self._create_default_profile(user_id)
 
-                # Analizar patrones de entrenamiento
-                total_sessions = len(set(row[0] for row in training_history))
-                total_score = sum(
-                    row[3] for row in training_history if row[4]
-                )  # Solo respuestas correctas
-                average_score = (
-                    total_score / len(training_history) if training_history else 0
-                )
+                version, dirty = row
+                if dirty:
+                    profile = self.refresh_profiles([user_id]).get(user_id)
+                    return profile or self._create_default_profile(user_id)
 
-                # Categorías preferidas
-                categories = [row[1] for row in training_history]
-                category_counts = Counter(categories)
-                preferred_categories = [
-                    cat for cat, count in category_counts.most_common(3)
-                ]
-
-                # Dificultades preferidas
-                difficulties = [row[2] for row in training_history]
-                difficulty_counts = Counter(difficulties)
-                preferred_difficulties = [
-                    diff for diff, count in difficulty_counts.most_common(2)
-                ]
-
-                # Áreas débiles y fuertes
-                correct_by_category = defaultdict(list)
-                for row in training_history:
-                    correct_by_category[row[1]].append(row[4])
-
-                weak_areas = []
-                strong_areas = []
-
-                for category, results in correct_by_category.items():
-                    success_rate = sum(results) / len(results)
-                    if success_rate < 0.6:
-                        weak_areas.append(category)
-                    elif success_rate > 0.8:
-                        strong_areas.append(category)
-
-                # Estilo de aprendizaje
-                learning_style = self._determine_learning_style(training_history)
-
-                # Patrón de estudio
-                study_pattern = self._determine_study_pattern(training_history)
-
-                # Última actividad
-                last_activity = max(row[5] for row in training_history)
-
-                profile = UserProfile(
-                    user_id=user_id,
-                    total_sessions=total_sessions,
-                    total_score=total_score,
-                    average_score=average_score,
-                    preferred_categories=preferred_categories,
-                    preferred_difficulties=preferred_difficulties,
-                    weak_areas=weak_areas,
-                    strong_areas=strong_areas,
-                    learning_style=learning_style,
-                    study_pattern=study_pattern,
-                    last_activity=datetime.fromisoformat(last_activity),
-                    created_at=datetime.now(),
-                )
+                cached = self.user_profiles.get(user_id)
+                if cached is not None and self._profile_versions.get(user_id) == version:
+                    return cached
 
-                # Guardar perfil
-                self._save_user_profile(profile)
-                self.user_profiles[user_id] = profile
+                profile = self._profiles_from_aggregates(cursor, [user_id])[user_id]
 
-                return profile
+            # Guardar perfil
+            self._save_user_profile(profile)
+            return profile
 
         except Exception as e:
             logger.error(f"❌ Error generando perfil: {e}")
@@ -284,22 +566,23 @@ class PersonalizedRecommendations:
             created_at=datetime.now(),
         )
 
-    def _determine_learning_style(self, training_history: List[Tuple]) -> str:
+    def _determine_learning_style(
+        self, category_counts: Dict[str, int], attempts: int
+    ) -> str:
         """Determinar estilo de aprendizaje basado en patrones"""
         # Análisis simplificado - en producción sería más sofisticado
-        if len(training_history) < 5:
+        if attempts < 5:
             return "mixed"
 
-        # Analizar tipos de preguntas y respuestas
-        theoretical_count = 0
-        practical_count = 0
-
-        for row in training_history:
-            # Clasificar por categoría (simplificado)
-            if row[1] in ["comprehension", "critical_analysis"]:
-                theoretical_count += 1
-            elif row[1] in ["programming", "problem_solving"]:
-                practical_count += 1
+        # Clasificar por categoría (simplificado)
+        theoretical_count = sum(
+            category_counts.get(category, 0)
+            for category in ["comprehension", "critical_analysis"]
+        )
+        practical_count = sum(
+            category_counts.get(category, 0)
+            for category in ["programming", "problem_solving"]
+        )
 
         if theoretical_count > practical_count * 1.5:
             return "theoretical"
@@ -308,25 +591,19 @@ class PersonalizedRecommendations:
         else:
             return "mixed"
 
-    def _determine_study_pattern(self, training_history: List[Tuple]) -> str:
+    def _determine_study_pattern(
+        self, first_activity: str, last_activity: str, attempts: int
+    ) -> str:
         """Determinar patrón de estudio basado en frecuencia"""
-        if len(training_history) < 3:
+        if attempts < 3:
             return "consistent"
 
-        # Analizar frecuencia de entrenamiento
-        dates = [datetime.fromisoformat(row[5]) for row in training_history]
-        dates.sort()
-
-        # Calcular intervalos entre sesiones
-        intervals = []
-        for i in range(1, len(dates)):
-            interval = (dates[i] - dates[i - 1]).total_seconds() / 3600  # horas
-            intervals.append(interval)
-
-        if not intervals:
-            return "consistent"
-
-        avg_interval = sum(intervals) / len(intervals)
+        # Intervalo medio entre sesiones (horas): la suma de intervalos
+        # consecutivos es la distancia entre la primera y la última
+        span = datetime.fromisoformat(last_activity) - datetime.fromisoformat(
+            first_activity
+        )
+        avg_interval = span.total_seconds() / 3600 / (attempts - 1)
 
         if avg_interval < 24:  # Menos de 1 día
             return "intensive"
@@ -337,11 +614,17 @@ class PersonalizedRecommendations:
 
     def _save_user_profile(self, profile: UserProfile):
         """Guardar perfil de usuario en base de datos"""
+        self._save_user_profiles([profile])
+
+    def _save_user_profiles(self, profiles: List[UserProfile]):
+        """Guardar perfiles de usuario en base de datos"""
+        if not profiles:
+            return
         try:
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
-                cursor.execute(
+                cursor.executemany(
                     """
                     INSERT OR REPLACE INTO user_profiles 
                     (user_id, total_sessions, total_score, average_score, preferred_categories,
@@ -349,20 +632,23 @@ class PersonalizedRecommendations:
                      last_activity, created_at)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
-                    (
-                        profile.user_id,
-                        profile.total_sessions,
-                        profile.total_score,
-                        profile.average_score,
-                        json.dumps(profile.preferred_categories),
-                        json.dumps(profile.preferred_difficulties),
-                        json.dumps(profile.weak_areas),
-                        json.dumps(profile.strong_areas),
-                        profile.learning_style,
-                        profile.study_pattern,
-                        profile.last_activity.isoformat(),
-                        profile.created_at.isoformat(),
-                    ),
+                    [
+                        (
+                            profile.user_id,
+                            profile.total_sessions,
+                            profile.total_score,
+                            profile.average_score,
+                            json.dumps(profile.preferred_categories),
+                            json.dumps(profile.preferred_difficulties),
+                            json.dumps(profile.weak_areas),
+                            json.dumps(profile.strong_areas),
+                            profile.learning_style,
+                            profile.study_pattern,
+                            profile.last_activity.isoformat(),
+                            profile.created_at.isoformat(),
+                        )
+                        for profile in profiles
+                    ],
                 )
 
                 conn.commit()
@@ -370,6 +656,47 @@ class PersonalizedRecommendations:
         except Exception as e:
             logger.error(f"❌ Error guardando perfil: {e}")
 
+    def _get_recommender(self) -> VectorizedRecommender:
+        """Recomendador vectorizado del catálogo actual (se reconstruye si cambia)"""
+        from ..training.advanced_training_system import get_advanced_training_system
+
+        training_system = get_advanced_training_system()
+        available_exercises = training_system.get_all_exercises()
+
+        recommender = self._recommender
+        if (
+            recommender is None
+            or recommender.weights != self.weights
+            or recommender.exercise_ids != tuple(ex.id for ex in available_exercises)
+        ):
+            recommender = VectorizedRecommender(available_exercises, self.weights)
+            self._recommender = recommender
+        return recommender
+
+    def _build_recommendations(
+        self, recommender: VectorizedRecommender, profile: UserProfile, ranked
+    ) -> List[ExerciseRecommendation]:
+        recommendations = []
+        for index, confidence_score, expected_score in ranked:
+            exercise = recommender.exercises[index]
+            recommendations.append(
+                ExerciseRecommendation(
+                    exercise_id=exercise.id,
+                    title=exercise.title,
+                    category=exercise.category,
+                    difficulty=exercise.difficulty,
+                    confidence_score=confidence_score,
+                    reasoning=self._generate_recommendation_reasoning(
+                        exercise, profile
+                    ),
+                    estimated_completion_time=exercise.time_limit_minutes,
+                    expected_score=expected_score,
+                    learning_objectives=exercise.learning_objectives,
+                    prerequisites=exercise.prerequisites,
+                )
+            )
+        return recommendations
+
     def get_exercise_recommendations(
         self, user_id: str, limit: int = 5
     ) -> List[ExerciseRecommendation]:
@@ -378,51 +705,102 @@ class PersonalizedRecommendations:
             # Generar o actualizar perfil de usuario
             profile = self.generate_user_profile(user_id)
 
-            # Cargar ejercicios disponibles
-            from ..training.advanced_training_system import get_advanced_training_system
+            # Puntuar todos los ejercicios disponibles de una vez
+            recommender = self._get_recommender()
+            ranked = recommender.recommend([profile], limit, MIN_CONFIDENCE)[0]
+            recommendations = self._build_recommendations(recommender, profile, ranked)
 
-            training_system = get_advanced_training_system()
-            available_exercises = training_system.get_all_exercises()
+            # Guardar recomendaciones
+            self._save_recommendations(user_id, recommendations)
 
-            # Calcular puntuaciones de recomendación
-            recommendations = []
+            return recommendations
 
-            for exercise in available_exercises:
-                confidence_score = self._calculate_recommendation_score(
-                    exercise, profile
-                )
+        except Exception as e:
+            logger.error(f"❌ Error generando recomendaciones: {e}")
+            return []
+
+    def get_user_profiles(self, user_ids: List[str]) -> Dict[str, UserProfile]:
+        """
+        Perfiles de muchos usuarios: los vigentes salen de la caché, los
+        sucios se recalculan y el resto se construye desde los agregados
+        por lotes
+        """
+        profiles: Dict[str, UserProfile] = {}
+        try:
+            if not self._ensure_profile_aggregates():
+                return {u: self._create_default_profile(u) for u in user_ids}
 
-                if confidence_score > 0.3:  # Umbral mínimo
-                    recommendation = ExerciseRecommendation(
-                        exercise_id=exercise.id,
-                        title=exercise.title,
-                        category=exercise.category,
-                        difficulty=exercise.difficulty,
-                        confidence_score=confidence_score,
-                        reasoning=self._generate_recommendation_reasoning(
-                            exercise, profile
-                        ),
-                        estimated_completion_time=exercise.time_limit_minutes,
-                        expected_score=self._predict_expected_score(exercise, profile),
-                        learning_objectives=exercise.learning_objectives,
-                        prerequisites=exercise.prerequisites,
+            dirty, missing = [], []
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for start in range(0, len(user_ids), PROFILE_BATCH_SIZE):
+                    chunk = list(user_ids[start : start + PROFILE_BATCH_SIZE])
+                    placeholders = ",".join("?" * len(chunk))
+                    cursor.execute(
+                        f"""
+                        SELECT user_id, version, dirty FROM user_activity_stats
+                        WHERE user_id IN ({placeholders})
+                    """,
+                        chunk,
                     )
-                    recommendations.append(recommendation)
+                    stale = []
+                    for user_id, version, is_dirty in cursor.fetchall():
+                        cached = self.user_profiles.get(user_id)
+                        if is_dirty:
+                            dirty.append(user_id)
+                        elif (
+                            cached is not None
+                            and self._profile_versions.get(user_id) == version
+                        ):
+                            profiles[user_id] = cached
+                        else:
+                            stale.append(user_id)
+                    if stale:
+                        built = self._profiles_from_aggregates(cursor, stale)
+                        profiles.update(built)
+                        missing.extend(built.values())
+
+            if dirty:
+                profiles.update(self.refresh_profiles(dirty))
+            self._save_user_profiles(missing)
 
-            # Ordenar por puntuación de confianza
-            recommendations.sort(key=lambda x: x.confidence_score, reverse=True)
+        except Exception as e:
+            logger.error(f"❌ Error obteniendo perfiles: {e}")
+
+        # Usuarios sin historial - perfil por defecto
+        for user_id in user_ids:
+            if user_id not in profiles:
+                profiles[user_id] = self._create_default_profile(user_id)
+        return profiles
+
+    def get_batch_recommendations(
+        self, user_ids: List[str], limit: int = 5, save: bool = True
+    ) -> Dict[str, List[ExerciseRecommendation]]:
+        """
+        Recomendaciones para una cohorte de usuarios (p. ej. el envío
+        nocturno de emails/notificaciones) puntuando todos a la vez
+        """
+        try:
+            user_ids = list(dict.fromkeys(user_ids))
+            profiles = self.get_user_profiles(user_ids)
+            recommender = self._get_recommender()
 
-            # Limitar resultados
-            recommendations = recommendations[:limit]
+            ordered = [profiles[user_id] for user_id in user_ids]
+            ranked = recommender.recommend(ordered, limit, MIN_CONFIDENCE)
 
-            # Guardar recomendaciones
-            self._save_recommendations(user_id, recommendations)
+            results = {
+                profile.user_id: self._build_recommendations(recommender, profile, r)
+                for profile, r in zip(ordered, ranked)
+            }
+            if save:
+                self._save_recommendations_many(results)
 
-            return recommendations
+            logger.info(f"📬 Recomendaciones generadas para {len(results)} usuarios")
+            return results
 
         except Exception as e:
-            logger.error(f"❌ Error generando recomendaciones: {e}")
-            return []
+            logger.error(f"❌ Error generando recomendaciones por lotes: {e}")
+            return {}
 
     def _calculate_recommendation_score(self, exercise, profile: UserProfile) -> float:
         """Calcular puntuación de recomendación para un ejercicio"""
@@ -502,28 +880,41 @@ class PersonalizedRecommendations:
         self, user_id: str, recommendations: List[ExerciseRecommendation]
     ):
         """Guardar recomendaciones en base de datos"""
+        self._save_recommendations_many({user_id: recommendations})
+
+    def _save_recommendations_many(
+        self, recommendations_by_user: Dict[str, List[ExerciseRecommendation]]
+    ):
+        """Guardar recomendaciones de varios usuarios en una transacción"""
         try:
+            now = datetime.now()
+            rows = [
+                (
+                    # Microsegundos: en segundos chocaban llamadas seguidas
+                    f"rec_{user_id}_{rec.exercise_id}_{int(now.timestamp() * 1e6)}",
+                    user_id,
+                    rec.exercise_id,
+                    rec.confidence_score,
+                    rec.reasoning,
+                    now.isoformat(),
+                )
+                for user_id, recommendations in recommendations_by_user.items()
+                for rec in recommendations
+            ]
+            if not rows:
+                return
+
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
-                for rec in recommendations:
-                    recommendation_id = f"rec_{user_id}_{rec.exercise_id}_{int(datetime.now().timestamp())}"
-
-                    cursor.execute(
-                        """
-                        INSERT INTO exercise_recommendations 
-                        (recommendation_id, user_id, exercise_id, confidence_score, reasoning, generated_at)
-                        VALUES (?, ?, ?, ?, ?, ?)
-                    """,
-                        (
-                            recommendation_id,
-                            user_id,
-                            rec.exercise_id,
-                            rec.confidence_score,
-                            rec.reasoning,
-                            datetime.now().isoformat(),
-                        ),
-                    )
+                cursor.executemany(
+                    """
+                    INSERT INTO exercise_recommendations 
+                    (recommendation_id, user_id, exercise_id, confidence_score, reasoning, generated_at)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                    rows,
+                )
 
                 conn.commit()
 
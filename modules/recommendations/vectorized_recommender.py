@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Recomendador Vectorizado de Ejercicios
+======================================
+Aplica las mismas reglas que `PersonalizedRecommendations` con una
+operación matricial en lugar de puntuar ejercicio a ejercicio:
+
+- Ejercicios: matriz one-hot (ejercicios x [categorías | dificultades])
+- Usuarios: vector de perfil con la aportación de cada categoría y cada
+  dificultad a la confianza y a la puntuación esperada
+- Confianza de todos los candidatos = X @ u (o U @ X.T para una cohorte);
+  top-k con `argpartition`
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Aportación constante del factor de recencia (peso * 0.5)
+RECENCY_FACTOR = 0.5
+
+# Confianza mínima para recomendar un ejercicio
+MIN_CONFIDENCE = 0.3
+
+# Usuarios puntuados por operación matricial en las cohortes
+SCORE_BATCH_SIZE = 1024
+
+
+class VectorizedRecommender:
+    """Puntuación matricial de ejercicios para uno o muchos perfiles"""
+
+    def __init__(self, exercises: Sequence, weights: Dict[str, float]):
+        self.exercises = list(exercises)
+        self.weights = dict(weights)
+
+        self.categories = sorted({ex.category for ex in self.exercises})
+        self.difficulties = sorted({ex.difficulty for ex in self.exercises})
+        self._category_index = {c: i for i, c in enumerate(self.categories)}
+        self._difficulty_index = {d: i for i, d in enumerate(self.difficulties)}
+
+        n_categories = len(self.categories)
+        self.features = np.zeros(
+            (len(self.exercises), n_categories + len(self.difficulties)),
+            dtype=np.float64,
+        )
+        rows = np.arange(len(self.exercises))
+        self.features[
+            rows, [self._category_index[ex.category] for ex in self.exercises]
+        ] = 1.0
+        self.features[
+            rows,
+            [n_categories + self._difficulty_index[ex.difficulty] for ex in self.exercises],
+        ] = 1.0
+
+        self.exercise_ids = tuple(ex.id for ex in self.exercises)
+
+    def __len__(self) -> int:
+        return len(self.exercises)
+
+    def _mask(self, index: Dict[str, int], values: Sequence[str]) -> np.ndarray:
+        mask = np.zeros(len(index), dtype=bool)
+        mask[[index[v] for v in values if v in index]] = True
+        return mask
+
+    def profile_vectors(self, profile) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Vectores (confianza, puntuación esperada) de un perfil, alineados con
+        las columnas de `features`
+        """
+        w = self.weights
+        preferred = self._mask(self._category_index, profile.preferred_categories)
+        weak = self._mask(self._category_index, profile.weak_areas)
+        strong = self._mask(self._category_index, profile.strong_areas)
+
+        # Categoría: preferencia (o área débil), brecha y diversidad
+        category_score = (
+            np.where(
+                preferred,
+                w["category_preference"],
+                np.where(weak, w["category_preference"] * 0.8, 0.0),
+            )
+            + np.where(weak, w["skill_gap"], 0.0)
+            + np.where(strong, 0.0, w["diversity"])
+        )
+
+        # Dificultad: preferida o ajustada por rendimiento
+        average = profile.average_score
+        difficulty_score = np.zeros(len(self.difficulties))
+        for difficulty, i in self._difficulty_index.items():
+            if difficulty in profile.preferred_difficulties:
+                difficulty_score[i] = w["difficulty_adaptation"]
+            elif average > 80 and difficulty == "medium":
+                difficulty_score[i] = w["difficulty_adaptation"] * 0.7
+            elif average > 90 and difficulty == "hard":
+                difficulty_score[i] = w["difficulty_adaptation"] * 0.6
+
+        # Puntuación esperada: ajustes sobre la media del usuario
+        category_expected = np.where(strong, 10.0, np.where(weak, -10.0, 0.0))
+        difficulty_expected = np.zeros(len(self.difficulties))
+        for difficulty, i in self._difficulty_index.items():
+            if difficulty == "easy" and average > 70:
+                difficulty_expected[i] = 5.0
+            elif difficulty == "hard" and average < 60:
+                difficulty_expected[i] = -15.0
+
+        return (
+            np.concatenate([category_score, difficulty_score]),
+            np.concatenate([category_expected, difficulty_expected]),
+        )
+
+    def score(self, profiles: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Matrices (usuarios x ejercicios) de confianza y de puntuación
+        esperada para una lista de perfiles
+        """
+        vectors = [self.profile_vectors(profile) for profile in profiles]
+        confidence_weights = np.stack([v[0] for v in vectors])
+        expected_weights = np.stack([v[1] for v in vectors])
+        averages = np.array([p.average_score for p in profiles], dtype=np.float64)
+
+        recency = self.weights["recency"] * RECENCY_FACTOR
+        confidence = confidence_weights @ self.features.T + recency
+        # Redondeo: sumas iguales en distinto orden empatan de verdad
+        confidence = np.minimum(np.round(confidence, 12), 1.0)
+
+        expected = np.clip(
+            expected_weights @ self.features.T + averages[:, None], 0, 100
+        )
+        return confidence, expected
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int, threshold: Optional[float] = None) -> np.ndarray:
+        """
+        Índices de las k mayores puntuaciones (> threshold), de mayor a menor;
+        los empates, en el orden de los ejercicios
+        """
+        candidates = (
+            np.flatnonzero(scores > threshold)
+            if threshold is not None
+            else np.arange(len(scores))
+        )
+        k = min(k, len(candidates))
+        if k <= 0:
+            return np.zeros(0, dtype=np.int64)
+
+        candidate_scores = scores[candidates]
+        if k < len(candidates):
+            kth = candidate_scores[np.argpartition(-candidate_scores, k - 1)[k - 1]]
+            above = candidates[candidate_scores > kth]
+            ties = candidates[candidate_scores == kth][: k - len(above)]
+            candidates = np.concatenate([above, ties])
+
+        return candidates[np.lexsort((candidates, -scores[candidates]))]
+
+    def recommend(
+        self, profiles: Sequence, limit: int = 5, threshold: float = MIN_CONFIDENCE
+    ) -> List[List[Tuple[int, float, float]]]:
+        """
+        Para cada perfil, lista de (índice de ejercicio, confianza,
+        puntuación esperada) de las `limit` mejores recomendaciones
+        """
+        if not profiles or not self.exercises:
+            return [[] for _ in profiles]
+
+        results = []
+        # Por bloques de usuarios para acotar la matriz usuarios x ejercicios
+        for start in range(0, len(profiles), SCORE_BATCH_SIZE):
+            confidence, expected = self.score(profiles[start : start + SCORE_BATCH_SIZE])
+            for row in range(len(confidence)):
+                indices = self.top_k(confidence[row], limit, threshold)
+                results.append(
+                    [
+                        (int(i), float(confidence[row, i]), float(expected[row, i]))
+                        for i in indices
+                    ]
+                )
+        return results
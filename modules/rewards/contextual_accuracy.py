@@ -1,8 +1,12 @@
 #!/usr/bin/env python3
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
 import spacy
 import numpy as np
-from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from modules.embeddings.encoder_service import get_encoder_service
 
 
 class ContextualAccuracyEvaluator:
@@ -10,6 +14,9 @@ class ContextualAccuracyEvaluator:
         self,
         nlp_model="models/custom/shaili-personal-model",
         embedding_model="models/custom/shaili-personal-model",
+        quantize: bool = False,
+        query_cache_size: int = 2048,
+        encoder=None,
     ):
         """
         Inicializar evaluador de precisión contextual
@@ -17,20 +24,62 @@ class ContextualAccuracyEvaluator:
         Args:
             nlp_model (str): Modelo de SpaCy para análisis lingüístico
             embedding_model (str): Modelo de embeddings para similitud semántica
+            quantize (bool): Usar el encoder con cuantización dinámica int8 (CPU)
+            query_cache_size (int): Embeddings de consultas a mantener en caché
+            encoder: Encoder a usar en lugar del compartido del proceso
         """
-        # Cargar modelo principal
-        try:
-            from transformers import AutoModel, AutoTokenizer
+        self.query_cache_size = query_cache_size
+        self._query_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
 
-            self.tokenizer = AutoTokenizer.from_pretrained(embedding_model)
-            self.embedding_model = AutoModel.from_pretrained(embedding_model)
-            self.embedding_model.eval()
+        # Encoder compartido del proceso (modelo principal)
+        try:
+            self.embedding_model = encoder or get_encoder_service(
+                embedding_model, quantize=quantize
+            )
+            self.embedding_model.load()
             self.nlp = None  # No usar SpaCy
         except Exception as e:
             print(f"Error cargando modelo principal: {e}")
             self.nlp = None
             self.embedding_model = None
 
+    def _cached_query(self, query: str) -> Optional[np.ndarray]:
+        with self._query_cache_lock:
+            embedding = self._query_cache.get(query)
+            if embedding is not None:
+                self._query_cache.move_to_end(query)
+            return embedding
+
+    def _cache_query(self, query: str, embedding: np.ndarray):
+        with self._query_cache_lock:
+            self._query_cache[query] = embedding
+            self._query_cache.move_to_end(query)
+            while len(self._query_cache) > self.query_cache_size:
+                self._query_cache.popitem(last=False)
+
+    def _similarities(self, pairs: Sequence[Tuple[str, str]]) -> np.ndarray:
+        """
+        Similitud coseno de cada par (consulta, respuesta). Las consultas sin
+        caché y todas las respuestas se codifican en una sola llamada
+        """
+        queries: Dict[str, Optional[np.ndarray]] = {}
+        for query, _ in pairs:
+            if query not in queries:
+                queries[query] = self._cached_query(query)
+        missing = [query for query, embedding in queries.items() if embedding is None]
+
+        embeddings = self.embedding_model.encode(
+            missing + [response for _, response in pairs], normalize=True
+        )
+        for query, embedding in zip(missing, embeddings):
+            queries[query] = embedding
+            self._cache_query(query, embedding)
+
+        query_matrix = np.stack([queries[query] for query, _ in pairs])
+        response_matrix = embeddings[len(missing) :]
+        return np.einsum("ij,ij->i", query_matrix, response_matrix)
+
     def semantic_similarity(self, query: str, response: str) -> float:
         """
         Calcular similitud semántica entre consulta y respuesta
@@ -45,24 +94,7 @@ class ContextualAccuracyEvaluator:
         if not self.embedding_model:
             return 0.5  # Valor por defecto si no hay modelo
 
-        # Generar embeddings usando el modelo principal
-        query_inputs = self.tokenizer(
-            query, return_tensors="pt", padding=True, truncation=True
-        )
-        response_inputs = self.tokenizer(
-            response, return_tensors="pt", padding=True, truncation=True
-        )
-
-        with torch.no_grad():
-            query_outputs = self.embedding_model(**query_inputs)
-            response_outputs = self.embedding_model(**response_inputs)
-
-            query_emb = query_outputs.last_hidden_state.mean(dim=1).cpu().numpy()
-            response_emb = response_outputs.last_hidden_state.mean(dim=1).cpu().numpy()
-
-        # Calcular similitud coseno
-        similarity = cosine_similarity(query_emb, response_emb)[0][0]
-        return similarity
+        return float(self._similarities([(query, response)])[0])
 
     def linguistic_coverage(self, query: str, response: str) -> float:
         """
@@ -127,6 +159,48 @@ class ContextualAccuracyEvaluator:
 
         return round(contextual_score, 2)
 
+    def evaluate_batch(
+        self, pairs: Sequence[Tuple[str, str]], batch_size: int = 256
+    ) -> List[float]:
+        """
+        Precisión contextual de muchos pares (consulta, respuesta), p. ej.
+        para recalcular recompensas históricas
+
+        Args:
+            pairs (list): Pares (consulta, respuesta)
+            batch_size (int): Pares por llamada al encoder
+
+        Returns:
+            list: Puntuación de precisión contextual de cada par (0-1)
+        """
+        pairs = list(pairs)
+        scores: List[float] = []
+        for start in range(0, len(pairs), batch_size):
+            chunk = pairs[start : start + batch_size]
+            if self.embedding_model:
+                semantic = self._similarities(chunk)
+            else:
+                semantic = np.full(len(chunk), 0.5)
+
+            for (query, response), semantic_sim in zip(chunk, semantic):
+                linguistic_cov = self.linguistic_coverage(query, response)
+                scores.append(round(0.6 * float(semantic_sim) + 0.4 * linguistic_cov, 2))
+        return scores
+
+
+_shared_evaluator: Optional[ContextualAccuracyEvaluator] = None
+_shared_evaluator_lock = threading.Lock()
+
+
+def get_contextual_evaluator() -> ContextualAccuracyEvaluator:
+    """Evaluador compartido del proceso (se crea en la primera llamada)"""
+    global _shared_evaluator
+    if _shared_evaluator is None:
+        with _shared_evaluator_lock:
+            if _shared_evaluator is None:
+                _shared_evaluator = ContextualAccuracyEvaluator()
+    return _shared_evaluator
+
 
 def evaluate_contextual_accuracy(query: str, response: str) -> float:
     """
@@ -139,8 +213,7 @@ def evaluate_contextual_accuracy(query: str, response: str) -> float:
     Returns:
         float: Puntuación de precisión contextual (0-1)
     """
-    evaluator = ContextualAccuracyEvaluator()
-    return evaluator.contextual_precision(query, response)
+    return get_contextual_evaluator().contextual_precision(query, response)
 
 
 # Ejemplo de uso
@@ -9,7 +9,7 @@ sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from modules.rewards.tracker import SessionTracker
 from modules.rewards.reward_system import ShailiRewardSystem
-from modules.rewards.contextual_accuracy import ContextualAccuracyEvaluator
+from modules.rewards.contextual_accuracy import get_contextual_evaluator
 
 
 class ShailiRewardsIntegration:
@@ -28,7 +28,7 @@ class ShailiRewardsIntegration:
         # Inicializar componentes
         self.session_tracker = SessionTracker(storage_path=sessions_path)
         self.reward_system = ShailiRewardSystem(vault_path=vault_path)
-        self.contextual_evaluator = ContextualAccuracyEvaluator()
+        self.contextual_evaluator = get_contextual_evaluator()
 
     def process_interaction(self, domain: str, query: str, response: str) -> dict:
         """
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Libro de Recompensas (Ledger)
+=============================
+Registro de recompensas Sheilys en SQLite, solo de adición, que sustituye
+al vault de un JSON por recompensa.
+
+- Tabla `rewards` con índices (domain, ts) y (ts): la retención es un
+  borrado por rango del índice temporal
+- Totales por dominio de la ventana de retención mantenidos en memoria:
+  se suman al escribir y las recompensas que salen de la ventana se restan
+  de forma incremental, así que `total_sheilys` no recorre el ledger
+- Las filas añadidas por otros procesos se incorporan por rowid; los
+  borrados incrementan `generation` y fuerzan a los demás procesos a
+  recalcular sus totales
+- `migrate_vault` importa una vez los JSON del vault anterior
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rewards (
+    reward_id TEXT NOT NULL UNIQUE,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    session_id TEXT,
+    domain TEXT NOT NULL,
+    sheilys REAL NOT NULL,
+    details TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_rewards_domain_ts ON rewards (domain, ts);
+CREATE INDEX IF NOT EXISTS idx_rewards_ts ON rewards (ts);
+CREATE TABLE IF NOT EXISTS ledger_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def timestamp_to_epoch(timestamp: str) -> float:
+    """ISO 8601 a segundos epoch; las fechas sin zona se toman como UTC"""
+    moment = datetime.fromisoformat(timestamp)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class RewardLedger:
+    """Ledger de recompensas con totales por dominio en O(1)"""
+
+    def __init__(self, db_path: Union[str, Path], retention_days: int = 90):
+        self.db_path = str(db_path)
+        self.retention_seconds = retention_days * 86400
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+        # Totales de la ventana [_window_start, ahora) por dominio
+        self._totals: Dict[str, float] = {}
+        self._window_start = 0.0
+        self._last_rowid = 0
+        self._generation = 0
+        with self._lock:
+            self._rebuild_totals()
+
+    # ------------------------------------------------------------------
+    # Totales en memoria
+    # ------------------------------------------------------------------
+
+    def _cutoff(self) -> float:
+        return time.time() - self.retention_seconds
+
+    def _read_generation(self) -> int:
+        row = self._conn.execute(
+            "SELECT value FROM ledger_meta WHERE key = 'generation'"
+        ).fetchone()
+        return int(row[0]) if row else 0
+
+    def _rebuild_totals(self):
+        """Recalcular los totales de la ventana (arranque o recorte externo)"""
+        cutoff = self._cutoff()
+        self._totals = dict(
+            self._conn.execute(
+                "SELECT domain, SUM(sheilys) FROM rewards WHERE ts >= ? GROUP BY domain",
+                (cutoff,),
+            ).fetchall()
+        )
+        self._window_start = cutoff
+        self._last_rowid = self._conn.execute(
+            "SELECT COALESCE(MAX(rowid), 0) FROM rewards"
+        ).fetchone()[0]
+        self._generation = self._read_generation()
+
+    def _add_to_totals(self, domain: str, sheilys: float, ts: float):
+        if ts >= self._window_start:
+            self._totals[domain] = self._totals.get(domain, 0.0) + sheilys
+
+    def _refresh_totals(self):
+        """Incorporar escrituras de otros procesos y expirar la ventana"""
+        if self._read_generation() != self._generation:
+            self._rebuild_totals()
+            return
+
+        for rowid, domain, sheilys, ts in self._conn.execute(
+            "SELECT rowid, domain, sheilys, ts FROM rewards WHERE rowid > ?",
+            (self._last_rowid,),
+        ).fetchall():
+            self._add_to_totals(domain, sheilys, ts)
+            self._last_rowid = max(self._last_rowid, rowid)
+
+        cutoff = self._cutoff()
+        if cutoff > self._window_start:
+            for domain, expired in self._conn.execute(
+                """
+                SELECT domain, SUM(sheilys) FROM rewards
+                WHERE ts >= ? AND ts < ? GROUP BY domain
+                """,
+                (self._window_start, cutoff),
+            ).fetchall():
+                remaining = self._totals.get(domain, 0.0) - expired
+                if abs(remaining) < 1e-9:
+                    self._totals.pop(domain, None)
+                else:
+                    self._totals[domain] = remaining
+            self._window_start = cutoff
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def append(self, reward: Dict[str, Any]) -> bool:
+        """Añadir una recompensa; False si su reward_id ya existía"""
+        return self.append_many([reward]) == 1
+
+    def append_many(self, rewards: Iterable[Dict[str, Any]]) -> int:
+        """Añadir recompensas en una transacción; devuelve las nuevas"""
+        rows = [
+            (
+                reward["reward_id"],
+                timestamp_to_epoch(reward["timestamp"]),
+                reward["timestamp"],
+                reward.get("session_id"),
+                reward.get("domain", "general"),
+                float(reward.get("sheilys", 0.0)),
+                json.dumps(reward.get("details", {}), ensure_ascii=False, default=str),
+            )
+            for reward in rewards
+        ]
+        if not rows:
+            return 0
+
+        with self._lock:
+            self._refresh_totals()
+            inserted = 0
+            with self._conn:
+                for row in rows:
+                    cursor = self._conn.execute(
+                        """
+                        INSERT OR IGNORE INTO rewards
+                            (reward_id, ts, timestamp, session_id, domain, sheilys, details)
+                        VALUES (?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        row,
+                    )
+                    if cursor.rowcount:
+                        inserted += 1
+                        self._add_to_totals(row[4], row[5], row[1])
+                        self._last_rowid = max(self._last_rowid, cursor.lastrowid)
+            return inserted
+
+    def total_sheilys(self, domain: Optional[str] = None) -> float:
+        """Sheilys de la ventana de retención, total o de un dominio"""
+        with self._lock:
+            self._refresh_totals()
+            if domain is None:
+                return sum(self._totals.values())
+            return self._totals.get(domain, 0.0)
+
+    def domain_totals(self) -> Dict[str, float]:
+        with self._lock:
+            self._refresh_totals()
+            return dict(self._totals)
+
+    def get_rewards(
+        self,
+        domain: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """Recompensas más recientes (opcionalmente por dominio y desde `since`)"""
+        clauses, params = [], []
+        if domain is not None:
+            clauses.append("domain = ?")
+            params.append(domain)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT reward_id, timestamp, session_id, domain, sheilys, details
+                FROM rewards {where} ORDER BY ts DESC LIMIT ?
+                """,
+                (*params, limit),
+            ).fetchall()
+        return [
+            {
+                "reward_id": reward_id,
+                "timestamp": timestamp,
+                "session_id": session_id,
+                "domain": domain,
+                "sheilys": sheilys,
+                "details": json.loads(details) if details else {},
+            }
+            for reward_id, timestamp, session_id, domain, sheilys, details in rows
+        ]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM rewards").fetchone()[0]
+
+    def prune(self, max_rewards: Optional[int] = None) -> int:
+        """
+        Borrar las recompensas fuera de la retención y, si se indica,
+        las más antiguas por encima de `max_rewards`. Devuelve las borradas
+        """
+        with self._lock:
+            self._refresh_totals()
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM rewards WHERE ts < ?", (self._window_start,)
+                ).rowcount
+
+                trimmed = 0
+                if max_rewards is not None:
+                    trimmed = self._conn.execute(
+                        """
+                        DELETE FROM rewards WHERE rowid IN (
+                            SELECT rowid FROM rewards ORDER BY ts DESC
+                            LIMIT -1 OFFSET ?
+                        )
+                        """,
+                        (max(max_rewards, 0),),
+                    ).rowcount
+
+                if deleted or trimmed:
+                    # Otros procesos pueden tener una ventana más antigua
+                    # que incluya lo borrado: deben recalcular sus totales
+                    self._conn.execute(
+                        """
+                        INSERT INTO ledger_meta (key, value) VALUES ('generation', '1')
+                        ON CONFLICT(key) DO UPDATE
+                            SET value = CAST(value AS INTEGER) + 1
+                        """
+                    )
+
+            if trimmed:
+                self._rebuild_totals()
+            else:
+                self._generation = self._read_generation()
+
+        if deleted or trimmed:
+            logger.info(f"🧹 Ledger: {deleted} recompensas caducadas, {trimmed} recortadas")
+        return deleted + trimmed
+
+    # ------------------------------------------------------------------
+    # Migración del vault de JSON
+    # ------------------------------------------------------------------
+
+    def migrate_vault(self, vault_path: Union[str, Path]) -> int:
+        """
+        Importar una vez los `*.json` del vault anterior. Los archivos no se
+        borran; la migración queda marcada en `ledger_meta`
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT 1 FROM ledger_meta WHERE key = 'vault_migrated'"
+            ).fetchone()
+        if done or not os.path.isdir(vault_path):
+            return 0
+
+        rewards = []
+        for filename in sorted(os.listdir(vault_path)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(vault_path, filename), "r", encoding="utf-8") as f:
+                    reward = json.load(f)
+                reward.setdefault("reward_id", filename[: -len(".json")])
+                timestamp_to_epoch(reward["timestamp"])
+                rewards.append(reward)
+            except Exception as e:
+                logger.warning(f"⚠️ Recompensa no migrada {filename}: {e}")
+
+        imported = self.append_many(rewards)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ledger_meta (key, value) VALUES ('vault_migrated', ?)",
+                (datetime.now(timezone.utc).isoformat(),),
+            )
+        logger.info(f"📦 Vault migrado al ledger: {imported} recompensas")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -2,12 +2,13 @@
 import os
 import json
 import hashlib
-from datetime import datetime, timedelta, UTC
+from datetime import datetime, UTC
 from typing import Dict, Any, List
 import math  # Added for math.log
 
 # Importar el nuevo módulo de precisión contextual
 from .contextual_accuracy import evaluate_contextual_accuracy
+from .reward_ledger import RewardLedger
 
 
 class ShailiRewardSystem:
@@ -37,6 +38,12 @@ class ShailiRewardSystem:
         # Crear directorio si no existe
         os.makedirs(vault_path, exist_ok=True)
 
+        # Ledger SQLite de recompensas; importa una vez los JSON del vault
+        self.ledger = RewardLedger(
+            os.path.join(vault_path, "rewards_ledger.db"), retention_days
+        )
+        self.ledger.migrate_vault(vault_path)
+
     def _calculate_sheilys(self, session_data: Dict[str, Any]) -> float:
         """
         Calcular puntuación de Sheilys con un modelo multifactorial avanzado
@@ -115,8 +122,11 @@ class ShailiRewardSystem:
 
         interaction_score = interaction_depth(query, response)
 
-        # 5. Precisión Contextual AVANZADA
-        contextual_accuracy = evaluate_contextual_accuracy(query, response)
+        # 5. Precisión Contextual AVANZADA (reutilizar la ya calculada por
+        # el llamador; si no, evaluador compartido del proceso)
+        contextual_accuracy = session_data.get("contextual_accuracy")
+        if contextual_accuracy is None:
+            contextual_accuracy = evaluate_contextual_accuracy(query, response)
 
         # Cálculo final de Sheilys
         sheilys = (
@@ -159,10 +169,8 @@ class ShailiRewardSystem:
         ).hexdigest()
         reward_data["reward_id"] = reward_id
 
-        # Guardar en vault
-        reward_file = os.path.join(self.vault_path, f"{reward_id}.json")
-        with open(reward_file, "w", encoding="utf-8") as f:
-            json.dump(reward_data, f, ensure_ascii=False, indent=2)
+        # Añadir al ledger
+        self.ledger.append(reward_data)
 
         return reward_data
 
@@ -176,50 +184,11 @@ class ShailiRewardSystem:
         Returns:
             float: Total de Sheilys
         """
-        total_sheilys = 0.0
-        cutoff_date = datetime.now(UTC) - timedelta(days=self.retention_days)
-
-        for filename in os.listdir(self.vault_path):
-            if filename.endswith(".json"):
-                filepath = os.path.join(self.vault_path, filename)
-
-                # Leer recompensa
-                with open(filepath, "r", encoding="utf-8") as f:
-                    reward = json.load(f)
-
-                # Filtrar por fecha y dominio
-                reward_date = datetime.fromisoformat(reward["timestamp"])
-                if reward_date >= cutoff_date and (
-                    domain is None or reward["domain"] == domain
-                ):
-                    total_sheilys += reward["sheilys"]
-
+        total_sheilys = self.ledger.total_sheilys(domain)
         return round(total_sheilys, 2)
 
     def cleanup_old_rewards(self):
         """
         Limpiar recompensas antiguas
         """
-        cutoff_date = datetime.now(UTC) - timedelta(days=self.retention_days)
-        rewards = []
-
-        # Recopilar recompensas
-        for filename in os.listdir(self.vault_path):
-            if filename.endswith(".json"):
-                filepath = os.path.join(self.vault_path, filename)
-
-                # Leer recompensa
-                with open(filepath, "r", encoding="utf-8") as f:
-                    reward = json.load(f)
-
-                reward_date = datetime.fromisoformat(reward["timestamp"])
-
-                if reward_date >= cutoff_date:
-                    rewards.append((reward_date, filepath))
-
-        # Ordenar por fecha
-        rewards.sort(key=lambda x: x[0])
-
-        # Mantener solo los más recientes
-        for _, filepath in rewards[self.max_vault_size :]:
-            os.remove(filepath)
+        self.ledger.prune(self.max_vault_size)
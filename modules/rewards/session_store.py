@@ -0,0 +1,350 @@
+#!/usr/bin/env python3
+"""
+Almacén de Sesiones
+===================
+Sesiones del SessionTracker en SQLite en lugar de un JSON por sesión.
+
+- Índices (domain, quality_score, ts) y (quality_score, ts): el top-N por
+  calidad se resuelve en el índice sin cargar el historial
+- `iter_sessions` recorre las sesiones por lotes (exportación a
+  entrenamiento) sin materializarlas todas
+- `compact` mueve el contenido de las sesiones antiguas a segmentos JSONL
+  comprimidos (`segments/segment_XXXXX.jsonl.gz`); las filas del índice se
+  conservan y apuntan a su segmento
+- `prune` borra las sesiones fuera de la retención y los segmentos que se
+  quedan vacíos
+- `migrate_json_dir` importa una vez los JSON del directorio anterior
+"""
+
+import gzip
+import json
+import logging
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    from .reward_ledger import timestamp_to_epoch
+except ImportError:
+    from reward_ledger import timestamp_to_epoch
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT NOT NULL UNIQUE,
+    ts REAL NOT NULL,
+    domain TEXT NOT NULL,
+    quality_score REAL NOT NULL,
+    data TEXT,
+    segment_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_sessions_domain_quality_ts
+    ON sessions (domain, quality_score, ts);
+CREATE INDEX IF NOT EXISTS idx_sessions_quality_ts ON sessions (quality_score, ts);
+CREATE INDEX IF NOT EXISTS idx_sessions_ts ON sessions (ts);
+CREATE TABLE IF NOT EXISTS session_segments (
+    segment_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    file TEXT NOT NULL,
+    min_ts REAL NOT NULL,
+    max_ts REAL NOT NULL,
+    sessions INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_store_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+class SessionStore:
+    """Sesiones indexadas por dominio, calidad y fecha"""
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        segment_dir: Optional[Union[str, Path]] = None,
+        segment_cache_size: int = 4,
+    ):
+        self.db_path = str(db_path)
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.segment_dir = Path(segment_dir or Path(self.db_path).parent / "segments")
+        self.segment_cache_size = segment_cache_size
+        self._segment_cache: "OrderedDict[int, Dict[str, Dict[str, Any]]]" = OrderedDict()
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _row(session: Dict[str, Any]) -> Tuple:
+        return (
+            session["session_id"],
+            timestamp_to_epoch(session["timestamp"]),
+            session.get("domain", "general"),
+            float(session.get("quality_score", 0.0)),
+            json.dumps(session, ensure_ascii=False, default=str),
+        )
+
+    def add(self, session: Dict[str, Any]) -> bool:
+        """Guardar una sesión; False si su session_id ya existía"""
+        return self.add_many([session]) == 1
+
+    def add_many(self, sessions: List[Dict[str, Any]]) -> int:
+        rows = [self._row(session) for session in sessions]
+        with self._lock, self._conn:
+            before = self._conn.total_changes
+            self._conn.executemany(
+                """
+                INSERT OR IGNORE INTO sessions (session_id, ts, domain, quality_score, data)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                rows,
+            )
+            return self._conn.total_changes - before
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _where(
+        min_quality: Optional[float], domain: Optional[str], since: Optional[float]
+    ) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if domain is not None:
+            clauses.append("domain = ?")
+            params.append(domain)
+        if min_quality is not None:
+            clauses.append("quality_score >= ?")
+            params.append(min_quality)
+        if since is not None:
+            clauses.append("ts >= ?")
+            params.append(since)
+        return (f"WHERE {' AND '.join(clauses)}" if clauses else ""), params
+
+    def _load_segment(self, segment_id: int) -> Dict[str, Dict[str, Any]]:
+        """Sesiones de un segmento (session_id -> sesión), con caché LRU"""
+        sessions = self._segment_cache.get(segment_id)
+        if sessions is not None:
+            self._segment_cache.move_to_end(segment_id)
+            return sessions
+
+        row = self._conn.execute(
+            "SELECT file FROM session_segments WHERE segment_id = ?", (segment_id,)
+        ).fetchone()
+        sessions = {}
+        if row is not None:
+            with gzip.open(self.segment_dir / row[0], "rt", encoding="utf-8") as f:
+                for line in f:
+                    session = json.loads(line)
+                    sessions[session["session_id"]] = session
+
+        self._segment_cache[segment_id] = sessions
+        while len(self._segment_cache) > self.segment_cache_size:
+            self._segment_cache.popitem(last=False)
+        return sessions
+
+    def _materialize(self, rows) -> List[Dict[str, Any]]:
+        """Filas (session_id, data, segment_id) a sesiones, en el mismo orden"""
+        sessions = []
+        for session_id, data, segment_id in rows:
+            if data is not None:
+                sessions.append(json.loads(data))
+            else:
+                session = self._load_segment(segment_id).get(session_id)
+                if session is not None:
+                    sessions.append(session)
+        return sessions
+
+    def top_sessions(
+        self,
+        min_quality: Optional[float] = None,
+        domain: Optional[str] = None,
+        since: Optional[float] = None,
+        limit: int = 1000,
+    ) -> List[Dict[str, Any]]:
+        """Las `limit` sesiones de mayor calidad que cumplen los filtros"""
+        where, params = self._where(min_quality, domain, since)
+        with self._lock:
+            rows = self._conn.execute(
+                f"""
+                SELECT session_id, data, segment_id FROM sessions {where}
+                ORDER BY quality_score DESC, ts DESC LIMIT ?
+                """,
+                (*params, limit),
+            ).fetchall()
+            return self._materialize(rows)
+
+    def iter_sessions(
+        self,
+        min_quality: Optional[float] = None,
+        domain: Optional[str] = None,
+        since: Optional[float] = None,
+        batch_size: int = 500,
+    ) -> Iterator[Dict[str, Any]]:
+        """Recorrer por lotes, en orden cronológico, las sesiones filtradas"""
+        where, params = self._where(min_quality, domain, since)
+        last = (float("-inf"), 0)
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    f"""
+                    SELECT ts, rowid, session_id, data, segment_id FROM sessions
+                    {where} {"AND" if where else "WHERE"} (ts, rowid) > (?, ?)
+                    ORDER BY ts, rowid LIMIT ?
+                    """,
+                    (*params, *last, batch_size),
+                ).fetchall()
+                if not rows:
+                    return
+                sessions = self._materialize([row[2:] for row in rows])
+            last = (rows[-1][0], rows[-1][1])
+            yield from sessions
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    # ------------------------------------------------------------------
+    # Mantenimiento
+    # ------------------------------------------------------------------
+
+    def compact(self, before: float, max_segment_sessions: int = 10000) -> int:
+        """
+        Mover a segmentos comprimidos el contenido de las sesiones anteriores
+        a `before` (epoch). Devuelve las sesiones compactadas
+        """
+        self.segment_dir.mkdir(parents=True, exist_ok=True)
+        compacted = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    """
+                    SELECT session_id, ts, data FROM sessions
+                    WHERE ts < ? AND data IS NOT NULL
+                    ORDER BY ts LIMIT ?
+                    """,
+                    (before, max_segment_sessions),
+                ).fetchall()
+                if not rows:
+                    break
+
+                segment_id = self._conn.execute(
+                    "SELECT COALESCE(MAX(segment_id), 0) + 1 FROM session_segments"
+                ).fetchone()[0]
+                filename = f"segment_{segment_id:05d}.jsonl.gz"
+                tmp_path = self.segment_dir / f".{filename}.tmp"
+                with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                    for _, _, data in rows:
+                        f.write(data + "\n")
+                os.replace(tmp_path, self.segment_dir / filename)
+
+                with self._conn:
+                    self._conn.execute(
+                        """
+                        INSERT INTO session_segments
+                            (segment_id, file, min_ts, max_ts, sessions, created_at)
+                        VALUES (?, ?, ?, ?, ?, ?)
+                        """,
+                        (
+                            segment_id,
+                            filename,
+                            rows[0][1],
+                            rows[-1][1],
+                            len(rows),
+                            datetime.now(timezone.utc).isoformat(),
+                        ),
+                    )
+                    self._conn.executemany(
+                        "UPDATE sessions SET data = NULL, segment_id = ? WHERE session_id = ?",
+                        [(segment_id, session_id) for session_id, _, _ in rows],
+                    )
+                compacted += len(rows)
+
+        if compacted:
+            logger.info(f"🗜️ {compacted} sesiones compactadas en segmentos")
+        return compacted
+
+    def prune(self, before: float) -> int:
+        """Borrar las sesiones anteriores a `before` y los segmentos vacíos"""
+        with self._lock:
+            with self._conn:
+                deleted = self._conn.execute(
+                    "DELETE FROM sessions WHERE ts < ?", (before,)
+                ).rowcount
+                empty = self._conn.execute(
+                    """
+                    SELECT segment_id, file FROM session_segments
+                    WHERE max_ts < ? AND NOT EXISTS (
+                        SELECT 1 FROM sessions
+                        WHERE sessions.segment_id = session_segments.segment_id
+                    )
+                    """,
+                    (before,),
+                ).fetchall()
+                self._conn.executemany(
+                    "DELETE FROM session_segments WHERE segment_id = ?",
+                    [(segment_id,) for segment_id, _ in empty],
+                )
+
+            for segment_id, filename in empty:
+                self._segment_cache.pop(segment_id, None)
+                try:
+                    os.remove(self.segment_dir / filename)
+                except FileNotFoundError:
+                    pass
+
+        if deleted:
+            logger.info(f"🧹 {deleted} sesiones caducadas, {len(empty)} segmentos borrados")
+        return deleted
+
+    def migrate_json_dir(self, directory: Union[str, Path]) -> int:
+        """
+        Importar una vez los `*.json` de sesiones del directorio anterior.
+        Los archivos no se borran; la migración queda marcada
+        """
+        with self._lock:
+            done = self._conn.execute(
+                "SELECT 1 FROM session_store_meta WHERE key = 'json_migrated'"
+            ).fetchone()
+        if done or not os.path.isdir(directory):
+            return 0
+
+        sessions = []
+        for filename in sorted(os.listdir(directory)):
+            if not filename.endswith(".json"):
+                continue
+            try:
+                with open(os.path.join(directory, filename), "r", encoding="utf-8") as f:
+                    session = json.load(f)
+                session.setdefault("session_id", filename[: -len(".json")])
+                self._row(session)
+                sessions.append(session)
+            except Exception as e:
+                logger.warning(f"⚠️ Sesión no migrada {filename}: {e}")
+
+        imported = self.add_many(sessions)
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO session_store_meta (key, value) VALUES ('json_migrated', ?)",
+                (datetime.now(timezone.utc).isoformat(),),
+            )
+        logger.info(f"📦 Sesiones migradas al almacén: {imported}")
+        return imported
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
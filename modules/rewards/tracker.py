@@ -2,8 +2,13 @@
 import os
 import json
 import hashlib
-from datetime import datetime, timedelta
-from typing import Dict, Any, List
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, Iterator, List
+
+try:
+    from .session_store import SessionStore
+except ImportError:
+    from session_store import SessionStore
 
 
 class SessionTracker:
@@ -33,6 +38,16 @@ class SessionTracker:
         # Crear directorio si no existe
         os.makedirs(storage_path, exist_ok=True)
 
+        # Almacén indexado; importa una vez los JSON de sesiones anteriores
+        self.store = SessionStore(os.path.join(storage_path, "sessions.db"))
+        self.store.migrate_json_dir(storage_path)
+
+    def _cutoff(self) -> float:
+        """Inicio de la ventana de retención (epoch)"""
+        return (
+            datetime.now(timezone.utc) - timedelta(days=self.retention_days)
+        ).timestamp()
+
     def _generate_session_id(self, session_data: Dict[str, Any]) -> str:
         """
         Generar un ID único para la sesión basado en sus contenidos
@@ -77,9 +92,7 @@ class SessionTracker:
         session_data["session_id"] = session_id
 
         # Guardar sesión
-        session_file = os.path.join(self.storage_path, f"{session_id}.json")
-        with open(session_file, "w", encoding="utf-8") as f:
-            json.dump(session_data, f, ensure_ascii=False, indent=2)
+        self.store.add(session_data)
 
         return session_data
 
@@ -96,48 +109,41 @@ class SessionTracker:
         Returns:
             list: Sesiones útiles
         """
-        useful_sessions = []
-        cutoff_date = datetime.utcnow() - timedelta(days=self.retention_days)
-
-        for filename in os.listdir(self.storage_path):
-            if filename.endswith(".json"):
-                filepath = os.path.join(self.storage_path, filename)
-
-                # Leer sesión
-                with open(filepath, "r", encoding="utf-8") as f:
-                    session = json.load(f)
-
-                # Filtrar por fecha, puntuación y dominio
-                session_date = datetime.fromisoformat(session["timestamp"])
-                if (
-                    session_date >= cutoff_date
-                    and session["quality_score"] >= min_quality_score
-                    and (domain is None or session["domain"] == domain)
-                ):
-                    useful_sessions.append(session)
-
-        # Ordenar por puntuación de calidad (descendente)
-        useful_sessions.sort(key=lambda x: x["quality_score"], reverse=True)
+        # Top-N por calidad resuelto en el índice del almacén
+        return self.store.top_sessions(
+            min_quality=min_quality_score,
+            domain=domain,
+            since=self._cutoff(),
+            limit=self.max_sessions,
+        )
+
+    def iter_useful_sessions(
+        self, min_quality_score: float = 0.7, domain: str = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Recorrer todas las sesiones útiles en orden cronológico, sin límite
+        y sin cargarlas a la vez (exportación a entrenamiento)
 
-        # Limitar número de sesiones
-        return useful_sessions[: self.max_sessions]
+        Args:
+            min_quality_score (float): Puntuación mínima para considerar útil
+            domain (str, optional): Filtrar por dominio específico
+        """
+        return self.store.iter_sessions(
+            min_quality=min_quality_score, domain=domain, since=self._cutoff()
+        )
 
     def cleanup_old_sessions(self):
         """
         Limpiar sesiones antiguas
         """
-        cutoff_date = datetime.utcnow() - timedelta(days=self.retention_days)
-
-        for filename in os.listdir(self.storage_path):
-            if filename.endswith(".json"):
-                filepath = os.path.join(self.storage_path, filename)
+        self.store.prune(self._cutoff())
 
-                # Leer fecha de sesión
-                with open(filepath, "r", encoding="utf-8") as f:
-                    session = json.load(f)
-
-                session_date = datetime.fromisoformat(session["timestamp"])
+    def compact_sessions(self, older_than_days: int = 7) -> int:
+        """
+        Comprimir en segmentos las sesiones de más de `older_than_days` días
 
-                # Eliminar si es más antiguo que la fecha de corte
-                if session_date < cutoff_date:
-                    os.remove(filepath)
+        Returns:
+            int: Sesiones compactadas
+        """
+        before = datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        return self.store.compact(before.timestamp())
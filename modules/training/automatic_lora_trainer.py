@@ -3,13 +3,27 @@
 Sistema de Fine-tuning Automático LoRA
 =====================================
 Entrena automáticamente modelos LoRA cuando se acumulan suficientes datos
+
+- Conteo de datos por rama mantenido por triggers (sin GROUP BY periódico)
+- Cola de prioridad persistida en SQLite; los trabajos interrumpidos se
+  reanudan desde su último checkpoint
+- Concurrencia según los núcleos disponibles, con cada trabajo fijado a
+  su propio conjunto de núcleos
+- Métricas leídas en streaming de la salida del entrenamiento
 """
 
+import ast
 import json
 import logging
+import shutil
+import signal
 import subprocess
+import sys
 import threading
 import time
+import uuid
+import weakref
+from collections import deque
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
@@ -37,8 +51,11 @@ class LoRATrainingConfig:
     save_steps: int = 500
     eval_steps: int = 500
     logging_steps: int = 100
-    min_data_points: int = 50  # Mínimo de datos para entrenar
+    min_data_points: int = 50  # Mínimo de datos (y de datos nuevos para reentrenar)
     max_data_points: int = 1000  # Máximo de datos por entrenamiento
+    max_training_hours: float = 6.0  # Tiempo máximo de un intento
+    stall_timeout_minutes: float = 30.0  # Sin salida durante este tiempo: se mata
+    max_attempts: int = 3  # Intentos (reanudando desde checkpoint) antes de fallar
 
 
 @dataclass
@@ -55,18 +72,117 @@ class LoRATrainingJob:
     metrics: Dict[str, Any] = None
     error_message: str = ""
     created_at: datetime = None
+    priority: int = 0  # Mayor primero (datos nuevos desde el último entrenamiento)
+    attempts: int = 0
+    data_count: int = 0
+    trainer_pid: Optional[int] = None  # Proceso del script de entrenamiento
+    trainer_token: Optional[str] = None
+
+
+# Prefijo de las líneas de métricas que escribe el script de entrenamiento
+METRICS_PREFIX = "LORA_METRICS "
+
+# Directorio de tokenization_cache, importable desde el script generado
+TOKENIZATION_CACHE_DIR = Path(__file__).resolve().parent.parent / "core" / "training"
+
+
+def _available_cores() -> List[int]:
+    """Núcleos en los que este proceso puede ejecutarse"""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def _process_token(pid: int) -> Optional[str]:
+    """
+    Identidad de un proceso que no se repite al reutilizarse su PID (p. ej.
+    al reiniciar un contenedor): boot id más instante de arranque del
+    proceso. None si /proc no está disponible
+    """
+    try:
+        with open("/proc/sys/kernel/random/boot_id", "r") as f:
+            boot_id = f.read().strip()
+        with open(f"/proc/{pid}/stat", "r") as f:
+            # El campo 22 (starttime) va tras el nombre entre paréntesis
+            start_time = f.read().rsplit(")", 1)[1].split()[19]
+        return f"{boot_id}:{start_time}"
+    except (OSError, IndexError):
+        return None
+
+
+def _process_alive(pid: Optional[int], token: Optional[str] = None) -> bool:
+    """El proceso `pid` existe y, si se conoce, es el mismo que `token`"""
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError:
+        return False
+    if token is not None:
+        current = _process_token(pid)
+        if current is not None and current != token:
+            return False
+    return True
+
+
+# Instancias vivas de este proceso por token de dueño: puede haber varias
+# sobre la misma BD (registro perezoso de módulos, chatbot...)
+_live_trainers: "weakref.WeakValueDictionary[str, AutomaticLoRATrainer]" = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _owner_alive(pid: Optional[int], token: Optional[str]) -> bool:
+    """
+    El planificador dueño de un trabajo sigue vivo. El token de dueño es el
+    del proceso más un uuid de la instancia: en este mismo proceso solo
+    cuenta si esa instancia existe todavía
+    """
+    if pid == os.getpid():
+        return token is not None and token in _live_trainers
+    process_token = token.rsplit("/", 1)[0] if token else None
+    return _process_alive(pid, process_token or None)
+
+
+def _kill_process(pid: int, token: Optional[str], timeout: float = 10.0):
+    """Matar un proceso ajeno (no hijo) y esperar a que desaparezca"""
+    try:
+        os.kill(pid, signal.SIGKILL)
+    except OSError:
+        return
+    deadline = time.monotonic() + timeout
+    while _process_alive(pid, token) and time.monotonic() < deadline:
+        time.sleep(0.1)
 
 
 class AutomaticLoRATrainer:
     """Sistema de fine-tuning automático LoRA"""
 
-    def __init__(self, db_path: str = "shaili_ai/data/lora_training.db"):
+    def __init__(
+        self,
+        db_path: str = "shaili_ai/data/lora_training.db",
+        max_concurrent_jobs: int = 2,
+        poll_interval: float = 30.0,
+    ):
         self.db_path = Path(db_path)
-        self.training_queue: List[LoRATrainingJob] = []
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
         self.running_jobs: Dict[str, LoRATrainingJob] = {}
-        self.max_concurrent_jobs = 2
         self.monitoring_thread = None
         self.is_running = False
+        self.poll_interval = poll_interval
+        self._wake_event = threading.Event()
+        self._jobs_lock = threading.Lock()
+        self._process_token = _process_token(os.getpid())
+        # Dueño de los trabajos de esta instancia (worker_token en la BD)
+        self._owner_token = f"{self._process_token or ''}/{uuid.uuid4().hex}"
+        _live_trainers[self._owner_token] = self
+
+        # Cada trabajo se fija a un conjunto propio de núcleos
+        self.cores = _available_cores()
+        self.max_concurrent_jobs = max(1, min(max_concurrent_jobs, len(self.cores)))
+        self.cores_per_job = max(1, len(self.cores) // self.max_concurrent_jobs)
+        self._free_cores: List[int] = list(self.cores)
 
         # Configuraciones por rama
         self.branch_configs = {
@@ -124,6 +240,7 @@ class AutomaticLoRATrainer:
 
         # Inicializar base de datos
         self._init_database()
+        self._recover_interrupted_jobs()
 
         logger.info("🎯 Sistema de fine-tuning automático LoRA inicializado")
 
@@ -168,11 +285,165 @@ class AutomaticLoRATrainer:
                 """
                 )
 
+                # Columnas de la cola de prioridad (bases de datos anteriores)
+                existing = {
+                    row[1]
+                    for row in cursor.execute("PRAGMA table_info(lora_training_jobs)")
+                }
+                for column, definition in (
+                    ("priority", "INTEGER NOT NULL DEFAULT 0"),
+                    ("attempts", "INTEGER NOT NULL DEFAULT 0"),
+                    ("data_count", "INTEGER NOT NULL DEFAULT 0"),
+                    ("worker_pid", "INTEGER"),
+                    ("worker_token", "TEXT"),
+                    ("trainer_pid", "INTEGER"),
+                    ("trainer_token", "TEXT"),
+                ):
+                    if column not in existing:
+                        cursor.execute(
+                            f"ALTER TABLE lora_training_jobs ADD COLUMN {column} {definition}"
+                        )
+                cursor.execute(
+                    """
+                    CREATE INDEX IF NOT EXISTS idx_lora_jobs_queue
+                    ON lora_training_jobs (status, priority DESC, created_at)
+                """
+                )
+
+                # Contadores de datos por rama, mantenidos por triggers
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS lora_branch_data_counts (
+                        branch_name TEXT PRIMARY KEY,
+                        total_count INTEGER NOT NULL DEFAULT 0,
+                        scheduled_count INTEGER NOT NULL DEFAULT 0
+                    )
+                """
+                )
+
                 conn.commit()
 
+            self._ensure_data_counters()
+
         except Exception as e:
             logger.error(f"❌ Error inicializando base de datos: {e}")
 
+    def _ensure_data_counters(self) -> bool:
+        """
+        Instalar los triggers que mantienen lora_branch_data_counts.
+
+        La tabla lora_training_data la crea el generador LoRA; si aún no
+        existe se vuelve a intentar en la siguiente verificación. Al
+        instalarlos se hace un único recuento inicial.
+        """
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger') "
+                "AND name IN ('lora_training_data', 'trg_lora_data_insert')"
+            )
+            names = {row[0] for row in cursor.fetchall()}
+            if "lora_training_data" not in names:
+                return False
+            if "trg_lora_data_insert" in names:
+                return True
+
+            cursor.executescript(
+                """
+                BEGIN;
+                -- INSERT OR REPLACE no dispara el trigger de borrado: descontar
+                -- aquí la fila que se va a reemplazar
+                CREATE TRIGGER IF NOT EXISTS trg_lora_data_replace
+                BEFORE INSERT ON lora_training_data
+                WHEN EXISTS (SELECT 1 FROM lora_training_data WHERE id = NEW.id)
+                BEGIN
+                    UPDATE lora_branch_data_counts SET total_count = total_count - 1
+                    WHERE branch_name =
+                        (SELECT branch_name FROM lora_training_data WHERE id = NEW.id);
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_lora_data_insert
+                AFTER INSERT ON lora_training_data
+                BEGIN
+                    -- Upsert: un OR IGNORE heredaría el OR REPLACE de la sentencia
+                    INSERT INTO lora_branch_data_counts (branch_name, total_count)
+                    VALUES (NEW.branch_name, 1)
+                    ON CONFLICT(branch_name) DO UPDATE SET total_count = total_count + 1;
+                END;
+
+                CREATE TRIGGER IF NOT EXISTS trg_lora_data_delete
+                AFTER DELETE ON lora_training_data
+                BEGIN
+                    UPDATE lora_branch_data_counts SET total_count = total_count - 1
+                    WHERE branch_name = OLD.branch_name;
+                END;
+
+                INSERT INTO lora_branch_data_counts (branch_name, total_count)
+                SELECT branch_name, COUNT(*) FROM lora_training_data
+                GROUP BY branch_name
+                ON CONFLICT(branch_name) DO UPDATE SET total_count = excluded.total_count;
+                COMMIT;
+            """
+            )
+            logger.info("✅ Contadores de datos LoRA por rama instalados")
+            return True
+
+    def _recover_interrupted_jobs(self):
+        """
+        Devolver a la cola los trabajos 'running' cuyo planificador ya no
+        existe (p. ej. se reinició el servidor o el contenedor); se
+        reanudarán desde su último checkpoint. Un trabajo con el PID de este
+        proceso solo es huérfano si la instancia que lo lanzó ya no existe:
+        otra instancia sobre la misma BD puede estar ejecutándolo. Si el
+        script de entrenamiento de un huérfano sigue vivo se mata, para que
+        el reintento no escriba en sus mismos checkpoints
+        """
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT job_id, worker_pid, worker_token, trainer_pid, trainer_token
+                    FROM lora_training_jobs WHERE status = 'running'
+                """
+                )
+                orphaned = []
+                for job_id, worker_pid, worker_token, trainer_pid, trainer_token in (
+                    cursor.fetchall()
+                ):
+                    if _owner_alive(worker_pid, worker_token):
+                        continue
+                    # Solo con identidad comprobada: su PID puede ser de otro
+                    if trainer_token and _process_token(trainer_pid) == trainer_token:
+                        logger.warning(
+                            f"⚠️ Matando entrenador huérfano {trainer_pid} de {job_id}"
+                        )
+                        _kill_process(trainer_pid, trainer_token)
+                    orphaned.append((job_id,))
+
+                cursor.executemany(
+                    """
+                    UPDATE lora_training_jobs
+                    SET status = 'pending', worker_pid = NULL, worker_token = NULL,
+                        trainer_pid = NULL, trainer_token = NULL
+                    WHERE job_id = ?
+                """,
+                    orphaned,
+                )
+                conn.commit()
+
+            if orphaned:
+                logger.info(
+                    f"🔄 {len(orphaned)} trabajos interrumpidos devueltos a la cola"
+                )
+
+        except Exception as e:
+            logger.error(f"❌ Error recuperando trabajos interrumpidos: {e}")
+
+    def notify_data_changed(self):
+        """Despertar al planificador sin esperar al siguiente sondeo"""
+        self._wake_event.set()
+
     def start_monitoring(self):
         """Iniciar monitoreo automático de datos para entrenamiento"""
         if self.monitoring_thread is None or not self.monitoring_thread.is_alive():
@@ -186,6 +457,7 @@ class AutomaticLoRATrainer:
     def stop_monitoring(self):
         """Detener monitoreo automático"""
         self.is_running = False
+        self._wake_event.set()
         if self.monitoring_thread:
             self.monitoring_thread.join(timeout=5)
         logger.info("⏹️ Monitoreo automático detenido")
@@ -200,70 +472,75 @@ class AutomaticLoRATrainer:
                 # Procesar cola de entrenamiento
                 self._process_training_queue()
 
-                # Esperar antes de la siguiente verificación
-                time.sleep(300)  # 5 minutos
+                # Esperar datos nuevos, un trabajo terminado o el sondeo
+                self._wake_event.wait(self.poll_interval)
+                self._wake_event.clear()
 
             except Exception as e:
                 logger.error(f"❌ Error en bucle de monitoreo: {e}")
                 time.sleep(60)  # 1 minuto en caso de error
 
     def _check_and_schedule_training(self):
-        """Verificar y programar entrenamientos automáticos"""
+        """
+        Verificar y programar entrenamientos automáticos.
+
+        Una rama se entrena por primera vez al alcanzar min_data_points y
+        se reentrena cuando acumula min_data_points datos nuevos desde la
+        última programación. La prioridad es el número de datos nuevos.
+        """
         try:
+            if not self._ensure_data_counters():
+                return
+
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
-                # Obtener estadísticas de datos por rama
+                # Lectura de una fila por rama (mantenida por triggers)
                 cursor.execute(
                     """
-                    SELECT branch_name, COUNT(*) as data_count
-                    FROM lora_training_data
-                    GROUP BY branch_name
+                    SELECT c.branch_name, c.total_count, c.scheduled_count
+                    FROM lora_branch_data_counts c
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM lora_training_jobs j
+                        WHERE j.branch_name = c.branch_name
+                        AND j.status IN ('pending', 'running')
+                    )
                 """
                 )
-
                 results = cursor.fetchall()
 
-                for branch_name, data_count in results:
-                    if branch_name in self.branch_configs:
-                        config = self.branch_configs[branch_name]
-
-                        # Verificar si hay suficientes datos y no hay entrenamiento reciente
-                        if data_count >= config.min_data_points:
-                            # Verificar si ya hay un trabajo pendiente o reciente
-                            cursor.execute(
-                                """
-                                SELECT COUNT(*) FROM lora_training_jobs
-                                WHERE branch_name = ? AND status IN ('pending', 'running')
-                                AND created_at > datetime('now', '-1 hour')
-                            """,
-                                (branch_name,),
-                            )
+            for branch_name, data_count, scheduled_count in results:
+                config = self.branch_configs.get(branch_name)
+                if config is None or data_count < config.min_data_points:
+                    continue
 
-                            recent_jobs = cursor.fetchone()[0]
-
-                            if recent_jobs == 0:
-                                # Programar entrenamiento automático
-                                self._schedule_training(branch_name, data_count)
+                new_data = data_count - scheduled_count
+                if scheduled_count == 0 or new_data >= config.min_data_points:
+                    self._schedule_training(branch_name, data_count, priority=new_data)
 
         except Exception as e:
             logger.error(f"❌ Error verificando entrenamientos: {e}")
 
-    def _schedule_training(self, branch_name: str, data_count: int):
+    def _schedule_training(self, branch_name: str, data_count: int, priority: int = 0):
         """Programar entrenamiento automático"""
         try:
-            # Generar dataset actualizado
+            # Exportar solo los datos nuevos al dataset por shards
             from .lora_finetuning_generator import get_lora_generator
 
             lora_generator = get_lora_generator()
 
-            dataset_path = lora_generator.export_lora_dataset(branch_name)
+            dataset_dir = lora_generator.export_lora_dataset_incremental(branch_name)
 
-            if dataset_path and Path(dataset_path).exists():
+            if dataset_dir and (Path(dataset_dir) / "manifest.json").exists():
                 # Crear trabajo de entrenamiento
                 job_id = f"lora_job_{branch_name}_{int(datetime.now().timestamp())}"
                 config = self.branch_configs[branch_name]
 
+                # Copia del manifiesto: el trabajo (y sus reintentos) ve
+                # siempre los mismos shards aunque lleguen datos nuevos
+                dataset_path = str(Path(dataset_dir) / f"manifest_{job_id}.json")
+                shutil.copyfile(Path(dataset_dir) / "manifest.json", dataset_path)
+
                 training_job = LoRATrainingJob(
                     job_id=job_id,
                     branch_name=branch_name,
@@ -271,16 +548,16 @@ class AutomaticLoRATrainer:
                     config=config,
                     status="pending",
                     created_at=datetime.now(),
+                    priority=priority,
+                    data_count=data_count,
                 )
 
-                # Guardar en base de datos
+                # Guardar en la cola persistente
                 self._save_training_job(training_job)
 
-                # Agregar a cola
-                self.training_queue.append(training_job)
-
                 logger.info(
-                    f"📅 Entrenamiento programado para {branch_name} con {data_count} datos"
+                    f"📅 Entrenamiento programado para {branch_name} con {data_count} datos "
+                    f"(prioridad {priority})"
                 )
 
         except Exception as e:
@@ -296,8 +573,9 @@ class AutomaticLoRATrainer:
                     """
                     INSERT INTO lora_training_jobs 
                     (job_id, branch_name, dataset_path, config, status, start_time, 
-                     end_time, metrics, error_message, created_at)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                     end_time, metrics, error_message, created_at, priority, attempts,
+                     data_count)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
                 """,
                     (
                         job.job_id,
@@ -310,31 +588,95 @@ class AutomaticLoRATrainer:
                         json.dumps(job.metrics) if job.metrics else None,
                         job.error_message,
                         job.created_at.isoformat(),
+                        job.priority,
+                        job.attempts,
+                        job.data_count,
                     ),
                 )
 
+                # Los datos contados quedan cubiertos por este trabajo
+                cursor.execute(
+                    """
+                    UPDATE lora_branch_data_counts SET scheduled_count = ?
+                    WHERE branch_name = ?
+                """,
+                    (job.data_count, job.branch_name),
+                )
+
                 conn.commit()
 
         except Exception as e:
             logger.error(f"❌ Error guardando trabajo: {e}")
 
-    def _process_training_queue(self):
-        """Procesar cola de entrenamiento"""
-        # Remover trabajos completados
-        self.training_queue = [
-            job for job in self.training_queue if job.status == "pending"
-        ]
+    def _load_pending_jobs(self, limit: int) -> List[LoRATrainingJob]:
+        """Trabajos pendientes por prioridad, sin ramas ya en ejecución"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                """
+                SELECT job_id, branch_name, dataset_path, config, status, metrics,
+                       created_at, priority, attempts, data_count
+                FROM lora_training_jobs
+                WHERE status = 'pending'
+                ORDER BY priority DESC, created_at
+            """
+            )
 
-        # Procesar trabajos pendientes
-        for job in self.training_queue[: self.max_concurrent_jobs]:
-            if len(self.running_jobs) < self.max_concurrent_jobs:
-                self._start_training_job(job)
+            jobs = []
+            running_branches = {job.branch_name for job in self.running_jobs.values()}
+            for row in cursor.fetchall():
+                if len(jobs) >= limit:
+                    break
+                if row[1] in running_branches:
+                    continue
+                running_branches.add(row[1])
+                jobs.append(
+                    LoRATrainingJob(
+                        job_id=row[0],
+                        branch_name=row[1],
+                        dataset_path=row[2],
+                        config=LoRATrainingConfig(**json.loads(row[3])),
+                        status=row[4],
+                        metrics=json.loads(row[5]) if row[5] else None,
+                        created_at=datetime.fromisoformat(row[6]),
+                        priority=row[7],
+                        attempts=row[8],
+                        data_count=row[9],
+                    )
+                )
+            return jobs
+
+    def _allocate_cores(self) -> Optional[List[int]]:
+        if len(self._free_cores) < self.cores_per_job:
+            return None
+        cores = self._free_cores[: self.cores_per_job]
+        self._free_cores = self._free_cores[self.cores_per_job :]
+        return cores
+
+    def _release_cores(self, cores: List[int]):
+        with self._jobs_lock:
+            self._free_cores = sorted(self._free_cores + cores)
 
-    def _start_training_job(self, job: LoRATrainingJob):
+    def _process_training_queue(self):
+        """Procesar cola de entrenamiento"""
+        with self._jobs_lock:
+            free_slots = self.max_concurrent_jobs - len(self.running_jobs)
+            if free_slots <= 0:
+                return
+
+            for job in self._load_pending_jobs(free_slots):
+                cores = self._allocate_cores()
+                if cores is None:
+                    break
+                self._start_training_job(job, cores)
+
+    def _start_training_job(self, job: LoRATrainingJob, cores: List[int]):
         """Iniciar trabajo de entrenamiento"""
         try:
             job.status = "running"
             job.start_time = datetime.now()
+            job.attempts += 1
+            job.trainer_pid = job.trainer_token = None
             self.running_jobs[job.job_id] = job
 
             # Actualizar en base de datos
@@ -342,73 +684,187 @@ class AutomaticLoRATrainer:
 
             # Iniciar entrenamiento en hilo separado
             training_thread = threading.Thread(
-                target=self._run_training_job, args=(job,), daemon=True
+                target=self._run_training_job, args=(job, cores), daemon=True
             )
             training_thread.start()
 
-            logger.info(f"🚀 Iniciando entrenamiento LoRA para {job.branch_name}")
+            logger.info(
+                f"🚀 Iniciando entrenamiento LoRA para {job.branch_name} "
+                f"(intento {job.attempts}, núcleos {cores})"
+            )
 
         except Exception as e:
             logger.error(f"❌ Error iniciando trabajo: {e}")
             job.status = "failed"
             job.error_message = str(e)
+            self.running_jobs.pop(job.job_id, None)
+            self._free_cores = sorted(self._free_cores + cores)
             self._update_job_status(job)
+            self._release_dataset(job)
+
+    @staticmethod
+    def _release_dataset(job: LoRATrainingJob):
+        """
+        Borrar la copia del manifiesto fijada por un trabajo terminado; la
+        siguiente exportación borra los shards que ya no se usan
+        """
+        pinned = Path(job.dataset_path)
+        if pinned.name == f"manifest_{job.job_id}.json":
+            try:
+                pinned.unlink()
+            except FileNotFoundError:
+                pass
 
-    def _run_training_job(self, job: LoRATrainingJob):
+    def _run_training_job(self, job: LoRATrainingJob, cores: List[int]):
         """Ejecutar trabajo de entrenamiento"""
         try:
-            # Crear directorio de salida
+            # Crear directorio de salida; los checkpoints son propios del
+            # trabajo para que un reintento reanude solo su propio progreso
             output_dir = Path(f"shaili_ai/models/lora/{job.branch_name}")
-            output_dir.mkdir(parents=True, exist_ok=True)
+            checkpoint_dir = output_dir / "checkpoints" / job.job_id
+            checkpoint_dir.mkdir(parents=True, exist_ok=True)
 
             # Generar script de entrenamiento
-            training_script = self._generate_training_script(job, output_dir)
-
-            # Ejecutar entrenamiento
-            result = subprocess.run(
-                ["python", training_script],
-                capture_output=True,
-                text=True,
-                timeout=3600,  # 1 hora máximo
+            training_script = self._generate_training_script(
+                job, output_dir, checkpoint_dir
+            )
+
+            # Ejecutar entrenamiento leyendo su salida en streaming
+            returncode, stop_reason, output_tail = self._run_training_process(
+                job, training_script, cores
             )
 
-            if result.returncode == 0:
+            job.end_time = datetime.now()
+            if returncode == 0:
                 # Entrenamiento exitoso
                 job.status = "completed"
-                job.end_time = datetime.now()
-                job.metrics = self._parse_training_metrics(result.stdout)
 
                 # Guardar modelo entrenado
                 self._save_trained_model(job, output_dir)
+                shutil.rmtree(checkpoint_dir, ignore_errors=True)
 
                 logger.info(f"✅ Entrenamiento completado para {job.branch_name}")
 
+            elif (returncode < 0 or stop_reason) and job.attempts < job.config.max_attempts:
+                # Proceso matado: se reanudará desde el último checkpoint
+                job.status = "pending"
+                job.error_message = stop_reason or f"terminado por señal {-returncode}"
+                logger.warning(
+                    f"⚠️ Entrenamiento de {job.branch_name} interrumpido "
+                    f"({job.error_message}); se reanudará"
+                )
+
             else:
                 # Error en entrenamiento
                 job.status = "failed"
-                job.end_time = datetime.now()
-                job.error_message = result.stderr
+                job.error_message = stop_reason or output_tail
 
                 logger.error(
-                    f"❌ Error en entrenamiento para {job.branch_name}: {result.stderr}"
+                    f"❌ Error en entrenamiento para {job.branch_name}: {job.error_message}"
                 )
 
-            # Actualizar estado
-            self._update_job_status(job)
-
-            # Remover de trabajos en ejecución
-            if job.job_id in self.running_jobs:
-                del self.running_jobs[job.job_id]
-
         except Exception as e:
             logger.error(f"❌ Error ejecutando entrenamiento: {e}")
             job.status = "failed"
             job.error_message = str(e)
             job.end_time = datetime.now()
+
+        finally:
+            # Actualizar estado y liberar núcleos
             self._update_job_status(job)
+            if job.status in ("completed", "failed"):
+                self._release_dataset(job)
+            self.running_jobs.pop(job.job_id, None)
+            self._release_cores(cores)
+            self._wake_event.set()
+
+    def _run_training_process(
+        self, job: LoRATrainingJob, training_script: str, cores: List[int]
+    ) -> Tuple[int, str, str]:
+        """
+        Ejecutar el script fijado a `cores`, parseando las métricas línea a
+        línea. Un vigilante mata el proceso si supera el tiempo máximo o
+        deja de producir salida. Devuelve (código, motivo de parada, cola
+        de la salida)
+        """
+        env = os.environ.copy()
+        threads = str(len(cores))
+        env.update(
+            OMP_NUM_THREADS=threads,
+            MKL_NUM_THREADS=threads,
+            TOKENIZERS_PARALLELISM="false",
+        )
 
-    def _generate_training_script(self, job: LoRATrainingJob, output_dir: Path) -> str:
-        """Generar script de entrenamiento LoRA"""
+        process = subprocess.Popen(
+            [sys.executable, training_script],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            env=env,
+        )
+        try:
+            os.sched_setaffinity(process.pid, cores)
+        except (AttributeError, OSError) as e:
+            logger.debug(f"No se pudo fijar afinidad de CPU: {e}")
+
+        # Registrar el entrenador: si este proceso muere, la recuperación lo mata
+        job.trainer_pid = process.pid
+        job.trainer_token = _process_token(process.pid)
+        self._update_job_status(job)
+
+        state = {"last_output": time.monotonic(), "stop_reason": ""}
+        watchdog = threading.Thread(
+            target=self._watch_training_process,
+            args=(process, job.config, state),
+            daemon=True,
+        )
+        watchdog.start()
+
+        metrics = dict(job.metrics or self._empty_metrics())
+        output_tail: deque = deque(maxlen=50)
+        last_persist = time.monotonic()
+
+        for line in process.stdout:
+            state["last_output"] = time.monotonic()
+            output_tail.append(line.rstrip())
+
+            if self._parse_metrics_line(line, metrics):
+                job.metrics = dict(metrics)
+                # Persistir el progreso como mucho cada 30 s
+                if state["last_output"] - last_persist > 30:
+                    self._update_job_status(job)
+                    last_persist = state["last_output"]
+
+        returncode = process.wait()
+        job.metrics = metrics
+        return returncode, state["stop_reason"], "\n".join(output_tail)
+
+    @staticmethod
+    def _watch_training_process(
+        process: subprocess.Popen, config: LoRATrainingConfig, state: Dict[str, Any]
+    ):
+        started = time.monotonic()
+        while process.poll() is None:
+            time.sleep(5)
+            now = time.monotonic()
+            if now - started > config.max_training_hours * 3600:
+                state["stop_reason"] = "tiempo máximo de entrenamiento superado"
+            elif now - state["last_output"] > config.stall_timeout_minutes * 60:
+                state["stop_reason"] = "sin salida del entrenamiento"
+            else:
+                continue
+            process.kill()
+            return
+
+    def _generate_training_script(
+        self, job: LoRATrainingJob, output_dir: Path, checkpoint_dir: Path
+    ) -> str:
+        """
+        Generar script de entrenamiento LoRA. El script emite sus métricas
+        como líneas LORA_METRICS en cuanto se registran y reanuda desde el
+        último checkpoint de `checkpoint_dir` si existe
+        """
         script_content = f'''#!/usr/bin/env python3
 """
 Script de Entrenamiento LoRA Automático para {job.branch_name}
@@ -418,28 +874,34 @@ import os
 import sys
 from pathlib import Path
 
-# Agregar ruta del proyecto
+# Agregar ruta del proyecto (y de la caché de tokenización)
 sys.path.append(str(Path.cwd()))
+sys.path.append("{TOKENIZATION_CACHE_DIR}")
 
 def train_lora():
     """Entrenar modelo LoRA"""
     try:
         from transformers import (
             AutoTokenizer, AutoModelForCausalLM, 
-            TrainingArguments, Trainer, DataCollatorForLanguageModeling
+            TrainingArguments, Trainer, DataCollatorForLanguageModeling,
+            TrainerCallback
         )
         from peft import LoraConfig, get_peft_model, TaskType
         import torch
-        from datasets import Dataset
+        from datasets import load_dataset
+        import hashlib
         import json
         
         # Configuración
         model_name = "{job.config.model_name}"
         dataset_path = "{job.dataset_path}"
         output_dir = "{output_dir}"
+        checkpoint_dir = "{checkpoint_dir}"
         
         # Cargar tokenizador y modelo
         tokenizer = AutoTokenizer.from_pretrained(model_name)
+        if tokenizer.pad_token is None:
+            tokenizer.pad_token = tokenizer.eos_token
         model = AutoModelForCausalLM.from_pretrained(model_name)
         
         # Configurar LoRA
@@ -454,21 +916,52 @@ def train_lora():
         # Aplicar LoRA al modelo
         model = get_peft_model(model, lora_config)
         
-        # Cargar dataset
-        with open(dataset_path, 'r', encoding='utf-8') as f:
-            data = [json.loads(line) for line in f]
-        
-        # Preparar datos
-        def tokenize_function(examples):
-            texts = [f"Instruction: {{ex['instruction']}}\\nOutput: {{ex['output']}}" for ex in examples]
-            return tokenizer(texts, truncation=True, padding=True, max_length={job.config.max_length})
+        # Cargar dataset: manifiesto de shards (verificando checksums) o JSONL
+        if dataset_path.endswith(".json"):
+            with open(dataset_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            data_files = []
+            for shard in manifest["shards"]:
+                shard_path = str(Path(dataset_path).parent / shard["file"])
+                with open(shard_path, 'rb') as f:
+                    if hashlib.sha256(f.read()).hexdigest() != shard["sha256"]:
+                        raise ValueError(f"Checksum incorrecto en {{shard_path}}")
+                data_files.append(shard_path)
+        else:
+            data_files = [dataset_path]
+
+        # Preparar datos: la caché tokeniza solo los shards nuevos y
+        # empaqueta los ejemplos en bloques de max_length
+        try:
+            from tokenization_cache import TokenizationCache
+        except ImportError:
+            TokenizationCache = None
         
-        dataset = Dataset.from_list(data)
-        tokenized_dataset = dataset.map(tokenize_function, batched=True)
+        if TokenizationCache is not None:
+            cache = TokenizationCache(
+                cache_dir="shaili_ai/cache/tokenized",
+                max_length={job.config.max_length},
+                pack=True,
+                template="Instruction: {{instruction}}\\nOutput: {{output}}",
+            )
+            tokenized_dataset = cache.load(dataset_path, tokenizer)
+            print(f"Tokenized dataset: {{tokenized_dataset.stats}}", flush=True)
+        else:
+            def tokenize_function(examples):
+                texts = [
+                    f"Instruction: {{instruction}}\\nOutput: {{output}}"
+                    for instruction, output in zip(examples["instruction"], examples["output"])
+                ]
+                return tokenizer(texts, truncation=True, padding=True, max_length={job.config.max_length})
+            
+            dataset = load_dataset("json", data_files=data_files, split="train")
+            tokenized_dataset = dataset.map(
+                tokenize_function, batched=True, remove_columns=dataset.column_names
+            )
         
         # Configurar entrenamiento
         training_args = TrainingArguments(
-            output_dir=output_dir,
+            output_dir=checkpoint_dir,
             num_train_epochs={job.config.num_epochs},
             per_device_train_batch_size={job.config.batch_size},
             learning_rate={job.config.learning_rate},
@@ -487,19 +980,33 @@ def train_lora():
             mlm=False
         )
         
+        # Métricas en streaming para el planificador
+        class MetricsCallback(TrainerCallback):
+            def on_log(self, args, state, control, logs=None, **kwargs):
+                if logs:
+                    print("{METRICS_PREFIX}" + json.dumps(dict(logs, step=state.global_step)), flush=True)
+        
         # Trainer
         trainer = Trainer(
             model=model,
             args=training_args,
             train_dataset=tokenized_dataset,
             data_collator=data_collator,
+            callbacks=[MetricsCallback()],
         )
         
-        # Entrenar
-        trainer.train()
+        # Entrenar (reanudando si un intento anterior dejó checkpoints)
+        checkpoints = sorted(
+            Path(checkpoint_dir).glob("checkpoint-*"),
+            key=lambda p: int(p.name.rsplit("-", 1)[-1]),
+        )
+        resume_from = str(checkpoints[-1]) if checkpoints else None
+        if resume_from:
+            print(f"Resuming from {{resume_from}}", flush=True)
+        trainer.train(resume_from_checkpoint=resume_from)
         
         # Guardar modelo
-        trainer.save_model()
+        trainer.save_model(output_dir)
         tokenizer.save_pretrained(output_dir)
         
         print("Training completed successfully!")
@@ -521,26 +1028,53 @@ if __name__ == "__main__":
 
         return str(script_path)
 
+    @staticmethod
+    def _empty_metrics() -> Dict[str, Any]:
+        return {
+            "training_loss": 0.0,
+            "final_loss": 0.0,
+            "training_time_minutes": 0,
+            "steps_completed": 0,
+        }
+
+    @staticmethod
+    def _parse_metrics_line(line: str, metrics: Dict[str, Any]) -> bool:
+        """
+        Actualizar `metrics` con una línea de salida: líneas LORA_METRICS
+        (JSON) o los diccionarios que imprime Trainer. Devuelve True si la
+        línea contenía métricas
+        """
+        line = line.strip()
+        try:
+            if line.startswith(METRICS_PREFIX):
+                logs = json.loads(line[len(METRICS_PREFIX) :])
+            elif line.startswith("{") and line.endswith("}") and "loss" in line:
+                logs = ast.literal_eval(line)
+            else:
+                return False
+        except (ValueError, SyntaxError):
+            return False
+        if not isinstance(logs, dict):
+            return False
+
+        if "loss" in logs:
+            metrics["final_loss"] = float(logs["loss"])
+        if "train_loss" in logs:
+            metrics["training_loss"] = float(logs["train_loss"])
+        if "train_runtime" in logs:
+            metrics["training_time_minutes"] = float(logs["train_runtime"]) / 60
+        if "step" in logs:
+            metrics["steps_completed"] = int(logs["step"])
+        if "epoch" in logs:
+            metrics["epoch"] = float(logs["epoch"])
+        return True
+
     def _parse_training_metrics(self, output: str) -> Dict[str, Any]:
         """Parsear métricas de entrenamiento desde la salida"""
         try:
-            metrics = {
-                "training_loss": 0.0,
-                "final_loss": 0.0,
-                "training_time_minutes": 0,
-                "steps_completed": 0,
-            }
-
-            # Parsear métricas básicas (simplificado)
-            lines = output.split("\n")
-            for line in lines:
-                if "loss" in line.lower():
-                    try:
-                        loss = float(line.split()[-1])
-                        metrics["final_loss"] = loss
-                    except:
-                        pass
-
+            metrics = self._empty_metrics()
+            for line in output.splitlines():
+                self._parse_metrics_line(line, metrics)
             return metrics
 
         except Exception as e:
@@ -571,7 +1105,7 @@ if __name__ == "__main__":
                         job.job_id,
                         str(output_dir),
                         json.dumps(job.metrics),
-                        len(self._get_dataset_size(job.dataset_path)),
+                        self._get_dataset_size(job.dataset_path),
                         int(training_duration),
                         datetime.now().isoformat(),
                     ),
@@ -585,6 +1119,9 @@ if __name__ == "__main__":
     def _get_dataset_size(self, dataset_path: str) -> int:
         """Obtener tamaño del dataset"""
         try:
+            if dataset_path.endswith(".json"):
+                with open(dataset_path, "r", encoding="utf-8") as f:
+                    return json.load(f)["total_examples"]
             with open(dataset_path, "r", encoding="utf-8") as f:
                 return len(f.readlines())
         except:
@@ -593,6 +1130,16 @@ if __name__ == "__main__":
     def _update_job_status(self, job: LoRATrainingJob):
         """Actualizar estado del trabajo en base de datos"""
         try:
+            # Planificador y entrenador dueños del trabajo mientras se ejecuta
+            owner = (None, None, None, None)
+            if job.status == "running":
+                owner = (
+                    os.getpid(),
+                    self._owner_token,
+                    job.trainer_pid,
+                    job.trainer_token,
+                )
+
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
@@ -600,7 +1147,8 @@ if __name__ == "__main__":
                     """
                     UPDATE lora_training_jobs 
                     SET status = ?, start_time = ?, end_time = ?, 
-                        metrics = ?, error_message = ?
+                        metrics = ?, error_message = ?, attempts = ?, worker_pid = ?,
+                        worker_token = ?, trainer_pid = ?, trainer_token = ?
                     WHERE job_id = ?
                 """,
                     (
@@ -609,6 +1157,8 @@ if __name__ == "__main__":
                         job.end_time.isoformat() if job.end_time else None,
                         json.dumps(job.metrics) if job.metrics else None,
                         job.error_message,
+                        job.attempts,
+                        *owner,
                         job.job_id,
                     ),
                 )
@@ -627,7 +1177,8 @@ if __name__ == "__main__":
                 # Trabajos recientes
                 cursor.execute(
                     """
-                    SELECT branch_name, status, created_at, start_time, end_time
+                    SELECT branch_name, status, created_at, start_time, end_time,
+                           priority, attempts
                     FROM lora_training_jobs
                     ORDER BY created_at DESC
                     LIMIT 10
@@ -643,9 +1194,16 @@ if __name__ == "__main__":
                             "created_at": row[2],
                             "start_time": row[3],
                             "end_time": row[4],
+                            "priority": row[5],
+                            "attempts": row[6],
                         }
                     )
 
+                cursor.execute(
+                    "SELECT COUNT(*) FROM lora_training_jobs WHERE status = 'pending'"
+                )
+                queue_size = cursor.fetchone()[0]
+
                 # Modelos entrenados
                 cursor.execute(
                     """
@@ -670,8 +1228,13 @@ if __name__ == "__main__":
                 return {
                     "recent_jobs": recent_jobs,
                     "trained_models": trained_models,
-                    "queue_size": len(self.training_queue),
+                    "queue_size": queue_size,
                     "running_jobs": len(self.running_jobs),
+                    "running_metrics": {
+                        job.branch_name: job.metrics
+                        for job in list(self.running_jobs.values())
+                    },
+                    "cores_per_job": self.cores_per_job,
                 }
 
         except Exception as e:
@@ -8,6 +8,7 @@ Genera datos de entrenamiento limpios para mejorar el LLM de ramas especialistas
 import json
 import logging
 import hashlib
+import os
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple
 from dataclasses import dataclass, asdict
@@ -17,6 +18,9 @@ import threading
 
 logger = logging.getLogger(__name__)
 
+# Versión del manifiesto de datasets incrementales (con registro de filas)
+LORA_MANIFEST_VERSION = 2
+
 
 @dataclass
 class LoRATrainingData:
@@ -157,6 +161,23 @@ class LoRAFinetuningGenerator:
                 """
                 )
 
+                # Filas exportadas a cada dataset incremental y su shard:
+                # permite reescribir los shards con filas reemplazadas o borradas
+                cursor.execute(
+                    """
+                    CREATE TABLE IF NOT EXISTS lora_export_rows (
+                        dataset TEXT NOT NULL,
+                        id TEXT NOT NULL,
+                        row_id INTEGER NOT NULL,
+                        shard TEXT NOT NULL,
+                        PRIMARY KEY (dataset, id)
+                    )
+                """
+                )
+                cursor.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_lora_export_shard ON lora_export_rows (dataset, shard)"
+                )
+
                 conn.commit()
 
                 # Crear especialistas de rama por defecto
@@ -561,26 +582,7 @@ class LoRAFinetuningGenerator:
                 training_data_list = []
 
                 for row in results:
-                    training_data = LoRATrainingData(
-                        id=row[0],
-                        branch_name=row[1],
-                        exercise_id=row[2],
-                        user_id=row[3],
-                        session_id=row[4],
-                        question=row[5],
-                        user_answer=row[6],
-                        correct_answer=row[7],
-                        explanation=row[8],
-                        difficulty=row[9],
-                        category=row[10],
-                        points=row[11],
-                        is_correct=bool(row[12]),
-                        training_format=row[13],
-                        metadata=json.loads(row[14]),
-                        created_at=datetime.fromisoformat(row[15]),
-                        quality_score=row[16],
-                    )
-                    training_data_list.append(training_data)
+                    training_data_list.append(self._row_to_training_data(row))
 
                 return training_data_list
 
@@ -588,6 +590,50 @@ class LoRAFinetuningGenerator:
             logger.error(f"❌ Error obteniendo datos de entrenamiento: {e}")
             return []
 
+    @staticmethod
+    def _to_lora_example(data: LoRATrainingData) -> Dict[str, Any]:
+        """Formato de instrucción-respuesta para fine-tuning"""
+        instruction = f"Pregunta sobre {data.category}: {data.question}"
+
+        if data.training_format == "yes_no":
+            response = f"Respuesta: {'Sí' if data.is_correct else 'No'}. Explicación: {data.explanation}"
+        elif data.training_format == "qa":
+            response = f"Respuesta: {data.correct_answer}. Explicación: {data.explanation}"
+        else:
+            response = f"Respuesta completa: {data.correct_answer}. Explicación detallada: {data.explanation}"
+
+        return {
+            "instruction": instruction,
+            "input": "",
+            "output": response,
+            "domain": data.category,
+            "difficulty": data.difficulty,
+            "quality_score": data.quality_score,
+            "metadata": data.metadata,
+        }
+
+    @staticmethod
+    def _row_to_training_data(row: Tuple) -> LoRATrainingData:
+        return LoRATrainingData(
+            id=row[0],
+            branch_name=row[1],
+            exercise_id=row[2],
+            user_id=row[3],
+            session_id=row[4],
+            question=row[5],
+            user_answer=row[6],
+            correct_answer=row[7],
+            explanation=row[8],
+            difficulty=row[9],
+            category=row[10],
+            points=row[11],
+            is_correct=bool(row[12]),
+            training_format=row[13],
+            metadata=json.loads(row[14]),
+            created_at=datetime.fromisoformat(row[15]),
+            quality_score=row[16],
+        )
+
     def export_lora_dataset(self, branch_name: str, output_path: str = None) -> str:
         """Exportar dataset para fine-tuning LoRA"""
         try:
@@ -598,30 +644,7 @@ class LoRAFinetuningGenerator:
                 return ""
 
             # Generar formato para fine-tuning
-            lora_dataset = []
-
-            for data in training_data:
-                # Formato de instrucción-respuesta para fine-tuning
-                instruction = f"Pregunta sobre {data.category}: {data.question}"
-
-                if data.training_format == "yes_no":
-                    response = f"Respuesta: {'Sí' if data.is_correct else 'No'}. Explicación: {data.explanation}"
-                elif data.training_format == "qa":
-                    response = f"Respuesta: {data.correct_answer}. Explicación: {data.explanation}"
-                else:
-                    response = f"Respuesta completa: {data.correct_answer}. Explicación detallada: {data.explanation}"
-
-                lora_dataset.append(
-                    {
-                        "instruction": instruction,
-                        "input": "",
-                        "output": response,
-                        "domain": data.category,
-                        "difficulty": data.difficulty,
-                        "quality_score": data.quality_score,
-                        "metadata": data.metadata,
-                    }
-                )
+            lora_dataset = [self._to_lora_example(data) for data in training_data]
 
             # Guardar dataset
             if output_path is None:
@@ -644,6 +667,280 @@ class LoRAFinetuningGenerator:
             logger.error(f"❌ Error exportando dataset: {e}")
             return ""
 
+    def export_lora_dataset_incremental(
+        self,
+        branch_name: str,
+        output_dir: str = None,
+        shard_size: int = 5000,
+        rebuild: bool = False,
+    ) -> str:
+        """
+        Exportar solo las filas añadidas desde la última exportación.
+
+        El dataset es un directorio de shards JSONL inmutables más un
+        `manifest.json` con el número de ejemplos y el sha256 de cada shard
+        y la marca de agua (rowid máximo exportado). Cada llamada escribe
+        shards nuevos con las filas de rowid mayor, así que su coste es
+        O(filas nuevas). Exporta todas las filas de la rama (no solo las
+        mejores por quality_score como `export_lora_dataset`).
+
+        El id y el rowid de cada fila exportada quedan en `lora_export_rows`.
+        Si el recuento de la rama no cuadra con el manifiesto (filas
+        reemplazadas con INSERT OR REPLACE o borradas), los shards afectados
+        se reescriben con un nombre nuevo y sin las versiones obsoletas.
+        `rebuild=True` reescribe todo.
+
+        Devuelve el directorio del dataset ("" si no hay datos).
+        """
+        try:
+            dataset_dir = Path(
+                output_dir or f"shaili_ai/data/lora_datasets/{branch_name}"
+            )
+            dataset_dir.mkdir(parents=True, exist_ok=True)
+            dataset_key = str(dataset_dir.resolve())
+            manifest_path = dataset_dir / "manifest.json"
+
+            manifest = None if rebuild else load_lora_manifest(dataset_dir)
+            if manifest is not None and manifest.get("version") != LORA_MANIFEST_VERSION:
+                # Manifiesto sin registro de filas exportadas: reconstruir
+                manifest = None
+
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+
+                changed = manifest is None
+                if manifest is None:
+                    cursor.execute(
+                        "DELETE FROM lora_export_rows WHERE dataset = ?", (dataset_key,)
+                    )
+                    manifest = {
+                        "branch_name": branch_name,
+                        "format": "jsonl",
+                        "version": LORA_MANIFEST_VERSION,
+                        "high_water_mark": 0,
+                        "high_water_id": None,
+                        "next_shard": _next_shard_index(dataset_dir),
+                        "total_examples": 0,
+                        "shards": [],
+                    }
+
+                if self._export_is_stale(cursor, branch_name, manifest):
+                    changed |= self._rewrite_stale_shards(
+                        cursor, dataset_dir, dataset_key, branch_name, manifest
+                    )
+                    # Todas las filas de la rama que no están exportadas
+                    cursor.execute(
+                        """
+                        SELECT rowid FROM lora_training_data t
+                        WHERE branch_name = ? AND NOT EXISTS (
+                            SELECT 1 FROM lora_export_rows e
+                            WHERE e.dataset = ? AND e.id = t.id AND e.row_id = t.rowid
+                        )
+                        ORDER BY rowid
+                    """,
+                        (branch_name, dataset_key),
+                    )
+                else:
+                    cursor.execute(
+                        """
+                        SELECT rowid FROM lora_training_data
+                        WHERE branch_name = ? AND rowid > ?
+                        ORDER BY rowid
+                    """,
+                        (branch_name, manifest["high_water_mark"]),
+                    )
+                pending = [row[0] for row in cursor.fetchall()]
+
+                new_examples = 0
+                for start in range(0, len(pending), shard_size):
+                    chunk = pending[start : start + shard_size]
+                    wanted = set(chunk)
+                    cursor.execute(
+                        """
+                        SELECT rowid, * FROM lora_training_data
+                        WHERE branch_name = ? AND rowid BETWEEN ? AND ?
+                        ORDER BY rowid
+                    """,
+                        (branch_name, chunk[0], chunk[-1]),
+                    )
+                    rows = [row for row in cursor.fetchall() if row[0] in wanted]
+                    if not rows:
+                        continue
+
+                    entry = self._write_shard(cursor, dataset_dir, dataset_key, manifest, rows)
+                    manifest["shards"].append(entry)
+                    if rows[-1][0] > manifest["high_water_mark"]:
+                        manifest["high_water_mark"] = rows[-1][0]
+                        manifest["high_water_id"] = rows[-1][1]
+                    new_examples += len(rows)
+
+                manifest["total_examples"] = sum(
+                    shard["examples"] for shard in manifest["shards"]
+                )
+                # Primero la BD: si se corta antes del manifiesto, las filas
+                # nuevas se vuelven a exportar y su shard huérfano se borra
+                conn.commit()
+
+            if not manifest["total_examples"]:
+                logger.warning(f"No hay datos de entrenamiento para {branch_name}")
+                return ""
+
+            if changed or new_examples or not manifest_path.exists():
+                # Escritura atómica: un shard sin entrada en el manifiesto se
+                # borra en la siguiente exportación
+                manifest["updated_at"] = datetime.now().isoformat()
+                tmp_path = manifest_path.with_suffix(".json.tmp")
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(manifest, f, indent=2, ensure_ascii=False)
+                os.replace(tmp_path, manifest_path)
+            _remove_unreferenced_shards(dataset_dir)
+
+            logger.info(
+                f"✅ Dataset incremental exportado: {dataset_dir} "
+                f"(+{new_examples}, {manifest['total_examples']} ejemplos en "
+                f"{len(manifest['shards'])} shards)"
+            )
+            return str(dataset_dir)
+
+        except Exception as e:
+            logger.error(f"❌ Error exportando dataset incremental: {e}")
+            return ""
+
+    def _write_shard(
+        self,
+        cursor: sqlite3.Cursor,
+        dataset_dir: Path,
+        dataset_key: str,
+        manifest: Dict[str, Any],
+        rows: List[Tuple],
+    ) -> Dict[str, Any]:
+        """Escribir un shard nuevo con `rows` (rowid, *fila) y registrar sus filas"""
+        shard_name = f"shard_{manifest['next_shard']:05d}.jsonl"
+        manifest["next_shard"] += 1
+
+        digest = hashlib.sha256()
+        with open(dataset_dir / shard_name, "wb") as f:
+            for row in rows:
+                item = self._to_lora_example(self._row_to_training_data(row[1:]))
+                line = (json.dumps(item, ensure_ascii=False) + "\n").encode("utf-8")
+                digest.update(line)
+                f.write(line)
+
+        cursor.executemany(
+            """
+            INSERT INTO lora_export_rows (dataset, id, row_id, shard)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(dataset, id) DO UPDATE
+                SET row_id = excluded.row_id, shard = excluded.shard
+        """,
+            [(dataset_key, row[1], row[0], shard_name) for row in rows],
+        )
+
+        return {
+            "file": shard_name,
+            "examples": len(rows),
+            "sha256": digest.hexdigest(),
+            "bytes": (dataset_dir / shard_name).stat().st_size,
+            "max_rowid": rows[-1][0],
+            "created_at": datetime.now().isoformat(),
+        }
+
+    @staticmethod
+    def _export_is_stale(
+        cursor: sqlite3.Cursor, branch_name: str, manifest: Dict[str, Any]
+    ) -> bool:
+        """
+        Comprobación barata de que las filas exportadas siguen en la BD: el
+        recuento hasta la marca de agua coincide con el manifiesto y la fila
+        de la marca de agua es la misma (un rowid reutilizado la cambia)
+        """
+        if not manifest["shards"]:
+            return False
+
+        cursor.execute(
+            "SELECT COUNT(*) FROM lora_training_data WHERE branch_name = ? AND rowid <= ?",
+            (branch_name, manifest["high_water_mark"]),
+        )
+        if cursor.fetchone()[0] != manifest["total_examples"]:
+            return True
+
+        cursor.execute(
+            "SELECT id FROM lora_training_data WHERE rowid = ?",
+            (manifest["high_water_mark"],),
+        )
+        row = cursor.fetchone()
+        return row is None or row[0] != manifest.get("high_water_id")
+
+    def _rewrite_stale_shards(
+        self,
+        cursor: sqlite3.Cursor,
+        dataset_dir: Path,
+        dataset_key: str,
+        branch_name: str,
+        manifest: Dict[str, Any],
+    ) -> bool:
+        """
+        Reescribir (con un nombre nuevo) los shards que contienen filas
+        reemplazadas o borradas, conservando solo las filas vigentes.
+        Devuelve True si el manifiesto cambió
+        """
+        cursor.execute(
+            """
+            SELECT e.id, e.shard FROM lora_export_rows e
+            LEFT JOIN lora_training_data t ON t.id = e.id AND t.branch_name = ?
+            WHERE e.dataset = ? AND (t.rowid IS NULL OR t.rowid != e.row_id)
+        """,
+            (branch_name, dataset_key),
+        )
+        stale = cursor.fetchall()
+        cursor.executemany(
+            "DELETE FROM lora_export_rows WHERE dataset = ? AND id = ?",
+            [(dataset_key, row_id) for row_id, _ in stale],
+        )
+
+        affected = {shard for _, shard in stale}
+        shards = []
+        for entry in manifest["shards"]:
+            if entry["file"] not in affected:
+                shards.append(entry)
+                continue
+
+            cursor.execute(
+                """
+                SELECT t.rowid, t.* FROM lora_export_rows e
+                JOIN lora_training_data t ON t.id = e.id AND t.rowid = e.row_id
+                WHERE e.dataset = ? AND e.shard = ?
+                ORDER BY t.rowid
+            """,
+                (dataset_key, entry["file"]),
+            )
+            rows = cursor.fetchall()
+            if rows:
+                shards.append(
+                    self._write_shard(cursor, dataset_dir, dataset_key, manifest, rows)
+                )
+
+        manifest["shards"] = shards
+        manifest["total_examples"] = sum(shard["examples"] for shard in shards)
+
+        # La marca de agua vuelve a la última fila vigente exportada
+        cursor.execute(
+            """
+            SELECT row_id, id FROM lora_export_rows WHERE dataset = ?
+            ORDER BY row_id DESC LIMIT 1
+        """,
+            (dataset_key,),
+        )
+        row = cursor.fetchone()
+        manifest["high_water_mark"], manifest["high_water_id"] = row or (0, None)
+
+        if stale:
+            logger.info(
+                f"♻️ {len(stale)} filas obsoletas retiradas de {len(affected)} shards "
+                f"de {branch_name}"
+            )
+        return True
+
     def get_branch_statistics(self) -> Dict[str, Any]:
         """Obtener estadísticas de todas las ramas"""
         try:
@@ -677,6 +974,77 @@ class LoRAFinetuningGenerator:
             return {}
 
 
+def load_lora_manifest(dataset_dir) -> Optional[Dict[str, Any]]:
+    """
+    Manifiesto de un dataset incremental (None si no existe). Acepta el
+    directorio o un archivo de manifiesto (p. ej. una copia fijada por un
+    trabajo de entrenamiento)
+    """
+    manifest_path = Path(dataset_dir)
+    if manifest_path.is_dir():
+        manifest_path = manifest_path / "manifest.json"
+    if not manifest_path.exists():
+        return None
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _next_shard_index(dataset_dir: Path) -> int:
+    """Siguiente número de shard libre (los de manifiestos fijados se conservan)"""
+    indices = [
+        int(path.stem.split("_", 1)[1])
+        for path in dataset_dir.glob("shard_*.jsonl")
+        if path.stem.split("_", 1)[1].isdigit()
+    ]
+    return max(indices, default=-1) + 1
+
+
+def _remove_unreferenced_shards(dataset_dir: Path):
+    """
+    Borrar los shards que no aparecen ni en `manifest.json` ni en los
+    manifiestos fijados por trabajos de entrenamiento (`manifest_*.json`)
+    """
+    referenced = set()
+    for manifest_path in [dataset_dir / "manifest.json", *dataset_dir.glob("manifest_*.json")]:
+        try:
+            manifest = load_lora_manifest(manifest_path)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Manifiesto ilegible {manifest_path}: {e}")
+            return
+        if manifest is not None:
+            referenced.update(shard["file"] for shard in manifest["shards"])
+
+    for shard_path in dataset_dir.glob("shard_*.jsonl"):
+        if shard_path.name not in referenced:
+            shard_path.unlink()
+
+
+def lora_dataset_shards(dataset_dir, verify: bool = True) -> List[str]:
+    """
+    Rutas de los shards de un dataset incremental, en orden. Con `verify`
+    se comprueba el sha256 de cada shard contra el manifiesto
+    """
+    manifest = load_lora_manifest(dataset_dir)
+    if manifest is None:
+        raise FileNotFoundError(f"Sin manifiesto en {dataset_dir}")
+    dataset_dir = Path(dataset_dir)
+    if not dataset_dir.is_dir():
+        dataset_dir = dataset_dir.parent
+
+    shards = []
+    for shard in manifest["shards"]:
+        path = dataset_dir / shard["file"]
+        if verify:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+            if digest.hexdigest() != shard["sha256"]:
+                raise ValueError(f"Checksum incorrecto en {path}")
+        shards.append(str(path))
+    return shards
+
+
 # Instancia global
 _lora_generator: Optional[LoRAFinetuningGenerator] = None
 
@@ -21,7 +21,10 @@ Fecha: 2024-08-24
 import logging
 import asyncio
 import json
+import threading
+import uuid
 import yaml
+from collections import OrderedDict
 from typing import Dict, List, Any, Optional, Union
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
@@ -84,6 +87,8 @@ class UnifiedSystemConfig:
     cache_enabled: bool = True
     cache_size: int = 10000
     cache_ttl: int = 3600
+    cache_max_bytes: int = 256 * 1024 * 1024
+    embedding_batch_size: int = 64
 
     # Configuración de evaluación
     quality_thresholds: Dict[str, float] = field(
@@ -395,8 +400,24 @@ class UnifiedEmbeddingSystem:
     def __init__(self, config: UnifiedSystemConfig):
         self.config = config
         self.session = self._create_session()
-        self.cache = {}
-        self.cache_timestamps = {}
+        # La sesión de SQLAlchemy no es thread-safe y se usa desde el executor
+        self._db_lock = threading.Lock()
+
+        # Caché LRU: clave -> (embedding, timestamp); el orden es el de uso
+        self.cache: "OrderedDict[str, tuple]" = OrderedDict()
+        self.cache_bytes = 0
+
+        # Índice en memoria para search_similar (se carga en la primera búsqueda)
+        self._index_matrix: Optional[np.ndarray] = None
+        self._index_records: List[Dict[str, Any]] = []
+        self._index_ids: set = set()
+        self._index_domains: Optional[np.ndarray] = None
+        self._index_pending: List[tuple] = []
+        self._index_loaded = False
+        # True desde la consulta de carga: lo guardado a partir de ahí se encola
+        self._index_loading = False
+        # Carga en curso compartida por las búsquedas concurrentes
+        self._index_load_future: Optional[asyncio.Future] = None
 
         # Cargar modelo de embeddings
         try:
@@ -426,26 +447,22 @@ class UnifiedEmbeddingSystem:
         # Verificar caché
         cache_key = f"{content}_{domain}"
         if use_cache and self.config.cache_enabled:
-            if cache_key in self.cache:
-                timestamp = self.cache_timestamps.get(cache_key, 0)
-                if datetime.utcnow().timestamp() - timestamp < self.config.cache_ttl:
-                    logger.info("📋 Embedding recuperado de caché")
-                    return self.cache[cache_key]
+            cached = self._get_cached(cache_key)
+            if cached is not None:
+                logger.info("📋 Embedding recuperado de caché")
+                return cached
 
         # Generar embedding
         try:
-            embedding = self.embedding_model.encode(
-                content,
-                max_length=self.config.max_sequence_length,
-                normalize_embeddings=True,
-            )
+            embeddings = await self._encode([content])
+            embedding = embeddings[0]
 
             # Guardar en caché
             if use_cache and self.config.cache_enabled:
                 self._update_cache(cache_key, embedding)
 
             # Guardar en base de datos
-            await self._save_embedding_record(content, embedding, domain)
+            await self._save_embedding_records([(content, embedding, domain)])
 
             logger.info(f"✅ Embedding generado para dominio: {domain}")
             return embedding
@@ -457,56 +474,208 @@ class UnifiedEmbeddingSystem:
     async def batch_generate_embeddings(
         self, contents: List[str], domains: List[str] = None
     ) -> List[np.ndarray]:
-        """Generar embeddings en lote"""
+        """
+        Generar embeddings en lote: los aciertos de caché se resuelven en
+        memoria y todos los fallos se codifican en una sola llamada al
+        modelo y se guardan en una sola inserción
+        """
 
         if domains is None:
             domains = ["general"] * len(contents)
 
-        embeddings = []
-        for content, domain in zip(contents, domains):
+        if not self.embedding_model:
+            logger.error("Error en embedding de lote: modelo no disponible")
+            return [np.zeros(self.config.embedding_dim) for _ in contents]
+
+        embeddings: List[Optional[np.ndarray]] = [None] * len(contents)
+        # Clave de caché -> posiciones del lote (deduplica textos repetidos)
+        misses: "OrderedDict[str, List[int]]" = OrderedDict()
+
+        for position, (content, domain) in enumerate(zip(contents, domains)):
+            cache_key = f"{content}_{domain}"
+            cached = (
+                self._get_cached(cache_key) if self.config.cache_enabled else None
+            )
+            if cached is not None:
+                embeddings[position] = cached
+            else:
+                misses.setdefault(cache_key, []).append(position)
+
+        if misses:
+            first_positions = [positions[0] for positions in misses.values()]
             try:
-                embedding = await self.generate_embedding(content, domain)
-                embeddings.append(embedding)
+                encoded = await self._encode([contents[i] for i in first_positions])
             except Exception as e:
                 logger.error(f"Error en embedding de lote: {e}")
-                # Error: no hay embedding disponible
-                embeddings.append(np.zeros(self.config.embedding_dim))
+                encoded = None
+
+            records = []
+            for index, (cache_key, positions) in enumerate(misses.items()):
+                if encoded is None:
+                    # Error: no hay embedding disponible
+                    embedding = np.zeros(self.config.embedding_dim)
+                else:
+                    embedding = encoded[index]
+                    if self.config.cache_enabled:
+                        self._update_cache(cache_key, embedding)
+                    first = positions[0]
+                    records.append((contents[first], embedding, domains[first]))
+
+                for position in positions:
+                    embeddings[position] = embedding
+
+            if records:
+                await self._save_embedding_records(records)
 
         return embeddings
 
+    async def _encode(self, texts: List[str]) -> np.ndarray:
+        """Codificar textos en el executor para no bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None,
+            lambda: self.embedding_model.encode(
+                texts,
+                batch_size=self.config.embedding_batch_size,
+                normalize_embeddings=True,
+                convert_to_numpy=True,
+            ),
+        )
+
     async def search_similar(
         self, query_embedding: np.ndarray, domain: str = None, top_k: int = 5
     ) -> List[Dict[str, Any]]:
-        """Buscar contenido similar"""
+        """Buscar contenido similar sobre la matriz de embeddings en memoria"""
+
+        if not self._index_loaded:
+            if self._index_load_future is None:
+                loop = asyncio.get_running_loop()
+                self._index_load_future = loop.run_in_executor(None, self._load_index)
+            try:
+                await self._index_load_future
+            finally:
+                self._index_load_future = None
 
-        # Obtener embeddings de la base de datos
-        query = self.session.query(EmbeddingRecord)
+        self._merge_pending_index()
+        if self._index_matrix is None or not len(self._index_records):
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm == 0 or query.shape[0] != self._index_matrix.shape[1]:
+            return []
+
+        # Las filas de la matriz ya están normalizadas: coseno = producto punto
+        scores = self._index_matrix @ (query / norm)
         if domain:
-            query = query.filter(EmbeddingRecord.domain == domain)
+            scores = np.where(self._index_domains == domain, scores, -np.inf)
+
+        k = min(top_k, int(np.isfinite(scores).sum()))
+        if k <= 0:
+            return []
 
-        records = query.limit(100).all()  # Limitar para rendimiento
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
 
-        similarities = []
-        for record in records:
+        return [
+            dict(self._index_records[i], similarity=float(scores[i])) for i in top
+        ]
+
+    def _load_index(self):
+        """Cargar todos los embeddings del modelo actual en una matriz"""
+        with self._db_lock:
+            self._index_loading = True
             try:
-                stored_embedding = np.array(json.loads(record.embedding_vector))
-                similarity = self._cosine_similarity(query_embedding, stored_embedding)
-                similarities.append(
-                    {
-                        "id": record.id,
-                        "content": record.content,
-                        "domain": record.domain,
-                        "similarity": similarity,
-                        "created_at": record.created_at.isoformat(),
-                    }
+                rows = (
+                    self.session.query(
+                        EmbeddingRecord.id,
+                        EmbeddingRecord.content,
+                        EmbeddingRecord.domain,
+                        EmbeddingRecord.created_at,
+                        EmbeddingRecord.embedding_vector,
+                    )
+                    .filter(
+                        EmbeddingRecord.model_name == self.config.embedding_model_name
+                    )
+                    .all()
                 )
+            except Exception:
+                self._index_loading = False
+                raise
+            # Lo pendiente hasta aquí ya está en la consulta
+            self._index_pending = []
+
+        vectors, records = [], []
+        for record_id, content, domain, created_at, vector_json in rows:
+            try:
+                vectors.append(np.asarray(json.loads(vector_json), dtype=np.float32))
             except Exception as e:
-                logger.error(f"Error calculando similitud: {e}")
+                logger.error(f"Error cargando embedding {record_id}: {e}")
                 continue
+            records.append(
+                {
+                    "id": record_id,
+                    "content": content,
+                    "domain": domain,
+                    "created_at": created_at.isoformat() if created_at else None,
+                }
+            )
 
-        # Ordenar por similitud y retornar top_k
-        similarities.sort(key=lambda x: x["similarity"], reverse=True)
-        return similarities[:top_k]
+        # Las filas guardadas desde la consulta quedan en _index_pending y se
+        # incorporan en la siguiente búsqueda
+        self._index_records = []
+        self._index_ids = set()
+        self._index_matrix = None
+        self._index_domains = None
+        self._append_to_index(vectors, records)
+        with self._db_lock:
+            self._index_loaded = True
+            self._index_loading = False
+        logger.info(f"📚 Índice de embeddings cargado: {len(records)} registros")
+
+    def _append_to_index(self, vectors: List[np.ndarray], records: List[Dict]):
+        """Agregar vectores (normalizados) y sus metadatos al índice"""
+        if not vectors:
+            return
+
+        dim = (
+            self._index_matrix.shape[1]
+            if self._index_matrix is not None
+            else vectors[0].shape[0]
+        )
+        # Las filas ya indexadas (guardadas durante la carga) no se repiten
+        keep = [
+            i
+            for i, vector in enumerate(vectors)
+            if vector.shape[0] == dim and records[i]["id"] not in self._index_ids
+        ]
+        if not keep:
+            return
+
+        matrix = np.vstack([vectors[i] for i in keep]).astype(np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        matrix /= np.where(norms == 0, 1, norms)
+        new_records = [records[i] for i in keep]
+        new_domains = np.array([record["domain"] for record in new_records], dtype=object)
+
+        if self._index_matrix is None:
+            self._index_matrix = matrix
+            self._index_domains = new_domains
+        else:
+            self._index_matrix = np.vstack([self._index_matrix, matrix])
+            self._index_domains = np.concatenate([self._index_domains, new_domains])
+        self._index_records.extend(new_records)
+        self._index_ids.update(record["id"] for record in new_records)
+
+    def _merge_pending_index(self):
+        """Incorporar al índice los embeddings guardados desde la última búsqueda"""
+        if not self._index_loaded or not self._index_pending:
+            return
+        with self._db_lock:
+            pending, self._index_pending = self._index_pending, []
+        self._append_to_index(
+            [vector for vector, _ in pending], [record for _, record in pending]
+        )
 
     def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calcular similitud coseno"""
@@ -519,40 +688,89 @@ class UnifiedEmbeddingSystem:
 
         return dot_product / (norm1 * norm2)
 
-    def _update_cache(self, key: str, embedding: np.ndarray):
-        """Actualizar caché de embeddings"""
-        # Implementar política LRU si el caché está lleno
-        if len(self.cache) >= self.config.cache_size:
-            # Eliminar entrada más antigua
-            oldest_key = min(
-                self.cache_timestamps.keys(), key=lambda k: self.cache_timestamps[k]
-            )
-            del self.cache[oldest_key]
-            del self.cache_timestamps[oldest_key]
+    def _get_cached(self, key: str) -> Optional[np.ndarray]:
+        """Leer del caché respetando el TTL y marcando la entrada como usada"""
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
 
-        self.cache[key] = embedding
-        self.cache_timestamps[key] = datetime.utcnow().timestamp()
+        embedding, timestamp = entry
+        if datetime.utcnow().timestamp() - timestamp >= self.config.cache_ttl:
+            self._evict(key)
+            return None
 
-    async def _save_embedding_record(
-        self, content: str, embedding: np.ndarray, domain: str
-    ):
-        """Guardar registro de embedding en base de datos"""
-        try:
-            record = EmbeddingRecord(
-                id=f"emb_{datetime.utcnow().timestamp()}",
-                content=content,
-                embedding_vector=json.dumps(embedding.tolist()),
-                domain=domain,
-                model_name=self.config.embedding_model_name,
-                metadata=json.dumps({"generated_at": datetime.utcnow().isoformat()}),
-            )
+        self.cache.move_to_end(key)
+        return embedding
 
-            self.session.add(record)
-            self.session.commit()
+    def _update_cache(self, key: str, embedding: np.ndarray):
+        """Actualizar caché de embeddings (LRU acotado por entradas y bytes)"""
+        if key in self.cache:
+            self._evict(key)
+
+        self.cache[key] = (embedding, datetime.utcnow().timestamp())
+        self.cache_bytes += embedding.nbytes
+
+        # Expulsar las entradas menos usadas recientemente
+        while self.cache and (
+            len(self.cache) > self.config.cache_size
+            or self.cache_bytes > self.config.cache_max_bytes
+        ):
+            self._evict(next(iter(self.cache)))
+
+    def _evict(self, key: str):
+        embedding, _ = self.cache.pop(key)
+        self.cache_bytes -= embedding.nbytes
+
+    async def _save_embedding_records(self, records: List[tuple]):
+        """Guardar registros (content, embedding, domain) en una inserción"""
+        now = datetime.utcnow()
+        rows = [
+            {
+                "id": f"emb_{uuid.uuid4().hex}",
+                "content": content,
+                "embedding_vector": json.dumps(embedding.tolist()),
+                "domain": domain,
+                "model_name": self.config.embedding_model_name,
+                "created_at": now,
+                "metadata_json": json.dumps({"generated_at": now.isoformat()}),
+            }
+            for content, embedding, domain in records
+        ]
+
+        loop = asyncio.get_running_loop()
+        saved = await loop.run_in_executor(None, self._bulk_insert, rows)
+        if not saved:
+            return
+
+        with self._db_lock:
+            # Sin índice cargado ni cargándose no hay nada que actualizar: la
+            # carga leerá la BD. Si la consulta de carga ya se hizo, puede que
+            # no incluya estas filas y se encolan (los repetidos se descartan)
+            if not self._index_loaded and not self._index_loading:
+                return
+            for (content, embedding, domain), row in zip(records, rows):
+                self._index_pending.append(
+                    (
+                        np.asarray(embedding, dtype=np.float32),
+                        {
+                            "id": row["id"],
+                            "content": content,
+                            "domain": domain,
+                            "created_at": now.isoformat(),
+                        },
+                    )
+                )
 
-        except Exception as e:
-            logger.error(f"Error guardando embedding: {e}")
-            self.session.rollback()
+    def _bulk_insert(self, rows: List[Dict[str, Any]]) -> bool:
+        with self._db_lock:
+            try:
+                self.session.bulk_insert_mappings(EmbeddingRecord, rows)
+                self.session.commit()
+                return True
+            except Exception as e:
+                logger.error(f"Error guardando embedding: {e}")
+                self.session.rollback()
+                return False
 
 
 # =============================================================================
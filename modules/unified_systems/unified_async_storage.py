@@ -0,0 +1,349 @@
+"""
+Capa de Almacenamiento Asíncrono para los Sistemas Unificados
+=============================================================
+
+Los sistemas unificados exponen APIs `async`, pero guardaban sus datos con
+llamadas síncronas a sqlite3/psycopg2 directamente dentro de las corrutinas,
+bloqueando el event loop del servidor en cada petición. Esta capa separa el
+acceso a la base de datos del event loop:
+
+- Escrituras: un único hilo escritor por base de datos con una cola. Las
+  sentencias pendientes se agrupan en una sola transacción (un commit por
+  lote) y cada una se aísla con un SAVEPOINT, de modo que un error solo
+  afecta a su propia sentencia.
+- Lecturas: un pool de hilos, cada uno con su propia conexión de lectura.
+- SQLite en modo WAL, para que las lecturas no esperen al escritor.
+
+`execute()` espera al commit (lectura de lo propio garantizada); `submit()`
+encola sin esperar, para logs y métricas donde la latencia importa más.
+"""
+
+import asyncio
+import logging
+import queue
+import sqlite3
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Marcador de cierre para la cola del escritor
+_STOP = object()
+
+
+class AsyncStorage:
+    """Base de datos con escritor dedicado y pool de lectura"""
+
+    def __init__(
+        self,
+        name: str,
+        connect: Callable[[], Any],
+        read_pool_size: int = 4,
+        batch_size: int = 200,
+        begin_statement: Optional[str] = None,
+    ):
+        """
+        Args:
+            name: nombre para logs (ruta o DSN sin credenciales)
+            connect: crea una conexión DB-API nueva (se llama por hilo)
+            read_pool_size: número de conexiones/hilos de lectura
+            batch_size: máximo de operaciones por transacción del escritor
+            begin_statement: sentencia que abre la transacción del lote
+                (SQLite en modo autocommit necesita un BEGIN explícito)
+        """
+        self.name = name
+        self._connect = connect
+        self.batch_size = batch_size
+        self._begin_statement = begin_statement
+
+        self._queue: "queue.Queue" = queue.Queue()
+        self._closed = False
+
+        self._read_local = threading.local()
+        self._read_connections: List[Any] = []
+        self._read_lock = threading.Lock()
+        self._read_executor = ThreadPoolExecutor(
+            max_workers=read_pool_size, thread_name_prefix="storage-read"
+        )
+
+        self.stats = {"batches": 0, "operations": 0, "errors": 0}
+
+        self._writer = threading.Thread(
+            target=self._writer_loop, name="storage-writer", daemon=True
+        )
+        self._writer.start()
+
+    # ==================== ESCRITURA ====================
+
+    def submit(self, sql: str, params: Sequence[Any] = ()) -> Future:
+        """Encolar una escritura sin esperar a que se confirme"""
+        return self.submit_call(lambda conn: _execute(conn, sql, params))
+
+    def submit_many(self, sql: str, rows: Sequence[Sequence[Any]]) -> Future:
+        """Encolar una escritura con varios juegos de parámetros"""
+        return self.submit_call(lambda conn: _execute_many(conn, sql, rows))
+
+    def submit_call(self, fn: Callable[[Any], Any]) -> Future:
+        """
+        Encolar una función `fn(conn)` que se ejecuta en el hilo escritor
+        dentro de la transacción del lote (varias sentencias atómicas)
+        """
+        future: Future = Future()
+        if self._closed:
+            future.set_exception(RuntimeError(f"Almacenamiento cerrado: {self.name}"))
+            return future
+        self._queue.put((fn, future))
+        return future
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Escribir y esperar al commit; devuelve el número de filas afectadas"""
+        return await asyncio.wrap_future(self.submit(sql, params))
+
+    async def execute_many(self, sql: str, rows: Sequence[Sequence[Any]]) -> int:
+        return await asyncio.wrap_future(self.submit_many(sql, rows))
+
+    async def transaction(self, fn: Callable[[Any], Any]) -> Any:
+        """Ejecutar `fn(conn)` de forma atómica en el escritor y esperar"""
+        return await asyncio.wrap_future(self.submit_call(fn))
+
+    def run_write(self, fn: Callable[[Any], Any], timeout: Optional[float] = None):
+        """Versión bloqueante de transaction() (inicialización, scripts)"""
+        return self.submit_call(fn).result(timeout)
+
+    def flush(self, timeout: Optional[float] = None):
+        """Esperar a que se confirmen todas las escrituras encoladas"""
+        if not self._closed:
+            self.submit_call(lambda conn: None).result(timeout)
+
+    def _writer_loop(self):
+        conn = None
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+
+            # Agrupar lo que haya en cola en la misma transacción
+            batch = [item]
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+
+            try:
+                if conn is None:
+                    conn = self._connect()
+                self._write_batch(conn, batch)
+            except Exception as e:
+                logger.error(f"❌ Error en lote de escritura ({self.name}): {e}")
+                self.stats["errors"] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                # Reabrir la conexión en el siguiente lote
+                conn = _close_quietly(conn)
+
+            if stop:
+                break
+
+        _close_quietly(conn)
+
+    def _write_batch(self, conn, batch: List[Tuple[Callable, Future]]):
+        cursor = conn.cursor()
+        try:
+            if self._begin_statement:
+                cursor.execute(self._begin_statement)
+
+            results = []
+            for index, (fn, future) in enumerate(batch):
+                savepoint = f"sp_{index}"
+                cursor.execute(f"SAVEPOINT {savepoint}")
+                try:
+                    results.append((future, fn(conn), None))
+                    cursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+                except Exception as e:
+                    cursor.execute(f"ROLLBACK TO SAVEPOINT {savepoint}")
+                    cursor.execute(f"RELEASE SAVEPOINT {savepoint}")
+                    results.append((future, None, e))
+                    self.stats["errors"] += 1
+                    # submit() no espera el Future: sin este log el error se pierde
+                    logger.error(f"❌ Error en escritura ({self.name}): {e}")
+
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            cursor.close()
+
+        self.stats["batches"] += 1
+        self.stats["operations"] += len(batch)
+
+        # Resolver después del commit: quien espera ya puede leer sus datos
+        for future, result, error in results:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    # ==================== LECTURA ====================
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()):
+        return await self.read(lambda conn: _fetch(conn, sql, params, one=True))
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[Any]:
+        return await self.read(lambda conn: _fetch(conn, sql, params, one=False))
+
+    async def read(self, fn: Callable[[Any], Any]) -> Any:
+        """Ejecutar `fn(conn)` con una conexión de lectura del pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._read_executor, self._run_read, fn
+        )
+
+    def read_sync(self, fn: Callable[[Any], Any]) -> Any:
+        """Versión bloqueante de read() para las APIs síncronas"""
+        return self._read_executor.submit(self._run_read, fn).result()
+
+    def _run_read(self, fn: Callable[[Any], Any]) -> Any:
+        conn = getattr(self._read_local, "conn", None)
+        if conn is None:
+            conn = self._connect()
+            self._read_local.conn = conn
+            with self._read_lock:
+                self._read_connections.append(conn)
+        try:
+            return fn(conn)
+        finally:
+            # No dejar transacciones de lectura abiertas (snapshot obsoleto)
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+
+    # ==================== CIERRE ====================
+
+    def close(self, timeout: float = 10.0):
+        """Confirmar lo pendiente y cerrar todas las conexiones"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._writer.join(timeout)
+        self._read_executor.shutdown(wait=True)
+        with self._read_lock:
+            for conn in self._read_connections:
+                _close_quietly(conn)
+            self._read_connections.clear()
+        logger.info(f"✅ Almacenamiento cerrado: {self.name}")
+
+
+def _execute(conn, sql: str, params: Sequence[Any]) -> int:
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def _execute_many(conn, sql: str, rows: Sequence[Sequence[Any]]) -> int:
+    cursor = conn.cursor()
+    try:
+        cursor.executemany(sql, rows)
+        return cursor.rowcount
+    finally:
+        cursor.close()
+
+
+def _fetch(conn, sql: str, params: Sequence[Any], one: bool):
+    cursor = conn.cursor()
+    try:
+        cursor.execute(sql, params)
+        return cursor.fetchone() if one else cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def _close_quietly(conn):
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+    return None
+
+
+# ==================== INSTANCIAS COMPARTIDAS ====================
+
+_storages: Dict[str, AsyncStorage] = {}
+_storages_lock = threading.Lock()
+
+
+def get_sqlite_storage(db_path: str, **kwargs) -> AsyncStorage:
+    """
+    Obtener el almacenamiento compartido de una base SQLite.
+
+    Todos los sistemas que usan la misma ruta comparten escritor y pool,
+    por lo que SQLite nunca ve dos escritores del mismo proceso compitiendo.
+    """
+    key = f"sqlite:{Path(db_path).resolve()}"
+    with _storages_lock:
+        storage = _storages.get(key)
+        if storage is None or storage._closed:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            _init_sqlite(db_path)
+            storage = AsyncStorage(
+                db_path,
+                lambda: _connect_sqlite(db_path),
+                begin_statement="BEGIN",
+                **kwargs,
+            )
+            _storages[key] = storage
+        return storage
+
+
+def get_postgres_storage(db_config: Dict[str, str], **kwargs) -> AsyncStorage:
+    """Obtener el almacenamiento compartido de una base PostgreSQL"""
+    import psycopg2
+
+    name = "postgres:{user}@{host}/{database}".format(
+        user=db_config.get("user", ""),
+        host=db_config.get("host", ""),
+        database=db_config.get("database", ""),
+    )
+    with _storages_lock:
+        storage = _storages.get(name)
+        if storage is None or storage._closed:
+            storage = AsyncStorage(
+                name, lambda: psycopg2.connect(**db_config), **kwargs
+            )
+            _storages[name] = storage
+        return storage
+
+
+def _init_sqlite(db_path: str):
+    """Activar WAL (persistente en el archivo) antes de abrir el pool"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+    finally:
+        conn.close()
+
+
+def _connect_sqlite(db_path: str) -> sqlite3.Connection:
+    # Autocommit a nivel de driver: las transacciones las abre el escritor
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    return conn
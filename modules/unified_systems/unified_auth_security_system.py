@@ -20,6 +20,7 @@ import base64
 import secrets
 import time
 import sqlite3
+import threading
 import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional, Union, Tuple
@@ -95,6 +96,14 @@ class UnifiedAuthSecuritySystem:
         self.algorithm = "HS256"
         self.token_expiration = 3600  # 1 hora
 
+        # Tokens revocados (jti) en memoria; se recargan de la BD cada
+        # `revocation_refresh_interval` segundos para ver las revocaciones
+        # hechas por otros procesos
+        self.revocation_refresh_interval = 30
+        self.revoked_token_ids: set = set()
+        self.revocations_loaded_at = 0.0
+        self._revocation_lock = threading.Lock()
+
         # Configuración 2FA
         self.totp_issuer = "NeuroFusion"
         self.backup_codes_count = 5
@@ -107,6 +116,7 @@ class UnifiedAuthSecuritySystem:
 
         # Inicializar componentes
         self._init_database()
+        self._refresh_revoked_tokens()
         self._init_crypto()
         self._init_monitoring()
 
@@ -268,12 +278,12 @@ class UnifiedAuthSecuritySystem:
     def validate_jwt_token(self, token: str) -> Dict[str, Any]:
         """Validar token JWT"""
         try:
+            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
+
             # Verificar si el token está revocado
-            if self._is_token_revoked(token):
+            if self._is_token_id_revoked(payload.get("jti")):
                 raise jwt.InvalidTokenError("Token revocado")
 
-            payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-
             # Verificar expiración
             if datetime.utcnow() > datetime.fromtimestamp(payload["exp"]):
                 raise jwt.ExpiredSignatureError("Token expirado")
@@ -306,6 +316,12 @@ class UnifiedAuthSecuritySystem:
                 conn.commit()
                 conn.close()
 
+                # Efectivo de inmediato en este proceso. Se añade tras el
+                # commit y bajo el lock, para que una recarga concurrente
+                # no pueda sustituir el conjunto por uno que no lo incluya
+                with self._revocation_lock:
+                    self.revoked_token_ids.add(token_id)
+
                 self._log_security_event(
                     payload["user_id"],
                     "jwt_token_revoked",
@@ -727,24 +743,52 @@ class UnifiedAuthSecuritySystem:
         """Verificar si token está revocado"""
         try:
             payload = jwt.decode(token, self.secret_key, algorithms=[self.algorithm])
-            token_id = payload.get("jti")
+            return self._is_token_id_revoked(payload.get("jti"))
 
-            if not token_id:
-                return True
+        except Exception as e:
+            logger.error(f"❌ Error verificando revocación: {e}")
+            return True
+
+    def _is_token_id_revoked(self, token_id: Optional[str]) -> bool:
+        """Consultar el conjunto de revocados en memoria (sin acceso a BD)"""
+        if not token_id:
+            return True
+
+        if (
+            time.monotonic() - self.revocations_loaded_at
+            >= self.revocation_refresh_interval
+        ):
+            self._refresh_revoked_tokens()
+
+        return token_id in self.revoked_token_ids
 
+    def _refresh_revoked_tokens(self):
+        """Recargar los jti revocados que aún no han expirado"""
+        # Solo un hilo recarga; el resto sigue usando el conjunto actual
+        if not self._revocation_lock.acquire(blocking=False):
+            return
+        try:
             conn = sqlite3.connect(str(self.db_path))
-            cursor = conn.cursor()
-            cursor.execute(
-                "SELECT is_revoked FROM jwt_tokens WHERE token_id = ?", (token_id,)
-            )
-            result = cursor.fetchone()
-            conn.close()
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT token_id FROM jwt_tokens
+                    WHERE is_revoked = TRUE AND expires_at > ?
+                """,
+                    (datetime.utcnow(),),
+                )
+                revoked = {row[0] for row in cursor.fetchall()}
+            finally:
+                conn.close()
 
-            return result and result[0]
+            self.revoked_token_ids = revoked
+            self.revocations_loaded_at = time.monotonic()
 
         except Exception as e:
-            logger.error(f"❌ Error verificando revocación: {e}")
-            return True
+            logger.error(f"❌ Error cargando tokens revocados: {e}")
+        finally:
+            self._revocation_lock.release()
 
     def _log_security_event(
         self,
@@ -6,12 +6,137 @@ Sistema de tokenización que maneja múltiples ramas de especialización
 """
 
 import logging
-from typing import Dict, List, Any, Optional, Tuple
-from collections import Counter
+from typing import Dict, List, Any, Optional, Tuple, Iterable
+from collections import Counter, deque
 import re
 
 logger = logging.getLogger(__name__)
 
+_NON_WORD_RE = re.compile(r"[^\w\s]")
+
+
+class BranchPatternMatcher:
+    """
+    Autómata Aho-Corasick sobre los términos de todas las ramas.
+
+    Recorre el texto una sola vez y devuelve las coincidencias de todos los
+    términos a la vez, en lugar de buscar cada término de cada rama por
+    separado. Los términos `whole_word` solo cuentan si no forman parte de
+    una palabra mayor (misma noción de palabra que `_tokenize_text`).
+    """
+
+    def __init__(self):
+        # Cada patrón: (término, rama, tipo, whole_word)
+        self.patterns: List[Tuple[str, str, str, bool]] = []
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._terminal: List[Tuple[int, ...]] = [()]
+        self._output: List[Tuple[int, ...]] = [()]
+        self._alphabet: set = set()
+        self._built = False
+
+    def add(self, term: str, branch: str, kind: str, whole_word: bool = False):
+        """Agregar un término (en minúsculas) asociado a una rama"""
+        term = term.lower()
+        if not term:
+            return
+
+        state = 0
+        for ch in term:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._terminal.append(())
+            state = next_state
+
+        self._terminal[state] += (len(self.patterns),)
+        self.patterns.append((term, branch, kind, whole_word))
+        self._alphabet.update(term)
+        self._built = False
+
+    def build(self):
+        """Calcular enlaces de fallo y salidas acumuladas (BFS)"""
+        self._output = list(self._terminal)
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            state = queue.popleft()
+            for ch, child in self._goto[state].items():
+                queue.append(child)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._output[child] += self._output[self._fail[child]]
+
+        self._built = True
+
+    def scan(self, text: str) -> Dict[int, int]:
+        """Ocurrencias de cada patrón en el texto: {id de patrón: conteo}"""
+        if not self._built:
+            self.build()
+
+        text = text.lower()
+        goto, fail, output = self._goto, self._fail, self._output
+        alphabet, patterns = self._alphabet, self.patterns
+        last = len(text) - 1
+        hits: Dict[int, int] = {}
+        state = 0
+
+        for i, ch in enumerate(text):
+            if ch not in alphabet:
+                state = 0
+                continue
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+
+            for pattern_id in output[state]:
+                term, _, _, whole_word = patterns[pattern_id]
+                if whole_word:
+                    start = i - len(term) + 1
+                    if start > 0 and _is_word_char(text[start - 1]):
+                        continue
+                    if i < last and _is_word_char(text[i + 1]):
+                        continue
+                hits[pattern_id] = hits.get(pattern_id, 0) + 1
+
+        return hits
+
+    def branch_hits(
+        self, text: str, kinds: Optional[Iterable[str]] = None
+    ) -> Counter:
+        """Número de ocurrencias por rama (opcionalmente solo de ciertos tipos)"""
+        kinds = set(kinds) if kinds is not None else None
+        counts = Counter()
+        for pattern_id, occurrences in self.scan(text).items():
+            _, branch, kind, _ = self.patterns[pattern_id]
+            if kinds is None or kind in kinds:
+                counts[branch] += occurrences
+        return counts
+
+    def branch_terms(
+        self, text: str, kinds: Optional[Iterable[str]] = None
+    ) -> Dict[str, set]:
+        """Términos distintos encontrados por rama"""
+        kinds = set(kinds) if kinds is not None else None
+        terms: Dict[str, set] = {}
+        for pattern_id in self.scan(text):
+            term, branch, kind, _ = self.patterns[pattern_id]
+            if kinds is None or kind in kinds:
+                terms.setdefault(branch, set()).add(term)
+        return terms
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
 
 class VocabBuilder20Branches:
     """Constructor de vocabulario para 20 ramas de especialización"""
@@ -19,6 +144,8 @@ class VocabBuilder20Branches:
     def __init__(self):
         self.branch_vocabs = {}
         self.unified_vocab = {}
+        # Se incrementa con cada cambio de vocabulario (invalida el autómata)
+        self.version = 0
         self.special_tokens = {
             "<PAD>": 0,
             "<UNK>": 1,
@@ -72,11 +199,12 @@ class VocabBuilder20Branches:
 
         # Actualizar contador
         self.branch_vocabs[branch].update(branch_tokens)
+        self.version += 1
 
     def _tokenize_text(self, text: str) -> List[str]:
         """Tokenización básica del texto"""
         # Limpiar texto
-        text = re.sub(r"[^\w\s]", " ", text.lower())
+        text = _NON_WORD_RE.sub(" ", text.lower())
 
         # Dividir en tokens
         tokens = text.split()
@@ -106,6 +234,21 @@ class VocabBuilder20Branches:
 class UnifiedBranchTokenizer:
     """Tokenizador unificado para múltiples ramas de especialización"""
 
+    # Palabras clave por rama usadas para sugerir ramas
+    BRANCH_KEYWORDS = {
+        "tech": ["technology", "software", "computer", "programming", "code"],
+        "science": ["science", "research", "experiment", "discovery", "theory"],
+        "health": ["health", "medical", "doctor", "patient", "treatment"],
+        "finance": ["money", "finance", "bank", "investment", "economy"],
+        "education": ["education", "learning", "school", "student", "teacher"],
+    }
+
+    # Términos aprendidos de cada rama que se incorporan al autómata
+    VOCAB_TERMS_PER_BRANCH = 200
+    # Un término presente en más ramas que esto no discrimina entre ellas
+    MAX_BRANCHES_PER_TERM = 3
+    MIN_VOCAB_TERM_LENGTH = 3
+
     def __init__(self, vocab_builder: Optional[VocabBuilder20Branches] = None):
         self.vocab_builder = vocab_builder or VocabBuilder20Branches()
         self.unified_vocab = self.vocab_builder.get_unified_vocab()
@@ -139,34 +282,45 @@ class UnifiedBranchTokenizer:
         # Tokens especiales
         self.special_tokens = self.vocab_builder.special_tokens
 
+        # Autómata de términos de ramas (se construye al primer uso)
+        self._matcher: Optional[BranchPatternMatcher] = None
+        self._matcher_version = -1
+
         logger.info(
             f"✅ Tokenizador unificado inicializado con {self.vocab_size} tokens"
         )
 
     def tokenize(self, text: str, branch: Optional[str] = None) -> List[int]:
         """Tokenizar texto"""
-        # Tokenización básica
-        tokens = self.vocab_builder._tokenize_text(text)
-
-        # Convertir a IDs
-        token_ids = []
-        for token in tokens:
-            if branch and branch in self.prefix_to_branch:
-                # Agregar prefijo de rama
-                branch_token = f"{branch}::{token}"
-                if branch_token in self.unified_vocab:
-                    token_ids.append(self.unified_vocab[branch_token])
-                else:
-                    token_ids.append(
-                        self.unified_vocab.get(token, self.unified_vocab["<UNK>"])
-                    )
-            else:
-                # Token sin rama específica
-                token_ids.append(
-                    self.unified_vocab.get(token, self.unified_vocab["<UNK>"])
-                )
+        return self.tokenize_batch([text], branch)[0]
+
+    def tokenize_batch(
+        self, texts: List[str], branch: Optional[str] = None
+    ) -> List[List[int]]:
+        """Tokenizar varios textos resolviendo rama y vocabulario una sola vez"""
+        vocab = self.unified_vocab
+        unk_id = vocab["<UNK>"]
+        tokenize_text = self.vocab_builder._tokenize_text
+
+        if not (branch and branch in self.prefix_to_branch):
+            return [
+                [vocab.get(token, unk_id) for token in tokenize_text(text)]
+                for text in texts
+            ]
+
+        # Con rama: se prefiere el token de la rama y si no, el token global
+        prefix = f"{branch}::"
+        batch = []
+        for text in texts:
+            token_ids = []
+            for token in tokenize_text(text):
+                token_id = vocab.get(prefix + token)
+                if token_id is None:
+                    token_id = vocab.get(token, unk_id)
+                token_ids.append(token_id)
+            batch.append(token_ids)
 
-        return token_ids
+        return batch
 
     def detokenize(self, token_ids: List[int]) -> str:
         """Convertir IDs de tokens de vuelta a texto"""
@@ -183,39 +337,70 @@ class UnifiedBranchTokenizer:
 
         return " ".join(tokens)
 
-    def detect_active_branches(self, text: str) -> List[str]:
-        """Detectar qué ramas están activas en el texto"""
-        active_branches = set()
+    @property
+    def matcher(self) -> BranchPatternMatcher:
+        """Autómata de términos, reconstruido si cambió el vocabulario"""
+        if self._matcher is None or self._matcher_version != self.vocab_builder.version:
+            self._matcher = self._build_matcher()
+            self._matcher_version = self.vocab_builder.version
+        return self._matcher
 
-        for branch in self.prefix_to_branch.keys():
-            if branch in text.lower():
-                active_branches.add(branch)
+    def _build_matcher(self) -> BranchPatternMatcher:
+        """Construir un único autómata con los términos de todas las ramas"""
+        matcher = BranchPatternMatcher()
 
-        return list(active_branches)
+        for prefix, branch in self.prefix_to_branch.items():
+            matcher.add(prefix, branch, "name")
 
-    def suggest_branches(self, text: str) -> List[Tuple[str, float]]:
-        """Sugerir ramas basándose en el contenido del texto"""
-        # Análisis simple basado en palabras clave
-        branch_keywords = {
-            "tech": ["technology", "software", "computer", "programming", "code"],
-            "science": ["science", "research", "experiment", "discovery", "theory"],
-            "health": ["health", "medical", "doctor", "patient", "treatment"],
-            "finance": ["money", "finance", "bank", "investment", "economy"],
-            "education": ["education", "learning", "school", "student", "teacher"],
-        }
+        for branch, keywords in self.BRANCH_KEYWORDS.items():
+            for keyword in keywords:
+                matcher.add(keyword, branch, "keyword")
+
+        # Términos aprendidos: los más frecuentes de cada rama que no sean
+        # comunes a muchas ramas
+        branch_terms: Dict[str, List[str]] = {}
+        term_branches: Counter = Counter()
+        for branch, branch_vocab in self.vocab_builder.branch_vocabs.items():
+            terms = [
+                token.split("::", 1)[1]
+                for token, _ in branch_vocab.most_common(self.VOCAB_TERMS_PER_BRANCH)
+            ]
+            terms = [t for t in terms if len(t) >= self.MIN_VOCAB_TERM_LENGTH]
+            branch_terms[branch] = terms
+            term_branches.update(terms)
 
-        text_lower = text.lower()
-        branch_scores = Counter()
+        for branch, terms in branch_terms.items():
+            for term in terms:
+                if term_branches[term] <= self.MAX_BRANCHES_PER_TERM:
+                    matcher.add(term, branch, "vocab", whole_word=True)
 
-        for branch, keywords in branch_keywords.items():
-            for keyword in keywords:
-                if keyword in text_lower:
-                    branch_scores[branch] += 1
+        matcher.build()
+        return matcher
+
+    def branch_hits(self, text: str) -> Dict[str, int]:
+        """Coincidencias por rama (nombres, palabras clave y vocabulario)"""
+        return dict(self.matcher.branch_hits(text))
 
+    def detect_active_branches(self, text: str) -> List[str]:
+        """Detectar qué ramas están activas en el texto"""
+        hits = self.matcher.branch_hits(text, kinds=("name",))
+        return [branch for branch in self.prefix_to_branch.values() if hits[branch]]
+
+    def suggest_branches(self, text: str) -> List[Tuple[str, float]]:
+        """Sugerir ramas basándose en el contenido del texto"""
         total_words = len(text.split())
         if total_words == 0:
             return []
 
+        # Términos distintos por rama (palabras clave y vocabulario aprendido)
+        branch_terms = self.matcher.branch_terms(text, kinds=("keyword", "vocab"))
+        branch_scores = Counter()
+        for branch in list(self.BRANCH_KEYWORDS) + list(
+            self.vocab_builder.branch_vocabs
+        ):
+            if branch in branch_terms and branch not in branch_scores:
+                branch_scores[branch] = len(branch_terms[branch])
+
         suggestions = []
         for branch, count in branch_scores.most_common():
             score = count / total_words
@@ -292,6 +477,7 @@ class UnifiedBranchTokenizer:
         tokenizer.special_tokens = config["special_tokens"]
         tokenizer.prefix_to_branch = config["prefix_to_branch"]
         tokenizer.vocab_size = len(tokenizer.unified_vocab)
+        tokenizer._matcher = None
 
         logger.info(f"📂 Tokenizador unificado cargado desde {path}")
         return tokenizer
@@ -23,6 +23,8 @@ from enum import Enum
 from pathlib import Path
 from typing import Dict, List, Optional, Any, Tuple, Union
 from collections import defaultdict, deque
+import heapq
+import math
 import numpy as np
 import torch
 import torch.nn as nn
@@ -145,6 +147,13 @@ class UnifiedConsciousnessMemorySystem:
         self.consciousness_history: List[ConsciousnessState] = []
         self.associations: Dict[str, List[str]] = defaultdict(list)
 
+        # Índice invertido para la recuperación de memorias:
+        # token -> {memory_id: frecuencia del token en la memoria}
+        self.memory_index: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.memory_terms: Dict[str, Tuple[str, ...]] = {}
+        self.memory_lengths: Dict[str, int] = {}
+        self.total_indexed_tokens = 0
+
         # Estado actual
         self.current_state = ConsciousnessState(
             level=self.config.consciousness_level,
@@ -625,6 +634,7 @@ class UnifiedConsciousnessMemorySystem:
 
             # Almacenar en memoria principal
             self.memories[memory_id] = memory_item
+            self._index_memory(memory_item)
 
             return {
                 "stored": True,
@@ -769,18 +779,106 @@ class UnifiedConsciousnessMemorySystem:
     async def _find_relevant_memories(
         self, input_text: str, context: Optional[Dict[str, Any]] = None
     ) -> List[MemoryItem]:
-        """Buscar memorias relevantes"""
-        relevant_memories = []
-
-        # Buscar por contenido similar
-        for memory in self.memories.values():
-            if self._is_memory_relevant(memory, input_text, context):
-                relevant_memories.append(memory)
+        """
+        Buscar memorias relevantes usando el índice invertido: solo se
+        evalúan las memorias que comparten algún token con la entrada y se
+        puntúan con BM25 (la importancia desempata)
+        """
+        input_words = set(self._tokenize_memory_text(input_text))
+        if not input_words:
+            return []
+
+        # Términos de la consulta por memoria candidata
+        matched_terms: Dict[str, int] = defaultdict(int)
+        for word in input_words:
+            for memory_id in self.memory_index.get(word, ()):
+                matched_terms[memory_id] += 1
+
+        # Mismo umbral de relevancia que _is_memory_relevant
+        min_overlap = len(input_words) * 0.1
+        candidates = [
+            memory_id
+            for memory_id, overlap in matched_terms.items()
+            if overlap > min_overlap
+        ]
 
-        # Ordenar por importancia y relevancia
-        relevant_memories.sort(key=lambda x: x.importance_score, reverse=True)
+        scores = self._bm25_scores(input_words, candidates)
+        top_ids = heapq.nlargest(
+            10,  # Limitar a 10 memorias más relevantes
+            candidates,
+            key=lambda memory_id: (
+                scores[memory_id],
+                self.memories[memory_id].importance_score,
+            ),
+        )
+        return [self.memories[memory_id] for memory_id in top_ids]
+
+    @staticmethod
+    def _tokenize_memory_text(text: str) -> List[str]:
+        """Tokenización usada por el índice de memorias"""
+        return text.lower().split()
+
+    def _index_memory(self, memory_item: MemoryItem):
+        """Agregar (o reindexar) una memoria en el índice invertido"""
+        if memory_item.id in self.memory_lengths:
+            self._unindex_memory(memory_item.id)
+
+        tokens = self._tokenize_memory_text(memory_item.content)
+        term_counts: Dict[str, int] = defaultdict(int)
+        for token in tokens:
+            term_counts[token] += 1
+
+        for token, count in term_counts.items():
+            self.memory_index[token][memory_item.id] = count
+
+        self.memory_terms[memory_item.id] = tuple(term_counts)
+        self.memory_lengths[memory_item.id] = len(tokens)
+        self.total_indexed_tokens += len(tokens)
+
+    def _unindex_memory(self, memory_id: str):
+        """Eliminar una memoria del índice invertido"""
+        length = self.memory_lengths.pop(memory_id, None)
+        if length is None:
+            return
+
+        self.total_indexed_tokens -= length
+        for token in self.memory_terms.pop(memory_id, ()):
+            postings = self.memory_index.get(token)
+            if postings and postings.pop(memory_id, None) is not None:
+                if not postings:
+                    del self.memory_index[token]
+
+    def _bm25_scores(
+        self,
+        query_terms: set,
+        memory_ids: List[str],
+        k1: float = 1.5,
+        b: float = 0.75,
+    ) -> Dict[str, float]:
+        """Puntuación BM25 de las memorias candidatas para la consulta"""
+        total_memories = len(self.memory_lengths)
+        if not total_memories or not memory_ids:
+            return {}
+
+        avg_length = self.total_indexed_tokens / total_memories or 1.0
+        candidates = set(memory_ids)
+        scores: Dict[str, float] = defaultdict(float)
+
+        for term in query_terms:
+            postings = self.memory_index.get(term)
+            if not postings:
+                continue
+            doc_freq = len(postings)
+            idf = math.log(1 + (total_memories - doc_freq + 0.5) / (doc_freq + 0.5))
+            for memory_id, term_freq in postings.items():
+                if memory_id not in candidates:
+                    continue
+                length_norm = 1 - b + b * self.memory_lengths[memory_id] / avg_length
+                scores[memory_id] += (
+                    idf * term_freq * (k1 + 1) / (term_freq + k1 * length_norm)
+                )
 
-        return relevant_memories[:10]  # Limitar a 10 memorias más relevantes
+        return scores
 
     def _is_memory_relevant(
         self,
@@ -15,7 +15,6 @@ Este módulo combina funcionalidades de:
 import logging
 import json
 import time
-import sqlite3
 import asyncio
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -29,6 +28,11 @@ import torch.nn as nn
 from sentence_transformers import SentenceTransformer
 import difflib
 
+try:
+    from .unified_async_storage import get_sqlite_storage
+except ImportError:
+    from unified_async_storage import get_sqlite_storage
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -148,18 +152,17 @@ class UnifiedGenerationResponseSystem:
     def _init_database(self):
         """Inicializar base de datos"""
         try:
-            # Crear directorio si no existe
-            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-            self.conn = sqlite3.connect(self.db_path)
-            self._create_tables()
+            # Escritor dedicado + pool de lectura (no bloquea el event loop)
+            self.storage = get_sqlite_storage(self.db_path)
+            self.storage.run_write(self._create_tables)
             logger.info("✅ Base de datos de generación y respuesta inicializada")
         except Exception as e:
             logger.error(f"Error inicializando base de datos: {e}")
             raise
 
-    def _create_tables(self):
+    def _create_tables(self, conn):
         """Crear tablas en base de datos"""
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
 
         # Tabla de generaciones
         cursor.execute(
@@ -242,7 +245,6 @@ class UnifiedGenerationResponseSystem:
             "CREATE INDEX IF NOT EXISTS idx_validation_level ON validations(validation_level)"
         )
 
-        self.conn.commit()
         cursor.close()
 
     def _init_generation_components(self):
@@ -766,9 +768,8 @@ class UnifiedGenerationResponseSystem:
     async def _save_generation_to_db(self, result: GenerationResult):
         """Guardar generación en base de datos"""
         try:
-            cursor = self.conn.cursor()
-
-            cursor.execute(
+            # Se encola sin esperar al commit: la respuesta no depende de ello
+            self.storage.submit(
                 """
                 INSERT INTO generations 
                 (id, prompt, content, generation_type, response_mode, quality_score, confidence,
@@ -790,17 +791,28 @@ class UnifiedGenerationResponseSystem:
                 ),
             )
 
-            self.conn.commit()
-            cursor.close()
-
         except Exception as e:
             logger.error(f"Error guardando generación: {e}")
 
     def get_system_stats(self) -> Dict[str, Any]:
         """Obtener estadísticas del sistema"""
         try:
-            cursor = self.conn.cursor()
+            return self.storage.read_sync(self._read_system_stats)
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas: {e}")
+            return {"error": str(e)}
 
+    async def get_system_stats_async(self) -> Dict[str, Any]:
+        """Obtener estadísticas del sistema sin bloquear el event loop"""
+        try:
+            return await self.storage.read(self._read_system_stats)
+        except Exception as e:
+            logger.error(f"Error obteniendo estadísticas: {e}")
+            return {"error": str(e)}
+
+    def _read_system_stats(self, conn) -> Dict[str, Any]:
+        cursor = conn.cursor()
+        try:
             # Estadísticas de generaciones
             cursor.execute("SELECT COUNT(*) FROM generations")
             total_generations = cursor.fetchone()[0]
@@ -821,42 +833,39 @@ class UnifiedGenerationResponseSystem:
             # Estadísticas de refinamientos
             cursor.execute("SELECT COUNT(*) FROM refinements")
             total_refinements = cursor.fetchone()[0]
-
+        finally:
             cursor.close()
 
-            return {
-                "generations": {
-                    "total": total_generations,
-                    "average_quality": round(avg_quality, 3),
-                    "average_confidence": round(avg_confidence, 3),
-                },
-                "validations": {
-                    "total": total_validations,
-                    "valid_count": valid_count,
-                    "success_rate": round(valid_count / max(total_validations, 1), 3),
-                },
-                "refinements": {"total": total_refinements},
-                "performance": {
-                    "generation_types": list(
-                        set(
-                            gen.generation_type.value for gen in self.generation_history
-                        )
-                    ),
-                    "response_modes": list(
-                        set(gen.response_mode.value for gen in self.generation_history)
-                    ),
-                },
-            }
-
-        except Exception as e:
-            logger.error(f"Error obteniendo estadísticas: {e}")
-            return {"error": str(e)}
+        return {
+            "generations": {
+                "total": total_generations,
+                "average_quality": round(avg_quality, 3),
+                "average_confidence": round(avg_confidence, 3),
+            },
+            "validations": {
+                "total": total_validations,
+                "valid_count": valid_count,
+                "success_rate": round(valid_count / max(total_validations, 1), 3),
+            },
+            "refinements": {"total": total_refinements},
+            "performance": {
+                "generation_types": list(
+                    set(
+                        gen.generation_type.value for gen in self.generation_history
+                    )
+                ),
+                "response_modes": list(
+                    set(gen.response_mode.value for gen in self.generation_history)
+                ),
+            },
+        }
 
     def close(self):
         """Cerrar sistema"""
         try:
-            if hasattr(self, "conn"):
-                self.conn.close()
+            if hasattr(self, "storage"):
+                # Confirma las escrituras encoladas antes de cerrar
+                self.storage.close()
             logger.info("✅ Sistema de generación y respuesta cerrado")
         except Exception as e:
             logger.error(f"Error cerrando sistema: {e}")
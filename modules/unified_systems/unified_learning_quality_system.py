@@ -14,7 +14,6 @@ Este módulo combina funcionalidades de:
 import logging
 import json
 import time
-import sqlite3
 import asyncio
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
@@ -28,6 +27,11 @@ import torch.nn as nn
 from sklearn.metrics.pairwise import cosine_similarity
 import difflib
 
+try:
+    from .unified_async_storage import get_sqlite_storage
+except ImportError:
+    from unified_async_storage import get_sqlite_storage
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -114,6 +118,124 @@ class QualityEvaluation:
     processing_time: float = 0.0
 
 
+# Léxicos usados por las métricas (búsqueda por subcadena, en minúsculas)
+TOXIC_WORDS = (
+    "odio",
+    "muerte",
+    "matar",
+    "suicidio",
+    "violencia",
+    "sangre",
+    "dolor",
+    "tortura",
+    "sufrimiento",
+    "maldición",
+    "diablo",
+    "infierno",
+    "demonio",
+    "asesinato",
+    "crimen",
+    "robo",
+)
+EVIDENCE_MARKERS = ("según", "estudios", "investigación", "datos")
+CAUSAL_MARKERS = ("porque", "debido", "ya que", "puesto que")
+
+# Pesos del score general; toxicidad y alucinación penalizan
+QUALITY_WEIGHTS = {
+    "similarity": 0.25,
+    "coherence": 0.20,
+    "relevance": 0.20,
+    "accuracy": 0.15,
+    "completeness": 0.10,
+    "toxicity": 0.05,
+    "hallucination": 0.05,
+}
+PENALTY_METRICS = ("toxicity", "hallucination")
+
+
+class TextAnalysis:
+    """
+    Análisis de un texto calculado una sola vez y compartido por todas las
+    métricas: normalización, conjunto de palabras, puntos y léxicos
+    """
+
+    __slots__ = (
+        "text",
+        "normalized",
+        "words",
+        "length",
+        "word_count",
+        "period_count",
+        "toxic_hits",
+        "has_evidence",
+        "has_causal",
+    )
+
+    def __init__(self, text: Optional[str]):
+        text = text or ""
+        lower = text.lower()
+        self.text = text
+        self.normalized = lower.strip()
+        self.words = frozenset(lower.split())
+        self.length = len(text)
+        self.word_count = len(text.split())
+        self.period_count = text.count(".")
+        self.toxic_hits = sum(1 for word in TOXIC_WORDS if word in lower)
+        self.has_evidence = any(word in lower for word in EVIDENCE_MARKERS)
+        self.has_causal = any(word in lower for word in CAUSAL_MARKERS)
+
+    @classmethod
+    def of(cls, text: Union[str, "TextAnalysis", None]) -> "TextAnalysis":
+        """Reutilizar un análisis existente o analizar el texto"""
+        return text if isinstance(text, TextAnalysis) else cls(text)
+
+
+# Métricas que solo dependen de rasgos del propio texto. Aceptan escalares o
+# arrays de NumPy, de modo que la evaluación individual y la de lotes
+# comparten la misma fórmula.
+
+
+def _coherence_scores(length, period_count):
+    length = np.asarray(length, dtype=float)
+    scores = np.minimum(length / 100, 1.0) * 0.8 + 0.2
+    # Sin puntos el texto es una sola frase
+    scores = np.where(np.asarray(period_count) < 1, 0.5, scores)
+    return np.where(length == 0, 0.0, scores)
+
+
+def _accuracy_scores(length, period_count, has_evidence):
+    length = np.asarray(length, dtype=float)
+    scores = (
+        0.5
+        + 0.2 * (length > 50)
+        + 0.2 * np.asarray(has_evidence, dtype=float)
+        + 0.1 * (np.asarray(period_count) > 2)
+    )
+    return np.where(length == 0, 0.0, np.minimum(scores, 1.0))
+
+
+def _toxicity_scores(toxic_hits, word_count):
+    word_count = np.asarray(word_count, dtype=float)
+    toxicity = np.divide(
+        np.asarray(toxic_hits, dtype=float) * 10,
+        word_count,
+        out=np.zeros_like(word_count),
+        where=word_count > 0,
+    )
+    return np.minimum(toxicity, 1.0)
+
+
+def _completeness_scores(length, period_count, has_causal):
+    length = np.asarray(length, dtype=float)
+    scores = (
+        0.3
+        + 0.3 * (length > 100)
+        + 0.2 * (np.asarray(period_count) > 3)
+        + 0.2 * np.asarray(has_causal, dtype=float)
+    )
+    return np.where(length == 0, 0.0, np.minimum(scores, 1.0))
+
+
 class UnifiedLearningQualitySystem:
     """Sistema unificado de aprendizaje y evaluación de calidad"""
 
@@ -149,24 +271,17 @@ class UnifiedLearningQualitySystem:
     def _init_database(self):
         """Inicializar base de datos"""
         try:
-            self.conn = sqlite3.connect(self.db_path)
-            self._create_tables()
+            # Escritor dedicado + pool de lectura (crea el directorio si falta)
+            self.storage = get_sqlite_storage(self.db_path)
+            self.storage.run_write(self._create_tables)
             logger.info("✅ Base de datos de aprendizaje y calidad inicializada")
         except Exception as e:
-            logger.error(f"Error inicializando base de datos: {e}")
-            # Crear directorio si no existe
-            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-            try:
-                self.conn = sqlite3.connect(self.db_path)
-                self._create_tables()
-                logger.info("✅ Base de datos creada exitosamente")
-            except Exception as e2:
-                logger.error(f"Error crítico creando base de datos: {e2}")
-                raise
-
-    def _create_tables(self):
+            logger.error(f"Error crítico creando base de datos: {e}")
+            raise
+
+    def _create_tables(self, conn):
         """Crear tablas en base de datos"""
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
 
         # Tabla de experiencias de aprendizaje
         cursor.execute(
@@ -249,7 +364,6 @@ class UnifiedLearningQualitySystem:
             "CREATE INDEX IF NOT EXISTS idx_eval_score ON quality_evaluations(overall_score)"
         )
 
-        self.conn.commit()
         cursor.close()
 
     def _init_learning_components(self):
@@ -357,27 +471,32 @@ class UnifiedLearningQualitySystem:
         start_time = time.time()
 
         try:
-            # Calcular métricas de calidad
+            # Analizar cada texto una vez; todas las métricas lo comparten
+            response_analysis = TextAnalysis(response)
             metrics = {}
             issues = []
 
             for metric_type, metric_func in self.quality_metrics.items():
                 try:
-                    if metric_type == QualityMetric.SIMILARITY and reference:
-                        score = metric_func(response, reference)
-                    elif metric_type == QualityMetric.HALLUCINATION and context:
-                        score = metric_func(response, context)
+                    if metric_type == QualityMetric.SIMILARITY:
+                        if not reference:
+                            metrics[metric_type.value] = 0.0
+                            continue
+                        score = metric_func(response_analysis, reference)
+                    elif metric_type == QualityMetric.HALLUCINATION:
+                        if not context:
+                            metrics[metric_type.value] = 0.0
+                            continue
+                        score = metric_func(response_analysis, context)
                     elif metric_type == QualityMetric.RELEVANCE:
-                        score = metric_func(query, response)
+                        score = metric_func(query, response_analysis)
                     else:
-                        score = metric_func(response)
+                        score = metric_func(response_analysis)
 
                     metrics[metric_type.value] = score
 
                     # Verificar umbrales
-                    threshold = getattr(
-                        self.quality_config, f"{metric_type.value}_threshold", 0.5
-                    )
+                    threshold = self._metric_threshold(metric_type.value)
                     if score < threshold:
                         issues.append(f"{metric_type.value} baja: {score:.3f}")
 
@@ -425,6 +544,78 @@ class UnifiedLearningQualitySystem:
                 issues=[f"Error en evaluación: {str(e)}"],
             )
 
+    async def evaluate_quality_batch(
+        self,
+        queries: List[str],
+        responses: List[str],
+        references: Optional[List[Optional[str]]] = None,
+        contexts: Optional[List[Optional[str]]] = None,
+        domain: str = "general",
+    ) -> List[QualityEvaluation]:
+        """
+        Evaluar la calidad de muchas respuestas a la vez.
+
+        Mismas métricas que evaluate_quality, pero vectorizadas sobre el lote
+        (ver _score_batch) y fuera del event loop, con una sola escritura
+        para todas las evaluaciones. Permite evaluar cada respuesta de
+        producción en lugar de una muestra.
+        """
+        if len(queries) != len(responses):
+            raise ValueError("queries y responses deben tener la misma longitud")
+
+        count = len(responses)
+        if count == 0:
+            return []
+        references = references or [None] * count
+        contexts = contexts or [None] * count
+
+        start_time = time.time()
+
+        try:
+            loop = asyncio.get_running_loop()
+            metrics, overall_scores, issues = await loop.run_in_executor(
+                None, self._score_batch, queries, responses, references, contexts
+            )
+        except Exception as e:
+            logger.error(f"Error en evaluación de calidad por lotes: {e}")
+            return [
+                QualityEvaluation(
+                    query=query,
+                    response=response,
+                    overall_score=0.0,
+                    issues=[f"Error en evaluación: {str(e)}"],
+                )
+                for query, response in zip(queries, responses)
+            ]
+
+        processing_time = (time.time() - start_time) / count
+        evaluations = [
+            QualityEvaluation(
+                query=queries[i],
+                response=responses[i],
+                reference=references[i],
+                context=contexts[i],
+                domain=domain,
+                metrics=metrics[i],
+                overall_score=overall_scores[i],
+                issues=issues[i],
+                processing_time=processing_time,
+            )
+            for i in range(count)
+        ]
+
+        self._save_quality_evaluations(evaluations)
+
+        self.quality_history.extend(evaluations)
+        self.learning_stats["total_evaluations"] += count
+
+        self._log_performance_metrics(
+            "evaluation_time", [processing_time] * count, domain
+        )
+        self._log_performance_metrics("quality_score", overall_scores, domain)
+
+        return evaluations
+
     async def _continuous_learning(
         self, experience: LearningExperience
     ) -> Dict[str, Any]:
@@ -513,190 +704,99 @@ class UnifiedLearningQualitySystem:
             "mode": "reinforcement",
         }
 
-    def _calculate_similarity(self, response: str, reference: str) -> float:
+    def _calculate_similarity(
+        self,
+        response: Union[str, TextAnalysis],
+        reference: Union[str, TextAnalysis],
+    ) -> float:
         """Calcular similitud entre respuesta y referencia"""
-        if not response or not reference:
+        response, reference = TextAnalysis.of(response), TextAnalysis.of(reference)
+        if not response.text or not reference.text:
             return 0.0
 
-        # Normalizar textos
-        response_norm = response.lower().strip()
-        reference_norm = reference.lower().strip()
-
         # Similitud de secuencia usando difflib
         sequence_similarity = difflib.SequenceMatcher(
-            None, response_norm, reference_norm
+            None, response.normalized, reference.normalized
         ).ratio()
 
         # Similitud de palabras clave
-        response_words = set(response_norm.split())
-        reference_words = set(reference_norm.split())
-
-        if not reference_words:
+        if not reference.words:
             return sequence_similarity
 
-        keyword_overlap = len(response_words.intersection(reference_words)) / len(
-            reference_words
-        )
+        keyword_overlap = len(response.words & reference.words) / len(reference.words)
 
         # Combinar métricas (70% secuencia, 30% palabras clave)
         combined_similarity = sequence_similarity * 0.7 + keyword_overlap * 0.3
 
         return min(combined_similarity, 1.0)
 
-    def _calculate_coherence(self, text: str) -> float:
-        """Calcular coherencia del texto"""
-        if not text:
-            return 0.0
-
-        # Métricas simples de coherencia
-        sentences = text.split(".")
-        if len(sentences) < 2:
-            return 0.5
-
-        # Simular coherencia basada en longitud y estructura
-        coherence = min(len(text) / 100, 1.0) * 0.8 + 0.2
-        return coherence
+    def _calculate_coherence(self, text: Union[str, TextAnalysis]) -> float:
+        """Calcular coherencia del texto (longitud y estructura)"""
+        analysis = TextAnalysis.of(text)
+        return float(_coherence_scores(analysis.length, analysis.period_count))
 
-    def _calculate_relevance(self, query: str, response: str) -> float:
+    def _calculate_relevance(
+        self, query: Union[str, TextAnalysis], response: Union[str, TextAnalysis]
+    ) -> float:
         """Calcular relevancia de la respuesta respecto a la consulta"""
-        if not query or not response:
+        query, response = TextAnalysis.of(query), TextAnalysis.of(response)
+        if not query.text or not response.text or not query.words:
             return 0.0
 
-        # Palabras clave de la consulta
-        query_words = set(query.lower().split())
-        response_words = set(response.lower().split())
-
-        if not query_words:
-            return 0.0
-
-        # Calcular overlap
-        overlap = len(query_words.intersection(response_words))
-        relevance = overlap / len(query_words)
-
+        # Overlap de palabras clave de la consulta
+        relevance = len(query.words & response.words) / len(query.words)
         return min(relevance, 1.0)
 
-    def _calculate_accuracy(self, text: str) -> float:
-        """Calcular precisión del texto"""
-        if not text:
-            return 0.0
-
-        # Simular precisión basada en características del texto
-        accuracy = 0.5  # Base
-
-        # Factores que mejoran la precisión
-        if len(text) > 50:
-            accuracy += 0.2
-        if any(
-            word in text.lower()
-            for word in ["según", "estudios", "investigación", "datos"]
-        ):
-            accuracy += 0.2
-        if text.count(".") > 2:
-            accuracy += 0.1
-
-        return min(accuracy, 1.0)
-
-    def _calculate_toxicity(self, text: str) -> float:
-        """Calcular toxicidad del texto"""
-        if not text:
-            return 0.0
-
-        # Lista de palabras tóxicas
-        toxic_words = [
-            "odio",
-            "muerte",
-            "matar",
-            "suicidio",
-            "violencia",
-            "sangre",
-            "dolor",
-            "tortura",
-            "sufrimiento",
-            "maldición",
-            "diablo",
-            "infierno",
-            "demonio",
-            "asesinato",
-            "crimen",
-            "robo",
-        ]
-
-        text_lower = text.lower()
-        toxic_count = sum(1 for word in toxic_words if word in text_lower)
-
-        # Normalizar por longitud
-        word_count = len(text.split())
-        if word_count == 0:
-            return 0.0
+    def _calculate_accuracy(self, text: Union[str, TextAnalysis]) -> float:
+        """Calcular precisión del texto (longitud, fuentes citadas, frases)"""
+        analysis = TextAnalysis.of(text)
+        return float(
+            _accuracy_scores(
+                analysis.length, analysis.period_count, analysis.has_evidence
+            )
+        )
 
-        toxicity = (toxic_count * 10) / word_count
-        return min(toxicity, 1.0)
+    def _calculate_toxicity(self, text: Union[str, TextAnalysis]) -> float:
+        """Calcular toxicidad del texto normalizada por número de palabras"""
+        analysis = TextAnalysis.of(text)
+        return float(_toxicity_scores(analysis.toxic_hits, analysis.word_count))
 
-    def _calculate_hallucination(self, response: str, context: str) -> float:
+    def _calculate_hallucination(
+        self, response: Union[str, TextAnalysis], context: Union[str, TextAnalysis]
+    ) -> float:
         """Calcular nivel de alucinación"""
-        if not response or not context:
+        response, context = TextAnalysis.of(response), TextAnalysis.of(context)
+        if not response.text or not context.text or not response.words:
             return 0.0
 
-        # Simular detección de alucinación
+        # Simular detección de alucinación: palabras ausentes del contexto
         # En una implementación real, usar modelos más sofisticados
-        response_words = set(response.lower().split())
-        context_words = set(context.lower().split())
-
-        if not response_words:
-            return 0.0
-
-        # Calcular palabras no presentes en el contexto
-        hallucinated_words = response_words - context_words
-        hallucination_score = len(hallucinated_words) / len(response_words)
-
-        return min(hallucination_score, 1.0)
-
-    def _calculate_completeness(self, text: str) -> float:
-        """Calcular completitud del texto"""
-        if not text:
-            return 0.0
-
-        # Métricas de completitud
-        completeness = 0.3  # Base
-
-        # Factores que mejoran la completitud
-        if len(text) > 100:
-            completeness += 0.3
-        if text.count(".") > 3:
-            completeness += 0.2
-        if any(
-            word in text.lower()
-            for word in ["porque", "debido", "ya que", "puesto que"]
-        ):
-            completeness += 0.2
-
-        return min(completeness, 1.0)
+        hallucinated_words = response.words - context.words
+        return min(len(hallucinated_words) / len(response.words), 1.0)
+
+    def _calculate_completeness(self, text: Union[str, TextAnalysis]) -> float:
+        """Calcular completitud del texto (longitud, frases, conectores causales)"""
+        analysis = TextAnalysis.of(text)
+        return float(
+            _completeness_scores(
+                analysis.length, analysis.period_count, analysis.has_causal
+            )
+        )
 
     def _calculate_overall_quality_score(self, metrics: Dict[str, float]) -> float:
         """Calcular score de calidad general"""
         if not metrics:
             return 0.0
 
-        # Pesos para diferentes métricas
-        weights = {
-            "similarity": 0.25,
-            "coherence": 0.20,
-            "relevance": 0.20,
-            "accuracy": 0.15,
-            "completeness": 0.10,
-            "toxicity": 0.05,  # Penalización
-            "hallucination": 0.05,  # Penalización
-        }
-
         total_score = 0.0
         total_weight = 0.0
 
         for metric_name, score in metrics.items():
-            if metric_name in weights:
-                weight = weights[metric_name]
+            if metric_name in QUALITY_WEIGHTS:
+                weight = QUALITY_WEIGHTS[metric_name]
 
                 # Para métricas de penalización, invertir el score
-                if metric_name in ["toxicity", "hallucination"]:
+                if metric_name in PENALTY_METRICS:
                     adjusted_score = 1.0 - score
                 else:
                     adjusted_score = score
@@ -706,6 +806,113 @@ class UnifiedLearningQualitySystem:
 
         return total_score / total_weight if total_weight > 0 else 0.0
 
+    def _metric_threshold(self, metric_name: str) -> float:
+        return getattr(self.quality_config, f"{metric_name}_threshold", 0.5)
+
+    def _score_batch(
+        self,
+        queries: List[str],
+        responses: List[str],
+        references: List[Optional[str]],
+        contexts: List[Optional[str]],
+    ) -> Tuple[List[Dict[str, float]], List[float], List[List[str]]]:
+        """
+        Calcular métricas, score general e incidencias de un lote.
+
+        Cada texto distinto se analiza una vez (consultas y contextos suelen
+        repetirse); las métricas de rasgos y el score general se calculan
+        sobre arrays y solo las métricas de pares recorren el lote.
+        """
+        analyses: Dict[str, TextAnalysis] = {}
+
+        def analyze(text: Optional[str]) -> TextAnalysis:
+            key = text or ""
+            analysis = analyses.get(key)
+            if analysis is None:
+                analysis = analyses[key] = TextAnalysis(key)
+            return analysis
+
+        query_analyses = [analyze(q) for q in queries]
+        response_analyses = [analyze(r) for r in responses]
+        n = len(response_analyses)
+
+        def feature(name: str, dtype=float) -> np.ndarray:
+            return np.fromiter(
+                (getattr(a, name) for a in response_analyses), dtype=dtype, count=n
+            )
+
+        length = feature("length")
+        period_count = feature("period_count")
+
+        has_reference = np.fromiter((bool(r) for r in references), bool, count=n)
+        has_context = np.fromiter((bool(c) for c in contexts), bool, count=n)
+
+        scores = {
+            QualityMetric.SIMILARITY.value: np.fromiter(
+                (
+                    self._calculate_similarity(response, analyze(reference))
+                    if reference
+                    else 0.0
+                    for response, reference in zip(response_analyses, references)
+                ),
+                float,
+                count=n,
+            ),
+            QualityMetric.COHERENCE.value: _coherence_scores(length, period_count),
+            QualityMetric.RELEVANCE.value: np.fromiter(
+                (
+                    self._calculate_relevance(query, response)
+                    for query, response in zip(query_analyses, response_analyses)
+                ),
+                float,
+                count=n,
+            ),
+            QualityMetric.ACCURACY.value: _accuracy_scores(
+                length, period_count, feature("has_evidence", bool)
+            ),
+            QualityMetric.TOXICITY.value: _toxicity_scores(
+                feature("toxic_hits"), feature("word_count")
+            ),
+            QualityMetric.HALLUCINATION.value: np.fromiter(
+                (
+                    self._calculate_hallucination(response, analyze(context))
+                    if context
+                    else 0.0
+                    for response, context in zip(response_analyses, contexts)
+                ),
+                float,
+                count=n,
+            ),
+            QualityMetric.COMPLETENESS.value: _completeness_scores(
+                length, period_count, feature("has_causal", bool)
+            ),
+        }
+
+        # Score general: media ponderada con las penalizaciones invertidas
+        overall = np.zeros(n)
+        for name, weight in QUALITY_WEIGHTS.items():
+            values = scores[name]
+            overall += weight * (1.0 - values if name in PENALTY_METRICS else values)
+        overall /= sum(QUALITY_WEIGHTS.values())
+
+        # Incidencias por umbral (sin referencia/contexto no se evalúa)
+        issues: List[List[str]] = [[] for _ in range(n)]
+        measured = {
+            QualityMetric.SIMILARITY.value: has_reference,
+            QualityMetric.HALLUCINATION.value: has_context,
+        }
+        for name, values in scores.items():
+            below = values < self._metric_threshold(name)
+            if name in measured:
+                below &= measured[name]
+            for index in np.flatnonzero(below):
+                issues[index].append(f"{name} baja: {values[index]:.3f}")
+
+        names = list(scores)
+        matrix = np.column_stack([scores[name] for name in names]).tolist()
+        metrics = [dict(zip(names, row)) for row in matrix]
+        return metrics, overall.tolist(), issues
+
     def _calculate_learning_performance(
         self, experience: LearningExperience, learning_result: Dict[str, Any]
     ) -> Dict[str, float]:
@@ -751,9 +958,7 @@ class UnifiedLearningQualitySystem:
     async def _save_learning_experience(self, experience: LearningExperience):
         """Guardar experiencia de aprendizaje en base de datos"""
         try:
-            cursor = self.conn.cursor()
-
-            cursor.execute(
+            self.storage.submit(
                 """
                 INSERT INTO learning_experiences 
                 (id, input_data, target_data, domain, quality_score, learning_mode, timestamp, metadata, performance_metrics)
@@ -772,40 +977,39 @@ class UnifiedLearningQualitySystem:
                 ),
             )
 
-            self.conn.commit()
-            cursor.close()
-
         except Exception as e:
             logger.error(f"Error guardando experiencia de aprendizaje: {e}")
 
     async def _save_quality_evaluation(self, evaluation: QualityEvaluation):
         """Guardar evaluación de calidad en base de datos"""
-        try:
-            cursor = self.conn.cursor()
+        self._save_quality_evaluations([evaluation])
 
-            cursor.execute(
+    def _save_quality_evaluations(self, evaluations: List[QualityEvaluation]):
+        """Encolar varias evaluaciones de calidad en una sola escritura"""
+        try:
+            self.storage.submit_many(
                 """
                 INSERT INTO quality_evaluations 
                 (query, response, reference, context, domain, metrics, overall_score, issues, timestamp, processing_time)
                 VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """,
-                (
-                    evaluation.query,
-                    evaluation.response,
-                    evaluation.reference,
-                    evaluation.context,
-                    evaluation.domain,
-                    json.dumps(evaluation.metrics),
-                    evaluation.overall_score,
-                    json.dumps(evaluation.issues),
-                    evaluation.timestamp.isoformat(),
-                    evaluation.processing_time,
-                ),
+                [
+                    (
+                        evaluation.query,
+                        evaluation.response,
+                        evaluation.reference,
+                        evaluation.context,
+                        evaluation.domain,
+                        json.dumps(evaluation.metrics),
+                        evaluation.overall_score,
+                        json.dumps(evaluation.issues),
+                        evaluation.timestamp.isoformat(),
+                        evaluation.processing_time,
+                    )
+                    for evaluation in evaluations
+                ],
             )
 
-            self.conn.commit()
-            cursor.close()
-
         except Exception as e:
             logger.error(f"Error guardando evaluación de calidad: {e}")
 
@@ -814,9 +1018,8 @@ class UnifiedLearningQualitySystem:
     ):
         """Registrar métrica de rendimiento"""
         try:
-            cursor = self.conn.cursor()
-
-            cursor.execute(
+            # Se encola sin esperar: este método se llama desde corrutinas
+            self.storage.submit(
                 """
                 INSERT INTO performance_metrics (metric_type, metric_value, domain, timestamp)
                 VALUES (?, ?, ?, ?)
@@ -824,45 +1027,69 @@ class UnifiedLearningQualitySystem:
                 (metric_type, value, domain, datetime.now().isoformat()),
             )
 
-            self.conn.commit()
-            cursor.close()
-
             # También guardar en memoria
             self.performance_metrics[metric_type].append(value)
 
         except Exception as e:
             logger.error(f"Error registrando métrica: {e}")
 
-    def get_learning_stats(self, domain: Optional[str] = None) -> Dict[str, Any]:
-        """Obtener estadísticas de aprendizaje"""
+    def _log_performance_metrics(
+        self, metric_type: str, values: List[float], domain: str = "general"
+    ):
+        """Registrar varias mediciones de una métrica en una sola escritura"""
         try:
-            cursor = self.conn.cursor()
+            timestamp = datetime.now().isoformat()
+            self.storage.submit_many(
+                """
+                INSERT INTO performance_metrics (metric_type, metric_value, domain, timestamp)
+                VALUES (?, ?, ?, ?)
+            """,
+                [(metric_type, value, domain, timestamp) for value in values],
+            )
 
-            # Estadísticas generales
-            cursor.execute("SELECT COUNT(*) FROM learning_experiences")
-            total_experiences = cursor.fetchone()[0]
+            self.performance_metrics[metric_type].extend(values)
 
-            cursor.execute("SELECT AVG(quality_score) FROM learning_experiences")
-            avg_quality = cursor.fetchone()[0] or 0.0
+        except Exception as e:
+            logger.error(f"Error registrando métrica: {e}")
 
-            # Estadísticas por dominio
-            if domain:
-                cursor.execute(
-                    "SELECT COUNT(*) FROM learning_experiences WHERE domain = ?",
-                    (domain,),
-                )
-                domain_experiences = cursor.fetchone()[0]
+    @staticmethod
+    def _read_table_stats(
+        conn, table: str, score_column: str, domain: Optional[str]
+    ) -> Tuple[int, float, int, float]:
+        """Total, media, total del dominio y media del dominio en una consulta"""
+        cursor = conn.cursor()
+        try:
+            cursor.execute(
+                f"""
+                SELECT COUNT(*), AVG({score_column}),
+                       SUM(CASE WHEN domain = ? THEN 1 ELSE 0 END),
+                       AVG(CASE WHEN domain = ? THEN {score_column} END)
+                FROM {table}
+            """,
+                (domain, domain),
+            )
+            total, average, domain_total, domain_average = cursor.fetchone()
+        finally:
+            cursor.close()
 
-                cursor.execute(
-                    "SELECT AVG(quality_score) FROM learning_experiences WHERE domain = ?",
-                    (domain,),
-                )
-                domain_avg_quality = cursor.fetchone()[0] or 0.0
-            else:
-                domain_experiences = total_experiences
-                domain_avg_quality = avg_quality
+        total, average = total or 0, average or 0.0
+        if not domain:
+            return total, average, total, average
+        return total, average, domain_total or 0, domain_average or 0.0
 
-            cursor.close()
+    def get_learning_stats(self, domain: Optional[str] = None) -> Dict[str, Any]:
+        """Obtener estadísticas de aprendizaje"""
+        try:
+            (
+                total_experiences,
+                avg_quality,
+                domain_experiences,
+                domain_avg_quality,
+            ) = self.storage.read_sync(
+                lambda conn: self._read_table_stats(
+                    conn, "learning_experiences", "quality_score", domain
+                )
+            )
 
             return {
                 "total_experiences": total_experiences,
@@ -883,33 +1110,16 @@ class UnifiedLearningQualitySystem:
     def get_quality_stats(self, domain: Optional[str] = None) -> Dict[str, Any]:
         """Obtener estadísticas de calidad"""
         try:
-            cursor = self.conn.cursor()
-
-            # Estadísticas generales
-            cursor.execute("SELECT COUNT(*) FROM quality_evaluations")
-            total_evaluations = cursor.fetchone()[0]
-
-            cursor.execute("SELECT AVG(overall_score) FROM quality_evaluations")
-            avg_score = cursor.fetchone()[0] or 0.0
-
-            # Estadísticas por dominio
-            if domain:
-                cursor.execute(
-                    "SELECT COUNT(*) FROM quality_evaluations WHERE domain = ?",
-                    (domain,),
-                )
-                domain_evaluations = cursor.fetchone()[0]
-
-                cursor.execute(
-                    "SELECT AVG(overall_score) FROM quality_evaluations WHERE domain = ?",
-                    (domain,),
+            (
+                total_evaluations,
+                avg_score,
+                domain_evaluations,
+                domain_avg_score,
+            ) = self.storage.read_sync(
+                lambda conn: self._read_table_stats(
+                    conn, "quality_evaluations", "overall_score", domain
                 )
-                domain_avg_score = cursor.fetchone()[0] or 0.0
-            else:
-                domain_evaluations = total_evaluations
-                domain_avg_score = avg_score
-
-            cursor.close()
+            )
 
             return {
                 "total_evaluations": total_evaluations,
@@ -935,7 +1145,7 @@ class UnifiedLearningQualitySystem:
             "quality": quality_stats,
             "performance_metrics": dict(self.performance_metrics),
             "system_health": {
-                "database_connected": hasattr(self, "conn"),
+                "database_connected": hasattr(self, "storage"),
                 "knowledge_base_size": len(self.knowledge_base),
                 "quality_history_size": len(self.quality_history),
             },
@@ -944,8 +1154,9 @@ class UnifiedLearningQualitySystem:
     def close(self):
         """Cerrar sistema"""
         try:
-            if hasattr(self, "conn"):
-                self.conn.close()
+            if hasattr(self, "storage"):
+                # Confirma las escrituras encoladas antes de cerrar
+                self.storage.close()
             logger.info("✅ Sistema de aprendizaje y calidad cerrado")
         except Exception as e:
             logger.error(f"Error cerrando sistema: {e}")
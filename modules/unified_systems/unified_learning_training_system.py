@@ -44,6 +44,11 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 import requests
 from tqdm import tqdm
 
+try:
+    from .unified_async_storage import get_postgres_storage
+except ImportError:
+    from unified_async_storage import get_postgres_storage
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -161,12 +166,11 @@ class UnifiedLearningTrainingSystem:
     def _init_database(self):
         """Inicializar base de datos"""
         try:
-            # Conectar a PostgreSQL
-            self.db_conn = psycopg2.connect(**self.db_config)
-            self.db_conn.autocommit = True
+            # PostgreSQL con escritor dedicado + pool de lectura
+            self.storage = get_postgres_storage(self.db_config)
 
             # Crear tablas si no existen
-            self._create_tables()
+            self.storage.run_write(self._create_tables)
 
             logger.info("✅ Base de datos inicializada")
 
@@ -246,10 +250,10 @@ class UnifiedLearningTrainingSystem:
 
         logger.info("✅ Sistema de monitoreo inicializado")
 
-    def _create_tables(self):
+    def _create_tables(self, conn):
         """Crear tablas en la base de datos"""
         try:
-            cursor = self.db_conn.cursor()
+            cursor = conn.cursor()
 
             # Tabla de sesiones de entrenamiento
             cursor.execute(
@@ -448,8 +452,7 @@ class UnifiedLearningTrainingSystem:
     async def _register_dataset(self, name: str, dataset_type: DatasetType, size: int):
         """Registrar dataset en base de datos"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 INSERT INTO datasets (dataset_id, name, type, size, domains)
                 VALUES (%s, %s, %s, %s, %s)
@@ -466,7 +469,6 @@ class UnifiedLearningTrainingSystem:
                     json.dumps(self.datasets[dataset_type]["domains"]),
                 ),
             )
-            cursor.close()
 
         except Exception as e:
             logger.error(f"❌ Error registrando dataset: {e}")
@@ -702,8 +704,6 @@ class UnifiedLearningTrainingSystem:
     ) -> List[Dict[str, Any]]:
         """Obtener sesiones de entrenamiento"""
         try:
-            cursor = self.db_conn.cursor(cursor_factory=RealDictCursor)
-
             query = "SELECT * FROM training_sessions"
             params = []
 
@@ -713,9 +713,15 @@ class UnifiedLearningTrainingSystem:
 
             query += " ORDER BY start_time DESC"
 
-            cursor.execute(query, params)
-            sessions = cursor.fetchall()
-            cursor.close()
+            def fetch_sessions(conn):
+                cursor = conn.cursor(cursor_factory=RealDictCursor)
+                try:
+                    cursor.execute(query, params)
+                    return cursor.fetchall()
+                finally:
+                    cursor.close()
+
+            sessions = await self.storage.read(fetch_sessions)
 
             return [dict(session) for session in sessions]
 
@@ -783,8 +789,7 @@ class UnifiedLearningTrainingSystem:
     async def _save_training_session(self, session: TrainingSession):
         """Guardar sesión de entrenamiento en base de datos"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 INSERT INTO training_sessions 
                 (session_id, model_name, dataset_name, training_mode, config, start_time)
@@ -799,7 +804,6 @@ class UnifiedLearningTrainingSystem:
                     session.start_time,
                 ),
             )
-            cursor.close()
 
         except Exception as e:
             logger.error(f"❌ Error guardando sesión: {e}")
@@ -807,8 +811,7 @@ class UnifiedLearningTrainingSystem:
     async def _update_training_session(self, session: TrainingSession):
         """Actualizar sesión de entrenamiento"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 UPDATE training_sessions 
                 SET end_time = %s, status = %s, metrics = %s, artifacts = %s
@@ -822,7 +825,6 @@ class UnifiedLearningTrainingSystem:
                     session.session_id,
                 ),
             )
-            cursor.close()
 
         except Exception as e:
             logger.error(f"❌ Error actualizando sesión: {e}")
@@ -830,8 +832,7 @@ class UnifiedLearningTrainingSystem:
     async def _save_learning_experience(self, experience: LearningExperience):
         """Guardar experiencia de aprendizaje"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 INSERT INTO learning_experiences 
                 (experience_id, domain, input_data, output_data, performance_score, metadata)
@@ -846,7 +847,6 @@ class UnifiedLearningTrainingSystem:
                     json.dumps(experience.metadata),
                 ),
             )
-            cursor.close()
 
         except Exception as e:
             logger.error(f"❌ Error guardando experiencia: {e}")
@@ -854,8 +854,7 @@ class UnifiedLearningTrainingSystem:
     async def _log_training_metric(self, metric_type: str, value: float, step: int = 0):
         """Registrar métrica de entrenamiento"""
         try:
-            cursor = self.db_conn.cursor()
-            cursor.execute(
+            self.storage.submit(
                 """
                 INSERT INTO training_metrics 
                 (metric_type, metric_value, step)
@@ -863,7 +862,6 @@ class UnifiedLearningTrainingSystem:
             """,
                 (metric_type, value, step),
             )
-            cursor.close()
 
         except Exception as e:
             logger.error(f"❌ Error registrando métrica: {e}")
@@ -898,8 +896,8 @@ class UnifiedLearningTrainingSystem:
         """Cerrar sistema"""
         try:
             # Cerrar conexiones
-            if hasattr(self, "db_conn"):
-                self.db_conn.close()
+            if hasattr(self, "storage"):
+                self.storage.close()
 
             # Cerrar executor
             if hasattr(self, "executor"):
@@ -17,8 +17,8 @@ Este módulo combina funcionalidades de:
 
 import logging
 import json
+import os
 import time
-import sqlite3
 import asyncio
 import hashlib
 import secrets
@@ -38,6 +38,11 @@ from cryptography.hazmat.primitives.asymmetric import rsa, padding
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.fernet import Fernet
 
+try:
+    from .unified_async_storage import get_sqlite_storage
+except ImportError:
+    from unified_async_storage import get_sqlite_storage
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -86,6 +91,8 @@ class SecurityConfig:
     max_login_attempts: int = 5
     lockout_duration: int = 900  # 15 minutos
     session_timeout: int = 1800  # 30 minutos
+    session_cache_ttl: int = 30  # segundos antes de revalidar contra la BD
+    activity_flush_interval: int = 15  # segundos entre escrituras de actividad
     enable_2fa: bool = True
     enable_audit_logging: bool = True
     enable_intrusion_detection: bool = True
@@ -149,6 +156,11 @@ class UnifiedSecurityAuthSystem:
 
         # Componentes del sistema
         self.active_sessions: Dict[str, UserSession] = {}
+        # Momento (monotónico) en que cada sesión se leyó/validó contra la BD
+        self.session_cached_at: Dict[str, float] = {}
+        # Última actividad pendiente de escribir, agrupada por sesión
+        self.pending_activity: Dict[str, str] = {}
+        self.last_activity_flush = time.monotonic()
         self.security_events: List[SecurityEvent] = []
         self.audit_logs: List[AuditLog] = []
         self.user_attempts: Dict[str, Dict[str, Any]] = defaultdict(dict)
@@ -164,18 +176,17 @@ class UnifiedSecurityAuthSystem:
     def _init_database(self):
         """Inicializar base de datos"""
         try:
-            # Crear directorio si no existe
-            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
-            self.conn = sqlite3.connect(self.db_path)
-            self._create_tables()
+            # Escritor dedicado + pool de lectura (no bloquea el event loop)
+            self.storage = get_sqlite_storage(self.db_path)
+            self.storage.run_write(self._create_tables)
             logger.info("✅ Base de datos de seguridad y autenticación inicializada")
         except Exception as e:
             logger.error(f"Error inicializando base de datos: {e}")
             raise
 
-    def _create_tables(self):
+    def _create_tables(self, conn):
         """Crear tablas en base de datos"""
-        cursor = self.conn.cursor()
+        cursor = conn.cursor()
 
         # Tabla de usuarios
         cursor.execute(
@@ -313,7 +324,6 @@ class UnifiedSecurityAuthSystem:
             "CREATE INDEX IF NOT EXISTS idx_recovery_token ON account_recovery(recovery_token)"
         )
 
-        self.conn.commit()
         cursor.close()
 
     def _init_security_components(self):
@@ -366,8 +376,7 @@ class UnifiedSecurityAuthSystem:
             # Crear usuario
             user_id = f"user_{int(time.time() * 1000)}"
 
-            cursor = self.conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 INSERT INTO users (id, username, email, password_hash, salt, security_level, created_at)
                 VALUES (?, ?, ?, ?, ?, ?, ?)
@@ -383,9 +392,6 @@ class UnifiedSecurityAuthSystem:
                 ),
             )
 
-            self.conn.commit()
-            cursor.close()
-
             # Registrar evento de auditoría
             await self._log_audit_event(
                 user_id,
@@ -531,8 +537,7 @@ class UnifiedSecurityAuthSystem:
             backup_codes = [secrets.token_hex(4).upper() for _ in range(5)]
 
             # Guardar configuración 2FA
-            cursor = self.conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 INSERT OR REPLACE INTO two_factor_auth 
                 (user_id, secret_key, backup_codes, is_enabled, created_at)
@@ -547,9 +552,6 @@ class UnifiedSecurityAuthSystem:
                 ),
             )
 
-            self.conn.commit()
-            cursor.close()
-
             # Generar QR code
             totp = pyotp.TOTP(secret_key)
             provisioning_uri = totp.provisioning_uri(
@@ -571,13 +573,10 @@ class UnifiedSecurityAuthSystem:
         """Verificar código 2FA"""
         try:
             # Obtener configuración 2FA
-            cursor = self.conn.cursor()
-            cursor.execute(
+            result = await self.storage.fetchone(
                 "SELECT secret_key, backup_codes FROM two_factor_auth WHERE user_id = ?",
                 (user_id,),
             )
-            result = cursor.fetchone()
-            cursor.close()
 
             if not result:
                 return {"valid": False, "error": "2FA no configurado"}
@@ -594,8 +593,7 @@ class UnifiedSecurityAuthSystem:
             if code in backup_codes:
                 # Remover código usado
                 backup_codes.remove(code)
-                cursor = self.conn.cursor()
-                cursor.execute(
+                await self.storage.execute(
                     """
                     UPDATE two_factor_auth 
                     SET backup_codes = ?, last_used = ?
@@ -603,8 +601,6 @@ class UnifiedSecurityAuthSystem:
                 """,
                     (json.dumps(backup_codes), datetime.now().isoformat(), user_id),
                 )
-                self.conn.commit()
-                cursor.close()
 
                 return {"valid": True, "method": "backup_code"}
 
@@ -638,8 +634,7 @@ class UnifiedSecurityAuthSystem:
 
             # Guardar firma
             signature_id = f"sig_{int(time.time() * 1000)}"
-            cursor = self.conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 INSERT INTO digital_signatures 
                 (signature_id, user_id, data_hash, signature, public_key, created_at)
@@ -655,9 +650,6 @@ class UnifiedSecurityAuthSystem:
                 ),
             )
 
-            self.conn.commit()
-            cursor.close()
-
             return {
                 "success": True,
                 "signature_id": signature_id,
@@ -715,8 +707,7 @@ class UnifiedSecurityAuthSystem:
 
             # Guardar token
             recovery_id = f"rec_{int(time.time() * 1000)}"
-            cursor = self.conn.cursor()
-            cursor.execute(
+            await self.storage.execute(
                 """
                 INSERT INTO account_recovery 
                 (recovery_id, user_id, recovery_token, expires_at, created_at)
@@ -731,9 +722,6 @@ class UnifiedSecurityAuthSystem:
                 ),
             )
 
-            self.conn.commit()
-            cursor.close()
-
             return {
                 "success": True,
                 "recovery_token": recovery_token,
@@ -759,8 +747,7 @@ class UnifiedSecurityAuthSystem:
                 }
 
             # Verificar token
-            cursor = self.conn.cursor()
-            cursor.execute(
+            result = await self.storage.fetchone(
                 """
                 SELECT user_id, expires_at, used 
                 FROM account_recovery 
@@ -768,7 +755,6 @@ class UnifiedSecurityAuthSystem:
             """,
                 (recovery_token,),
             )
-            result = cursor.fetchone()
 
             if not result:
                 return {"success": False, "error": "Token de recuperación inválido"}
@@ -785,27 +771,36 @@ class UnifiedSecurityAuthSystem:
             salt = secrets.token_hex(16)
             password_hash = self._hash_password(new_password, salt)
 
-            cursor.execute(
-                """
-                UPDATE users 
-                SET password_hash = ?, salt = ?
-                WHERE id = ?
-            """,
-                (password_hash, salt, user_id),
-            )
-
-            # Marcar token como usado
-            cursor.execute(
-                """
-                UPDATE account_recovery 
-                SET used = TRUE 
-                WHERE recovery_token = ?
-            """,
-                (recovery_token,),
-            )
-
-            self.conn.commit()
-            cursor.close()
+            def apply_reset(conn) -> bool:
+                cursor = conn.cursor()
+                try:
+                    # Marcar token como usado (solo si nadie lo usó entretanto)
+                    cursor.execute(
+                        """
+                        UPDATE account_recovery 
+                        SET used = TRUE 
+                        WHERE recovery_token = ? AND NOT used
+                    """,
+                        (recovery_token,),
+                    )
+                    if cursor.rowcount == 0:
+                        return False
+
+                    cursor.execute(
+                        """
+                        UPDATE users 
+                        SET password_hash = ?, salt = ?
+                        WHERE id = ?
+                    """,
+                        (password_hash, salt, user_id),
+                    )
+                    return True
+                finally:
+                    cursor.close()
+
+            # Ambas actualizaciones en la misma transacción del escritor
+            if not await self.storage.transaction(apply_reset):
+                return {"success": False, "error": "Token ya utilizado"}
 
             # Registrar evento de auditoría
             await self._log_audit_event(
@@ -889,8 +884,7 @@ class UnifiedSecurityAuthSystem:
         )
 
         # Guardar en base de datos
-        cursor = self.conn.cursor()
-        cursor.execute(
+        await self.storage.execute(
             """
             INSERT INTO user_sessions 
             (session_id, user_id, auth_method, security_level, created_at, expires_at, ip_address, user_agent, last_activity)
@@ -909,22 +903,30 @@ class UnifiedSecurityAuthSystem:
             ),
         )
 
-        self.conn.commit()
-        cursor.close()
-
         # Guardar en memoria
         self.active_sessions[session_id] = session
+        self.session_cached_at[session_id] = time.monotonic()
 
         return session
 
     async def _get_session(self, session_id: str) -> Optional[UserSession]:
-        """Obtener sesión"""
-        if session_id in self.active_sessions:
+        """
+        Obtener sesión.
+
+        La copia en memoria se usa durante `session_cache_ttl` segundos; después
+        se vuelve a leer de la BD, de modo que una sesión desactivada desde
+        otro proceso deja de aceptarse como mucho tras ese intervalo.
+        """
+        cached_at = self.session_cached_at.get(session_id)
+        if (
+            cached_at is not None
+            and time.monotonic() - cached_at < self.config.session_cache_ttl
+            and session_id in self.active_sessions
+        ):
             return self.active_sessions[session_id]
 
         # Buscar en base de datos
-        cursor = self.conn.cursor()
-        cursor.execute(
+        result = await self.storage.fetchone(
             """
             SELECT user_id, auth_method, security_level, created_at, expires_at, 
                    ip_address, user_agent, is_active, last_activity
@@ -933,8 +935,6 @@ class UnifiedSecurityAuthSystem:
         """,
             (session_id,),
         )
-        result = cursor.fetchone()
-        cursor.close()
 
         if result:
             session = UserSession(
@@ -950,41 +950,59 @@ class UnifiedSecurityAuthSystem:
                 last_activity=datetime.fromisoformat(result[8]),
             )
             self.active_sessions[session_id] = session
+            self.session_cached_at[session_id] = time.monotonic()
             return session
 
+        self.active_sessions.pop(session_id, None)
+        self.session_cached_at.pop(session_id, None)
         return None
 
     async def _deactivate_session(self, session_id: str):
         """Desactivar sesión"""
         if session_id in self.active_sessions:
             del self.active_sessions[session_id]
+        self.session_cached_at.pop(session_id, None)
+        self.pending_activity.pop(session_id, None)
 
-        cursor = self.conn.cursor()
-        cursor.execute(
+        await self.storage.execute(
             "UPDATE user_sessions SET is_active = FALSE WHERE session_id = ?",
             (session_id,),
         )
-        self.conn.commit()
-        cursor.close()
 
     async def _update_session_activity(self, session_id: str):
-        """Actualizar actividad de sesión"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        """
+        Actualizar actividad de sesión.
+
+        Solo se anota en memoria; las actividades se escriben agrupadas (una
+        fila por sesión) cada `activity_flush_interval` segundos.
+        """
+        self.pending_activity[session_id] = datetime.now().isoformat()
+
+        if (
+            time.monotonic() - self.last_activity_flush
+            >= self.config.activity_flush_interval
+        ):
+            self.flush_session_activity()
+
+    def flush_session_activity(self):
+        """Escribir de una vez las últimas actividades pendientes"""
+        self.last_activity_flush = time.monotonic()
+        if not self.pending_activity:
+            return
+
+        pending, self.pending_activity = self.pending_activity, {}
+        self.storage.submit_many(
             """
             UPDATE user_sessions 
             SET last_activity = ? 
             WHERE session_id = ?
         """,
-            (datetime.now().isoformat(), session_id),
+            [(last_activity, sid) for sid, last_activity in pending.items()],
         )
-        self.conn.commit()
-        cursor.close()
 
     async def _get_user_by_username(self, username: str) -> Optional[Dict[str, Any]]:
         """Obtener usuario por nombre de usuario"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        result = await self.storage.fetchone(
             """
             SELECT id, username, email, password_hash, salt, security_level, is_active
             FROM users 
@@ -992,8 +1010,6 @@ class UnifiedSecurityAuthSystem:
         """,
             (username,),
         )
-        result = cursor.fetchone()
-        cursor.close()
 
         if result:
             return {
@@ -1009,8 +1025,7 @@ class UnifiedSecurityAuthSystem:
 
     async def _get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
         """Obtener usuario por email"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        result = await self.storage.fetchone(
             """
             SELECT id, username, email, password_hash, salt, security_level, is_active
             FROM users 
@@ -1018,8 +1033,6 @@ class UnifiedSecurityAuthSystem:
         """,
             (email,),
         )
-        result = cursor.fetchone()
-        cursor.close()
 
         if result:
             return {
@@ -1035,24 +1048,19 @@ class UnifiedSecurityAuthSystem:
 
     async def _user_exists(self, username: str, email: str) -> bool:
         """Verificar si el usuario existe"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        row = await self.storage.fetchone(
             "SELECT COUNT(*) FROM users WHERE username = ? OR email = ?",
             (username, email),
         )
-        count = cursor.fetchone()[0]
-        cursor.close()
-        return count > 0
+        return row[0] > 0
 
     async def _update_last_login(self, user_id: str):
         """Actualizar último login"""
-        cursor = self.conn.cursor()
-        cursor.execute(
+        # Se encola sin esperar: no bloquea la respuesta
+        self.storage.submit(
             "UPDATE users SET last_login = ? WHERE id = ?",
             (datetime.now().isoformat(), user_id),
         )
-        self.conn.commit()
-        cursor.close()
 
     def _is_ip_blocked(self, ip_address: str) -> bool:
         """Verificar si IP está bloqueada"""
@@ -1138,8 +1146,8 @@ class UnifiedSecurityAuthSystem:
         )
 
         # Guardar en base de datos
-        cursor = self.conn.cursor()
-        cursor.execute(
+        # Se encola sin esperar al commit
+        self.storage.submit(
             """
             INSERT INTO security_events 
             (event_id, user_id, event_type, threat_level, description, ip_address, user_agent, timestamp)
@@ -1157,9 +1165,6 @@ class UnifiedSecurityAuthSystem:
             ),
         )
 
-        self.conn.commit()
-        cursor.close()
-
         # Guardar en memoria
         self.security_events.append(event)
 
@@ -1189,8 +1194,8 @@ class UnifiedSecurityAuthSystem:
         )
 
         # Guardar en base de datos
-        cursor = self.conn.cursor()
-        cursor.execute(
+        # Se encola sin esperar al commit
+        self.storage.submit(
             """
             INSERT INTO audit_logs 
             (log_id, user_id, action, resource, timestamp, ip_address, user_agent, success, details)
@@ -1209,43 +1214,42 @@ class UnifiedSecurityAuthSystem:
             ),
         )
 
-        self.conn.commit()
-        cursor.close()
-
         # Guardar en memoria
         self.audit_logs.append(log)
 
-    def get_security_stats(self) -> Dict[str, Any]:
-        """Obtener estadísticas de seguridad"""
+    @staticmethod
+    def _read_security_counts(conn) -> Tuple[int, ...]:
+        """Contadores de get_security_stats en una sola consulta"""
+        cursor = conn.cursor()
         try:
-            cursor = self.conn.cursor()
-
-            # Estadísticas de usuarios
-            cursor.execute("SELECT COUNT(*) FROM users")
-            total_users = cursor.fetchone()[0]
-
-            cursor.execute("SELECT COUNT(*) FROM users WHERE is_active = TRUE")
-            active_users = cursor.fetchone()[0]
-
-            # Estadísticas de sesiones
-            cursor.execute("SELECT COUNT(*) FROM user_sessions WHERE is_active = TRUE")
-            active_sessions = cursor.fetchone()[0]
-
-            # Estadísticas de eventos de seguridad
-            cursor.execute("SELECT COUNT(*) FROM security_events")
-            total_security_events = cursor.fetchone()[0]
-
             cursor.execute(
-                "SELECT COUNT(*) FROM security_events WHERE threat_level = 'high' OR threat_level = 'critical'"
+                """
+                SELECT
+                    (SELECT COUNT(*) FROM users),
+                    (SELECT COUNT(*) FROM users WHERE is_active = TRUE),
+                    (SELECT COUNT(*) FROM user_sessions WHERE is_active = TRUE),
+                    (SELECT COUNT(*) FROM security_events),
+                    (SELECT COUNT(*) FROM security_events
+                     WHERE threat_level = 'high' OR threat_level = 'critical'),
+                    (SELECT COUNT(*) FROM audit_logs)
+            """
             )
-            high_threat_events = cursor.fetchone()[0]
-
-            # Estadísticas de auditoría
-            cursor.execute("SELECT COUNT(*) FROM audit_logs")
-            total_audit_logs = cursor.fetchone()[0]
-
+            return cursor.fetchone()
+        finally:
             cursor.close()
 
+    def get_security_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas de seguridad"""
+        try:
+            (
+                total_users,
+                active_users,
+                active_sessions,
+                total_security_events,
+                high_threat_events,
+                total_audit_logs,
+            ) = self.storage.read_sync(self._read_security_counts)
+
             return {
                 "users": {
                     "total": total_users,
@@ -1274,8 +1278,10 @@ class UnifiedSecurityAuthSystem:
     def close(self):
         """Cerrar sistema"""
         try:
-            if hasattr(self, "conn"):
-                self.conn.close()
+            if hasattr(self, "storage"):
+                self.flush_session_activity()
+                # Confirma las escrituras encoladas antes de cerrar
+                self.storage.close()
             logger.info("✅ Sistema de seguridad y autenticación cerrado")
         except Exception as e:
             logger.error(f"Error cerrando sistema: {e}")
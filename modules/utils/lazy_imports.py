@@ -0,0 +1,69 @@
+"""
+Importaciones diferidas para librerías pesadas
+==============================================
+
+torch, transformers, spacy, nltk, faiss, sentence_transformers... tardan
+segundos en importarse y muchos procesos (health checks, CLIs, servidores
+que aún no han recibido peticiones) nunca llegan a usarlas. `lazy_import`
+devuelve un proxy que importa el módulo real en el primer acceso a un
+atributo, de modo que `np = lazy_import("numpy")` se comporta como
+`import numpy as np` pero sin coste al importar el módulo que lo declara.
+
+Si la librería no está instalada, el ImportError aparece en el primer uso
+y no al importar el módulo.
+"""
+
+import importlib
+import sys
+import threading
+from types import ModuleType
+from typing import Any
+
+
+class LazyModule(ModuleType):
+    """Proxy de un módulo que se importa en el primer acceso a un atributo"""
+
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__dict__["_lazy_lock"] = threading.Lock()
+        self.__dict__["_lazy_module"] = None
+
+    def _load(self) -> ModuleType:
+        module = self.__dict__["_lazy_module"]
+        if module is None:
+            with self.__dict__["_lazy_lock"]:
+                module = self.__dict__["_lazy_module"]
+                if module is None:
+                    module = importlib.import_module(self.__name__)
+                    self.__dict__["_lazy_module"] = module
+        return module
+
+    def __getattr__(self, attr: str) -> Any:
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self) -> str:
+        state = "cargado" if self.__dict__["_lazy_module"] is not None else "diferido"
+        return f"<LazyModule {self.__name__!r} ({state})>"
+
+
+def lazy_import(name: str) -> ModuleType:
+    """
+    Importar `name` de forma diferida.
+
+    Si el módulo ya está importado en el proceso se devuelve directamente,
+    ya que no hay nada que ahorrar.
+    """
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    return LazyModule(name)
+
+
+def is_loaded(module: ModuleType) -> bool:
+    """Indicar si un módulo (o proxy diferido) ya se ha importado realmente"""
+    if isinstance(module, LazyModule):
+        return module.__dict__["_lazy_module"] is not None
+    return True
@@ -10,9 +10,12 @@ import json
 import logging
 import sqlite3
 import time
+import atexit
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Callable, Deque
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 import requests
@@ -50,6 +53,292 @@ def log_error(message: str, error: Exception = None):
         logger.error(f"Error enviando notificación de error: {notification_error}")
 
 
+class _WindowEntry:
+    """Entrada de la ventana deslizante de un tipo de alerta"""
+
+    __slots__ = ("timestamp", "alert_id", "resolved")
+
+    def __init__(
+        self, timestamp: float, alert_id: Optional[int] = None, resolved: bool = False
+    ):
+        self.timestamp = timestamp
+        self.alert_id = alert_id
+        self.resolved = resolved
+
+
+class _AlertState:
+    """
+    Estado compartido por todos los AlertManager de un mismo db_path:
+    ventanas deslizantes por tipo de alerta, cola de escrituras por lotes
+    y pool de notificaciones.
+    """
+
+    def __init__(self, db_path: str, alert_config: Dict[str, Any]):
+        self.db_path = db_path
+        self.lock = threading.RLock()
+        # Serializa la escritura de lotes y la reconstrucción de ventanas:
+        # un lote a medio escribir no está ni en la cola ni en la DB
+        self.io_lock = threading.Lock()
+        self.windows: Dict[str, Deque[_WindowEntry]] = {}
+        self.entries_by_id: Dict[int, _WindowEntry] = {}
+        self.pending_writes: List[Dict[str, Any]] = []
+        self.horizon_seconds = 3600.0
+
+        self.write_batch_size = int(alert_config.get("write_batch_size", 50))
+        self.write_interval = float(
+            alert_config.get("write_batch_interval_seconds", 1.0)
+        )
+        self.resync_interval = float(alert_config.get("window_resync_seconds", 300))
+        self.last_resync = time.time()
+
+        workers = int(alert_config.get("notification_workers", 4))
+        self.notification_pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="alert-notify"
+        )
+        # Limita las notificaciones en vuelo para no acumular trabajo sin fin
+        self.notification_slots = threading.BoundedSemaphore(
+            int(alert_config.get("max_pending_notifications", workers * 8))
+        )
+
+        self._flush_event = threading.Event()
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="alert-writer", daemon=True
+        )
+
+    def start(self):
+        """Reconstruir ventanas desde la DB y arrancar el escritor"""
+        self.rebuild_windows()
+        self._writer_thread.start()
+        atexit.register(self.shutdown)
+
+    def set_horizon(self, minutes: float):
+        """Ampliar el horizonte de las ventanas si una regla lo necesita"""
+        self.horizon_seconds = max(self.horizon_seconds, minutes * 60)
+
+    def rebuild_windows(self):
+        """Cargar desde la DB las alertas dentro del horizonte de las ventanas"""
+        with self.io_lock:
+            self._rebuild_windows()
+
+    def _rebuild_windows(self):
+        cutoff = datetime.now() - timedelta(seconds=self.horizon_seconds)
+        windows: Dict[str, Deque[_WindowEntry]] = {}
+        entries_by_id: Dict[int, _WindowEntry] = {}
+
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                cursor.execute(
+                    """
+                    SELECT id, alert_type, timestamp, resolved FROM alerts
+                    WHERE timestamp > ?
+                    ORDER BY timestamp ASC
+                """,
+                    (cutoff.isoformat(),),
+                )
+
+                for alert_id, alert_type, timestamp, resolved in cursor.fetchall():
+                    try:
+                        ts = datetime.fromisoformat(str(timestamp)).timestamp()
+                    except ValueError:
+                        continue
+                    entry = _WindowEntry(ts, alert_id, bool(resolved))
+                    windows.setdefault(alert_type, deque()).append(entry)
+                    entries_by_id[alert_id] = entry
+
+        except Exception as e:
+            log_error("❌ Error reconstruyendo ventanas de alertas", e)
+            return
+
+        with self.lock:
+            # Las alertas aún no escritas siguen siendo parte de la ventana
+            for pending in self.pending_writes:
+                windows.setdefault(pending["alert_type"], deque()).append(
+                    pending["entry"]
+                )
+            self.windows = windows
+            self.entries_by_id = entries_by_id
+            self.last_resync = time.time()
+
+    def _prune(self, window: Deque[_WindowEntry], now: float):
+        cutoff = now - self.horizon_seconds
+        while window and window[0].timestamp <= cutoff:
+            expired = window.popleft()
+            if expired.alert_id is not None:
+                self.entries_by_id.pop(expired.alert_id, None)
+
+    def count_since(self, alert_type: str, seconds: float, now: float) -> int:
+        """Contar alertas del tipo dentro de los últimos `seconds` segundos"""
+        window = self.windows.get(alert_type)
+        if not window:
+            return 0
+        self._prune(window, now)
+
+        cutoff = now - seconds
+        count = 0
+        for entry in reversed(window):
+            if entry.timestamp <= cutoff:
+                break
+            count += 1
+        return count
+
+    def has_unresolved_since(self, alert_type: str, seconds: float, now: float) -> bool:
+        """Indicar si hay una alerta sin resolver dentro de la ventana"""
+        window = self.windows.get(alert_type)
+        if not window:
+            return False
+        self._prune(window, now)
+
+        cutoff = now - seconds
+        for entry in reversed(window):
+            if entry.timestamp <= cutoff:
+                break
+            if not entry.resolved:
+                return True
+        return False
+
+    def record(
+        self,
+        alert: Dict[str, Any],
+        now: float,
+        on_saved: Optional[Callable[[int], None]] = None,
+    ):
+        """Registrar la alerta en su ventana y encolar su escritura"""
+        entry = _WindowEntry(now)
+        self.windows.setdefault(alert["alert_type"], deque()).append(entry)
+        self.pending_writes.append(
+            {
+                "alert_type": alert["alert_type"],
+                "severity": alert["severity"],
+                "message": alert["message"],
+                "timestamp": datetime.fromtimestamp(now).isoformat(),
+                "entry": entry,
+                "on_saved": on_saved,
+            }
+        )
+        if len(self.pending_writes) >= self.write_batch_size:
+            self._flush_event.set()
+
+    def mark_resolved(self, alert_id: int):
+        with self.io_lock, self.lock:
+            entry = self.entries_by_id.get(alert_id)
+            if entry is not None:
+                entry.resolved = True
+
+    def flush(self):
+        """Escribir en una sola transacción todas las alertas pendientes"""
+        with self.io_lock:
+            self._flush()
+
+    def _flush(self):
+        with self.lock:
+            batch, self.pending_writes = self.pending_writes, []
+        if not batch:
+            return
+
+        saved = []
+        try:
+            with sqlite3.connect(self.db_path) as conn:
+                cursor = conn.cursor()
+                for pending in batch:
+                    cursor.execute(
+                        """
+                        INSERT INTO alerts (alert_type, severity, message, timestamp)
+                        VALUES (?, ?, ?, ?)
+                    """,
+                        (
+                            pending["alert_type"],
+                            pending["severity"],
+                            pending["message"],
+                            pending["timestamp"],
+                        ),
+                    )
+                    saved.append((pending, cursor.lastrowid))
+                conn.commit()
+
+        except Exception as e:
+            log_error(f"❌ Error guardando lote de {len(batch)} alertas en DB", e)
+            # Devolver el lote a la cola (delante) para el siguiente volcado
+            with self.lock:
+                self.pending_writes[:0] = batch
+            return
+
+        with self.lock:
+            for pending, alert_id in saved:
+                pending["entry"].alert_id = alert_id
+                self.entries_by_id[alert_id] = pending["entry"]
+
+        for pending, alert_id in saved:
+            if pending["on_saved"]:
+                try:
+                    pending["on_saved"](alert_id)
+                except Exception as e:
+                    log_error("❌ Error registrando alerta guardada", e)
+
+    def dispatch(self, channel: str, func: Callable, *args) -> bool:
+        """Enviar una notificación en el pool sin bloquear al llamador"""
+        if not self.notification_slots.acquire(blocking=False):
+            logger.warning(f"⚠️ Cola de notificaciones llena, descartando {channel}")
+            return False
+
+        def _run():
+            try:
+                func(*args)
+            finally:
+                self.notification_slots.release()
+
+        try:
+            self.notification_pool.submit(_run)
+        except RuntimeError:
+            # Pool cerrado durante el apagado del proceso
+            self.notification_slots.release()
+            return False
+        return True
+
+    def _writer_loop(self):
+        while True:
+            self._flush_event.wait(self.write_interval)
+            self._flush_event.clear()
+            self.flush()
+            if time.time() - self.last_resync >= self.resync_interval:
+                self.rebuild_windows()
+
+    def shutdown(self):
+        self.flush()
+        self.notification_pool.shutdown(wait=False)
+
+
+_alert_states: Dict[str, _AlertState] = {}
+_alert_states_lock = threading.Lock()
+
+
+def _get_alert_state(
+    db_path: str, alert_config: Dict[str, Any], horizon_minutes: float
+) -> _AlertState:
+    """Obtener (o crear y arrancar) el estado compartido de una base de datos"""
+    key = str(Path(db_path).resolve())
+    created = False
+    with _alert_states_lock:
+        state = _alert_states.get(key)
+        if state is None:
+            state = _AlertState(db_path, alert_config)
+            state.set_horizon(horizon_minutes)
+            _alert_states[key] = state
+            created = True
+        elif horizon_minutes * 60 > state.horizon_seconds:
+            state.set_horizon(horizon_minutes)
+        else:
+            return state
+
+    # Fuera del lock global: un error al leer la DB pasa por log_error, que
+    # crea otro AlertManager y vuelve a pedir el estado
+    if created:
+        state.start()
+    else:
+        state.rebuild_windows()
+    return state
+
+
 class AlertManager:
     """Gestor de alertas del sistema Shaili AI"""
 
@@ -63,6 +352,16 @@ class AlertManager:
         # Crear directorio si no existe
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
+        # Ventanas deslizantes en memoria, escritor por lotes y pool de
+        # notificaciones compartidos por todas las instancias del proceso
+        horizon_minutes = max(
+            [60, self.alert_config.get("alert_cooldown_minutes", 15)]
+            + [rule["time_window_minutes"] for rule in self.escalation_rules]
+        )
+        self._state = _get_alert_state(
+            self.db_path, self.alert_config, horizon_minutes
+        )
+
     def _load_alert_config(self) -> Dict[str, Any]:
         """Cargar configuración de alertas"""
         config_path = Path("monitoring/alert_config.json")
@@ -86,6 +385,11 @@ class AlertManager:
             "alert_cooldown_minutes": 15,
             "max_alerts_per_hour": 10,
             "auto_resolve_hours": 2,
+            "notification_workers": 4,
+            "notification_timeout_seconds": 10,
+            "write_batch_size": 50,
+            "write_batch_interval_seconds": 1.0,
+            "window_resync_seconds": 300,
         }
 
         # Guardar configuración por defecto
@@ -192,30 +496,31 @@ class AlertManager:
     def process_alert(self, alert: Dict[str, Any]) -> bool:
         """Procesar una nueva alerta"""
         try:
-            # Verificar si la alerta ya existe (cooldown)
-            if self._is_alert_in_cooldown(alert):
-                logger.info(f"⚠️ Alerta en cooldown: {alert['alert_type']}")
-                return False
-
-            # Verificar límite de alertas por hora
-            if self._is_alert_limit_reached(alert["alert_type"]):
-                logger.warning(
-                    f"🚨 Límite de alertas alcanzado para: {alert['alert_type']}"
-                )
-                return False
+            with self._state.lock:
+                now = time.time()
+
+                # Verificar si la alerta ya existe (cooldown)
+                if self._is_alert_in_cooldown(alert, now):
+                    logger.info(f"⚠️ Alerta en cooldown: {alert['alert_type']}")
+                    return False
 
-            # Guardar alerta en base de datos
-            alert_id = self._save_alert_to_db(alert)
+                # Verificar límite de alertas por hora
+                if self._is_alert_limit_reached(alert["alert_type"], now):
+                    logger.warning(
+                        f"🚨 Límite de alertas alcanzado para: {alert['alert_type']}"
+                    )
+                    return False
 
-            # Verificar escalación
-            escalation_level = self._check_escalation(alert)
+                # Verificar escalación
+                escalation_level = self._check_escalation(alert, now)
+
+                # Encolar alerta para su escritura por lotes; el historial se
+                # registra cuando la DB le asigna un id
+                self._save_alert_to_db(alert, now, escalation_level)
 
             # Enviar notificaciones
             self._send_notifications(alert, escalation_level)
 
-            # Registrar en historial
-            self._add_to_history(alert_id, alert, escalation_level)
-
             logger.info(
                 f"✅ Alerta procesada: {alert['alert_type']} (Nivel: {escalation_level})"
             )
@@ -225,111 +530,56 @@ class AlertManager:
             log_error("❌ Error procesando alerta", e)
             return False
 
-    def _is_alert_in_cooldown(self, alert: Dict[str, Any]) -> bool:
-        """Verificar si la alerta está en período de cooldown"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cooldown_minutes = self.alert_config.get("alert_cooldown_minutes", 15)
-                cutoff_time = datetime.now() - timedelta(minutes=cooldown_minutes)
+    def flush(self):
+        """Forzar la escritura de las alertas pendientes en la DB"""
+        self._state.flush()
 
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM alerts 
-                    WHERE alert_type = ? AND timestamp > ? AND resolved = FALSE
-                """,
-                    (alert["alert_type"], cutoff_time.isoformat()),
-                )
-
-                count = cursor.fetchone()[0]
-                return count > 0
-
-        except Exception as e:
-            log_error("❌ Error verificando cooldown", e)
-            return False
+    def _is_alert_in_cooldown(
+        self, alert: Dict[str, Any], now: Optional[float] = None
+    ) -> bool:
+        """Verificar si la alerta está en período de cooldown"""
+        cooldown_minutes = self.alert_config.get("alert_cooldown_minutes", 15)
+        return self._state.has_unresolved_since(
+            alert["alert_type"], cooldown_minutes * 60, now or time.time()
+        )
 
-    def _is_alert_limit_reached(self, alert_type: str) -> bool:
+    def _is_alert_limit_reached(
+        self, alert_type: str, now: Optional[float] = None
+    ) -> bool:
         """Verificar si se alcanzó el límite de alertas por hora"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                max_alerts = self.alert_config.get("max_alerts_per_hour", 10)
-                cutoff_time = datetime.now() - timedelta(hours=1)
-
-                cursor.execute(
-                    """
-                    SELECT COUNT(*) FROM alerts 
-                    WHERE alert_type = ? AND timestamp > ?
-                """,
-                    (alert_type, cutoff_time.isoformat()),
-                )
-
-                count = cursor.fetchone()[0]
-                return count >= max_alerts
-
-        except Exception as e:
-            log_error("❌ Error verificando límite de alertas", e)
-            return False
-
-    def _save_alert_to_db(self, alert: Dict[str, Any]) -> int:
-        """Guardar alerta en la base de datos"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                cursor.execute(
-                    """
-                    INSERT INTO alerts (alert_type, severity, message, timestamp)
-                    VALUES (?, ?, ?, ?)
-                """,
-                    (
-                        alert["alert_type"],
-                        alert["severity"],
-                        alert["message"],
-                        datetime.now().isoformat(),
-                    ),
-                )
-
-                conn.commit()
-                return cursor.lastrowid
+        max_alerts = self.alert_config.get("max_alerts_per_hour", 10)
+        count = self._state.count_since(alert_type, 3600, now or time.time())
+        return count >= max_alerts
 
-        except Exception as e:
-            log_error("❌ Error guardando alerta en DB", e)
-            return 0
+    def _save_alert_to_db(
+        self, alert: Dict[str, Any], now: float, escalation_level: int
+    ):
+        """Encolar la alerta para el escritor por lotes"""
+        self._state.record(
+            alert,
+            now,
+            on_saved=lambda alert_id: self._add_to_history(
+                alert_id, alert, escalation_level
+            ),
+        )
 
-    def _check_escalation(self, alert: Dict[str, Any]) -> int:
+    def _check_escalation(
+        self, alert: Dict[str, Any], now: Optional[float] = None
+    ) -> int:
         """Verificar si se debe escalar la alerta"""
-        try:
-            with sqlite3.connect(self.db_path) as conn:
-                cursor = conn.cursor()
-
-                for rule in self.escalation_rules:
-                    if rule["alert_type"] == alert["alert_type"]:
-                        # Contar alertas similares en la ventana de tiempo
-                        cutoff_time = datetime.now() - timedelta(
-                            minutes=rule["time_window_minutes"]
-                        )
-
-                        cursor.execute(
-                            """
-                            SELECT COUNT(*) FROM alerts 
-                            WHERE alert_type = ? AND timestamp > ?
-                        """,
-                            (alert["alert_type"], cutoff_time.isoformat()),
-                        )
-
-                        count = cursor.fetchone()[0]
-
-                        if count >= rule["threshold"]:
-                            return rule["escalation_level"]
+        now = now or time.time()
+        for rule in self.escalation_rules:
+            if rule["alert_type"] == alert["alert_type"]:
+                # Contar alertas similares en la ventana de tiempo, incluida
+                # la que se está procesando
+                count = 1 + self._state.count_since(
+                    alert["alert_type"], rule["time_window_minutes"] * 60, now
+                )
 
-                return 0  # Sin escalación
+                if count >= rule["threshold"]:
+                    return rule["escalation_level"]
 
-        except Exception as e:
-            log_error("❌ Error verificando escalación", e)
-            return 0
+        return 0  # Sin escalación
 
     def _send_notifications(self, alert: Dict[str, Any], escalation_level: int):
         """Enviar notificaciones por todos los canales habilitados"""
@@ -337,21 +587,30 @@ class AlertManager:
             # Preparar mensaje
             message = self._format_alert_message(alert, escalation_level)
 
-            # Enviar por email
+            # Cada canal se envía en el pool para que un servidor lento no
+            # bloquee el procesamiento de alertas
             if self.notification_channels["email"]["enabled"]:
-                self._send_email_notification(message, escalation_level)
+                self._state.dispatch(
+                    "email", self._send_email_notification, message, escalation_level
+                )
 
-            # Enviar por Slack
             if self.notification_channels["slack"]["enabled"]:
-                self._send_slack_notification(message, escalation_level)
+                self._state.dispatch(
+                    "slack", self._send_slack_notification, message, escalation_level
+                )
 
-            # Enviar por Telegram
             if self.notification_channels["telegram"]["enabled"]:
-                self._send_telegram_notification(message, escalation_level)
+                self._state.dispatch(
+                    "telegram",
+                    self._send_telegram_notification,
+                    message,
+                    escalation_level,
+                )
 
-            # Enviar webhook
             if self.notification_channels["webhook"]["enabled"]:
-                self._send_webhook_notification(alert, escalation_level)
+                self._state.dispatch(
+                    "webhook", self._send_webhook_notification, alert, escalation_level
+                )
 
         except Exception as e:
             log_error("❌ Error enviando notificaciones", e)
@@ -392,6 +651,13 @@ class AlertManager:
 
         return message
 
+    def _channel_timeout(self, channel: str) -> float:
+        """Timeout de un canal de notificación en segundos"""
+        default_timeout = self.alert_config.get("notification_timeout_seconds", 10)
+        return self.notification_channels.get(channel, {}).get(
+            "timeout_seconds", default_timeout
+        )
+
     def _send_email_notification(self, message: str, escalation_level: int):
         """Enviar notificación por email"""
         try:
@@ -405,7 +671,9 @@ class AlertManager:
             msg.attach(MIMEText(message, "plain"))
 
             with smtplib.SMTP(
-                email_config["smtp_server"], email_config["smtp_port"]
+                email_config["smtp_server"],
+                email_config["smtp_port"],
+                timeout=self._channel_timeout("email"),
             ) as server:
                 server.starttls()
                 server.login(email_config["username"], email_config["password"])
@@ -428,7 +696,11 @@ class AlertManager:
                 "icon_emoji": ":warning:",
             }
 
-            response = requests.post(slack_config["webhook_url"], json=payload)
+            response = requests.post(
+                slack_config["webhook_url"],
+                json=payload,
+                timeout=self._channel_timeout("slack"),
+            )
             response.raise_for_status()
 
             logger.info("✅ Notificación por Slack enviada")
@@ -448,7 +720,9 @@ class AlertManager:
                 "parse_mode": "HTML",
             }
 
-            response = requests.post(url, json=payload)
+            response = requests.post(
+                url, json=payload, timeout=self._channel_timeout("telegram")
+            )
             response.raise_for_status()
 
             logger.info("✅ Notificación por Telegram enviada")
@@ -469,7 +743,10 @@ class AlertManager:
             }
 
             response = requests.post(
-                webhook_config["url"], json=payload, headers=webhook_config["headers"]
+                webhook_config["url"],
+                json=payload,
+                headers=webhook_config["headers"],
+                timeout=self._channel_timeout("webhook"),
             )
             response.raise_for_status()
 
@@ -481,17 +758,19 @@ class AlertManager:
     def _add_to_history(
         self, alert_id: int, alert: Dict[str, Any], escalation_level: int
     ):
-        """Agregar alerta al historial"""
-        self.alert_history[alert_id] = {
-            "alert": alert,
-            "escalation_level": escalation_level,
-            "timestamp": datetime.now(),
-            "processed": True,
-        }
+        """Agregar alerta al historial (se llama desde el hilo escritor)"""
+        with self._state.lock:
+            self.alert_history[alert_id] = {
+                "alert": alert,
+                "escalation_level": escalation_level,
+                "timestamp": datetime.now(),
+                "processed": True,
+            }
 
     def resolve_alert(self, alert_id: int, resolution_notes: str = ""):
         """Marcar alerta como resuelta"""
         try:
+            self.flush()
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
@@ -505,10 +784,11 @@ class AlertManager:
                 )
 
                 conn.commit()
+                self._state.mark_resolved(alert_id)
 
                 # Remover del historial
-                if alert_id in self.alert_history:
-                    del self.alert_history[alert_id]
+                with self._state.lock:
+                    self.alert_history.pop(alert_id, None)
 
                 logger.info(f"✅ Alerta {alert_id} marcada como resuelta")
 
@@ -518,6 +798,7 @@ class AlertManager:
     def get_active_alerts(self) -> List[Dict[str, Any]]:
         """Obtener alertas activas"""
         try:
+            self.flush()
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
@@ -545,6 +826,7 @@ class AlertManager:
     def get_alert_statistics(self, hours: int = 24) -> Dict[str, Any]:
         """Obtener estadísticas de alertas"""
         try:
+            self.flush()
             with sqlite3.connect(self.db_path) as conn:
                 cursor = conn.cursor()
 
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Resumen de Métricas por Rama
+============================
+Archivo de resumen que el código de entrenamiento escribe en cada rama
+(`branches/<rama>/metrics_summary.json`) para que el colector de métricas
+lo lea con una sola apertura en lugar de recorrer checkpoints, logs y
+datasets en cada ciclo.
+"""
+
+import json
+import os
+import tempfile
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, Union
+
+SUMMARY_FILENAME = "metrics_summary.json"
+
+# Campos que el colector persiste en la tabla branch_metrics
+SUMMARY_FIELDS = (
+    "active_adapters",
+    "training_progress",
+    "accuracy_score",
+    "loss_value",
+    "samples_processed",
+    "last_training_time",
+)
+
+
+def write_branch_summary(
+    branch_dir: Union[str, Path], metrics: Dict[str, Any]
+) -> Path:
+    """
+    Escribir (de forma atómica) el resumen de métricas de una rama.
+
+    Solo se guardan los campos conocidos; los que falten o valgan None (p.
+    ej. un entrenamiento sin evaluación) conservan el valor del resumen
+    anterior si existe. `last_training_time` solo toma la hora
+    actual en el primer resumen: el código de entrenamiento la pasa en
+    cada entrenamiento.
+    """
+    branch_dir = Path(branch_dir)
+    branch_dir.mkdir(parents=True, exist_ok=True)
+
+    summary = read_branch_summary(branch_dir) or {}
+    summary.update(
+        {k: v for k, v in metrics.items() if k in SUMMARY_FIELDS and v is not None}
+    )
+    summary.setdefault("last_training_time", datetime.now().isoformat())
+    summary["updated_at"] = datetime.now().isoformat()
+
+    summary_path = branch_dir / SUMMARY_FILENAME
+    fd, tmp_path = tempfile.mkstemp(dir=branch_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(summary, f, indent=2)
+        os.replace(tmp_path, summary_path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+    return summary_path
+
+
+def read_branch_summary(branch_dir: Union[str, Path]) -> Optional[Dict[str, Any]]:
+    """Leer el resumen de métricas de una rama, o None si no existe"""
+    summary_path = Path(branch_dir) / SUMMARY_FILENAME
+    try:
+        with open(summary_path, "r") as f:
+            data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
@@ -12,7 +12,7 @@ import logging
 import traceback
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 import threading
 import sqlite3
 import os
@@ -20,6 +20,11 @@ import requests
 import subprocess
 import glob
 
+try:
+    from monitoring.branch_summary import SUMMARY_FILENAME, SUMMARY_FIELDS
+except ImportError:  # Ejecutado como script desde monitoring/
+    from branch_summary import SUMMARY_FILENAME, SUMMARY_FIELDS
+
 # Configurar logging con más detalles
 logging.basicConfig(
     level=logging.INFO,
@@ -62,6 +67,12 @@ class MetricsCollector:
         self.backend_url = "http://127.0.0.1:8000"
         self.frontend_url = "http://127.0.0.1:3000"
 
+        # Caché de métricas por rama: nombre -> (firma, métricas, instante)
+        self._branch_cache: Dict[str, Tuple[Tuple, Dict[str, Any], float]] = {}
+        # Tras este tiempo se rehace el escaneo completo aunque la firma no
+        # cambie (cubre cambios en subdirectorios anidados)
+        self.branch_cache_max_age = 300  # segundos
+
         # Crear directorio si no existe
         Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
 
@@ -453,33 +464,35 @@ class MetricsCollector:
         except:
             return "unknown"
 
+    # Subdirectorios cuyo mtime forma parte de la firma de una rama
+    _BRANCH_WATCHED_DIRS = (
+        "adapter",
+        "checkpoints",
+        "models",
+        "weights",
+        "dataset",
+        "data",
+        "logs",
+    )
+
     def collect_branch_metrics(self) -> List[Dict[str, Any]]:
         """Recopilar métricas reales de ramas"""
         try:
             metrics = []
             branches_path = Path("branches")
+            seen = set()
 
             if branches_path.exists():
-                for branch_dir in branches_path.iterdir():
-                    if branch_dir.is_dir() and branch_dir.name != "__pycache__":
-                        branch_metrics = {
-                            "branch_name": branch_dir.name,
-                            "active_adapters": self._count_real_active_adapters(
-                                branch_dir
-                            ),
-                            "training_progress": self._get_real_training_progress(
-                                branch_dir
-                            ),
-                            "accuracy_score": self._get_real_accuracy_score(branch_dir),
-                            "loss_value": self._get_real_loss_value(branch_dir),
-                            "samples_processed": self._get_real_samples_processed(
-                                branch_dir
-                            ),
-                            "last_training_time": self._get_last_training_time(
-                                branch_dir
-                            ),
-                        }
-                        metrics.append(branch_metrics)
+                with os.scandir(branches_path) as entries:
+                    for entry in entries:
+                        if entry.is_dir() and entry.name != "__pycache__":
+                            seen.add(entry.name)
+                            metrics.append(self._get_branch_metrics(Path(entry.path)))
+
+            # Olvidar ramas eliminadas
+            for name in list(self._branch_cache):
+                if name not in seen:
+                    del self._branch_cache[name]
 
             return metrics
 
@@ -487,6 +500,78 @@ class MetricsCollector:
             log_error("❌ Error recopilando métricas de ramas", e)
             return []
 
+    def _get_branch_metrics(self, branch_dir: Path) -> Dict[str, Any]:
+        """Métricas de una rama, reutilizando la caché si no ha cambiado"""
+        signature = self._branch_signature(branch_dir)
+        cached = self._branch_cache.get(branch_dir.name)
+        now = time.time()
+
+        if (
+            cached
+            and cached[0] == signature
+            and now - cached[2] < self.branch_cache_max_age
+        ):
+            return cached[1]
+
+        branch_metrics = self._read_branch_summary(branch_dir, signature)
+        if branch_metrics is None:
+            branch_metrics = self._scan_branch_metrics(branch_dir)
+
+        self._branch_cache[branch_dir.name] = (signature, branch_metrics, now)
+        return branch_metrics
+
+    def _branch_signature(self, branch_dir: Path) -> Tuple:
+        """
+        Firma barata de cambios de una rama: mtime/tamaño de los archivos del
+        nivel superior y mtime de los subdirectorios vigilados.
+        """
+        signature = []
+        try:
+            with os.scandir(branch_dir) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_file():
+                            st = entry.stat()
+                            signature.append((entry.name, st.st_mtime_ns, st.st_size))
+                        elif entry.name in self._BRANCH_WATCHED_DIRS:
+                            signature.append((entry.name, entry.stat().st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError:
+            return ()
+        return tuple(sorted(signature))
+
+    def _read_branch_summary(
+        self, branch_dir: Path, signature: Tuple
+    ) -> Optional[Dict[str, Any]]:
+        """Leer el resumen escrito por el entrenamiento, si existe"""
+        if not any(item[0] == SUMMARY_FILENAME for item in signature):
+            return None
+
+        try:
+            with open(branch_dir / SUMMARY_FILENAME, "r") as f:
+                summary = json.load(f)
+        except Exception as e:
+            log_error(f"❌ Error leyendo resumen de la rama {branch_dir.name}", e)
+            return None
+
+        branch_metrics = {"branch_name": branch_dir.name}
+        for field in SUMMARY_FIELDS:
+            branch_metrics[field] = summary.get(field)
+        return branch_metrics
+
+    def _scan_branch_metrics(self, branch_dir: Path) -> Dict[str, Any]:
+        """Escaneo completo de una rama sin resumen de entrenamiento"""
+        return {
+            "branch_name": branch_dir.name,
+            "active_adapters": self._count_real_active_adapters(branch_dir),
+            "training_progress": self._get_real_training_progress(branch_dir),
+            "accuracy_score": self._get_real_accuracy_score(branch_dir),
+            "loss_value": self._get_real_loss_value(branch_dir),
+            "samples_processed": self._get_real_samples_processed(branch_dir),
+            "last_training_time": self._get_last_training_time(branch_dir),
+        }
+
     def _count_real_active_adapters(self, branch_dir: Path) -> int:
         """Contar adapters activos reales en una rama"""
         try: